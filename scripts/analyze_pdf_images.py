@@ -5,13 +5,18 @@ Script Name: analyze_pdf_images.py
 
 Purpose:
     This script analyzes PDF files to identify image types and properties, including
-    format, dimensions, size, and whether images are raster or vector type.
+    format, dimensions and size of the raster images, and which pages hold
+    vector figures (drawn with paths rather than embedded as images).
 
 Usage:
     python scripts/analyze_pdf_images.py
 
     The script automatically analyzes the test PDF file located in the project structure.
 
+    Corpus-wide inventory (parallel, written to a CSV/SQLite/Parquet table,
+    see image_inventory.py):
+    python scripts/analyze_pdf_images.py --inventory pdf/output/image_inventory.csv
+
 Virtual Environment:
     This script should be run within the project's virtual environment.
     
@@ -22,7 +27,7 @@ Virtual Environment:
 
 Dependencies:
     - Python 3.10.11+
-    - PyMuPDF (fitz)
+    - PyMuPDF (fitz), used through pdf_prescan.py
 
 Author:
     MiouCat Workshop
@@ -32,10 +37,12 @@ License:
     MIT License
 """
 
-import fitz
 import os
+import argparse
 from pathlib import Path
 
+from pdf_prescan import get_profile
+
 # Terminal color codes
 class Colors:
     GREEN = '\033[92m'
@@ -50,81 +57,73 @@ class Colors:
         """Colorize text for terminal output"""
         return f"{color}{text}{Colors.RESET}"
 
-def analyze_pdf_images(pdf_path):
+def analyze_pdf_images(pdf_path, profile=None):
     """
     Analyze PDF file to identify image types and properties.
     
     Args:
         pdf_path (str): Path to the PDF file
+        profile (dict): Pre-scan profile of the PDF; loaded from the pre-scan
+            cache (scanning the PDF only if needed) when not given
     """
     print(f"{Colors.CYAN}Analyzing PDF:{Colors.RESET} {pdf_path}")
     print("=" * 60)
     
     try:
-        # Open PDF file
-        doc = fitz.open(pdf_path)
-        print(f"{Colors.BLUE}PDF contains {doc.page_count} pages{Colors.RESET}")
+        if profile is None:
+            profile = get_profile(pdf_path)
+        print(f"{Colors.BLUE}PDF contains {profile['page_count']} pages{Colors.RESET}")
         print()
         
         image_count = 0
         
         # Iterate through pages
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            images = page.get_images(full=True)
+        for page in profile["pages"]:
+            images = page["images"]
+            
+            if page.get("vector_figure"):
+                print(f"{Colors.BLUE}Page {page['number'] + 1}: vector figure "
+                      f"({page['drawings']} drawing paths, {page['drawing_coverage']:.0%} of the page){Colors.RESET}")
+                print()
             
             if images:
-                print(f"{Colors.BLUE}Page {page_num + 1}: {len(images)} images{Colors.RESET}")
+                print(f"{Colors.BLUE}Page {page['number'] + 1}: {len(images)} images{Colors.RESET}")
                 
                 # Analyze each image
                 for img_index, img in enumerate(images):
                     image_count += 1
-                    xref = img[0]
-                    
-                    # Get image info
-                    img_info = doc.extract_image(xref)
-                    img_data = img_info.get('image', b'')
-                    img_ext = img_info.get('ext', 'unknown')
-                    img_width = img_info.get('width', 0)
-                    img_height = img_info.get('height', 0)
-                    img_size = len(img_data) / 1024  # KB
-                    
-                    # Get image details from the PDF
-                    img_dict = doc.xref_object(xref)
+                    img_size = img["length"] / 1024  # KB, encoded stream size
                     
                     print(f"  {Colors.GREEN}Image {img_index + 1}:{Colors.RESET}")
-                    print(f"    Format: {img_ext}")
-                    print(f"    Dimensions: {img_width}x{img_height}")
+                    print(f"    Format: {img['ext']}")
+                    print(f"    Dimensions: {img['width']}x{img['height']}")
                     print(f"    Size: {img_size:.2f} KB")
-                    print(f"    XREF: {xref}")
-                    
-                    # Check if it's a vector image (PDF form XObject)
-                    if 'Form' in img_dict:
-                        print("    Type: Vector (Form XObject)")
-                    else:
-                        print("    Type: Raster")
+                    print(f"    XREF: {img['xref']}")
+                    print("    Type: Raster")
                     
                     print()
         
         print("=" * 60)
         print(f"{Colors.GREEN}Total images found: {image_count}{Colors.RESET}")
+        print(f"{Colors.GREEN}Pages with vector figures: {profile['vector_pages']}{Colors.RESET}")
         print("=" * 60)
         
-        doc.close()
-        
     except Exception as e:
         print(f"{Colors.RED}Error analyzing PDF: {str(e)}{Colors.RESET}")
 
-def main():
+def run_analysis(input_dir, inventory=None, workers=None):
     """
-    Main function to analyze PDF images in all subdirectories.
-    """
-    # Get project root
-    script_dir = Path(__file__).parent
-    project_root = script_dir.parent
+    Analyze the images of every PDF in the subdirectories of the input directory.
     
-    # Path to the input directory
-    input_dir = project_root / "pdf" / "input"
+    Args:
+        input_dir (Path): Input directory
+        inventory (str): Write a tabular inventory to this path instead of printing
+        workers (int): Worker processes for the inventory (CPU count if None)
+    """
+    if inventory:
+        from image_inventory import run_inventory
+        run_inventory(input_dir, Path(inventory), workers)
+        return
     
     if not input_dir.exists():
         print(f"{Colors.RED}Input directory not found: {input_dir}{Colors.RESET}")
@@ -158,23 +157,19 @@ def main():
         print(f"{Colors.CYAN}\nAnalyzing: {pdf_path.relative_to(input_dir)}{Colors.RESET}")
         print("-" * 80)
         
-        # Count images in this PDF
+        # Count images in this PDF (one scan, reused by the analysis below)
         try:
-            doc = fitz.open(pdf_path)
-            doc_images = 0
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                images = page.get_images(full=True)
-                doc_images += len(images)
-            doc.close()
+            profile = get_profile(pdf_path)
+            doc_images = profile["image_count"]
             total_images += doc_images
             
             print(f"{Colors.GREEN}PDF contains {doc_images} images{Colors.RESET}")
         except Exception as e:
             print(f"{Colors.RED}Error analyzing {pdf_path}: {str(e)}{Colors.RESET}")
+            continue
         
         # Call the existing analyze function
-        analyze_pdf_images(str(pdf_path))
+        analyze_pdf_images(str(pdf_path), profile)
     
     # Final summary
     print(f"{Colors.CYAN}\n=== Final Summary ==={Colors.RESET}")
@@ -182,5 +177,21 @@ def main():
     print(f"{Colors.GREEN}Total images found:{Colors.RESET} {total_images}")
     print(f"{Colors.CYAN}====================={Colors.RESET}")
 
+def main():
+    """
+    Main function to analyze PDF images in all subdirectories.
+    """
+    parser = argparse.ArgumentParser(description="Analyze the images in all PDFs")
+    parser.add_argument("--inventory", metavar="OUTPUT",
+                        help="Write a tabular inventory (.csv, .sqlite/.db or .parquet) of all images "
+                             "instead of printing them")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for --inventory (default: CPU count)")
+    args = parser.parse_args()
+    
+    # Path to the input directory
+    project_root = Path(__file__).parent.parent
+    run_analysis(project_root / "pdf" / "input", args.inventory, args.workers)
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,482 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: autotune.py
+
+Purpose:
+    This module picks Marker's per-stage batch sizes and the number of worker
+    processes from the machine's available memory and cores, instead of the
+    fixed max_workers = cores / 2 and batch_size = min(4, cores). Large pages
+    (posters, A3 scans) get smaller batches than letter-sized ones.
+
+    The memory model starts from conservative built-in estimates and can be
+    calibrated with a short conversion of a synthetic document, which measures
+    the real model footprint and per-page memory on this machine. Tuning is
+    persisted per host in pdf/output/.pipeline/autotune.json.
+
+    When a conversion runs out of memory (MemoryError, allocator errors, or a
+    worker killed by the OOM killer), record_memory_pressure() halves the batch
+    sizes and persists that, so the retry and every later run use less memory
+    instead of crashing again. The backoff is capped, and each run of
+    successful documents without memory pressure undoes one halving, so a
+    single bad document does not slow down every later run.
+
+    Batch sizes are rounded down to powers of two, so small changes in free
+    memory do not produce a new converter config for every document.
+
+Usage:
+    Used by process_pdf.py and batch_scheduler.py. To inspect or calibrate:
+    python scripts/autotune.py show
+    python scripts/autotune.py calibrate
+    python scripts/autotune.py reset
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - psutil (optional, memory probing on Windows and macOS)
+    - marker-pdf (calibration only)
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import json
+import socket
+import argparse
+import multiprocessing
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_STATE_PATH = Path(__file__).parent.parent / "pdf" / "output" / ".pipeline" / "autotune.json"
+
+# Conservative CPU estimates, refined by calibrate()
+DEFAULT_MODEL_MB = 3500     # resident size of the loaded Surya/Marker models
+DEFAULT_PAGE_MB = 120       # extra memory per letter-sized page in a batch
+
+# Marker config keys of the per-stage batch sizes, with the relative memory
+# cost of one batch item and an upper bound
+STAGE_BATCHES = {
+    "layout_batch_size": (1.0, 12),
+    "detection_batch_size": (0.8, 16),
+    "recognition_batch_size": (0.25, 64),
+    "table_rec_batch_size": (0.6, 12),
+    "equation_batch_size": (0.6, 12),
+    "ocr_error_batch_size": (0.3, 16),
+}
+
+# Memory left to the OS and other processes
+RESERVED_MB = 1500
+LETTER_PAGE_AREA = 612 * 792
+
+# At most this many halvings of the batch sizes
+MAX_BACKOFF = 4
+# Successful documents in a row after which one halving is undone
+BACKOFF_DECAY_DOCUMENTS = 20
+
+# Set to 0 to keep the fixed batch sizes
+ENABLED_ENV = "PAPER2SKILL_AUTOTUNE"
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def probe_memory():
+    """
+    Get the total and currently available system memory.
+
+    Returns:
+        tuple: (total_mb, available_mb), (None, None) if unknown
+    """
+    try:
+        import psutil
+        memory = psutil.virtual_memory()
+        return memory.total / (1024 * 1024), memory.available / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        values = {}
+        with open("/proc/meminfo") as f:
+            for line in f:
+                name, value = line.split(":", 1)
+                values[name] = int(value.split()[0]) / 1024
+        return values["MemTotal"], values.get("MemAvailable", values["MemFree"])
+    except (OSError, ValueError, KeyError):
+        return None, None
+
+
+def probe_system():
+    """
+    Describe the machine the pipeline runs on.
+
+    Returns:
+        dict: Host name, CPU count and memory in MB
+    """
+    total_mb, available_mb = probe_memory()
+    return {
+        "host": socket.gethostname(),
+        "cpu_count": multiprocessing.cpu_count(),
+        "total_mb": round(total_mb) if total_mb else None,
+        "available_mb": round(available_mb) if available_mb else None,
+    }
+
+
+def is_enabled():
+    """
+    Check whether autotuning is enabled.
+
+    Returns:
+        bool: False if PAPER2SKILL_AUTOTUNE is set to 0
+    """
+    return os.environ.get(ENABLED_ENV, "1") != "0"
+
+
+def halve_batches(config):
+    """
+    Halve the batch sizes of a Marker config.
+
+    Args:
+        config (dict): Marker converter config
+
+    Returns:
+        dict: Copy of the config with every batch size halved (at least 1)
+    """
+    return {key: max(1, value // 2) if key in STAGE_BATCHES or key == "batch_size" else value
+            for key, value in config.items()}
+
+
+def round_batch(value):
+    """
+    Round a batch size down to a power of two.
+
+    Args:
+        value (float): Batch size
+
+    Returns:
+        int: Largest power of two not above value (at least 1)
+    """
+    value = max(1, int(value))
+    return 1 << (value.bit_length() - 1)
+
+
+def is_memory_error(error):
+    """
+    Check whether an exception means the conversion ran out of memory.
+
+    Args:
+        error (BaseException): Exception raised by a conversion
+
+    Returns:
+        bool: True for MemoryError and allocator failures reported by torch
+    """
+    if isinstance(error, MemoryError):
+        return True
+    message = str(error).lower()
+    return any(text in message for text in (
+        "out of memory", "can't allocate memory", "cannot allocate memory", "defaultcpuallocator",
+    ))
+
+
+class Autotuner:
+    """
+    Persistent memory model and batch-size backoff for one host.
+    """
+
+    def __init__(self, state_path=DEFAULT_STATE_PATH):
+        """
+        Load the tuning of this host, or start from the built-in estimates.
+
+        Args:
+            state_path (Path): JSON file holding the tuning of every host
+        """
+        self.path = Path(state_path)
+        self.system = probe_system()
+        # Worker processes sharing the machine, set by the batch scheduler
+        self.workers = 1
+        # Successful documents since the last memory pressure, in this process
+        self.successes = 0
+        self._mtime = None
+        self.state = self._load()
+
+    def _default_state(self):
+        return {
+            "model_mb": DEFAULT_MODEL_MB,
+            "page_mb": DEFAULT_PAGE_MB,
+            "backoff": 0,
+            "calibrated_at": None,
+        }
+
+    def _load(self):
+        state = self._default_state()
+        try:
+            self._mtime = self.path.stat().st_mtime_ns
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state.update(json.load(f).get(self.system["host"], {}))
+        except (OSError, ValueError):
+            pass
+        return state
+
+    def refresh(self):
+        """
+        Reload the state if another process changed it (e.g. after a backoff).
+        """
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.state = self._load()
+
+    def save(self):
+        """
+        Persist the tuning of this host (temp file + rename).
+        """
+        data = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            pass
+        data[self.system["host"]] = self.state
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._mtime = self.path.stat().st_mtime_ns
+
+    def page_budget(self, workers=None):
+        """
+        Work out how many letter-sized pages one worker may hold in a batch.
+
+        Args:
+            workers (int): Worker processes sharing the machine (self.workers if None)
+
+        Returns:
+            float: Page budget per worker (at least 1)
+        """
+        workers = max(1, workers or self.workers)
+        total_mb, available_mb = probe_memory()
+        if available_mb is None:
+            # Unknown memory: keep the previous fixed behaviour
+            return 4.0
+        # Planned share of the machine, and what is actually free right now
+        # (the models of running workers are already excluded from the latter)
+        planned_mb = (total_mb - RESERVED_MB) / workers - self.state["model_mb"]
+        free_mb = (available_mb - RESERVED_MB) / workers
+        budget = min(planned_mb, free_mb) / self.state["page_mb"]
+        return max(1.0, budget / (2 ** self.state["backoff"]))
+
+    def batch_sizes(self, cores_limit, page_area=LETTER_PAGE_AREA, workers=None):
+        """
+        Pick Marker's batch sizes for one conversion.
+
+        Args:
+            cores_limit (int): CPU cores the conversion may use
+            page_area (float): Largest page area of the document in points²
+            workers (int): Worker processes sharing the machine (self.workers if None)
+
+        Returns:
+            dict: Marker config entries (per-stage batch sizes and batch_size)
+        """
+        self.refresh()
+        scale = min(4.0, max(1.0, page_area / LETTER_PAGE_AREA))
+        budget = self.page_budget(workers) / scale
+        config = {}
+        for key, (cost, upper) in STAGE_BATCHES.items():
+            config[key] = round_batch(min(upper, budget / cost))
+        # Generic batch size, bounded by the cores like before
+        config["batch_size"] = round_batch(min(cores_limit, budget, 8))
+        return config
+
+    def recommend_workers(self, threads_per_worker):
+        """
+        Recommend a worker count that fits both the cores and the memory.
+
+        Args:
+            threads_per_worker (int): Compute threads per worker
+
+        Returns:
+            int: Number of worker processes
+        """
+        by_cores = max(1, self.system["cpu_count"] // max(1, threads_per_worker))
+        _total, available_mb = probe_memory()
+        if available_mb is None:
+            return by_cores
+        # Each worker needs its own models plus room for a minimal batch
+        per_worker = self.state["model_mb"] + 2 * self.state["page_mb"]
+        by_memory = max(1, int((available_mb - RESERVED_MB) // per_worker))
+        return min(by_cores, by_memory)
+
+    def record_memory_pressure(self):
+        """
+        Halve all batch sizes from now on (persisted), after running out of memory.
+
+        The backoff stops growing at MAX_BACKOFF.
+
+        Returns:
+            int: New backoff level
+        """
+        self.refresh()
+        self.successes = 0
+        if self.state["backoff"] >= MAX_BACKOFF:
+            print(f"{Colors.YELLOW}Memory pressure: batch sizes already at the smallest "
+                  f"backoff level ({MAX_BACKOFF}){Colors.RESET}")
+            return self.state["backoff"]
+        self.state["backoff"] += 1
+        self.save()
+        print(f"{Colors.YELLOW}Memory pressure: halving batch sizes "
+              f"(backoff level {self.state['backoff']}){Colors.RESET}")
+        return self.state["backoff"]
+
+    def record_success(self):
+        """
+        Count a document converted without memory pressure.
+
+        After BACKOFF_DECAY_DOCUMENTS of them in a row, one halving of the
+        batch sizes is undone (persisted).
+
+        Returns:
+            int: Current backoff level
+        """
+        if self.state["backoff"] == 0:
+            return 0
+        self.successes += 1
+        if self.successes >= BACKOFF_DECAY_DOCUMENTS:
+            self.successes = 0
+            self.refresh()
+            self.state["backoff"] = max(0, self.state["backoff"] - 1)
+            self.save()
+            print(f"{Colors.GREEN}No memory pressure for {BACKOFF_DECAY_DOCUMENTS} documents: "
+                  f"doubling batch sizes (backoff level {self.state['backoff']}){Colors.RESET}")
+        return self.state["backoff"]
+
+    def reset(self):
+        """
+        Forget calibration and backoff for this host.
+        """
+        self.state = self._default_state()
+        self.save()
+
+    def calibrate(self, cores_limit=None):
+        """
+        Measure the model footprint and per-page memory with a short conversion.
+
+        Loads the Marker models and converts a small synthetic document twice,
+        once page by page and once with larger batches, to separate the fixed
+        model cost from the per-page cost.
+
+        Args:
+            cores_limit (int): CPU cores the calibration may use
+        """
+        import shutil
+        import tempfile
+        import process_pdf
+        from batch_scheduler import current_rss_mb
+        from pipeline_metrics import peak_rss_mb
+        from benchmark_pipeline import generate_corpus
+
+        cores_limit = process_pdf.get_cores_limit(cores_limit)
+        corpus_dir = Path(tempfile.mkdtemp(prefix="paper2skill-calibrate-"))
+        try:
+            corpus = generate_corpus(corpus_dir)
+            pdf_path = min(corpus, key=lambda path: path.stat().st_size)
+
+            before = current_rss_mb()
+            process_pdf.get_model_dict()
+            model_mb = max(500.0, current_rss_mb() - before)
+
+            peaks = {}
+            for batch in (1, 4):
+                config = process_pdf.get_converter_config(cores_limit)
+                config.update({key: batch for key in STAGE_BATCHES})
+                config["batch_size"] = batch
+                converter = process_pdf.get_converter(config, cache=False)
+                converter(str(pdf_path))
+                peaks[batch] = peak_rss_mb()
+        finally:
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+
+        # ru_maxrss only grows, so the difference is what the larger batches added
+        page_mb = max(DEFAULT_PAGE_MB / 4, (peaks[4] - peaks[1]) / 3)
+        self.state.update({
+            "model_mb": round(model_mb),
+            "page_mb": round(page_mb),
+            "backoff": 0,
+            "calibrated_at": datetime.now().isoformat(timespec='seconds'),
+        })
+        self.save()
+
+
+_tuner = None
+
+
+def get_tuner():
+    """
+    Get the process-wide autotuner.
+
+    Returns:
+        Autotuner: Shared instance
+    """
+    global _tuner
+    if _tuner is None:
+        _tuner = Autotuner()
+    return _tuner
+
+
+def main():
+    """
+    Main function to show, calibrate or reset the tuning of this host.
+    """
+    parser = argparse.ArgumentParser(description="Autotune Marker batch sizes and worker counts")
+    parser.add_argument("command", choices=["show", "calibrate", "reset"],
+                        help="show: print the current tuning; calibrate: measure memory use with a "
+                             "short conversion; reset: drop calibration and backoff")
+    parser.add_argument("--threads-per-worker", type=int, default=4,
+                        help="Threads per worker for the worker recommendation (default: %(default)s)")
+    args = parser.parse_args()
+
+    tuner = get_tuner()
+    if args.command == "calibrate":
+        print(f"{Colors.YELLOW}Calibrating (loads the Marker models)...{Colors.RESET}")
+        tuner.calibrate()
+    elif args.command == "reset":
+        tuner.reset()
+
+    system = tuner.system
+    print(f"{Colors.CYAN}Host:{Colors.RESET} {system['host']} ({system['cpu_count']} cores, "
+          f"{system['available_mb']}/{system['total_mb']} MB available)")
+    print(f"{Colors.BLUE}Model footprint:{Colors.RESET} {tuner.state['model_mb']} MB, "
+          f"{Colors.BLUE}per page:{Colors.RESET} {tuner.state['page_mb']} MB "
+          f"({'calibrated ' + tuner.state['calibrated_at'] if tuner.state['calibrated_at'] else 'estimated'})")
+    print(f"{Colors.BLUE}Backoff level:{Colors.RESET} {tuner.state['backoff']}")
+    workers = tuner.recommend_workers(args.threads_per_worker)
+    print(f"{Colors.BLUE}Recommended workers:{Colors.RESET} {workers} x {args.threads_per_worker} threads")
+    for key, value in tuner.batch_sizes(args.threads_per_worker, workers=workers).items():
+        print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: batch_scheduler.py
+
+Purpose:
+    This module spreads whole PDF documents across a pool of worker processes.
+    Each worker loads its own copy of the Marker models once, runs with a fixed
+    thread budget, and is recycled when its memory use passes a ceiling, so that
+    large CPU-only machines are kept busy without oversubscribing cores or RAM.
+
+Usage:
+    Used by process_pdf.py:
+    python scripts/process_pdf.py --workers 8 --threads-per-worker 4 --max-worker-memory 6000
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - marker-pdf (worker side)
+    - psutil (optional, used for memory readings on Windows)
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import queue
+import multiprocessing
+
+# Environment variables read by the BLAS/OpenMP/PyTorch thread pools
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+)
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def plan_workers(workers=None, threads_per_worker=None):
+    """
+    Work out the worker count and per-worker thread budget.
+
+    Missing values are derived from the CPU count so that
+    workers * threads_per_worker never exceeds the number of cores. A derived
+    worker count is also capped by the memory (see autotune.py).
+
+    Args:
+        workers (int): Requested number of worker processes, or None
+        threads_per_worker (int): Requested threads per worker, or None
+
+    Returns:
+        tuple: (workers, threads_per_worker)
+    """
+    cpu_count = multiprocessing.cpu_count()
+    derive_workers = workers is None
+    if workers is None and threads_per_worker is None:
+        threads_per_worker = min(4, cpu_count)
+    if workers is None:
+        workers = max(1, cpu_count // threads_per_worker)
+    if threads_per_worker is None:
+        threads_per_worker = max(1, cpu_count // workers)
+    if derive_workers:
+        import autotune
+        if autotune.is_enabled():
+            # Don't start more model copies than the memory can hold
+            workers = min(workers, autotune.get_tuner().recommend_workers(threads_per_worker))
+    return max(1, workers), max(1, threads_per_worker)
+
+
+def current_rss_mb():
+    """
+    Get the resident memory of the current process.
+
+    Returns:
+        float: Resident set size in MB, or 0.0 if it cannot be measured
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return 0.0
+
+
+def limit_threads(threads):
+    """
+    Restrict the numeric libraries of this process to a thread budget.
+
+    Must be called before torch is imported for the environment variables to
+    take effect; torch.set_num_threads is applied as well when available.
+
+    Args:
+        threads (int): Maximum number of compute threads
+    """
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(threads)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _worker_main(worker_id, task_queue, result_queue, threads, memory_limit_mb, pool_size=1):
+    """
+    Worker process loop: load models once, then convert PDFs until told to stop.
+
+    Args:
+        worker_id (int): Worker number, used in progress messages
+        task_queue (Queue): Jobs to run, None means stop
+        result_queue (Queue): Events sent back to the scheduler
+        threads (int): Thread budget for this worker
+        memory_limit_mb (float): RSS ceiling in MB, 0 to disable
+        pool_size (int): Number of workers sharing the machine
+    """
+    limit_threads(threads)
+    import autotune
+    autotune.get_tuner().workers = pool_size
+
+    import process_pdf
+    process_pdf.get_model_dict()
+    result_queue.put(("ready", worker_id, None, None))
+
+    while True:
+        job = task_queue.get()
+        if job is None:
+            break
+
+        index, kind, kwargs = job
+        result_queue.put(("started", worker_id, index, None))
+        if kind == "chunk":
+            ok = process_pdf.convert_pdf_chunk(cores_limit=threads, **kwargs)
+        else:
+            ok = process_pdf.process_pdf_file(cores_limit=threads, **kwargs)
+        rss = current_rss_mb()
+        result_queue.put(("done", worker_id, index, ok))
+
+        if memory_limit_mb and rss > memory_limit_mb:
+            result_queue.put(("recycle", worker_id, index, rss))
+            break
+
+
+class BatchScheduler:
+    """
+    Document-level process pool for the PDF converter.
+
+    Jobs are handed out one document at a time through a shared queue, so a
+    slow document only ever blocks the worker that is converting it. Workers
+    that exceed the memory ceiling, or that die, are replaced with fresh ones,
+    unless a replacement failed to load the models: then the workers still
+    running finish the queue on their own.
+    """
+
+    def __init__(self, workers=None, threads_per_worker=None, memory_limit_mb=0):
+        """
+        Initialize the scheduler.
+
+        Args:
+            workers (int): Number of worker processes (derived from CPU count if None)
+            threads_per_worker (int): Compute threads per worker (derived if None)
+            memory_limit_mb (float): Per-worker RSS ceiling in MB, 0 to disable
+        """
+        self.workers, self.threads_per_worker = plan_workers(workers, threads_per_worker)
+        self.memory_limit_mb = memory_limit_mb or 0
+        # Spawn avoids forking a parent that may already hold torch state
+        self.context = multiprocessing.get_context("spawn")
+
+    def _start_worker(self, worker_id, task_queue, result_queue):
+        process = self.context.Process(
+            target=_worker_main,
+            args=(worker_id, task_queue, result_queue, self.threads_per_worker, self.memory_limit_mb, self.workers),
+            daemon=True,
+        )
+        process.start()
+        return process
+
+    def _retry_after_oom(self, exitcode, index, retried):
+        """
+        Decide whether a job whose worker was killed should run again.
+
+        A worker killed by SIGKILL was most likely stopped by the OOM killer;
+        the job is retried once with halved batch sizes.
+        """
+        import signal
+        import autotune
+        if index in retried or not autotune.is_enabled():
+            return False
+        if exitcode != -getattr(signal, "SIGKILL", 9):
+            return False
+        retried.add(index)
+        autotune.get_tuner().record_memory_pressure()
+        return True
+
+    def run(self, jobs):
+        """
+        Run a list of conversion jobs across the worker pool.
+
+        Args:
+            jobs (list): (kind, kwargs) tuples, where kind is "pdf" for
+                process_pdf_file() or "chunk" for convert_pdf_chunk()
+
+        Returns:
+            dict: Mapping of job index to True (success) or False (failure)
+        """
+        results = {}
+        if not jobs:
+            return results
+
+        worker_count = min(self.workers, len(jobs))
+        print(f"{Colors.CYAN}Starting {worker_count} workers "
+              f"({self.threads_per_worker} threads each"
+              f"{f', {self.memory_limit_mb:.0f} MB ceiling' if self.memory_limit_mb else ''})...{Colors.RESET}")
+        if self.memory_limit_mb and current_rss_mb() == 0.0:
+            print(f"{Colors.YELLOW}Cannot measure memory on this system; install psutil to enable the ceiling.{Colors.RESET}")
+
+        task_queue = self.context.Queue()
+        result_queue = self.context.Queue()
+        for index, (kind, kwargs) in enumerate(jobs):
+            task_queue.put((index, kind, kwargs))
+
+        processes = {}
+        in_flight = {}
+        ready = set()
+        retried = set()
+        # Jobs not accounted for at the previous quiet poll, and jobs already requeued once as lost
+        unaccounted = set()
+        lost_once = set()
+        replace_workers = True
+        next_worker_id = 0
+        for _ in range(worker_count):
+            processes[next_worker_id] = self._start_worker(next_worker_id, task_queue, result_queue)
+            next_worker_id += 1
+
+        while len(results) < len(jobs):
+            try:
+                event, worker_id, index, value = result_queue.get(timeout=5)
+            except queue.Empty:
+                # Detect workers that died without reporting (crash, OOM kill)
+                for worker_id, process in list(processes.items()):
+                    if process.is_alive():
+                        continue
+                    del processes[worker_id]
+                    if worker_id not in ready:
+                        if not ready:
+                            # No worker could even load the models; retrying won't help
+                            print(f"{Colors.RED}Worker {worker_id} failed to start (exit code {process.exitcode}){Colors.RESET}")
+                            for index in range(len(jobs)):
+                                results.setdefault(index, False)
+                            break
+                        # Other workers loaded the models, so this one most likely ran out
+                        # of memory (e.g. a replacement after an OOM kill): make do without it
+                        print(f"{Colors.YELLOW}Worker {worker_id} failed to start (exit code {process.exitcode}), "
+                              f"continuing with {len(processes)} workers{Colors.RESET}")
+                        replace_workers = False
+                        continue
+                    failed = in_flight.pop(worker_id, None)
+                    if failed is not None:
+                        print(f"{Colors.RED}Worker {worker_id} died while converting {jobs[failed][1]['pdf_path']}"
+                              f" (exit code {process.exitcode}){Colors.RESET}")
+                        if self._retry_after_oom(process.exitcode, failed, retried):
+                            task_queue.put((failed, *jobs[failed]))
+                        else:
+                            results[failed] = False
+                    if replace_workers and len(results) + len(in_flight) < len(jobs):
+                        processes[next_worker_id] = self._start_worker(next_worker_id, task_queue, result_queue)
+                        next_worker_id += 1
+                if len(results) >= len(jobs):
+                    continue
+                missing = set(range(len(jobs))) - set(results) - set(in_flight.values())
+                if not processes:
+                    print(f"{Colors.RED}No workers left; {len(jobs) - len(results)} jobs were not converted{Colors.RESET}")
+                    for index in range(len(jobs)):
+                        results.setdefault(index, False)
+                    continue
+                # A worker killed between taking a job and reporting it leaves the job
+                # nowhere: not queued, not in flight and never finished
+                if not task_queue.empty():
+                    unaccounted = set()
+                    continue
+                lost = missing & unaccounted
+                unaccounted = missing - lost
+                for index in sorted(lost):
+                    print(f"{Colors.RED}Lost track of {jobs[index][1]['pdf_path']} after a worker died{Colors.RESET}")
+                    if index in lost_once:
+                        results[index] = False
+                    else:
+                        lost_once.add(index)
+                        task_queue.put((index, *jobs[index]))
+                continue
+
+            if event == "ready":
+                ready.add(worker_id)
+            elif event == "started":
+                in_flight[worker_id] = index
+            elif event == "done":
+                in_flight.pop(worker_id, None)
+                results[index] = bool(value)
+                print(f"{Colors.BLUE}Progress:{Colors.RESET} {len(results)}/{len(jobs)} jobs")
+            elif event == "recycle":
+                print(f"{Colors.YELLOW}Worker {worker_id} reached {value:.0f} MB, restarting it{Colors.RESET}")
+                process = processes.pop(worker_id, None)
+                if process is not None:
+                    process.join()
+                if len(results) + len(in_flight) < len(jobs):
+                    processes[next_worker_id] = self._start_worker(next_worker_id, task_queue, result_queue)
+                    next_worker_id += 1
+
+        for _ in processes:
+            task_queue.put(None)
+        for process in processes.values():
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+
+        return results
@@ -0,0 +1,439 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: benchmark_pipeline.py
+
+Purpose:
+    This script benchmarks the PDF conversion pipeline on a reproducible,
+    synthetic corpus. The corpus is generated with PyMuPDF from a fixed seed
+    and covers the kinds of pages found in papers: body text, raster and vector
+    figures, tables, equations and scanned (image-only) pages.
+
+    Each stage is timed separately:
+    - prescan:  building the document profile (pdf_prescan.py)
+    - model_load: loading the Marker models
+    - layout_ocr: Marker's document build (layout, OCR, block processors)
+    - render:   rendering the document to Markdown
+    - image_write: writing the extracted images (image_sink.py), through a
+      private image store in the work directory so the benchmark neither
+      reads nor fills pdf/output/.image_store
+
+    Pages/sec, peak RSS and per-stage latencies are written to a JSON results
+    file and compared against a stored baseline, so that converter or config
+    changes cannot quietly slow throughput down. The script exits with status 1
+    when a regression beyond the tolerance is found.
+
+Usage:
+    python scripts/benchmark_pipeline.py
+    python scripts/benchmark_pipeline.py --save-baseline
+    python scripts/benchmark_pipeline.py --prescan-only --tolerance 0.2
+
+    The corpus is generated in pdf/benchmark/corpus/, results are written to
+    pdf/benchmark/results/ and the baseline to pdf/benchmark/baseline.json
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - PyMuPDF (fitz)
+    - marker-pdf (not needed with --prescan-only)
+    - psutil (optional, peak memory on Windows)
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from pipeline_metrics import peak_rss_mb
+
+CORPUS_VERSION = 1
+DEFAULT_SEED = 1234
+DEFAULT_TOLERANCE = 0.10
+
+BENCHMARK_DIR = Path(__file__).parent.parent / "pdf" / "benchmark"
+
+# Document name -> page kinds, in page order
+CORPUS_SPEC = {
+    "text_heavy": ["text"] * 8 + ["equations"] * 2,
+    "figures_tables": ["text", "figure", "table", "figure", "vector", "table", "text", "equations"],
+    "scanned_mixed": ["text", "scanned", "scanned", "figure", "scanned", "text"],
+}
+
+WORDS = (
+    "model data results method analysis learning network training performance "
+    "system approach feature layer accuracy dataset proposed function error "
+    "experiment distribution parameter sample evaluation baseline signal image "
+    "structure algorithm optimization inference representation benchmark"
+).split()
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def _paragraph(rng, sentences=5):
+    text = []
+    for _ in range(sentences):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 18))]
+        text.append(" ".join(words).capitalize() + ".")
+    return " ".join(text)
+
+
+def _draw_text_page(page, rng, title):
+    page.insert_text((72, 72), title, fontsize=16)
+    box = page.rect + (72, 100, -72, -72)
+    paragraphs = [_paragraph(rng) for _ in range(6)]
+    # insert_textbox writes nothing when the text overflows, so drop paragraphs until it fits
+    while paragraphs and page.insert_textbox(box, "\n\n".join(paragraphs), fontsize=10) < 0:
+        paragraphs.pop()
+
+
+def _draw_figure_page(page, rng, title):
+    import fitz
+    page.insert_text((72, 72), title, fontsize=16)
+    width, height = 480, 320
+    # Smooth pseudo-random gradient, so JPEG size is realistic rather than noise
+    r0, g0, b0 = rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)
+    samples = bytearray()
+    for y in range(height):
+        for x in range(width):
+            samples += bytes(((r0 + x) % 256, (g0 + y) % 256, (b0 + x + y) % 256))
+    pix = fitz.Pixmap(fitz.csRGB, width, height, bytes(samples), False)
+    page.insert_image(fitz.Rect(72, 100, 72 + width * 0.9, 100 + height * 0.9), stream=pix.tobytes("jpeg"))
+    page.insert_textbox(fitz.Rect(72, 400, page.rect.width - 72, 460),
+                        f"Figure {rng.randint(1, 9)}: {_paragraph(rng, 1)}", fontsize=9)
+    page.insert_textbox(page.rect + (72, 480, -72, -72), _paragraph(rng), fontsize=10)
+
+
+def _draw_vector_page(page, rng, title):
+    import fitz
+    page.insert_text((72, 72), title, fontsize=16)
+    origin = fitz.Point(100, 380)
+    page.draw_line(origin, origin + (380, 0))
+    page.draw_line(origin, origin - (0, 260))
+    points = [origin + (i * 19, -rng.randint(20, 250)) for i in range(21)]
+    page.draw_polyline(points, color=(0, 0, 1))
+    for point in points[::4]:
+        page.draw_circle(point, 3, color=(1, 0, 0), fill=(1, 0, 0))
+    page.insert_textbox(fitz.Rect(72, 400, page.rect.width - 72, 460),
+                        f"Figure {rng.randint(1, 9)}: {_paragraph(rng, 1)}", fontsize=9)
+
+
+def _draw_table_page(page, rng, title):
+    import fitz
+    page.insert_text((72, 72), title, fontsize=16)
+    rows, cols = 8, 5
+    left, top, cell_w, cell_h = 72, 110, 90, 22
+    headers = ["Method", "Accuracy", "F1", "Params (M)", "Time (s)"]
+    for row in range(rows + 1):
+        page.draw_line((left, top + row * cell_h), (left + cols * cell_w, top + row * cell_h))
+    for col in range(cols + 1):
+        page.draw_line((left + col * cell_w, top), (left + col * cell_w, top + rows * cell_h))
+    for row in range(rows):
+        for col in range(cols):
+            if row == 0:
+                text = headers[col]
+            elif col == 0:
+                text = f"{rng.choice(WORDS).capitalize()}-{row}"
+            else:
+                text = f"{rng.uniform(0, 100):.2f}"
+            page.insert_text((left + col * cell_w + 4, top + row * cell_h + 15), text, fontsize=9)
+    page.insert_textbox(fitz.Rect(72, top + rows * cell_h + 20, page.rect.width - 72, page.rect.height - 72),
+                        _paragraph(rng), fontsize=10)
+
+
+def _draw_equation_page(page, rng, title):
+    page.insert_text((72, 72), title, fontsize=16)
+    y = 110
+    for _ in range(5):
+        a, b, c = rng.randint(2, 9), rng.randint(2, 9), rng.randint(2, 9)
+        page.insert_textbox(page.rect + (72, y, -72, -(page.rect.height - y - 50)), _paragraph(rng, 2), fontsize=10)
+        y += 70
+        page.insert_text((150, y), f"L(w) = (1/{a}n) sum_i (y_i - w^T x_i)^{b} + {c} ||w||^2", fontsize=12)
+        y += 30
+
+
+def _draw_scanned_page(page, rng, title):
+    import fitz
+    # Render a text page to a grayscale bitmap and keep only the bitmap
+    scratch = fitz.open()
+    source = scratch.new_page(width=page.rect.width, height=page.rect.height)
+    _draw_text_page(source, rng, title)
+    pix = source.get_pixmap(dpi=150, colorspace=fitz.csGRAY)
+    page.insert_image(page.rect, stream=pix.tobytes("png"))
+    scratch.close()
+
+
+PAGE_BUILDERS = {
+    "text": _draw_text_page,
+    "figure": _draw_figure_page,
+    "vector": _draw_vector_page,
+    "table": _draw_table_page,
+    "equations": _draw_equation_page,
+    "scanned": _draw_scanned_page,
+}
+
+
+def generate_corpus(corpus_dir, seed=DEFAULT_SEED):
+    """
+    Generate the synthetic benchmark corpus, unless an identical one exists.
+
+    Args:
+        corpus_dir (Path): Directory to write the PDFs to
+        seed (int): Random seed; the same seed gives the same corpus
+
+    Returns:
+        list: Paths of the generated PDFs
+    """
+    import fitz
+
+    corpus_dir = Path(corpus_dir)
+    descriptor = {"version": CORPUS_VERSION, "seed": seed, "spec": CORPUS_SPEC, "pymupdf": fitz.VersionBind}
+    descriptor_path = corpus_dir / "corpus.json"
+    paths = [corpus_dir / f"{name}.pdf" for name in CORPUS_SPEC]
+
+    if descriptor_path.exists() and all(path.exists() for path in paths):
+        with open(descriptor_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == descriptor:
+                return paths
+
+    print(f"{Colors.YELLOW}Generating benchmark corpus in {corpus_dir}...{Colors.RESET}")
+    if corpus_dir.exists():
+        shutil.rmtree(corpus_dir)
+    corpus_dir.mkdir(parents=True)
+    rng = random.Random(seed)
+    for (name, kinds), path in zip(CORPUS_SPEC.items(), paths):
+        doc = fitz.open()
+        for number, kind in enumerate(kinds, 1):
+            page = doc.new_page(width=612, height=792)
+            PAGE_BUILDERS[kind](page, rng, f"{number}. {rng.choice(WORDS).capitalize()} {rng.choice(WORDS)}")
+        # Fixed metadata and no compression randomness keep the files reproducible
+        doc.set_metadata({"title": name, "producer": "benchmark_pipeline.py",
+                          "creationDate": "D:20260101000000", "modDate": "D:20260101000000"})
+        doc.save(str(path), garbage=3, deflate=True, no_new_id=True)
+        doc.close()
+    with open(descriptor_path, 'w', encoding='utf-8') as f:
+        json.dump(descriptor, f, indent=2)
+    return paths
+
+
+def _timed(timings, stage, func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+    return result
+
+
+def _write_images(images, images_dir, pdf_path, store):
+    from image_sink import ImageSink, submit_images
+
+    with ImageSink(images_dir, pdf_path, store=store) as sink:
+        submit_images(sink, images)
+    return sink.saved
+
+
+def run_benchmark(pdf_paths, prescan_only=False, cores_limit=None):
+    """
+    Run every stage over the corpus and collect timings.
+
+    Args:
+        pdf_paths (list): PDFs to convert
+        prescan_only (bool): Only time the pre-scan (no Marker needed)
+        cores_limit (int): CPU cores Marker may use (process_pdf default if None)
+
+    Returns:
+        dict: Benchmark results
+    """
+    from pdf_prescan import scan_pdf
+
+    totals = {}
+    documents = []
+    page_total = 0
+
+    if not prescan_only:
+        import process_pdf
+        from image_store import ImageStore, is_enabled
+        _timed(totals, "model_load", process_pdf.get_model_dict)
+        converter = process_pdf.get_converter(
+            process_pdf.get_converter_config(process_pdf.get_cores_limit(cores_limit)))
+
+    work_dir = Path(tempfile.mkdtemp(prefix="paper2skill-bench-"))
+    # Images already in the real store would make image_write depend on past runs
+    store = ImageStore(work_dir / ".image_store") if not prescan_only and is_enabled() else None
+    try:
+        for pdf_path in pdf_paths:
+            timings = {}
+            profile = _timed(timings, "prescan", scan_pdf, pdf_path)
+            pages = profile["page_count"]
+
+            if not prescan_only:
+                if hasattr(converter, "build_document"):
+                    # Time layout/OCR and rendering separately where Marker allows it
+                    document = _timed(timings, "layout_ocr", converter.build_document, str(pdf_path))
+                    renderer = converter.resolve_dependencies(converter.renderer)
+                    rendered = _timed(timings, "render", renderer, document)
+                    del document
+                else:
+                    rendered = _timed(timings, "layout_ocr", converter, str(pdf_path))
+                markdown_text, _, images = process_pdf.text_from_rendered(rendered)
+                del rendered
+                image_count = len(images)
+                _timed(timings, "image_write", _write_images, images, work_dir / pdf_path.stem, pdf_path, store)
+                timings["markdown_chars"] = len(markdown_text)
+                timings["images"] = image_count
+
+            elapsed = sum(value for key, value in timings.items() if key in ("prescan", "layout_ocr", "render", "image_write"))
+            page_total += pages
+            for key in ("prescan", "layout_ocr", "render", "image_write"):
+                if key in timings:
+                    totals[key] = totals.get(key, 0.0) + timings[key]
+            documents.append({
+                "name": pdf_path.name,
+                "pages": pages,
+                "seconds": round(elapsed, 4),
+                "pages_per_sec": round(pages / elapsed, 3) if elapsed else 0.0,
+                "stages": {key: round(value, 4) if isinstance(value, float) else value
+                           for key, value in timings.items()},
+            })
+            print(f"  {Colors.GREEN}✓{Colors.RESET} {pdf_path.name}: {pages} pages in {elapsed:.2f}s")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    conversion_time = sum(value for key, value in totals.items() if key != "model_load")
+    return {
+        "created_at": datetime.now().isoformat(timespec='seconds'),
+        "mode": "prescan" if prescan_only else "full",
+        "machine": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+        },
+        "pages": page_total,
+        "pages_per_sec": round(page_total / conversion_time, 3) if conversion_time else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "stages": {key: round(value, 4) for key, value in totals.items()},
+        "stage_ms_per_page": {key: round(value * 1000 / page_total, 2)
+                              for key, value in totals.items() if key != "model_load" and page_total},
+        "documents": documents,
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Find metrics that got worse than the baseline by more than the tolerance.
+
+    Args:
+        results (dict): Current benchmark results
+        baseline (dict): Stored baseline results
+        tolerance (float): Allowed relative slowdown, e.g. 0.1 for 10%
+
+    Returns:
+        list: Human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    if baseline.get("mode") != results["mode"]:
+        return [f"baseline mode '{baseline.get('mode')}' differs from '{results['mode']}'; re-create the baseline"]
+
+    old, new = baseline.get("pages_per_sec", 0.0), results["pages_per_sec"]
+    if old and new < old * (1 - tolerance):
+        regressions.append(f"throughput {new} pages/s vs baseline {old} ({(new - old) / old:+.1%})")
+
+    for stage, new_ms in results["stage_ms_per_page"].items():
+        old_ms = baseline.get("stage_ms_per_page", {}).get(stage)
+        if old_ms and new_ms > old_ms * (1 + tolerance):
+            regressions.append(f"{stage} {new_ms} ms/page vs baseline {old_ms} ({(new_ms - old_ms) / old_ms:+.1%})")
+
+    old_rss, new_rss = baseline.get("peak_rss_mb", 0.0), results["peak_rss_mb"]
+    if old_rss and new_rss > old_rss * (1 + tolerance):
+        regressions.append(f"peak RSS {new_rss} MB vs baseline {old_rss} ({(new_rss - old_rss) / old_rss:+.1%})")
+    return regressions
+
+
+def main():
+    """
+    Main function to run the benchmark and check it against the baseline.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the PDF pipeline on a synthetic corpus")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Corpus seed (default: %(default)s)")
+    parser.add_argument("--prescan-only", action="store_true", help="Only benchmark the pre-scan (no Marker)")
+    parser.add_argument("--cores", type=int, default=None, help="CPU cores Marker may use")
+    parser.add_argument("--baseline", default=str(BENCHMARK_DIR / "baseline.json"),
+                        help="Baseline results file (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before failing (default: %(default)s)")
+    args = parser.parse_args()
+
+    pdf_paths = generate_corpus(BENCHMARK_DIR / "corpus", args.seed)
+    print(f"{Colors.CYAN}Benchmarking {len(pdf_paths)} documents...{Colors.RESET}")
+    results = run_benchmark(pdf_paths, prescan_only=args.prescan_only, cores_limit=args.cores)
+    results["seed"] = args.seed
+
+    results_dir = BENCHMARK_DIR / "results"
+    results_dir.mkdir(parents=True, exist_ok=True)
+    results_path = results_dir / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{results['mode']}.json"
+    with open(results_path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n{Colors.BLUE}Pages/sec:{Colors.RESET} {results['pages_per_sec']}")
+    print(f"{Colors.BLUE}Peak RSS:{Colors.RESET} {results['peak_rss_mb']} MB")
+    for stage, ms in results["stage_ms_per_page"].items():
+        print(f"{Colors.BLUE}{stage}:{Colors.RESET} {ms} ms/page")
+    if "model_load" in results["stages"]:
+        print(f"{Colors.BLUE}model_load:{Colors.RESET} {results['stages']['model_load']:.2f} s")
+    print(f"{Colors.BLUE}Results:{Colors.RESET} {results_path}")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(results_path, baseline_path)
+        print(f"{Colors.GREEN}Saved baseline:{Colors.RESET} {baseline_path}")
+        return
+
+    if not baseline_path.exists():
+        print(f"{Colors.YELLOW}No baseline at {baseline_path}; run with --save-baseline to create one.{Colors.RESET}")
+        return
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{Colors.RED}Performance regressions against {baseline_path}:{Colors.RESET}")
+        for regression in regressions:
+            print(f"  {Colors.RED}✗{Colors.RESET} {regression}")
+        sys.exit(1)
+    print(f"\n{Colors.GREEN}No regressions beyond {args.tolerance:.0%} against the baseline.{Colors.RESET}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: chapter_splitter.py
+
+Purpose:
+    This script splits the Markdown produced by process_pdf.py into chapter
+    files, in the llm_processed/<publisher>/<journal>/<paper>/chapters/ layout
+    (abstract.md, introduction.md, methods.md, results.md, discussion.md,
+    references.md), so later LLM steps can send only the chapter they need
+    instead of the whole paper.
+
+    - Splitting is deterministic: section headings are matched against a fixed
+      list of chapter names (numbering such as "2." or "II." is ignored), and
+      subsections stay in the chapter they belong to.
+    - The Markdown is streamed line by line, so memory use does not depend on
+      the size of the paper.
+    - chapters/index.json records the source hash and the byte and line
+      offsets of every chapter in the source Markdown. Documents whose source
+      hash has not changed are skipped on later runs.
+    - Image links are rewritten relative to the chapters directory, so they
+      still point to the images in pdf/output.
+
+Usage:
+    python scripts/chapter_splitter.py
+    python scripts/chapter_splitter.py --force
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import re
+import json
+import shutil
+import hashlib
+import argparse
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_SOURCE_DIR = PROJECT_ROOT / "pdf" / "output"
+DEFAULT_TARGET_DIR = PROJECT_ROOT / "llm_processed"
+
+# Bump when the splitting rules change so that every document is split again
+SPLITTER_VERSION = 1
+
+INDEX_NAME = "index.json"
+
+# Chapter file names with the heading texts that start them (whole heading,
+# lower case, numbering removed)
+CHAPTER_PATTERNS = [
+    ("abstract", r"abstract|summary"),
+    ("introduction", r"introduction|background"),
+    ("methods", r"(?:materials and |online )?methods?|methodology|materials|experimental(?: section| procedures)?"),
+    ("results", r"results(?: and discussion)?|findings"),
+    ("discussion", r"discussion|conclusions?|concluding remarks|discussion and conclusions?"),
+    ("references", r"references|bibliography|literature cited|references and notes"),
+]
+CHAPTER_REGEXES = [(name, re.compile(rf"(?:{pattern})$")) for name, pattern in CHAPTER_PATTERNS]
+
+# Text before the first recognized chapter (title, authors, affiliations)
+FRONT_MATTER = "front_matter"
+
+HEADING_PATTERN = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+# Leading section numbers: "2", "2.1", "II.", "A."
+NUMBERING_PATTERN = re.compile(r"^(?:\d+(?:\.\d+)*[.)]?|[ivxlc]+[.)]|[a-z][.)])\s+")
+LINK_PATTERN = re.compile(r"(!?\[[^\]]*\]\()([^)\s]+)(\))")
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def classify_heading(text):
+    """
+    Map a section heading to a chapter.
+
+    Args:
+        text (str): Heading text without the leading #
+
+    Returns:
+        str: Chapter name, or None for headings that do not start a chapter
+    """
+    text = re.sub(r"[*_`]", "", text).strip().lower()
+    text = NUMBERING_PATTERN.sub("", text).strip(" .:")
+    for name, regex in CHAPTER_REGEXES:
+        if regex.match(text):
+            return name
+    return None
+
+
+def file_sha256(path):
+    """
+    Hash a file in blocks.
+
+    Args:
+        path (Path): File to hash
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _relink(line, source_dir, chapters_dir):
+    """
+    Rewrite relative link targets so they resolve from the chapters directory.
+    """
+    def replace(match):
+        target = match.group(2)
+        if re.match(r"^(?:[a-z][a-z0-9+.-]*:|#|/)", target, re.IGNORECASE):
+            return match.group(0)
+        relative = os.path.relpath(source_dir / target, chapters_dir)
+        return match.group(1) + Path(relative).as_posix() + match.group(3)
+    return LINK_PATTERN.sub(replace, line)
+
+
+def split_markdown(markdown_path, chapters_dir):
+    """
+    Stream a Markdown file into chapter files and write the offset index.
+
+    The chapters are written to a temp directory that replaces chapters_dir
+    once complete, so readers never see a half-split document.
+
+    Args:
+        markdown_path (Path): Markdown produced by process_pdf.py
+        chapters_dir (Path): Output chapters directory
+
+    Returns:
+        dict: Index of the split (source hash, chapters with offsets)
+    """
+    markdown_path = Path(markdown_path)
+    chapters_dir = Path(chapters_dir)
+    tmp_dir = chapters_dir.with_name(chapters_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+
+    sha = hashlib.sha256()
+    files = {}
+    sections = []
+    current = FRONT_MATTER
+    offset = 0
+    in_code = False
+    try:
+        with open(markdown_path, 'rb') as source:
+            for line_number, raw in enumerate(source, start=1):
+                sha.update(raw)
+                line = raw.decode('utf-8', errors='replace')
+                if line.lstrip().startswith("```"):
+                    in_code = not in_code
+                match = None if in_code else HEADING_PATTERN.match(line)
+                chapter = classify_heading(match.group(2)) if match else None
+                if chapter is not None and chapter != current or not sections:
+                    if chapter is not None:
+                        current = chapter
+                    sections.append({
+                        "chapter": current,
+                        "heading": match.group(2).strip() if chapter is not None else None,
+                        "start_byte": offset,
+                        "start_line": line_number,
+                    })
+                if current not in files:
+                    files[current] = open(tmp_dir / f"{current}.md", 'w', encoding='utf-8')
+                files[current].write(_relink(line, markdown_path.parent, chapters_dir))
+                offset += len(raw)
+                sections[-1]["end_byte"] = offset
+                sections[-1]["end_line"] = line_number
+    finally:
+        for f in files.values():
+            f.close()
+
+    index = {
+        "version": SPLITTER_VERSION,
+        "source": Path(os.path.relpath(markdown_path, chapters_dir)).as_posix(),
+        "source_sha256": sha.hexdigest(),
+        "source_bytes": offset,
+        "chapters": sorted(files),
+        "sections": sections,
+    }
+    with open(tmp_dir / INDEX_NAME, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+
+    if chapters_dir.exists():
+        shutil.rmtree(chapters_dir)
+    os.replace(tmp_dir, chapters_dir)
+    return index
+
+
+def is_up_to_date(markdown_path, chapters_dir):
+    """
+    Check whether a document's chapters were split from the current source.
+
+    Args:
+        markdown_path (Path): Source Markdown
+        chapters_dir (Path): Chapters directory
+
+    Returns:
+        bool: True if the index matches the source hash and splitter version
+    """
+    try:
+        with open(Path(chapters_dir) / INDEX_NAME, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if index.get("version") != SPLITTER_VERSION:
+        return False
+    # Cheap size check first, the hash only when the size matches
+    if index.get("source_bytes") != Path(markdown_path).stat().st_size:
+        return False
+    return index.get("source_sha256") == file_sha256(markdown_path)
+
+
+def find_documents(source_dir, target_dir):
+    """
+    Pair every converted Markdown file with its chapters directory.
+
+    process_pdf.py writes <relative dir>/<name>/<name>.md; the chapters go to
+    the same relative path below target_dir.
+
+    Args:
+        source_dir (Path): process_pdf.py output root
+        target_dir (Path): llm_processed root
+
+    Returns:
+        list: (markdown_path, chapters_dir) tuples, sorted
+    """
+    source_dir = Path(source_dir)
+    documents = []
+    for root, dirs, files in os.walk(source_dir):
+        # Skip pipeline state, the image store and chunk checkpoints
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        root = Path(root)
+        markdown_name = f"{root.name}.md"
+        if markdown_name in files:
+            relative = root.relative_to(source_dir)
+            documents.append((root / markdown_name, Path(target_dir) / relative / "chapters"))
+    return documents
+
+
+def split_all(source_dir=DEFAULT_SOURCE_DIR, target_dir=DEFAULT_TARGET_DIR, force=False):
+    """
+    Split every converted document whose source changed since the last run.
+
+    Args:
+        source_dir (Path): process_pdf.py output root
+        target_dir (Path): llm_processed root
+        force (bool): Split every document again
+
+    Returns:
+        tuple: (documents split, documents skipped)
+    """
+    documents = find_documents(source_dir, target_dir)
+    if not documents:
+        print(f"{Colors.YELLOW}No converted Markdown files found in {source_dir}{Colors.RESET}")
+        return 0, 0
+
+    split = 0
+    skipped = 0
+    for markdown_path, chapters_dir in documents:
+        name = markdown_path.relative_to(source_dir)
+        if not force and is_up_to_date(markdown_path, chapters_dir):
+            skipped += 1
+            continue
+        if not force and chapters_dir.exists() and not (chapters_dir / INDEX_NAME).exists():
+            # Chapters written by hand or by an LLM: leave them alone
+            print(f"{Colors.YELLOW}Skipping {name}: chapters were not made by the splitter "
+                  f"(use --force to replace them){Colors.RESET}")
+            skipped += 1
+            continue
+        try:
+            index = split_markdown(markdown_path, chapters_dir)
+        except Exception as e:
+            print(f"{Colors.RED}Error splitting {name}: {str(e)}{Colors.RESET}")
+            continue
+        split += 1
+        print(f"{Colors.GREEN}✓{Colors.RESET} {name}: {', '.join(index['chapters'])}")
+
+    print(f"{Colors.CYAN}Split {split} documents, {skipped} unchanged{Colors.RESET}")
+    return split, skipped
+
+
+def main():
+    """
+    Main function to split all converted documents into chapters.
+    """
+    parser = argparse.ArgumentParser(description="Split converted Markdown into chapter files")
+    parser.add_argument("--source", default=str(DEFAULT_SOURCE_DIR),
+                        help="process_pdf.py output directory (default: %(default)s)")
+    parser.add_argument("--target", default=str(DEFAULT_TARGET_DIR),
+                        help="Directory to write the chapters to (default: %(default)s)")
+    parser.add_argument("--force", action="store_true",
+                        help="Split every document again, replacing chapters not made by the splitter")
+    args = parser.parse_args()
+
+    split_all(Path(args.source), Path(args.target), args.force)
+
+    from search_index import update_index
+    update_index()
+
+
+if __name__ == "__main__":
+    main()
@@ -30,7 +30,7 @@ License:
     MIT License
 """
 
-import torch
+# torch is imported in main(): importing it takes seconds
 
 # Terminal color codes
 class Colors:
@@ -48,6 +48,12 @@ class Colors:
 
 def main():
     """Main function to check GPU and PyTorch status."""
+    try:
+        import torch
+    except ImportError:
+        print(f"{Colors.RED}PyTorch is not installed in this environment.{Colors.RESET}")
+        return
+    
     print(f"{Colors.CYAN}Checking PyTorch and GPU configuration...{Colors.RESET}")
     print()
     
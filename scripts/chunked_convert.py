@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: chunked_convert.py
+
+Purpose:
+    This module supports converting very large PDFs in page-range chunks. Each
+    chunk is converted on its own (possibly in another worker process) and
+    checkpointed to disk, so a crash at page 390 of a 400-page document only
+    repeats the unfinished chunk. Finished chunks are stitched back into the
+    usual <name>.md and <name>_images outputs.
+
+    Marker keeps the original page numbers when a page range is given, so image
+    names (_page_<n>_<Block>_<id>.jpeg) and page anchors are the same as in a
+    single-shot conversion and stay valid after stitching.
+
+    Marker only joins a paragraph that runs on to the next page when both pages
+    are in the same conversion. When stitching, a chunk ending in plain text
+    without closing punctuation is joined to a next chunk starting in lowercase
+    plain text, the way Marker does it (a space, or dropping the hyphen of a
+    split word). Heading levels cannot be carried over: Marker infers them from
+    the font sizes seen within one conversion, so heading depth can differ from
+    a single-shot run when a chunk contains few headings. Chunking is therefore
+    off by default and process_pdf.py warns when it is turned on.
+
+    The same mechanism converts runs of pages with different OCR routes (see
+    page_router.py) with different Marker settings.
+
+Usage:
+    Used by process_pdf.py:
+    python scripts/process_pdf.py --chunk-pages 50
+    python scripts/process_pdf.py --route-ocr
+
+    Chunk checkpoints live in <output dir>/.<name>.chunks/ until stitched.
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import re
+import json
+import shutil
+from pathlib import Path
+
+STATE_FILE = "chunks.json"
+DONE_MARKER = "done.json"
+CHUNK_MARKDOWN = "chunk.md"
+CHUNK_IMAGES = "images"
+CHUNK_METADATA = "meta.json"
+
+# Paragraphs starting like this are not running text (headings, quotes, tables,
+# code, math, images, HTML, lists, indented code, page separators)
+BLOCK_START = re.compile(r'(?:#|>|\||```|\$\$|!\[|<|\{|[-*+] |\d+[.)] |    |\t)')
+# Closing punctuation, optionally followed by closing quotes or brackets
+SENTENCE_END = re.compile(r'[.!?。！？][\)\]"\'”’」』）*_]*\Z')
+HYPHENS = "-—¬"
+
+
+def plan_chunks(page_count, chunk_pages):
+    """
+    Split a document into consecutive page ranges.
+
+    Args:
+        page_count (int): Number of pages in the PDF
+        chunk_pages (int): Maximum pages per chunk
+
+    Returns:
+        list: (start, end) tuples, end exclusive
+    """
+    chunk_pages = max(1, chunk_pages)
+    return [(start, min(start + chunk_pages, page_count)) for start in range(0, page_count, chunk_pages)]
+
+
+def plan_page_ranges(page_count, chunk_pages=0, routes=None):
+    """
+    Plan the page ranges of a document from its page routes and chunk size.
+
+    Consecutive pages with the same route form one range, and ranges longer
+    than chunk_pages are split further.
+
+    Args:
+        page_count (int): Number of pages in the PDF
+        chunk_pages (int): Maximum pages per range, 0 for no limit
+        routes (list): Per-page route (see page_router.py), or None
+
+    Returns:
+        list: (start, end, route) tuples, end exclusive
+    """
+    if routes is None:
+        routes = [None] * page_count
+
+    runs = []
+    start = 0
+    for page in range(1, page_count + 1):
+        if page == page_count or routes[page] != routes[start]:
+            runs.append((start, page, routes[start]))
+            start = page
+
+    ranges = []
+    for run_start, run_end, route in runs:
+        size = chunk_pages or (run_end - run_start)
+        for chunk_start, chunk_end in plan_chunks(run_end - run_start, size):
+            ranges.append((run_start + chunk_start, run_start + chunk_end, route))
+    return ranges
+
+
+def get_chunk_root(output_dir, sanitized_name):
+    """
+    Get the checkpoint directory for a document's chunks.
+
+    Args:
+        output_dir (Path): Per-PDF output directory
+        sanitized_name (str): Sanitized stem of the output files
+
+    Returns:
+        Path: Checkpoint directory
+    """
+    return Path(output_dir) / f".{sanitized_name}.chunks"
+
+
+def get_chunk_dir(chunk_root, start, end):
+    """
+    Get the checkpoint directory of one chunk.
+
+    Args:
+        chunk_root (Path): Document checkpoint directory
+        start (int): First page (0-based)
+        end (int): Page after the last one
+
+    Returns:
+        Path: Chunk directory
+    """
+    return Path(chunk_root) / f"{start:05d}-{end - 1:05d}"
+
+
+def prepare_chunk_root(chunk_root, pdf_path, ranges):
+    """
+    Create the checkpoint directory, discarding checkpoints of another version.
+
+    Checkpoints are only reused when the PDF (size and mtime) and the planned
+    ranges match the ones they were produced from.
+
+    Args:
+        chunk_root (Path): Document checkpoint directory
+        pdf_path (Path): Path to the PDF file
+        ranges (list): (start, end, route) tuples
+    """
+    chunk_root = Path(chunk_root)
+    stat = Path(pdf_path).stat()
+    state = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "ranges": [list(r) for r in ranges]}
+    state_path = chunk_root / STATE_FILE
+
+    if state_path.exists():
+        try:
+            with open(state_path, 'r', encoding='utf-8') as f:
+                if json.load(f) == state:
+                    return
+        except (OSError, ValueError):
+            pass
+    if chunk_root.exists():
+        shutil.rmtree(chunk_root)
+
+    chunk_root.mkdir(parents=True)
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+
+
+def is_chunk_done(chunk_dir):
+    """
+    Check whether a chunk has been fully written.
+
+    Args:
+        chunk_dir (Path): Chunk directory
+
+    Returns:
+        bool: True if the chunk's completion marker exists
+    """
+    return (Path(chunk_dir) / DONE_MARKER).exists()
+
+
+def write_chunk(chunk_dir, markdown_text, images, save_images, metadata=None):
+    """
+    Checkpoint one converted chunk.
+
+    The completion marker is written last, via rename, so an interrupted chunk
+    is never mistaken for a finished one.
+
+    Args:
+        chunk_dir (Path): Chunk directory
+        markdown_text (str): Markdown of the chunk
+        images (dict): Image name to image data, as returned by Marker
+        save_images (callable): Function (images, images_dir) -> saved count
+        metadata (dict): Marker document metadata of the chunk, if any
+    """
+    chunk_dir = Path(chunk_dir)
+    if chunk_dir.exists():
+        shutil.rmtree(chunk_dir)
+    chunk_dir.mkdir(parents=True)
+
+    with open(chunk_dir / CHUNK_MARKDOWN, 'w', encoding='utf-8') as f:
+        f.write(markdown_text)
+    saved = save_images(images, chunk_dir / CHUNK_IMAGES) if images else 0
+    if metadata is not None:
+        with open(chunk_dir / CHUNK_METADATA, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, default=str)
+
+    tmp_marker = chunk_dir / (DONE_MARKER + ".tmp")
+    with open(tmp_marker, 'w', encoding='utf-8') as f:
+        json.dump({"images": saved}, f)
+    os.replace(tmp_marker, chunk_dir / DONE_MARKER)
+
+
+def merge_chunk_metadata(chunk_dirs):
+    """
+    Combine the metadata of consecutive chunks into one document's metadata.
+
+    List values (table of contents, page statistics) are concatenated in page
+    order; other values are taken from the first chunk that has them.
+
+    Args:
+        chunk_dirs (list): Chunk directories in page order
+
+    Returns:
+        dict: Merged metadata, or None if no chunk recorded any
+    """
+    merged = None
+    for chunk_dir in chunk_dirs:
+        path = Path(chunk_dir) / CHUNK_METADATA
+        if not path.exists():
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        if merged is None:
+            merged = {}
+        for key, value in metadata.items():
+            if isinstance(value, list):
+                merged.setdefault(key, []).extend(value)
+            else:
+                merged.setdefault(key, value)
+    return merged
+
+
+def join_continued(previous, following):
+    """
+    Join a paragraph cut at a chunk boundary, if it runs on.
+
+    Args:
+        previous (str): Last paragraph of a chunk
+        following (str): First paragraph of the next chunk
+
+    Returns:
+        str: The joined paragraph, or None if they are separate paragraphs
+    """
+    previous = previous.rstrip(" ")
+    if not previous or not following or BLOCK_START.match(previous) or BLOCK_START.match(following):
+        return None
+    if not following[0].islower() or SENTENCE_END.search(previous):
+        return None
+    if previous[-1] in HYPHENS and len(previous) > 1 and (previous[-2].islower() or previous[-2].isdigit()):
+        # A word split across pages
+        return previous[:-1] + following
+    return f"{previous} {following}"
+
+
+def stitch_chunks(chunk_root, ranges, markdown_path, images_dir, metadata_path=None):
+    """
+    Combine finished chunks into the final Markdown file and images directory.
+
+    Args:
+        chunk_root (Path): Document checkpoint directory
+        ranges (list): (start, end, route) tuples in page order
+        markdown_path (Path): Final Markdown file
+        images_dir (Path): Final images directory
+        metadata_path (Path): Sidecar for the merged chunk metadata, None to skip it
+
+    Returns:
+        int: Number of images moved into images_dir
+    """
+    chunk_dirs = [get_chunk_dir(chunk_root, start, end) for start, end, _ in ranges]
+    missing = [str(chunk_dir) for chunk_dir in chunk_dirs if not is_chunk_done(chunk_dir)]
+    if missing:
+        raise RuntimeError(f"Cannot stitch, unfinished chunks: {', '.join(missing)}")
+
+    # Stream the chunks into a temp file so only one chunk is in memory at a time.
+    # The last paragraph is held back, in case the next chunk continues it.
+    tmp_path = Path(markdown_path).with_name(Path(markdown_path).name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        tail = None
+        for chunk_dir in chunk_dirs:
+            with open(chunk_dir / CHUNK_MARKDOWN, 'r', encoding='utf-8') as f:
+                text = f.read().strip("\n")
+            if not text:
+                continue
+            if tail is not None:
+                head, separator, rest = text.partition("\n\n")
+                joined = join_continued(tail, head)
+                if joined is None:
+                    out.write(tail + "\n\n")
+                else:
+                    text = joined + separator + rest
+            body, separator, tail = text.rpartition("\n\n")
+            if separator:
+                out.write(body + "\n\n")
+        if tail is not None:
+            out.write(tail)
+
+    moved = 0
+    for chunk_dir in chunk_dirs:
+        chunk_images = chunk_dir / CHUNK_IMAGES
+        if not chunk_images.exists():
+            continue
+        Path(images_dir).mkdir(parents=True, exist_ok=True)
+        for image_path in chunk_images.iterdir():
+            os.replace(image_path, Path(images_dir) / image_path.name)
+            moved += 1
+
+    metadata = merge_chunk_metadata(chunk_dirs) if metadata_path is not None else None
+    if metadata is not None:
+        tmp_metadata = Path(metadata_path).with_name(Path(metadata_path).name + ".tmp")
+        with open(tmp_metadata, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_metadata, metadata_path)
+
+    os.replace(tmp_path, markdown_path)
+    shutil.rmtree(chunk_root)
+    return moved
@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: conversion_manifest.py
+
+Purpose:
+    This module keeps a persistent manifest of converted PDFs. Each entry records
+    the content hash of the source PDF, the converter config, the Marker version
+    and checksums of the produced outputs, so that deciding whether a PDF still
+    needs converting is a dictionary lookup plus a stat() call.
+
+    - Unchanged PDFs (same size and mtime, or same content hash) are skipped.
+    - Edited PDFs (content hash changed) are reconverted even if outputs exist.
+    - Renamed or moved PDFs reuse the outputs of the entry with the same hash,
+      once those match their recorded checksums. The files are hardlinked, so
+      images stay shared with the image store (image_store.py).
+    - Outputs whose Markdown was edited or deleted are converted again.
+    - A change of converter config or Marker version triggers reconversion.
+
+Usage:
+    Used by process_pdf.py. The manifest is stored at
+    pdf/output/.pipeline/manifest.json
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import json
+import socket
+import shutil
+import hashlib
+from datetime import datetime
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+
+# Lookup results
+STATUS_DONE = "done"
+STATUS_MOVED = "moved"
+STATUS_CHANGED = "changed"
+STATUS_NEW = "new"
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """
+    Compute the SHA-256 of a file without reading it into memory at once.
+
+    Args:
+        path (Path): File to hash
+        chunk_size (int): Read size in bytes
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def config_hash(config):
+    """
+    Hash a converter config so that config changes invalidate entries.
+
+    Args:
+        config (dict): Converter settings that affect the output
+
+    Returns:
+        str: Short hex digest of the canonical JSON form
+    """
+    canonical = json.dumps(config, sort_keys=True)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def _file_matches(path, sha256):
+    try:
+        return file_sha256(path) == sha256
+    except OSError:
+        return False
+
+
+def link_file(source, target):
+    """
+    Make target a hardlink to source, replacing any existing file.
+
+    Falls back to a copy when the volume does not support hardlinks.
+
+    Args:
+        source (Path): Existing file
+        target (Path): Link to create
+    """
+    target = Path(target)
+    tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+    try:
+        os.link(source, tmp_path)
+    except OSError:
+        shutil.copy2(source, tmp_path)
+    os.replace(tmp_path, target)
+
+
+def get_marker_version():
+    """
+    Get the installed Marker version without importing Marker.
+
+    Returns:
+        str: Version string, or "unknown" if marker-pdf is not installed
+    """
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        try:
+            return version("marker-pdf")
+        except PackageNotFoundError:
+            return "unknown"
+    except ImportError:
+        return "unknown"
+
+
+def output_checksums(output_dir):
+    """
+    Compute checksums of every file produced for one PDF.
+
+    Args:
+        output_dir (Path): Per-PDF output directory
+
+    Returns:
+        dict: Mapping of relative POSIX path to SHA-256
+    """
+    checksums = {}
+    output_dir = Path(output_dir)
+    if not output_dir.exists():
+        return checksums
+    for path in sorted(output_dir.rglob('*')):
+        if path.is_file():
+            checksums[path.relative_to(output_dir).as_posix()] = file_sha256(path)
+    return checksums
+
+
+class ConversionManifest:
+    """
+    Persistent record of which PDFs have been converted, and from what.
+
+    Entries are keyed by the PDF path relative to the input directory. An
+    in-memory index from content hash to key makes rename detection O(1).
+    """
+
+    def __init__(self, manifest_path, config, output_root=None):
+        """
+        Load the manifest, or start an empty one.
+
+        Args:
+            manifest_path (Path): Location of the manifest JSON file
+            config (dict): Converter settings that affect the output
+            output_root (Path): Root the output directories are relative to
+                (by default the manifest lives in <output root>/.pipeline/)
+        """
+        self.path = Path(manifest_path)
+        self.output_root = Path(output_root) if output_root is not None else self.path.parent.parent
+        self.config_hash = config_hash(config)
+        self.marker_version = get_marker_version()
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.entries = data.get("entries", {})
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable manifest {self.path}: {str(e)}")
+        self.by_hash = {entry["sha256"]: key for key, entry in self.entries.items()}
+
+    def save(self):
+        """
+        Write the manifest atomically (write to a temp file, then rename).
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Unique per process, so that two writers never share a temp file
+        tmp_path = self.path.with_name(f"{self.path.name}.{socket.gethostname()}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def _output_dir(self, entry):
+        return self.output_root / entry["output_dir"]
+
+    def _relative_output_dir(self, output_dir):
+        try:
+            return Path(output_dir).resolve().relative_to(self.output_root.resolve()).as_posix()
+        except ValueError:
+            return str(Path(output_dir).resolve())
+
+    def _is_current(self, entry):
+        return entry.get("config_hash") == self.config_hash and entry.get("marker_version") == self.marker_version
+
+    def _outputs_present(self, entry, output_dir, verify=False):
+        """
+        Check that the recorded outputs are still there and unmodified.
+
+        The Markdown must have its recorded size and checksum; it is only hashed
+        when its mtime changed since it was recorded. With verify, every
+        recorded output is hashed, as needed before its files are reused.
+        """
+        markdown = entry.get("markdown")
+        checksums = entry.get("outputs") or {}
+        if not markdown or markdown not in checksums:
+            return False
+        output_dir = Path(output_dir)
+        try:
+            stat = (output_dir / markdown).stat()
+        except OSError:
+            return False
+        if entry.get("markdown_size", stat.st_size) != stat.st_size:
+            return False
+        if verify:
+            return all(_file_matches(output_dir / relative, sha256) for relative, sha256 in checksums.items())
+        if entry.get("markdown_mtime_ns") == stat.st_mtime_ns:
+            return True
+        if not _file_matches(output_dir / markdown, checksums[markdown]):
+            return False
+        # Touched but not modified: refresh the stat fingerprint
+        entry["markdown_size"] = stat.st_size
+        entry["markdown_mtime_ns"] = stat.st_mtime_ns
+        return True
+
+    def lookup(self, key, pdf_path, output_dir):
+        """
+        Decide whether a PDF needs converting.
+
+        The common case (an unchanged file) costs a stat() of the PDF and one
+        of its Markdown; the PDF is only hashed when its size or mtime changed
+        or it has no entry yet, and the Markdown when its mtime changed.
+
+        Args:
+            key (str): PDF path relative to the input directory
+            pdf_path (Path): Path to the PDF file
+            output_dir (Path): Per-PDF output directory
+
+        Returns:
+            tuple: (status, sha256 or None, source key for STATUS_MOVED or None)
+        """
+        stat = Path(pdf_path).stat()
+        entry = self.entries.get(key)
+
+        if entry is not None and self._is_current(entry) and self._outputs_present(entry, output_dir):
+            if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+                return STATUS_DONE, entry["sha256"], None
+
+        sha256 = file_sha256(pdf_path)
+        if entry is not None and entry["sha256"] == sha256:
+            if self._is_current(entry) and self._outputs_present(entry, output_dir):
+                # Touched but not modified: refresh the stat fingerprint
+                entry["size"] = stat.st_size
+                entry["mtime_ns"] = stat.st_mtime_ns
+                return STATUS_DONE, sha256, None
+            return STATUS_CHANGED, sha256, None
+        if entry is not None:
+            return STATUS_CHANGED, sha256, None
+
+        source_key = self.by_hash.get(sha256)
+        if source_key is not None:
+            source = self.entries[source_key]
+            if self._is_current(source) and self._outputs_present(source, self._output_dir(source), verify=True):
+                return STATUS_MOVED, sha256, source_key
+        return STATUS_NEW, sha256, None
+
+    def adopt_moved(self, key, source_key, pdf_path, output_dir, sanitized_name):
+        """
+        Reuse the outputs of an identical PDF converted under another name.
+
+        Files are hardlinked (copied only where the volume cannot link them)
+        under the new sanitized name, and links to the images directory inside
+        the Markdown are rewritten accordingly. Hardlinks keep the images shared
+        with the image store; the old outputs are left in place.
+
+        Args:
+            key (str): New PDF path relative to the input directory
+            source_key (str): Key of the entry with the same content hash
+            pdf_path (Path): Path to the PDF file
+            output_dir (Path): Per-PDF output directory for the new path
+            sanitized_name (str): Sanitized stem used for the new output files
+        """
+        source = self.entries[source_key]
+        source_dir = self._output_dir(source)
+        source_name = Path(source["markdown"]).stem
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        for path in sorted(source_dir.rglob('*')):
+            if not path.is_file():
+                continue
+            relative = path.relative_to(source_dir).as_posix()
+            if relative.startswith(source_name):
+                relative = sanitized_name + relative[len(source_name):]
+            target = output_dir / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if path.suffix == ".md" and source_name != sanitized_name:
+                text = path.read_text(encoding='utf-8')
+                text = text.replace(f"{source_name}_images/", f"{sanitized_name}_images/")
+                # A new file, not a write through an existing link
+                tmp_path = target.with_name(f".{target.name}.{os.getpid()}.tmp")
+                tmp_path.write_text(text, encoding='utf-8')
+                os.replace(tmp_path, target)
+            else:
+                link_file(path, target)
+
+        self.record(key, pdf_path, output_dir, sanitized_name, sha256=source["sha256"])
+
+    def record(self, key, pdf_path, output_dir, sanitized_name, sha256=None):
+        """
+        Record a successful conversion.
+
+        Args:
+            key (str): PDF path relative to the input directory
+            pdf_path (Path): Path to the PDF file
+            output_dir (Path): Per-PDF output directory
+            sanitized_name (str): Sanitized stem of the output files
+            sha256 (str): Content hash if already known
+        """
+        stat = Path(pdf_path).stat()
+        old = self.entries.get(key)
+        if old is not None and self.by_hash.get(old["sha256"]) == key:
+            del self.by_hash[old["sha256"]]
+
+        entry = {
+            "sha256": sha256 or file_sha256(pdf_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "config_hash": self.config_hash,
+            "marker_version": self.marker_version,
+            "output_dir": self._relative_output_dir(output_dir),
+            "markdown": f"{sanitized_name}.md",
+            "outputs": output_checksums(output_dir),
+            "completed_at": datetime.now().isoformat(timespec='seconds'),
+        }
+        try:
+            markdown_stat = (Path(output_dir) / entry["markdown"]).stat()
+            entry["markdown_size"] = markdown_stat.st_size
+            entry["markdown_mtime_ns"] = markdown_stat.st_mtime_ns
+        except OSError:
+            pass
+        self.entries[key] = entry
+        self.by_hash[entry["sha256"]] = key
+
+    def merge(self, entries):
+        """
+        Take over entries recorded elsewhere (e.g. by another node).
+
+        An entry replaces an existing one only if it was completed later.
+
+        Args:
+            entries (dict): Manifest key to entry, with output directories
+                relative to the same output root
+
+        Returns:
+            int: Number of entries added or replaced
+        """
+        changed = 0
+        for key, entry in entries.items():
+            old = self.entries.get(key)
+            if old is not None and old.get("completed_at", "") >= entry.get("completed_at", ""):
+                continue
+            if old is not None and self.by_hash.get(old["sha256"]) == key:
+                del self.by_hash[old["sha256"]]
+            self.entries[key] = dict(entry)
+            self.by_hash[entry["sha256"]] = key
+            changed += 1
+        return changed
+
+    def forget_missing(self, input_dir):
+        """
+        Drop entries whose source PDF no longer exists.
+
+        Called after the walk so that moved files can still be matched by hash
+        against the entry of their old location first.
+
+        Args:
+            input_dir (Path): Root of the input tree
+
+        Returns:
+            int: Number of entries removed
+        """
+        removed = 0
+        for key in list(self.entries):
+            if not (Path(input_dir) / key).exists():
+                sha256 = self.entries.pop(key)["sha256"]
+                if self.by_hash.get(sha256) == key:
+                    del self.by_hash[sha256]
+                removed += 1
+        return removed
@@ -0,0 +1,618 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: embedding_index.py
+
+Purpose:
+    This module adds semantic retrieval ("find skills similar to this method")
+    over the skill documents in paper_skills/ and the chapter files in
+    llm_processed/*/chapters, without an external vector database.
+
+    - Documents are cut into short chunks and embedded on the CPU with a small
+      local sentence-embedding model (all-MiniLM-L6-v2 by default, stored in
+      models/), through transformers and torch.
+    - Vectors are stored normalized in one float16 matrix on disk, read through
+      a memory map, with an SQLite ID map from matrix row to document and
+      chunk. 100k chunks of 384 dimensions take about 75 MB.
+    - Only new or changed documents are embedded; the rows of changed or
+      deleted documents are marked dead and dropped by `compact`.
+    - Top-k queries are a vectorized NumPy dot product over the matrix in
+      blocks, so memory use stays flat however large the index grows. With
+      hnswlib installed, `build-ann` adds an approximate index for even faster
+      queries.
+
+Usage:
+    python scripts/embedding_index.py update
+    python scripts/embedding_index.py search "hierarchical loss for cell type annotation" -k 10
+    python scripts/embedding_index.py similar paper_skills/by_method/transformers/attention_skill.md
+    python scripts/embedding_index.py stats | compact | build-ann
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - NumPy
+    - transformers and torch (embedding)
+    - hnswlib (optional, approximate nearest-neighbour index)
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_INDEX_DIR = PROJECT_ROOT / "pdf" / "output" / ".pipeline" / "embeddings"
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+MODEL_CACHE_DIR = PROJECT_ROOT / "models" / "embeddings"
+
+VECTORS_NAME = "vectors.f16"
+IDS_NAME = "ids.sqlite"
+META_NAME = "meta.json"
+ANN_NAME = "ann.bin"
+
+# Tokens per embedded chunk (MiniLM truncates at 256 word pieces)
+CHUNK_TOKENS = 200
+# Rows scored per NumPy block during a search
+SEARCH_BLOCK = 65536
+EMBED_BATCH = 32
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def default_sources():
+    """
+    List the documents to embed.
+
+    Returns:
+        list: (kind, path) tuples for skill documents and chapter files
+    """
+    sources = []
+    skills_dir = PROJECT_ROOT / "paper_skills"
+    for directory, dirs, files in os.walk(skills_dir):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            # index.md pages are generated listings (skill_index.py)
+            if name.lower().endswith(".md") and name != "index.md":
+                sources.append(("skill", Path(directory) / name))
+    for directory, dirs, files in os.walk(PROJECT_ROOT / "llm_processed"):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(".") and not d.endswith(".tmp"))
+        if Path(directory).name == "chapters":
+            for name in sorted(files):
+                if name.lower().endswith(".md"):
+                    sources.append(("chapter", Path(directory) / name))
+    return sources
+
+
+class Embedder:
+    """
+    Sentence embeddings on the CPU (mean pooling over a transformers encoder).
+
+    The model is loaded on first use and cached in models/embeddings.
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL, threads=None):
+        """
+        Initialize the embedder.
+
+        Args:
+            model_name (str): Hugging Face model id
+            threads (int): Torch CPU threads (all cores if None)
+        """
+        self.model_name = model_name
+        self.threads = threads
+        self._tokenizer = None
+        self._model = None
+
+    def _load(self):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        if self.threads:
+            torch.set_num_threads(self.threads)
+        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name, cache_dir=str(MODEL_CACHE_DIR))
+        self._model = AutoModel.from_pretrained(self.model_name, cache_dir=str(MODEL_CACHE_DIR)).eval()
+
+    def encode(self, texts, batch_size=EMBED_BATCH):
+        """
+        Embed texts.
+
+        Args:
+            texts (list): Strings to embed
+            batch_size (int): Texts per forward pass
+
+        Returns:
+            numpy.ndarray: float32 matrix (len(texts), dim), rows L2-normalized
+        """
+        import torch
+
+        if self._model is None:
+            self._load()
+        vectors = []
+        with torch.inference_mode():
+            for start in range(0, len(texts), batch_size):
+                batch = self._tokenizer(texts[start:start + batch_size], padding=True, truncation=True,
+                                        max_length=256, return_tensors="pt")
+                output = self._model(**batch).last_hidden_state
+                mask = batch["attention_mask"].unsqueeze(-1).to(output.dtype)
+                pooled = (output * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+                vectors.append(torch.nn.functional.normalize(pooled, dim=1).numpy())
+        return np.concatenate(vectors).astype(np.float32) if vectors else np.zeros((0, 0), np.float32)
+
+
+class EmbeddingIndex:
+    """
+    Append-only float16 vector matrix with an SQLite ID map.
+
+    Row i of vectors.f16 belongs to chunk row i of ids.sqlite. Rows of
+    replaced or deleted documents are marked dead until compact() rewrites
+    the matrix.
+    """
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR, embedder=None):
+        """
+        Open (or create) the index.
+
+        Args:
+            index_dir (Path): Directory holding the matrix, ID map and metadata
+            embedder: Object with encode(texts) -> normalized float32 matrix
+                (an Embedder with the default model if None)
+        """
+        self.dir = Path(index_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.embedder = embedder or Embedder()
+        self.meta = self._load_meta()
+        self.conn = sqlite3.connect(str(self.dir / IDS_NAME))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS chunks (
+                    row INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    chunk INTEGER NOT NULL,
+                    section TEXT,
+                    preview TEXT,
+                    alive INTEGER NOT NULL DEFAULT 1
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL
+                )
+            """)
+        self._check_consistency()
+
+    def _load_meta(self):
+        try:
+            with open(self.dir / META_NAME, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"model": getattr(self.embedder, "model_name", None), "dim": None, "rows": 0}
+
+    def _save_meta(self):
+        tmp_path = self.dir / (META_NAME + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_path, self.dir / META_NAME)
+
+    def _check_consistency(self):
+        """
+        Cut off matrix rows written by a run that died before recording them.
+        """
+        path = self.dir / VECTORS_NAME
+        if not self.meta["dim"] or not path.exists():
+            return
+        expected = self.meta["rows"] * self.meta["dim"] * 2
+        if path.stat().st_size > expected:
+            with open(path, 'r+b') as f:
+                f.truncate(expected)
+        with self.conn:
+            self.conn.execute("DELETE FROM chunks WHERE row >= ?", (self.meta["rows"],))
+
+    def vectors(self):
+        """
+        Map the vector matrix read-only.
+
+        Returns:
+            numpy.memmap: float16 matrix (rows, dim), or None if the index is empty
+        """
+        if not self.meta["rows"]:
+            return None
+        return np.memmap(self.dir / VECTORS_NAME, dtype=np.float16, mode='r',
+                         shape=(self.meta["rows"], self.meta["dim"]))
+
+    def alive_mask(self):
+        """
+        Get which matrix rows belong to current documents.
+
+        Returns:
+            numpy.ndarray: bool array with one entry per row
+        """
+        mask = np.zeros(self.meta["rows"], dtype=bool)
+        rows = [row[0] for row in self.conn.execute("SELECT row FROM chunks WHERE alive = 1")]
+        if rows:
+            mask[np.asarray(rows, dtype=np.int64)] = True
+        return mask
+
+    def _append(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float16)
+        if self.meta["dim"] is None:
+            self.meta["dim"] = int(vectors.shape[1])
+        elif vectors.shape[1] != self.meta["dim"]:
+            raise ValueError(f"Embedding size {vectors.shape[1]} does not match the index ({self.meta['dim']})")
+        with open(self.dir / VECTORS_NAME, 'ab') as f:
+            f.write(vectors.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+    def update(self, sources=None):
+        """
+        Embed new and changed documents and retire the rows of removed ones.
+
+        Args:
+            sources (list): (kind, path) tuples (default_sources() if None)
+
+        Returns:
+            dict: Numbers of documents embedded, unchanged and removed, and chunks added
+        """
+        from llm_process import chunk_document
+
+        sources = default_sources() if sources is None else sources
+        known = {row["path"]: row for row in self.conn.execute("SELECT * FROM documents")}
+        seen = set()
+        counts = {"embedded": 0, "unchanged": 0, "removed": 0, "chunks": 0}
+
+        for kind, path in sources:
+            key = Path(path).resolve().as_posix()
+            seen.add(key)
+            stat = Path(path).stat()
+            record = known.get(key)
+            if record is not None and record["size"] == stat.st_size and record["mtime_ns"] == stat.st_mtime_ns:
+                counts["unchanged"] += 1
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            sha256 = hashlib.sha256(data).hexdigest()
+            if record is not None and record["sha256"] == sha256:
+                with self.conn:
+                    self.conn.execute("UPDATE documents SET size = ?, mtime_ns = ? WHERE path = ?",
+                                      (stat.st_size, stat.st_mtime_ns, key))
+                counts["unchanged"] += 1
+                continue
+
+            chunks = chunk_document(data.decode('utf-8', errors='replace'), CHUNK_TOKENS)
+            vectors = self.embedder.encode([chunk["text"] for chunk in chunks]) if chunks else None
+            first_row = self.meta["rows"]
+            if chunks:
+                self._append(vectors)
+            # Matrix first, then the row count, then the ID map. A crash before
+            # the row count is saved leaves extra rows that _check_consistency()
+            # cuts off; a crash after it leaves rows no chunk points to, which
+            # stay dead until compact(), and the document is embedded again
+            self.meta["rows"] = first_row + len(chunks)
+            self._save_meta()
+            with self.conn:
+                self.conn.execute("UPDATE chunks SET alive = 0 WHERE path = ?", (key,))
+                self.conn.executemany(
+                    "INSERT INTO chunks (row, path, kind, chunk, section, preview) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(first_row + number, key, kind, number, chunk["section"], " ".join(chunk["text"].split())[:200])
+                     for number, chunk in enumerate(chunks)],
+                )
+                self.conn.execute("INSERT OR REPLACE INTO documents (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                                  (key, stat.st_size, stat.st_mtime_ns, sha256))
+            counts["embedded"] += 1
+            counts["chunks"] += len(chunks)
+
+        removed = [path for path in known if path not in seen]
+        with self.conn:
+            self.conn.executemany("UPDATE chunks SET alive = 0 WHERE path = ?", [(path,) for path in removed])
+            self.conn.executemany("DELETE FROM documents WHERE path = ?", [(path,) for path in removed])
+        counts["removed"] = len(removed)
+        return counts
+
+    def _top_k(self, query, k, mask):
+        """
+        Exact top-k by blockwise dot product over the memory-mapped matrix.
+        """
+        matrix = self.vectors()
+        if matrix is None:
+            return []
+        best_rows = np.empty(0, dtype=np.int64)
+        best_scores = np.empty(0, dtype=np.float32)
+        for start in range(0, matrix.shape[0], SEARCH_BLOCK):
+            block = np.asarray(matrix[start:start + SEARCH_BLOCK], dtype=np.float32)
+            scores = block @ query
+            scores[~mask[start:start + SEARCH_BLOCK]] = -np.inf
+            count = min(k, scores.shape[0])
+            top = np.argpartition(-scores, count - 1)[:count]
+            best_rows = np.concatenate([best_rows, top + start])
+            best_scores = np.concatenate([best_scores, scores[top]])
+            if best_rows.shape[0] > k:
+                keep = np.argpartition(-best_scores, k - 1)[:k]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+        order = np.argsort(-best_scores)
+        return [(int(best_rows[i]), float(best_scores[i])) for i in order if np.isfinite(best_scores[i])]
+
+    def _ann_top_k(self, query, k, mask):
+        """
+        Approximate top-k through the hnswlib index, if it is present and current.
+
+        The index holds every row, so the mask (dead rows, --kind, the excluded
+        document) is applied to its neighbours afterwards. If fewer than k of
+        them survive while more rows match, None is returned and the caller
+        falls back to the exact scan.
+        """
+        ann_path = self.dir / ANN_NAME
+        if not ann_path.exists() or self.meta.get("ann_rows") != self.meta["rows"]:
+            return None
+        try:
+            import hnswlib
+        except ImportError:
+            return None
+        ann = hnswlib.Index(space="ip", dim=self.meta["dim"])
+        ann.load_index(str(ann_path))
+        ann.set_ef(max(64, k * 4))
+        labels, distances = ann.knn_query(query, k=min(self.meta["rows"], k * 4))
+        results = [(int(row), 1.0 - float(distance)) for row, distance in zip(labels[0], distances[0])
+                   if mask[row]]
+        if len(results) < k and int(np.count_nonzero(mask)) > len(results):
+            return None
+        return results[:k]
+
+    def search(self, text=None, k=10, kind=None, vector=None, exclude_path=None, exact=False):
+        """
+        Find the chunks most similar to a text or vector.
+
+        Args:
+            text (str): Query text
+            k (int): Number of results
+            kind (str): Only chunks of this kind ("skill" or "chapter")
+            vector (numpy.ndarray): Query vector instead of a text
+            exclude_path (str): Leave out the chunks of this document
+            exact (bool): Scan the full matrix even if an ANN index exists
+
+        Returns:
+            list: Result dicts (score, path, kind, chunk, section, preview), best first
+        """
+        if vector is None:
+            vector = self.embedder.encode([text])[0]
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        mask = self.alive_mask()
+        if kind or exclude_path:
+            sql = "SELECT row FROM chunks WHERE alive = 1"
+            params = []
+            if kind:
+                sql += " AND kind = ?"
+                params.append(kind)
+            if exclude_path:
+                sql += " AND path != ?"
+                params.append(Path(exclude_path).resolve().as_posix())
+            mask = np.zeros(self.meta["rows"], dtype=bool)
+            rows = [row[0] for row in self.conn.execute(sql, params)]
+            if rows:
+                mask[np.asarray(rows, dtype=np.int64)] = True
+
+        hits = None if exact else self._ann_top_k(query, k, mask)
+        if hits is None:
+            hits = self._top_k(query, k, mask)
+        results = []
+        for row, score in hits:
+            info = self.conn.execute("SELECT * FROM chunks WHERE row = ?", (row,)).fetchone()
+            results.append({"score": score, "path": info["path"], "kind": info["kind"], "chunk": info["chunk"],
+                            "section": info["section"], "preview": info["preview"]})
+        return results
+
+    def document_vector(self, path):
+        """
+        Get the mean vector of an indexed document.
+
+        Args:
+            path (Path): Indexed document
+
+        Returns:
+            numpy.ndarray: float32 vector, or None if the document is not indexed
+        """
+        rows = [row[0] for row in self.conn.execute(
+            "SELECT row FROM chunks WHERE path = ? AND alive = 1", (Path(path).resolve().as_posix(),))]
+        if not rows:
+            return None
+        return np.asarray(self.vectors()[np.asarray(rows)], dtype=np.float32).mean(axis=0)
+
+    def compact(self):
+        """
+        Rewrite the matrix without the rows of replaced or deleted documents.
+
+        Returns:
+            int: Number of rows dropped
+        """
+        matrix = self.vectors()
+        if matrix is None:
+            return 0
+        alive = [row[0] for row in self.conn.execute("SELECT row FROM chunks WHERE alive = 1 ORDER BY row")]
+        dropped = self.meta["rows"] - len(alive)
+        if not dropped:
+            return 0
+        tmp_path = self.dir / (VECTORS_NAME + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            for start in range(0, len(alive), SEARCH_BLOCK):
+                f.write(np.asarray(matrix[np.asarray(alive[start:start + SEARCH_BLOCK])], dtype=np.float16).tobytes())
+        del matrix
+        with self.conn:
+            self.conn.execute("DELETE FROM chunks WHERE alive = 0")
+            # Renumber in row order; rows only move down, so updating in ascending order is safe
+            self.conn.executemany("UPDATE chunks SET row = ? WHERE row = ?",
+                                  [(new_row, old_row) for new_row, old_row in enumerate(alive)])
+            os.replace(tmp_path, self.dir / VECTORS_NAME)
+        self.meta["rows"] = len(alive)
+        self.meta.pop("ann_rows", None)
+        self._save_meta()
+        return dropped
+
+    def build_ann(self):
+        """
+        Build the optional hnswlib index over all rows.
+
+        Returns:
+            bool: True if built, False if hnswlib is not installed
+        """
+        try:
+            import hnswlib
+        except ImportError:
+            return False
+        matrix = self.vectors()
+        if matrix is None:
+            return False
+        ann = hnswlib.Index(space="ip", dim=self.meta["dim"])
+        ann.init_index(max_elements=matrix.shape[0], ef_construction=200, M=16)
+        for start in range(0, matrix.shape[0], SEARCH_BLOCK):
+            block = np.asarray(matrix[start:start + SEARCH_BLOCK], dtype=np.float32)
+            ann.add_items(block, np.arange(start, start + block.shape[0]))
+        ann.save_index(str(self.dir / ANN_NAME))
+        self.meta["ann_rows"] = self.meta["rows"]
+        self._save_meta()
+        return True
+
+    def stats(self):
+        """
+        Summarize the index.
+
+        Returns:
+            dict: Model, dimensions, rows, live rows, documents and matrix size
+        """
+        live = self.conn.execute("SELECT COUNT(*) FROM chunks WHERE alive = 1").fetchone()[0]
+        documents = self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        path = self.dir / VECTORS_NAME
+        return {"model": self.meta.get("model"), "dim": self.meta["dim"], "rows": self.meta["rows"],
+                "live_rows": live, "documents": documents,
+                "matrix_mb": path.stat().st_size / (1024 * 1024) if path.exists() else 0.0,
+                "ann": self.meta.get("ann_rows") == self.meta["rows"] and (self.dir / ANN_NAME).exists()}
+
+    def close(self):
+        """
+        Close the ID map.
+        """
+        self.conn.close()
+
+
+def print_results(results, elapsed):
+    """
+    Print similarity results.
+
+    Args:
+        results (list): Results of EmbeddingIndex.search()
+        elapsed (float): Query time in seconds
+    """
+    print(f"{Colors.CYAN}{len(results)} results in {elapsed * 1000:.1f} ms{Colors.RESET}")
+    for number, result in enumerate(results, start=1):
+        print(f"{Colors.GREEN}{number}. {result['score']:.3f}{Colors.RESET} "
+              f"{os.path.relpath(result['path'], PROJECT_ROOT)} ({result['kind']}, chunk {result['chunk']})")
+        if result["section"]:
+            print(f"   {Colors.BLUE}{result['section']}{Colors.RESET}")
+        print(f"   {result['preview']}")
+
+
+def main():
+    """
+    Main function to update and query the embedding index.
+    """
+    parser = argparse.ArgumentParser(description="Semantic retrieval over skills and chapters")
+    parser.add_argument("command", choices=["update", "search", "similar", "stats", "compact", "build-ann"],
+                        help="update: embed new and changed documents; search: query by text; "
+                             "similar: documents like a given one; stats; compact: drop dead rows; "
+                             "build-ann: build the optional hnswlib index")
+    parser.add_argument("query", nargs="?", help="Query text (search) or document path (similar)")
+    parser.add_argument("-k", type=int, default=10, help="Number of results (default: %(default)s)")
+    parser.add_argument("--kind", choices=["skill", "chapter"], help="Only results of this kind")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Embedding model (default: %(default)s)")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads for embedding")
+    parser.add_argument("--exact", action="store_true", help="Ignore the ANN index and scan every vector")
+    parser.add_argument("--index", default=str(DEFAULT_INDEX_DIR), help="Index directory (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.command in ("search", "similar") and not args.query:
+        parser.error(f"{args.command} needs a query")
+
+    index = EmbeddingIndex(Path(args.index), Embedder(args.model, args.threads))
+    try:
+        if index.meta.get("model") not in (None, args.model):
+            print(f"{Colors.RED}The index was built with {index.meta['model']}; "
+                  f"use --model {index.meta['model']} or a new --index directory{Colors.RESET}")
+            return
+        index.meta["model"] = args.model
+
+        if args.command == "update":
+            counts = index.update()
+            print(f"{Colors.GREEN}Embedded {counts['embedded']} documents ({counts['chunks']} chunks){Colors.RESET}, "
+                  f"{counts['unchanged']} unchanged, {counts['removed']} removed")
+        elif args.command == "search":
+            start = time.perf_counter()
+            results = index.search(args.query, args.k, args.kind, exact=args.exact)
+            print_results(results, time.perf_counter() - start)
+        elif args.command == "similar":
+            vector = index.document_vector(args.query)
+            if vector is None:
+                print(f"{Colors.RED}Not in the index: {args.query} (run update first){Colors.RESET}")
+                return
+            start = time.perf_counter()
+            results = index.search(k=args.k, kind=args.kind, vector=vector, exclude_path=args.query,
+                                   exact=args.exact)
+            print_results(results, time.perf_counter() - start)
+        elif args.command == "compact":
+            print(f"{Colors.GREEN}Dropped {index.compact()} dead rows{Colors.RESET}")
+        elif args.command == "build-ann":
+            if index.build_ann():
+                print(f"{Colors.GREEN}ANN index built{Colors.RESET}")
+            else:
+                print(f"{Colors.YELLOW}hnswlib is not installed (pip install hnswlib), "
+                      f"queries keep using the exact scan{Colors.RESET}")
+        if args.command in ("stats", "update", "compact", "build-ann"):
+            stats = index.stats()
+            print(f"{Colors.CYAN}Embedding index:{Colors.RESET} {index.dir}")
+            print(f"{Colors.BLUE}Model:{Colors.RESET} {stats['model']} ({stats['dim']} dimensions)")
+            print(f"{Colors.BLUE}Rows:{Colors.RESET} {stats['live_rows']} live / {stats['rows']} total, "
+                  f"{stats['documents']} documents, {stats['matrix_mb']:.1f} MB, "
+                  f"ANN {'on' if stats['ann'] else 'off'}")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: image_inventory.py
+
+Purpose:
+    This module builds a corpus-wide inventory of the images embedded in the
+    PDFs, for auditing thousands of documents at once. Image metadata comes
+    from the xref dictionaries recorded by the pre-scan (pdf_prescan.py), so no
+    pixel data is decoded and no image stream is read. Images shared by several
+    pages (logos, headers) are listed once per document, with the pages they
+    appear on.
+
+    PDFs are scanned across a process pool, and the inventory is written as a
+    table that can be queried across documents:
+    - CSV (.csv)
+    - SQLite (.sqlite / .db), table "images"
+    - Parquet (.parquet), requires pyarrow
+
+Usage:
+    python scripts/image_inventory.py
+    python scripts/image_inventory.py --output pdf/output/image_inventory.csv --workers 8
+    python scripts/analyze_pdf_images.py --inventory pdf/output/image_inventory.parquet
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - PyMuPDF (fitz), used through pdf_prescan.py
+    - pyarrow (optional, Parquet output)
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import csv
+import sqlite3
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from pdf_prescan import get_profile
+
+DEFAULT_INPUT_DIR = Path(__file__).parent.parent / "pdf" / "input"
+DEFAULT_OUTPUT_PATH = Path(__file__).parent.parent / "pdf" / "output" / ".pipeline" / "image_inventory.sqlite"
+
+# Inventory columns with their SQLite types
+COLUMNS = [
+    ("pdf", "TEXT"),
+    ("xref", "INTEGER"),
+    ("name", "TEXT"),
+    ("type", "TEXT"),
+    ("ext", "TEXT"),
+    ("filter", "TEXT"),
+    ("colorspace", "TEXT"),
+    ("bpc", "INTEGER"),
+    ("width", "INTEGER"),
+    ("height", "INTEGER"),
+    ("pixels", "INTEGER"),
+    ("length", "INTEGER"),
+    ("bits_per_pixel", "REAL"),
+    ("has_smask", "INTEGER"),
+    ("first_page", "INTEGER"),
+    ("page_count", "INTEGER"),
+    ("pages", "TEXT"),
+]
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def inventory_rows(profile, pdf_key):
+    """
+    Turn a pre-scan profile into one inventory row per unique image xref.
+
+    Args:
+        profile (dict): Pre-scan profile of the PDF
+        pdf_key (str): Name of the PDF in the inventory (path relative to the input directory)
+
+    Returns:
+        list: Row dicts with the keys of COLUMNS
+    """
+    rows = {}
+    for page in profile["pages"]:
+        for image in page["images"]:
+            row = rows.get(image["xref"])
+            if row is not None:
+                # Same xref drawn again: one image, several placements
+                if page["number"] + 1 not in row["_pages"]:
+                    row["_pages"].append(page["number"] + 1)
+                continue
+            pixels = image["width"] * image["height"]
+            rows[image["xref"]] = {
+                "pdf": pdf_key,
+                "xref": image["xref"],
+                "name": image["name"],
+                "type": image["type"],
+                "ext": image["ext"],
+                "filter": image["filter"],
+                "colorspace": image["colorspace"],
+                "bpc": image["bpc"],
+                "width": image["width"],
+                "height": image["height"],
+                "pixels": pixels,
+                "length": image["length"],
+                "bits_per_pixel": round(image["length"] * 8 / pixels, 3) if pixels else None,
+                "has_smask": int(bool(image["smask"])),
+                "_pages": [page["number"] + 1],
+            }
+    result = []
+    for row in rows.values():
+        pages = row.pop("_pages")
+        row.update({
+            "first_page": pages[0],
+            "page_count": len(pages),
+            "pages": " ".join(str(number) for number in pages),
+        })
+        result.append(row)
+    return result
+
+
+def _scan_one(pdf_path, pdf_key):
+    """
+    Worker entry point: inventory one PDF.
+
+    Returns:
+        tuple: (pdf_key, rows, error message or None)
+    """
+    try:
+        return pdf_key, inventory_rows(get_profile(pdf_path), pdf_key), None
+    except Exception as e:
+        return pdf_key, [], str(e)
+
+
+def find_pdfs(input_dir):
+    """
+    Find every PDF below the input directory.
+
+    Args:
+        input_dir (Path): Root of the input tree
+
+    Returns:
+        list: Sorted PDF paths
+    """
+    pdf_files = []
+    for root, dirs, files in os.walk(input_dir):
+        for file in files:
+            if file.lower().endswith('.pdf'):
+                pdf_files.append(Path(root) / file)
+    return sorted(pdf_files)
+
+
+def build_inventory(pdf_files, input_dir, workers=None):
+    """
+    Inventory the images of many PDFs across a process pool.
+
+    Profiles already in the pre-scan cache are read without reopening the PDF.
+
+    Args:
+        pdf_files (list): PDF paths
+        input_dir (Path): Root the PDF names are made relative to
+        workers (int): Worker processes (CPU count if None)
+
+    Returns:
+        tuple: (rows sorted by PDF and xref, {pdf_key: error} for PDFs that failed)
+    """
+    input_dir = Path(input_dir)
+    jobs = [(pdf_path, Path(pdf_path).relative_to(input_dir).as_posix()) for pdf_path in pdf_files]
+    workers = max(1, min(workers or multiprocessing.cpu_count(), len(jobs) or 1))
+
+    rows = []
+    errors = {}
+    if workers == 1:
+        results = (_scan_one(pdf_path, pdf_key) for pdf_path, pdf_key in jobs)
+        for pdf_key, pdf_rows, error in results:
+            rows.extend(pdf_rows)
+            if error:
+                errors[pdf_key] = error
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_scan_one, pdf_path, pdf_key) for pdf_path, pdf_key in jobs]
+            for future in as_completed(futures):
+                pdf_key, pdf_rows, error = future.result()
+                rows.extend(pdf_rows)
+                if error:
+                    errors[pdf_key] = error
+    rows.sort(key=lambda row: (row["pdf"], row["xref"]))
+    return rows, errors
+
+
+def _write_csv(rows, output_path):
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=[name for name, _type in COLUMNS])
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _write_sqlite(rows, output_path):
+    conn = sqlite3.connect(str(output_path))
+    try:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS images")
+            conn.execute("CREATE TABLE images ({})".format(
+                ", ".join(f"{name} {sql_type}" for name, sql_type in COLUMNS)))
+            conn.executemany(
+                "INSERT INTO images VALUES ({})".format(", ".join("?" for _ in COLUMNS)),
+                [tuple(row[name] for name, _type in COLUMNS) for row in rows],
+            )
+            conn.execute("CREATE INDEX images_pdf ON images (pdf)")
+            conn.execute("CREATE INDEX images_ext ON images (ext)")
+    finally:
+        conn.close()
+
+
+def _write_parquet(rows, output_path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+    arrow_types = {"TEXT": pa.string(), "INTEGER": pa.int64(), "REAL": pa.float64()}
+    schema = pa.schema([(name, arrow_types[sql_type]) for name, sql_type in COLUMNS])
+    table = pa.Table.from_pylist(rows, schema=schema)
+    pq.write_table(table, str(output_path))
+
+
+WRITERS = {
+    ".csv": _write_csv,
+    ".sqlite": _write_sqlite,
+    ".db": _write_sqlite,
+    ".parquet": _write_parquet,
+}
+
+
+def write_inventory(rows, output_path):
+    """
+    Write the inventory in the format given by the file extension.
+
+    The file is written next to its final location and renamed into place,
+    so readers never see a partial table.
+
+    Args:
+        rows (list): Inventory rows
+        output_path (Path): .csv, .sqlite/.db or .parquet file
+    """
+    output_path = Path(output_path)
+    writer = WRITERS.get(output_path.suffix.lower())
+    if writer is None:
+        raise ValueError(f"Unsupported inventory format: {output_path.suffix} "
+                         f"(use one of {', '.join(sorted(WRITERS))})")
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    try:
+        writer(rows, tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def run_inventory(input_dir, output_path, workers=None):
+    """
+    Inventory every PDF below the input directory and write the table.
+
+    Args:
+        input_dir (Path): Root of the input tree
+        output_path (Path): Output table (.csv, .sqlite/.db or .parquet)
+        workers (int): Worker processes (CPU count if None)
+
+    Returns:
+        list: Inventory rows
+    """
+    input_dir = Path(input_dir)
+    if not input_dir.exists():
+        print(f"{Colors.RED}Input directory not found: {input_dir}{Colors.RESET}")
+        return []
+    pdf_files = find_pdfs(input_dir)
+    if not pdf_files:
+        print(f"{Colors.YELLOW}No PDF files found in input directory.{Colors.RESET}")
+        return []
+
+    print(f"{Colors.CYAN}Building image inventory of {len(pdf_files)} PDF files...{Colors.RESET}")
+    rows, errors = build_inventory(pdf_files, input_dir, workers)
+    for pdf_key, error in sorted(errors.items()):
+        print(f"{Colors.RED}Error scanning {pdf_key}: {error}{Colors.RESET}")
+    write_inventory(rows, output_path)
+
+    print(f"{Colors.GREEN}Inventory written:{Colors.RESET} {output_path}")
+    print(f"{Colors.BLUE}Unique images:{Colors.RESET} {len(rows)} in {len(pdf_files) - len(errors)} PDF files "
+          f"({sum(row['length'] for row in rows) / (1024 * 1024):.1f} MB encoded)")
+    return rows
+
+
+def main():
+    """
+    Main function to build the image inventory of the input directory.
+    """
+    parser = argparse.ArgumentParser(description="Build a tabular inventory of the images in all PDFs")
+    parser.add_argument("--input", default=str(DEFAULT_INPUT_DIR), help="Input directory (default: %(default)s)")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT_PATH),
+                        help="Output table, format from the extension: .csv, .sqlite/.db or .parquet "
+                             "(default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    run_inventory(Path(args.input), Path(args.output), args.workers)
+
+
+if __name__ == "__main__":
+    main()
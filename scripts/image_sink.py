@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: image_sink.py
+
+Purpose:
+    This module writes the images produced by Marker to disk. Images are taken
+    out of Marker's image dict one by one and released as soon as they are
+    written, encoding runs on a small thread pool, and the number of images
+    waiting to be encoded is bounded, so peak memory no longer grows with the
+    number of figures in a paper.
+
+    When a figure is exactly one embedded JPEG of the PDF (same page, drawn
+    where the figure's block is, same aspect ratio, no rotation or flip, not
+    cut off by the page, at least the rendered resolution), the original
+    stream is copied with doc.extract_image() instead of re-encoding the
+    rendered crop, which is faster and lossless. Figures whose block position
+    is unknown are always encoded from the crop.
+
+    Unless disabled, images go through the content-addressed store
+    (image_store.py): an image already extracted for another document is
+    hardlinked instead of being written again.
+
+Usage:
+    Used by process_pdf.py and chunked_convert.py through save_images().
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - Pillow
+    - PyMuPDF (fitz), only for passthrough of embedded JPEGs
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import io
+import os
+import re
+import base64
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from pdf_prescan import get_profile
+from image_store import get_store
+
+# Marker names images _page_<page>_<Block>_<id>.<ext>, with 0-based page numbers
+PAGE_PATTERN = re.compile(r"_page_(\d+)_")
+
+# Aspect ratio tolerance when matching a figure to an embedded image
+ASPECT_TOLERANCE = 0.03
+# Least intersection over union of the figure's block and the embedded image
+MIN_BBOX_OVERLAP = 0.8
+
+# Base64 characters decoded per write; a multiple of 4 keeps chunks aligned
+BASE64_CHUNK = 4 * 256 * 1024
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def _write_atomic(path, write):
+    """
+    Write a file through a temp file, so a crash never leaves a partial image.
+
+    Args:
+        path (Path): Final file path
+        write (callable): Function (file object) -> None writing the content
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _write_data_uri(f, data_uri):
+    # Decode in slices so the decoded image is never held in memory at once
+    _header, payload = data_uri.split(',', 1)
+    for start in range(0, len(payload), BASE64_CHUNK):
+        f.write(base64.b64decode(payload[start:start + BASE64_CHUNK]))
+
+
+class ImageSink:
+    """
+    Bounded, multi-threaded writer for Marker images.
+
+    submit() blocks when max_pending images are already waiting, so a producer
+    can never queue more than a fixed number of decoded images in memory.
+    """
+
+    def __init__(self, images_dir, pdf_path=None, max_workers=None, max_pending=None, store=None):
+        """
+        Initialize the sink.
+
+        Args:
+            images_dir (Path): Directory to write the images to
+            pdf_path (Path): Source PDF, enables passthrough of embedded JPEGs
+            max_workers (int): Encoder threads (at most 4 by default)
+            max_pending (int): Images allowed in flight (2 per thread by default)
+            store (ImageStore): Content-addressed store to link images from, None to write copies
+        """
+        self.images_dir = Path(images_dir)
+        self.images_dir.mkdir(parents=True, exist_ok=True)
+        self.pdf_path = pdf_path
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.pending = threading.BoundedSemaphore(max_pending or 2 * self.max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image-sink")
+        self.lock = threading.Lock()
+        self.saved = 0
+        self.passthrough = 0
+        self.store = store
+        self.deduplicated = 0
+        self._doc = None
+        self._profile = None
+
+    def _embedded_jpeg(self, name, image, bbox):
+        """
+        Find the embedded JPEG a figure was cropped from, if unambiguous.
+
+        Runs in the submitting thread, since PyMuPDF documents are not thread-safe.
+
+        Args:
+            name (str): Marker image name
+            image (PIL.Image.Image): Rendered crop
+            bbox (list): Figure block on the page (x0, y0, x1, y1 in points)
+
+        Returns:
+            bytes: Original JPEG stream, or None to encode the crop instead
+        """
+        match = PAGE_PATTERN.search(name)
+        if self.pdf_path is None or bbox is None or match is None or not name.lower().endswith(('.jpeg', '.jpg')):
+            return None
+        page_number = int(match.group(1))
+
+        if self._profile is None:
+            self._profile = get_profile(self.pdf_path)
+        if page_number >= self._profile["page_count"]:
+            return None
+        jpeg_xrefs = {
+            info["xref"] for info in self._profile["pages"][page_number]["images"]
+            if info["type"] == "raster" and info["filter"] == "DCTDecode"
+        }
+        if not jpeg_xrefs or not image.height:
+            return None
+
+        import fitz
+        if self._doc is None:
+            self._doc = fitz.open(str(self.pdf_path))
+        page = self._doc[page_number]
+        block = fitz.Rect(bbox)
+        # Allow for rounding at the page edges
+        page_rect = page.rect + (-1, -1, 1, 1)
+        target = image.width / image.height
+        candidates = []
+        for info in page.get_image_info(xrefs=True):
+            rect = fitz.Rect(info["bbox"])
+            a, b, c, d, _e, _f = info["transform"]
+            # Rotated, flipped or partly off the page: the crop shows something else
+            if rect.is_empty or b or c or a <= 0 or d <= 0 or not page_rect.contains(rect):
+                continue
+            overlap = (rect & block).get_area()
+            union = rect.get_area() + block.get_area() - overlap
+            if not union or overlap / union < MIN_BBOX_OVERLAP:
+                continue
+            if abs(rect.width / rect.height - target) <= ASPECT_TOLERANCE * target:
+                candidates.append(info)
+
+        if len(candidates) != 1 or candidates[0]["xref"] not in jpeg_xrefs:
+            return None
+        info = candidates[0]
+        # Only unmasked RGB or grayscale JPEGs look the same when used as they are
+        if info["colorspace"] not in (1, 3) or info["has-mask"]:
+            return None
+        if info["width"] < image.width or info["height"] < image.height:
+            return None
+        return self._doc.extract_image(info["xref"])["image"]
+
+    def _store(self, path, data):
+        if isinstance(data, str):
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, 'wb') as f:
+                _write_data_uri(f, data)
+            return self.store.put_file(tmp_path, path)
+        if not isinstance(data, bytes):
+            if data.mode != 'RGB':
+                data = data.convert('RGB')
+            buffer = io.BytesIO()
+            data.save(buffer, format='JPEG')
+            data = buffer.getvalue()
+        return self.store.put_bytes(data, path)
+
+    def _encode(self, path, data):
+        try:
+            if self.store is not None:
+                if not self._store(path, data):
+                    with self.lock:
+                        self.deduplicated += 1
+            elif isinstance(data, bytes):
+                _write_atomic(path, lambda f: f.write(data))
+            elif isinstance(data, str):
+                _write_atomic(path, lambda f: _write_data_uri(f, data))
+            else:
+                if data.mode != 'RGB':
+                    data = data.convert('RGB')
+                _write_atomic(path, lambda f: data.save(f, format='JPEG'))
+            with self.lock:
+                self.saved += 1
+        except Exception as e:
+            print(f"{Colors.RED}Error saving image {path.name}: {str(e)}{Colors.RESET}")
+        finally:
+            self.pending.release()
+
+    def submit(self, name, data, bbox=None):
+        """
+        Queue one image for writing.
+
+        Args:
+            name (str): Image file name
+            data: Image data (bytes, PIL image or data URI)
+            bbox (list): Figure block on the page, needed to copy the
+                embedded JPEG instead of encoding the crop
+        """
+        from PIL import Image
+
+        if isinstance(data, Image.Image):
+            try:
+                original = self._embedded_jpeg(name, data, bbox)
+            except Exception:
+                original = None
+            if original is not None:
+                data = original
+                self.passthrough += 1
+        elif not isinstance(data, bytes) and not (isinstance(data, str) and data.startswith('data:image/')):
+            print(f"{Colors.YELLOW}Unknown image data type for {name}: {type(data)}{Colors.RESET}")
+            return
+
+        self.pending.acquire()
+        self.executor.submit(self._encode, self.images_dir / name, data)
+
+    def close(self):
+        """
+        Wait for all queued images and release resources.
+
+        Returns:
+            int: Number of images saved
+        """
+        self.executor.shutdown(wait=True)
+        if self._doc is not None:
+            self._doc.close()
+            self._doc = None
+        return self.saved
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def save_images(images, images_dir, pdf_path=None):
+    """
+    Save the images returned by Marker to a directory.
+
+    Entries are removed from the images dict as they are queued, so each image
+    can be freed as soon as it has been written.
+
+    Args:
+        images (dict): Image name to image data (bytes, PIL image or data URI)
+        images_dir (Path): Directory to write the images to
+        pdf_path (Path): Source PDF, enables passthrough of embedded JPEGs
+
+    Returns:
+        int: Number of images saved
+    """
+    with open_sink(images_dir, pdf_path) as sink:
+        submit_images(sink, images)
+    print_sink_summary(sink)
+    return sink.saved
+
+
+def open_sink(images_dir, pdf_path=None):
+    """
+    Open an image sink backed by the image store, unless it is disabled.
+
+    Args:
+        images_dir (Path): Directory to write the images to
+        pdf_path (Path): Source PDF, enables passthrough of embedded JPEGs
+
+    Returns:
+        ImageSink: The sink; close it (or use it as a context manager) when done
+    """
+    return ImageSink(images_dir, pdf_path, store=get_store())
+
+
+def submit_images(sink, images, bboxes=None):
+    """
+    Queue all images of a dict, removing each entry as it is queued.
+
+    Args:
+        sink (ImageSink): Sink to write to
+        images (dict): Image name to image data
+        bboxes (dict): Image name without extension to its block on the page
+    """
+    bboxes = bboxes or {}
+    while images:
+        name = next(iter(images))
+        sink.submit(name, images.pop(name), bboxes.get(Path(name).stem))
+
+
+def print_sink_summary(sink):
+    """
+    Report passthrough and deduplication counts of a closed sink.
+
+    Args:
+        sink (ImageSink): Closed sink
+    """
+    if sink.passthrough:
+        print(f"{Colors.BLUE}Copied {sink.passthrough} embedded JPEGs without re-encoding{Colors.RESET}")
+    if sink.deduplicated:
+        print(f"{Colors.BLUE}Linked {sink.deduplicated} images already in the image store{Colors.RESET}")
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: image_store.py
+
+Purpose:
+    This module keeps every extracted image once, in a content-addressed store.
+    Blobs are named by the SHA-256 of their bytes, and the files in each
+    paper's <name>_images directory are hardlinks to those blobs, so publisher
+    logos, journal covers and repeated supplementary figures take disk space
+    only once while the Markdown keeps its usual relative links.
+
+    - An image whose hash is already in the store is linked instead of
+      written again, so "already extracted" is a hash lookup.
+    - Where hardlinks are not supported (e.g. FAT volumes), images are
+      copied, as before.
+    - Blobs no longer linked from any document (link count 1) are removed by
+      the gc command.
+
+    Note that hardlinked files share their content: edit an image by
+    replacing the file, not by rewriting it in place.
+
+Usage:
+    Used by image_sink.py. The store lives next to the outputs, in
+    pdf/output/.image_store (hardlinks need the same volume).
+
+    python scripts/image_store.py stats
+    python scripts/image_store.py gc
+
+    Disable with process_pdf.py --no-image-store
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import shutil
+import socket
+import hashlib
+import argparse
+import threading
+from pathlib import Path
+
+DEFAULT_STORE_DIR = Path(__file__).parent.parent / "pdf" / "output" / ".image_store"
+
+# Set to 0 to write plain per-document copies
+ENABLED_ENV = "PAPER2SKILL_IMAGE_STORE"
+
+# Bytes hashed per read when adopting a file
+HASH_CHUNK = 1024 * 1024
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def is_enabled():
+    """
+    Check whether images go through the store.
+
+    Returns:
+        bool: False if PAPER2SKILL_IMAGE_STORE is set to 0
+    """
+    return os.environ.get(ENABLED_ENV, "1") != "0"
+
+
+def _tmp_path(path):
+    # Unique per host and thread, since several workers (and nodes) may store the same image at once
+    return path.with_name(f".{path.name}.{socket.gethostname()}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+class ImageStore:
+    """
+    Content-addressed image blobs, shared between documents through hardlinks.
+
+    Blobs are stored as <root>/<first two hex digits>/<sha256><ext>. All
+    writes go through a temp file and a rename, so concurrent workers storing
+    the same image never see a partial blob.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        """
+        Initialize the store.
+
+        Args:
+            root (Path): Store directory, on the same volume as the outputs
+        """
+        self.root = Path(root)
+
+    def blob_path(self, digest, ext):
+        """
+        Get the path of a blob.
+
+        Args:
+            digest (str): SHA-256 hex digest of the image bytes
+            ext (str): File extension including the dot (e.g. ".jpeg")
+
+        Returns:
+            Path: Blob location (which may not exist yet)
+        """
+        return self.root / digest[:2] / f"{digest}{ext.lower()}"
+
+    def contains(self, digest, ext):
+        """
+        Check whether an image has already been extracted.
+
+        Args:
+            digest (str): SHA-256 hex digest of the image bytes
+            ext (str): File extension including the dot
+
+        Returns:
+            bool: True if the blob exists
+        """
+        return self.blob_path(digest, ext).exists()
+
+    def link(self, blob, dest):
+        """
+        Make dest a hardlink to a blob, replacing any existing file.
+
+        Falls back to a copy when the volume does not support hardlinks.
+
+        Args:
+            blob (Path): Blob in the store
+            dest (Path): File in a document's images directory
+        """
+        dest = Path(dest)
+        tmp_path = _tmp_path(dest)
+        try:
+            os.link(blob, tmp_path)
+        except OSError:
+            shutil.copyfile(blob, tmp_path)
+        os.replace(tmp_path, dest)
+
+    def put_bytes(self, data, dest):
+        """
+        Store image bytes and link them at dest.
+
+        Args:
+            data (bytes): Encoded image
+            dest (Path): File in a document's images directory
+
+        Returns:
+            bool: True if the image was new to the store, False if only linked
+        """
+        dest = Path(dest)
+        blob = self.blob_path(hashlib.sha256(data).hexdigest(), dest.suffix)
+        is_new = not blob.exists()
+        if is_new:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = _tmp_path(blob)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, blob)
+        self.link(blob, dest)
+        return is_new
+
+    def put_file(self, path, dest):
+        """
+        Move a written image file into the store and link it at dest.
+
+        If the store already has the image, the file is deleted instead.
+
+        Args:
+            path (Path): Image file to adopt (consumed)
+            dest (Path): File in a document's images directory
+
+        Returns:
+            bool: True if the image was new to the store, False if only linked
+        """
+        dest = Path(dest)
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_CHUNK), b""):
+                sha.update(block)
+        blob = self.blob_path(sha.hexdigest(), dest.suffix)
+        is_new = not blob.exists()
+        if is_new:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(path, blob)
+        else:
+            os.unlink(path)
+        self.link(blob, dest)
+        return is_new
+
+    def _blobs(self):
+        if not self.root.exists():
+            return
+        for prefix_dir in self.root.iterdir():
+            if prefix_dir.is_dir():
+                for blob in prefix_dir.iterdir():
+                    if blob.is_file() and not blob.name.startswith("."):
+                        yield blob
+
+    def stats(self):
+        """
+        Summarize the store.
+
+        Returns:
+            dict: Blob count, stored bytes, document links and bytes saved by sharing
+        """
+        blobs = 0
+        stored = 0
+        links = 0
+        saved = 0
+        for blob in self._blobs():
+            stat = blob.stat()
+            references = max(0, stat.st_nlink - 1)
+            blobs += 1
+            stored += stat.st_size
+            links += references
+            saved += stat.st_size * max(0, references - 1)
+        return {"blobs": blobs, "stored_bytes": stored, "links": links, "saved_bytes": saved}
+
+    def gc(self):
+        """
+        Remove blobs that no document links to anymore.
+
+        Returns:
+            tuple: (blobs removed, bytes freed)
+        """
+        removed = 0
+        freed = 0
+        for blob in list(self._blobs()):
+            stat = blob.stat()
+            if stat.st_nlink <= 1:
+                blob.unlink()
+                removed += 1
+                freed += stat.st_size
+        return removed, freed
+
+
+_store = None
+
+
+def get_store():
+    """
+    Get the process-wide image store.
+
+    Returns:
+        ImageStore: Shared instance, or None if the store is disabled
+    """
+    global _store
+    if not is_enabled():
+        return None
+    if _store is None:
+        _store = ImageStore()
+    return _store
+
+
+def main():
+    """
+    Main function to inspect or clean up the image store.
+    """
+    parser = argparse.ArgumentParser(description="Inspect or clean up the content-addressed image store")
+    parser.add_argument("command", choices=["stats", "gc"],
+                        help="stats: show blob count and space saved; gc: remove blobs no document uses")
+    parser.add_argument("--store", default=str(DEFAULT_STORE_DIR), help="Store directory (default: %(default)s)")
+    args = parser.parse_args()
+
+    store = ImageStore(args.store)
+    if args.command == "gc":
+        removed, freed = store.gc()
+        print(f"{Colors.GREEN}Removed {removed} unused blobs ({freed / (1024 * 1024):.1f} MB){Colors.RESET}")
+
+    stats = store.stats()
+    print(f"{Colors.CYAN}Image store:{Colors.RESET} {store.root}")
+    print(f"{Colors.BLUE}Unique images:{Colors.RESET} {stats['blobs']} "
+          f"({stats['stored_bytes'] / (1024 * 1024):.1f} MB)")
+    print(f"{Colors.BLUE}Document links:{Colors.RESET} {stats['links']}")
+    print(f"{Colors.GREEN}Saved by sharing:{Colors.RESET} {stats['saved_bytes'] / (1024 * 1024):.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
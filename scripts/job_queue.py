@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: job_queue.py
+
+Purpose:
+    This module keeps a durable SQLite queue of PDF conversion jobs, so a long
+    backfill survives crashes, preemption and restarts. Every PDF that needs
+    converting gets a row with its state (queued / running / done / failed),
+    the number of attempts and the last error.
+
+    - Jobs left "running" by a run that died are put back in the queue, and
+      their partial outputs are rebuilt instead of being taken for finished
+      work by the skip checks.
+    - Jobs that fail are retried on later runs until they reach the attempt
+      limit, after which they are skipped until retried explicitly. A run
+      that died while converting a job counts as a failed attempt.
+    - A run holds an exclusive lock on its state directory (RunLock), so two
+      runs (e.g. the watch daemon and process_pdf.py convert) never take over
+      each other's jobs or overwrite each other's manifest.
+
+Usage:
+    Used by process_pdf.py. The queue is stored at
+    pdf/output/.pipeline/jobs.sqlite
+
+    Resume an interrupted run (only the jobs left unfinished):
+    python scripts/process_pdf.py --resume
+
+    Inspect or reset the queue:
+    python scripts/job_queue.py status
+    python scripts/job_queue.py retry
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import socket
+import sqlite3
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_DB_PATH = Path(__file__).parent.parent / "pdf" / "output" / ".pipeline" / "jobs.sqlite"
+
+# Job states
+STATE_QUEUED = "queued"
+STATE_RUNNING = "running"
+STATE_DONE = "done"
+STATE_FAILED = "failed"
+
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Lock file held by the run using a state directory
+RUN_LOCK_NAME = "run.lock"
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class RunLock:
+    """
+    Exclusive lock on a pipeline state directory, held for a whole run.
+
+    An OS file lock (fcntl on Unix, msvcrt on Windows) is used, which is
+    released when the process exits, even when it is killed, so the lock is
+    never left stale. The file names the holder for error messages.
+    """
+
+    def __init__(self, state_dir):
+        """
+        Initialize the lock.
+
+        Args:
+            state_dir (Path): State directory (e.g. pdf/output/.pipeline)
+        """
+        self.path = Path(state_dir) / RUN_LOCK_NAME
+        self.file = None
+
+    def acquire(self):
+        """
+        Take the lock without waiting.
+
+        Returns:
+            bool: True if the lock was taken, False if another process holds it
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(self.path, 'a+', encoding='utf-8')
+        try:
+            if os.name == 'nt':
+                import msvcrt
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        f.seek(0)
+        f.truncate()
+        f.write(f"pid {os.getpid()} on {socket.gethostname()} since {_now()}\n")
+        f.flush()
+        self.file = f
+        return True
+
+    def holder(self):
+        """
+        Describe the process holding the lock.
+
+        Returns:
+            str: Holder description, or "another process" if it cannot be read
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return f.read().strip() or "another process"
+        except OSError:
+            return "another process"
+
+    def release(self):
+        """
+        Release the lock, if held.
+        """
+        if self.file is not None:
+            # Closing the file releases the OS lock
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+
+class JobQueue:
+    """
+    SQLite-backed queue of conversion jobs, keyed by the PDF path relative to
+    the input directory (the same key as the conversion manifest).
+
+    Every state change is committed immediately, so the database always
+    reflects what was in flight when the process stopped.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, max_attempts=DEFAULT_MAX_ATTEMPTS, read_only=False):
+        """
+        Open (or create) the queue database.
+
+        Args:
+            db_path (Path): Location of the SQLite file
+            max_attempts (int): Attempts before a job is marked failed for good
+            read_only (bool): Open an existing database for reading only, without
+                creating tables or changing its journal mode (e.g. the queue of
+                another node, or for status reports)
+        """
+        self.path = Path(db_path)
+        self.max_attempts = max(1, max_attempts)
+        if read_only:
+            self.conn = sqlite3.connect(self.path.resolve().as_uri() + "?mode=ro", uri=True)
+            self.conn.row_factory = sqlite3.Row
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    key TEXT PRIMARY KEY,
+                    pdf_path TEXT NOT NULL,
+                    output_dir TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    pid INTEGER,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state)")
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.conn.close()
+
+    def get(self, key):
+        """
+        Get the row of one job.
+
+        Args:
+            key (str): Job key
+
+        Returns:
+            sqlite3.Row: Job row, or None if the job is unknown
+        """
+        return self.conn.execute("SELECT * FROM jobs WHERE key = ?", (key,)).fetchone()
+
+    def recover(self):
+        """
+        Put jobs left running by a process that died back in the queue.
+
+        The interrupted run counts as an attempt: a job that has used up its
+        attempts is marked failed instead, so a PDF that keeps crashing (or
+        OOM-killing) the whole process is not retried forever.
+
+        Only call this while holding the RunLock of the queue's directory:
+        jobs running under another pid then belong to a process that died.
+
+        Returns:
+            list: Keys of the jobs put back in the queue
+        """
+        rows = self.conn.execute("SELECT key, pid, attempts FROM jobs WHERE state = ?", (STATE_RUNNING,)).fetchall()
+        interrupted = [row for row in rows if row["pid"] != os.getpid()]
+        recovered = [row["key"] for row in interrupted if row["attempts"] < self.max_attempts]
+        exhausted = [row["key"] for row in interrupted if row["attempts"] >= self.max_attempts]
+        now = _now()
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE jobs SET state = ?, pid = NULL, updated_at = ? WHERE key = ?",
+                [(STATE_QUEUED, now, key) for key in recovered],
+            )
+            self.conn.executemany(
+                "UPDATE jobs SET state = ?, last_error = ?, pid = NULL, updated_at = ? WHERE key = ?",
+                [(STATE_FAILED, "interrupted (process died)", now, key) for key in exhausted],
+            )
+        return recovered
+
+    def enqueue(self, key, pdf_path, output_dir):
+        """
+        Add a job, or requeue a finished one whose source needs converting again.
+
+        Failed jobs keep their attempt count, so they stay failed once the
+        limit is reached.
+
+        Args:
+            key (str): Job key
+            pdf_path (Path): Path to the PDF file
+            output_dir (Path): Per-PDF output directory
+
+        Returns:
+            bool: True if the job may run, False if it has used up its attempts
+        """
+        now = _now()
+        row = self.get(key)
+        with self.conn:
+            if row is None:
+                self.conn.execute(
+                    "INSERT INTO jobs (key, pdf_path, output_dir, state, created_at, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, str(pdf_path), str(output_dir), STATE_QUEUED, now, now),
+                )
+                return True
+            if row["state"] == STATE_FAILED and row["attempts"] >= self.max_attempts:
+                return False
+            attempts = 0 if row["state"] == STATE_DONE else row["attempts"]
+            self.conn.execute(
+                "UPDATE jobs SET pdf_path = ?, output_dir = ?, state = ?, attempts = ?, updated_at = ? WHERE key = ?",
+                (str(pdf_path), str(output_dir), STATE_QUEUED, attempts, now, key),
+            )
+        return True
+
+    def is_unfinished(self, key):
+        """
+        Check whether a job was queued or running and has not completed.
+
+        Outputs of such a job may be partial and must not be trusted.
+
+        Args:
+            key (str): Job key
+
+        Returns:
+            bool: True if the job exists and is not done
+        """
+        row = self.get(key)
+        return row is not None and row["state"] != STATE_DONE
+
+    def unfinished_keys(self):
+        """
+        Get the keys of all jobs that still have to run.
+
+        Returns:
+            set: Keys of queued, running and retryable failed jobs
+        """
+        rows = self.conn.execute(
+            "SELECT key FROM jobs WHERE state IN (?, ?) OR (state = ? AND attempts < ?)",
+            (STATE_QUEUED, STATE_RUNNING, STATE_FAILED, self.max_attempts),
+        ).fetchall()
+        return {row["key"] for row in rows}
+
+    def start(self, key):
+        """
+        Mark a job as running and count the attempt.
+
+        Args:
+            key (str): Job key
+        """
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, pid = ?, updated_at = ? WHERE key = ?",
+                (STATE_RUNNING, os.getpid(), _now(), key),
+            )
+
+    def finish(self, key, ok, error=None):
+        """
+        Record the outcome of a job.
+
+        Args:
+            key (str): Job key
+            ok (bool): True if the conversion succeeded
+            error (str): Failure description
+        """
+        state = STATE_DONE if ok else STATE_FAILED
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, last_error = ?, pid = NULL, updated_at = ? WHERE key = ?",
+                (state, None if ok else (error or "conversion failed"), _now(), key),
+            )
+
+    def requeue(self, key, error=None):
+        """
+        Put a started job back in the queue without counting the attempt,
+        e.g. when another node took its PDF over.
+
+        Args:
+            key (str): Job key
+            error (str): Why the job did not finish
+        """
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = MAX(0, attempts - 1), last_error = ?, pid = NULL, "
+                "updated_at = ? WHERE key = ?",
+                (STATE_QUEUED, error, _now(), key),
+            )
+
+    def mark_done(self, key):
+        """
+        Mark a job done if it is known, e.g. when the manifest shows it completed.
+
+        Args:
+            key (str): Job key
+        """
+        with self.conn:
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, last_error = NULL, pid = NULL, updated_at = ? WHERE key = ? AND state != ?",
+                (STATE_DONE, _now(), key, STATE_DONE),
+            )
+
+    def retry_failed(self):
+        """
+        Give every failed job a fresh set of attempts.
+
+        Returns:
+            int: Number of jobs requeued
+        """
+        with self.conn:
+            cursor = self.conn.execute(
+                "UPDATE jobs SET state = ?, attempts = 0, updated_at = ? WHERE state = ?",
+                (STATE_QUEUED, _now(), STATE_FAILED),
+            )
+        return cursor.rowcount
+
+    def forget_missing(self, input_dir):
+        """
+        Drop jobs whose source PDF no longer exists.
+
+        Args:
+            input_dir (Path): Root of the input tree
+
+        Returns:
+            int: Number of jobs removed
+        """
+        keys = [row["key"] for row in self.conn.execute("SELECT key FROM jobs").fetchall()]
+        missing = [key for key in keys if not (Path(input_dir) / key).exists()]
+        with self.conn:
+            self.conn.executemany("DELETE FROM jobs WHERE key = ?", [(key,) for key in missing])
+        return len(missing)
+
+    def counts(self):
+        """
+        Count jobs per state.
+
+        Returns:
+            dict: State to number of jobs
+        """
+        rows = self.conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state").fetchall()
+        return {row["state"]: row["n"] for row in rows}
+
+    def failed_jobs(self):
+        """
+        List failed jobs with their last error.
+
+        Returns:
+            list: sqlite3.Row objects ordered by key
+        """
+        return self.conn.execute(
+            "SELECT * FROM jobs WHERE state = ? ORDER BY key", (STATE_FAILED,)
+        ).fetchall()
+
+
+def print_status(job_queue):
+    """
+    Print a summary of the queue.
+
+    Args:
+        job_queue (JobQueue): Queue to summarize
+    """
+    counts = job_queue.counts()
+    print(f"{Colors.CYAN}Job queue:{Colors.RESET} {job_queue.path}")
+    print("-" * 50)
+    for state, color in ((STATE_DONE, Colors.GREEN), (STATE_QUEUED, Colors.BLUE),
+                         (STATE_RUNNING, Colors.YELLOW), (STATE_FAILED, Colors.RED)):
+        print(f"{color}{state.capitalize()}:{Colors.RESET} {counts.get(state, 0)}")
+    for row in job_queue.failed_jobs():
+        print(f"  {Colors.RED}✗{Colors.RESET} {row['key']} "
+              f"({row['attempts']}/{job_queue.max_attempts} attempts): {row['last_error']}")
+
+
+def main():
+    """
+    Main function to inspect and manage the job queue.
+    """
+    parser = argparse.ArgumentParser(description="Inspect and manage the PDF conversion job queue")
+    parser.add_argument("command", choices=["status", "retry"],
+                        help="status: show job counts and failures; retry: requeue failed jobs")
+    parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="Queue database (default: %(default)s)")
+    args = parser.parse_args()
+
+    job_queue = JobQueue(args.db, read_only=args.command == "status")
+    try:
+        if args.command == "retry":
+            print(f"{Colors.GREEN}Requeued {job_queue.retry_failed()} failed jobs{Colors.RESET}")
+        print_status(job_queue)
+    finally:
+        job_queue.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: llm_cache.py
+
+Purpose:
+    This module caches LLM responses on disk, so re-running the Markdown ->
+    llm_processed -> paper_skills flow only pays for the calls whose inputs
+    changed. Entries are keyed by model id, prompt template name and version,
+    and the hash of the input chunk.
+
+    - Bumping a template's version invalidates its entries implicitly (new
+      keys); `invalidate` removes the stale ones explicitly.
+    - Entries unused for longer than the age limit are evicted, then the
+      least recently used ones until the cache fits the size limit.
+    - Hit/miss counts are kept per template version, so it is easy to see what an
+      iteration on a prompt (e.g. by_topic or by_method categorization)
+      actually re-sent to the model.
+
+Usage:
+    Used by llm_process.py. The cache is stored at
+    pdf/output/.pipeline/llm_cache.sqlite
+
+    python scripts/llm_cache.py stats
+    python scripts/llm_cache.py evict --max-mb 512 --max-age-days 30
+    python scripts/llm_cache.py invalidate --template structure --below-version 3
+    python scripts/llm_cache.py clear
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+
+DEFAULT_DB_PATH = Path(__file__).parent.parent / "pdf" / "output" / ".pipeline" / "llm_cache.sqlite"
+
+DEFAULT_MAX_MB = 1024
+DEFAULT_MAX_AGE_DAYS = 90
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def input_hash(text):
+    """
+    Hash the input of a call.
+
+    Args:
+        text (str): Input chunk
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def cache_key(model, template, version, chunk_hash):
+    """
+    Build the key of a cache entry.
+
+    Args:
+        model (str): Model id
+        template (str): Prompt template name
+        version (int): Prompt template version
+        chunk_hash (str): Hash of the input chunk
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    return hashlib.sha256(json.dumps([model, template, version, chunk_hash]).encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite-backed cache of LLM responses with LRU/age eviction and statistics.
+
+    Hit and miss counts are collected in memory and written on flush() or
+    close(), so lookups stay read-only.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, max_mb=DEFAULT_MAX_MB, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            db_path (Path): Location of the SQLite file
+            max_mb (float): Size limit applied by evict(), 0 for none
+            max_age_days (float): Entries unused for longer are evicted, 0 for no limit
+        """
+        self.path = Path(db_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_mb = max_mb
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._counts = {}
+        self._used = {}
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    template TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    input_hash TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_template ON entries (template, version)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats (
+                    template TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    misses INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (template, version)
+                )
+            """)
+
+    def _count(self, template, version, hit):
+        hits, misses = self._counts.get((template, version), (0, 0))
+        self._counts[(template, version)] = (hits + hit, misses + (not hit))
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def get(self, model, template, version, chunk_hash, count=True):
+        """
+        Look up a cached response.
+
+        Args:
+            model (str): Model id
+            template (str): Prompt template name
+            version (int): Prompt template version
+            chunk_hash (str): Hash of the input chunk
+            count (bool): Count the lookup in the hit/miss statistics
+
+        Returns:
+            The cached response (any JSON value), or None
+        """
+        key = cache_key(model, template, version, chunk_hash)
+        row = self.conn.execute("SELECT response FROM entries WHERE key = ?", (key,)).fetchone()
+        if count:
+            self._count(template, version, row is not None)
+        if row is None:
+            return None
+        self._used[key] = time.time()
+        return json.loads(row["response"])
+
+    def contains(self, model, template, version, chunk_hash):
+        """
+        Check for an entry without counting a hit or miss.
+
+        Returns:
+            bool: True if the response is cached
+        """
+        key = cache_key(model, template, version, chunk_hash)
+        return self.conn.execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def put(self, model, template, version, chunk_hash, response):
+        """
+        Store a response.
+
+        Args:
+            model (str): Model id
+            template (str): Prompt template name
+            version (int): Prompt template version
+            chunk_hash (str): Hash of the input chunk
+            response: JSON-serializable response
+        """
+        data = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(key, model, template, version, input_hash, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(model, template, version, chunk_hash), model, template, version, chunk_hash,
+                 data, len(data.encode('utf-8')), now, now),
+            )
+
+    def flush(self):
+        """
+        Write the collected statistics and last-used times.
+        """
+        with self.conn:
+            self.conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                  [(used, key) for key, used in self._used.items()])
+            for (template, version), (hits, misses) in self._counts.items():
+                self.conn.execute("INSERT OR IGNORE INTO stats (template, version) VALUES (?, ?)",
+                                  (template, version))
+                self.conn.execute("UPDATE stats SET hits = hits + ?, misses = misses + ? "
+                                  "WHERE template = ? AND version = ?", (hits, misses, template, version))
+        self._used.clear()
+        self._counts.clear()
+
+    def evict(self, max_mb=None, max_age_days=None):
+        """
+        Drop entries unused for too long, then the least recently used ones
+        until the cache fits the size limit.
+
+        Args:
+            max_mb (float): Size limit (the cache's default if None), 0 for none
+            max_age_days (float): Age limit in days (the cache's default if None), 0 for none
+
+        Returns:
+            int: Number of entries removed
+        """
+        self.flush()
+        max_mb = self.max_mb if max_mb is None else max_mb
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        removed = 0
+        with self.conn:
+            if max_age_days:
+                cutoff = time.time() - max_age_days * 86400
+                removed += self.conn.execute("DELETE FROM entries WHERE last_used < ?", (cutoff,)).rowcount
+            if max_mb:
+                limit = max_mb * 1024 * 1024
+                total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+                if total > limit:
+                    doomed = []
+                    for row in self.conn.execute("SELECT key, size FROM entries ORDER BY last_used"):
+                        if total <= limit:
+                            break
+                        doomed.append((row["key"],))
+                        total -= row["size"]
+                    self.conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+                    removed += len(doomed)
+        return removed
+
+    def invalidate(self, template, version=None, below_version=None, model=None):
+        """
+        Remove the entries of a prompt template.
+
+        Args:
+            template (str): Prompt template name
+            version (int): Only this version
+            below_version (int): Only versions older than this one
+            model (str): Only entries of this model
+
+        Returns:
+            int: Number of entries removed
+        """
+        query = "DELETE FROM entries WHERE template = ?"
+        params = [template]
+        if version is not None:
+            query += " AND version = ?"
+            params.append(version)
+        if below_version is not None:
+            query += " AND version < ?"
+            params.append(below_version)
+        if model is not None:
+            query += " AND model = ?"
+            params.append(model)
+        with self.conn:
+            return self.conn.execute(query, params).rowcount
+
+    def clear(self):
+        """
+        Remove every entry and reset the statistics.
+        """
+        with self.conn:
+            self.conn.execute("DELETE FROM entries")
+            self.conn.execute("DELETE FROM stats")
+        self._used.clear()
+        self._counts.clear()
+
+    def stats(self):
+        """
+        Summarize the cache per template and version.
+
+        Returns:
+            list: Dicts with template, version, entries, bytes, hits and misses
+        """
+        self.flush()
+        rows = self.conn.execute("""
+            SELECT keys.template, keys.version,
+                   COUNT(entries.key) AS entries, COALESCE(SUM(entries.size), 0) AS bytes,
+                   COALESCE(stats.hits, 0) AS hits, COALESCE(stats.misses, 0) AS misses
+            FROM (SELECT template, version FROM entries UNION SELECT template, version FROM stats) AS keys
+            LEFT JOIN entries ON entries.template = keys.template AND entries.version = keys.version
+            LEFT JOIN stats ON stats.template = keys.template AND stats.version = keys.version
+            GROUP BY keys.template, keys.version
+            ORDER BY keys.template, keys.version
+        """).fetchall()
+        result = [dict(row) for row in rows]
+        return result
+
+    def close(self):
+        """
+        Write the statistics and close the database.
+        """
+        self.flush()
+        self.conn.close()
+
+
+def print_stats(cache):
+    """
+    Print the cache statistics.
+
+    Args:
+        cache (LLMCache): Cache to summarize
+    """
+    rows = cache.stats()
+    print(f"{Colors.CYAN}LLM cache:{Colors.RESET} {cache.path}")
+    print("-" * 70)
+    if not rows:
+        print(f"{Colors.YELLOW}Empty{Colors.RESET}")
+    for row in rows:
+        lookups = row["hits"] + row["misses"]
+        rate = f"{row['hits'] / lookups:.0%}" if lookups else "-"
+        print(f"{Colors.BLUE}{row['template']} v{row['version']}:{Colors.RESET} {row['entries']} entries, "
+              f"{row['bytes'] / (1024 * 1024):.2f} MB, "
+              f"{row['hits']} hits / {row['misses']} misses (hit rate {rate})")
+
+
+def main():
+    """
+    Main function to inspect and maintain the LLM cache.
+    """
+    parser = argparse.ArgumentParser(description="Inspect and maintain the LLM response cache")
+    parser.add_argument("command", choices=["stats", "evict", "invalidate", "clear"],
+                        help="stats: entries and hit rates; evict: apply the size/age limits; "
+                             "invalidate: drop a template's entries; clear: drop everything")
+    parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="Cache database (default: %(default)s)")
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_MB,
+                        help="Size limit for evict, 0 for none (default: %(default)s)")
+    parser.add_argument("--max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS,
+                        help="Age limit for evict, 0 for none (default: %(default)s)")
+    parser.add_argument("--template", help="Template to invalidate")
+    parser.add_argument("--version", type=int, help="Only invalidate this template version")
+    parser.add_argument("--below-version", type=int, help="Only invalidate versions older than this one")
+    parser.add_argument("--model", help="Only invalidate entries of this model")
+    args = parser.parse_args()
+
+    cache = LLMCache(args.db)
+    try:
+        if args.command == "evict":
+            removed = cache.evict(args.max_mb, args.max_age_days)
+            print(f"{Colors.GREEN}Evicted {removed} entries{Colors.RESET}")
+        elif args.command == "invalidate":
+            if not args.template:
+                parser.error("invalidate needs --template")
+            removed = cache.invalidate(args.template, args.version, args.below_version, args.model)
+            print(f"{Colors.GREEN}Invalidated {removed} entries{Colors.RESET}")
+        elif args.command == "clear":
+            cache.clear()
+            print(f"{Colors.GREEN}Cache cleared{Colors.RESET}")
+        print_stats(cache)
+    finally:
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
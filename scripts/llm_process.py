@@ -0,0 +1,640 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: llm_process.py
+
+Purpose:
+    This script is the LLM structuring stage: it reads the Markdown written by
+    process_pdf.py, splits it into chunks along section boundaries within a
+    token budget, and asks an OpenAI-compatible chat endpoint (a local server
+    such as llama.cpp, vLLM or Ollama, or a hosted API) to structure each chunk
+    into a summary, key concepts, methods and findings.
+
+    - Many chunks, from any number of documents, are batched into one request,
+      up to a per-request token budget, instead of sending one full-document
+      prompt per paper.
+    - Requests run concurrently with asyncio, capped by --concurrency.
+    - Every chunk result is cached (llm_cache.py) by model, prompt template
+      version and chunk hash, so a corpus-wide run only sends chunks it has
+      not seen before, and documents whose source did not change are skipped.
+
+    Results are written next to the chapters, as
+    llm_processed/<relative dir>/<name>/<name>_structured.json and .md
+
+Usage:
+    python scripts/llm_process.py --model llama3 --base-url http://localhost:8080/v1
+    python scripts/llm_process.py --chunk-tokens 1500 --request-tokens 6000 --concurrency 4
+
+    The endpoint and key can also be set with OPENAI_BASE_URL and OPENAI_API_KEY.
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - tiktoken (optional, exact token counts; estimated from characters otherwise)
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import re
+import json
+import asyncio
+import argparse
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from chapter_splitter import HEADING_PATTERN, find_documents, file_sha256
+from llm_cache import LLMCache, input_hash
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_SOURCE_DIR = PROJECT_ROOT / "pdf" / "output"
+DEFAULT_TARGET_DIR = PROJECT_ROOT / "llm_processed"
+
+DEFAULT_BASE_URL = "http://localhost:8080/v1"
+DEFAULT_MODEL = "llama3"
+
+# Prompt template name and version in the LLM cache; bump the version when
+# SYSTEM_PROMPT or the request format changes, so cached results are not reused
+PROMPT_TEMPLATE = "structure"
+PROMPT_VERSION = 1
+
+SYSTEM_PROMPT = (
+    "You structure excerpts of scientific papers. For every chunk you receive, "
+    "return an object with the keys: chunk (the chunk number), summary (2-3 "
+    "sentences), concepts (key terms), methods (techniques, models, datasets) "
+    "and findings (results and conclusions). Lists contain short strings; use "
+    "empty lists when a chunk has nothing for a key. Answer with a JSON array "
+    "of these objects only, one per chunk, in the order received."
+)
+
+# Characters per token when tiktoken is not installed (English prose)
+CHARS_PER_TOKEN = 4
+
+# Completion tokens reserved per chunk in a batch
+RESPONSE_TOKENS_PER_CHUNK = 300
+
+MAX_RETRIES = 4
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+_encoder = None
+
+
+def count_tokens(text):
+    """
+    Count the tokens of a text.
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Token count from tiktoken, or an estimate from the length
+    """
+    global _encoder
+    if _encoder is None:
+        try:
+            import tiktoken
+            _encoder = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoder = False
+    if _encoder:
+        return len(_encoder.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_sections(markdown_text):
+    """
+    Split Markdown into sections at its headings.
+
+    Args:
+        markdown_text (str): Document text
+
+    Returns:
+        list: (heading, text) tuples; text includes the heading line
+    """
+    sections = []
+    heading = None
+    lines = []
+    in_code = False
+    for line in markdown_text.splitlines(keepends=True):
+        if line.lstrip().startswith("```"):
+            in_code = not in_code
+        match = None if in_code else HEADING_PATTERN.match(line)
+        if match and lines:
+            sections.append((heading, "".join(lines)))
+            lines = []
+        if match:
+            heading = match.group(2).strip()
+        lines.append(line)
+    if lines:
+        sections.append((heading, "".join(lines)))
+    return sections
+
+
+def _split_long(text, budget):
+    """
+    Split a section larger than the budget at paragraph boundaries.
+    """
+    pieces = []
+    current = []
+    current_tokens = 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        if not paragraph.strip():
+            continue
+        tokens = count_tokens(paragraph)
+        if tokens > budget:
+            # One huge paragraph (e.g. a table): cut it by characters
+            step = max(1, len(paragraph) * budget // tokens)
+            parts = [paragraph[start:start + step] for start in range(0, len(paragraph), step)]
+        else:
+            parts = [paragraph]
+        for part in parts:
+            part_tokens = count_tokens(part)
+            if current and current_tokens + part_tokens > budget:
+                pieces.append("\n\n".join(current))
+                current = []
+                current_tokens = 0
+            current.append(part)
+            current_tokens += part_tokens
+    if current:
+        pieces.append("\n\n".join(current))
+    return pieces
+
+
+def chunk_document(markdown_text, budget):
+    """
+    Cut a document into chunks of at most budget tokens along section boundaries.
+
+    Consecutive small sections share a chunk; sections larger than the budget
+    are split at paragraph boundaries.
+
+    Args:
+        markdown_text (str): Document text
+        budget (int): Maximum tokens per chunk
+
+    Returns:
+        list: Chunk dicts with section (first heading), text and tokens
+    """
+    chunks = []
+    current = []
+
+    def flush():
+        if current:
+            text = "".join(text for _heading, text in current).strip()
+            if text:
+                chunks.append({"section": current[0][0], "text": text, "tokens": count_tokens(text)})
+            current.clear()
+
+    current_tokens = 0
+    for heading, text in split_sections(markdown_text):
+        tokens = count_tokens(text)
+        if tokens > budget:
+            flush()
+            current_tokens = 0
+            for piece in _split_long(text, budget):
+                chunks.append({"section": heading, "text": piece, "tokens": count_tokens(piece)})
+            continue
+        if current and current_tokens + tokens > budget:
+            flush()
+            current_tokens = 0
+        current.append((heading, text))
+        current_tokens += tokens
+    flush()
+    return chunks
+
+
+def plan_batches(chunks, request_budget, batch_size):
+    """
+    Pack chunks into requests within a token budget.
+
+    Args:
+        chunks (list): Chunk dicts (with tokens)
+        request_budget (int): Maximum prompt tokens per request
+        batch_size (int): Maximum chunks per request
+
+    Returns:
+        list: Lists of chunks, one per request
+    """
+    batches = []
+    current = []
+    current_tokens = 0
+    for chunk in chunks:
+        if current and (len(current) >= batch_size or current_tokens + chunk["tokens"] > request_budget):
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(chunk)
+        current_tokens += chunk["tokens"]
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_messages(batch):
+    """
+    Build the chat messages of one batched request.
+
+    Args:
+        batch (list): Chunk dicts
+
+    Returns:
+        list: OpenAI chat messages
+    """
+    parts = [f"Structure the following {len(batch)} chunks."]
+    for number, chunk in enumerate(batch, start=1):
+        parts.append(f"=== Chunk {number} ===\n{chunk['text']}")
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": "\n\n".join(parts)},
+    ]
+
+
+def parse_response(content, batch_length):
+    """
+    Parse the JSON array returned for a batch.
+
+    Args:
+        content (str): Message content of the completion
+        batch_length (int): Number of chunks in the request
+
+    Returns:
+        list: One result dict per chunk, in order, or None if the answer is unusable
+    """
+    content = content.strip()
+    fence = re.match(r"^```(?:json)?\s*(.*?)\s*```$", content, re.DOTALL)
+    if fence:
+        content = fence.group(1)
+    try:
+        items = json.loads(content)
+    except ValueError:
+        return None
+    if isinstance(items, dict):
+        items = [items]
+    if not isinstance(items, list):
+        return None
+    by_number = {}
+    for position, item in enumerate(items, start=1):
+        if not isinstance(item, dict):
+            return None
+        number = item.get("chunk", position)
+        by_number[number if isinstance(number, int) else position] = item
+    results = []
+    for number in range(1, batch_length + 1):
+        item = by_number.get(number)
+        if item is None:
+            return None
+        results.append({
+            "summary": str(item.get("summary", "")),
+            "concepts": [str(value) for value in item.get("concepts") or []],
+            "methods": [str(value) for value in item.get("methods") or []],
+            "findings": [str(value) for value in item.get("findings") or []],
+        })
+    return results
+
+
+class ChatClient:
+    """
+    Minimal asyncio client for an OpenAI-compatible chat completions endpoint.
+
+    HTTP calls run in worker threads (urllib), so no extra dependency is
+    needed; a semaphore caps the requests in flight.
+    """
+
+    def __init__(self, base_url, model, api_key=None, concurrency=4, max_tokens=None, timeout=600):
+        """
+        Initialize the client.
+
+        Args:
+            base_url (str): Endpoint root, e.g. http://localhost:8080/v1
+            model (str): Model name
+            api_key (str): Bearer token, if the endpoint needs one
+            concurrency (int): Maximum requests in flight
+            max_tokens (int): Completion token limit per request (per batch if None)
+            timeout (float): Seconds to wait for one response
+        """
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.api_key = api_key
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def _post(self, payload):
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode('utf-8'),
+                                         headers=headers, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    async def complete(self, messages, max_tokens):
+        """
+        Send one chat request, retrying rate limits and server errors.
+
+        Args:
+            messages (list): Chat messages
+            max_tokens (int): Completion token limit
+
+        Returns:
+            str: Message content of the first choice
+        """
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "temperature": 0,
+            "max_tokens": self.max_tokens or max_tokens,
+        }
+        async with self.semaphore:
+            for attempt in range(MAX_RETRIES + 1):
+                try:
+                    data = await asyncio.to_thread(self._post, payload)
+                    break
+                except urllib.error.HTTPError as e:
+                    if e.code != 429 and e.code < 500 or attempt == MAX_RETRIES:
+                        raise
+                except (urllib.error.URLError, TimeoutError):
+                    if attempt == MAX_RETRIES:
+                        raise
+                await asyncio.sleep(2 ** attempt)
+        self.requests += 1
+        usage = data.get("usage") or {}
+        self.prompt_tokens += usage.get("prompt_tokens", 0)
+        self.completion_tokens += usage.get("completion_tokens", 0)
+        return data["choices"][0]["message"]["content"]
+
+
+async def structure_batch(client, batch, cache):
+    """
+    Structure one batch, halving it if the model's answer cannot be parsed.
+
+    Args:
+        client (ChatClient): Endpoint client
+        batch (list): Chunk dicts (with hash)
+        cache (LLMCache): Result cache, filled as batches complete
+
+    Returns:
+        int: Number of chunks that could not be structured
+    """
+    content = await client.complete(build_messages(batch), RESPONSE_TOKENS_PER_CHUNK * len(batch))
+    results = parse_response(content, len(batch))
+    if results is None:
+        if len(batch) == 1:
+            print(f"{Colors.RED}Unusable answer for a chunk of {batch[0]['document']}{Colors.RESET}")
+            return 1
+        middle = len(batch) // 2
+        failures = await asyncio.gather(structure_batch(client, batch[:middle], cache),
+                                        structure_batch(client, batch[middle:], cache))
+        return sum(failures)
+    for chunk, result in zip(batch, results):
+        cache.put(client.model, PROMPT_TEMPLATE, PROMPT_VERSION, chunk["hash"], result)
+    return 0
+
+
+def _output_paths(chapters_dir):
+    document_dir = Path(chapters_dir).parent
+    return (document_dir / f"{document_dir.name}_structured.json",
+            document_dir / f"{document_dir.name}_structured.md")
+
+
+def is_up_to_date(markdown_path, chapters_dir, model, chunk_tokens):
+    """
+    Check whether a document was structured from its current source with these settings.
+
+    Args:
+        markdown_path (Path): Source Markdown
+        chapters_dir (Path): Chapters directory of the document
+        model (str): Model name
+        chunk_tokens (int): Chunk token budget
+
+    Returns:
+        bool: True if the existing output can be kept
+    """
+    json_path, _markdown_path = _output_paths(chapters_dir)
+    try:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            output = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (output.get("source_sha256") == file_sha256(markdown_path)
+            and output.get("model") == model
+            and output.get("prompt_version") == PROMPT_VERSION
+            and output.get("chunk_tokens") == chunk_tokens)
+
+
+def write_outputs(document, model, chunk_tokens, cache):
+    """
+    Write the structured JSON and Markdown of a document from cached chunk results.
+
+    Args:
+        document (dict): Document with its chunks
+        model (str): Model name
+        chunk_tokens (int): Chunk token budget
+        cache (LLMCache): Result cache
+
+    Returns:
+        bool: True if every chunk had a result
+    """
+    chunks = []
+    for chunk in document["chunks"]:
+        result = cache.get(model, PROMPT_TEMPLATE, PROMPT_VERSION, chunk["hash"], count=False)
+        if result is None:
+            return False
+        chunks.append({"section": chunk["section"], "tokens": chunk["tokens"], **result})
+
+    json_path, markdown_path = _output_paths(document["chapters_dir"])
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    output = {
+        "source": Path(os.path.relpath(document["markdown_path"], json_path.parent)).as_posix(),
+        "source_sha256": document["sha256"],
+        "model": model,
+        "prompt_version": PROMPT_VERSION,
+        "chunk_tokens": chunk_tokens,
+        "chunks": chunks,
+    }
+    lines = [f"# {json_path.parent.name}", ""]
+    for chunk in chunks:
+        lines.append(f"## {chunk['section'] or 'Front matter'}")
+        lines.append("")
+        if chunk["summary"]:
+            lines.extend([chunk["summary"], ""])
+        for key, title in (("concepts", "Concepts"), ("methods", "Methods"), ("findings", "Findings")):
+            if chunk[key]:
+                lines.append(f"**{title}:**")
+                lines.extend(f"- {value}" for value in chunk[key])
+                lines.append("")
+
+    for path, write in ((json_path, lambda f: json.dump(output, f, ensure_ascii=False, indent=2)),
+                        (markdown_path, lambda f: f.write("\n".join(lines)))):
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    return True
+
+
+async def process_corpus(client, documents, cache, chunk_tokens, request_tokens, batch_size):
+    """
+    Structure every chunk not in the cache, batching across documents.
+
+    Args:
+        client (ChatClient): Endpoint client
+        documents (list): Documents with their chunks
+        cache (LLMCache): Result cache
+        chunk_tokens (int): Chunk token budget
+        request_tokens (int): Prompt token budget per request
+        batch_size (int): Maximum chunks per request
+
+    Returns:
+        int: Number of chunks that could not be structured
+    """
+    pending = {}
+    for document in documents:
+        for chunk in document["chunks"]:
+            if chunk["hash"] in pending:
+                continue
+            if cache.get(client.model, PROMPT_TEMPLATE, PROMPT_VERSION, chunk["hash"]) is None:
+                pending[chunk["hash"]] = {**chunk, "document": document["name"]}
+
+    batches = plan_batches(list(pending.values()), request_tokens, batch_size)
+    print(f"{Colors.BLUE}{len(pending)} new chunks in {len(batches)} requests "
+          f"({sum(chunk['tokens'] for chunk in pending.values())} prompt tokens){Colors.RESET}")
+
+    failures = 0
+    tasks = [asyncio.create_task(structure_batch(client, batch, cache)) for batch in batches]
+    for done, task in enumerate(asyncio.as_completed(tasks), start=1):
+        try:
+            failures += await task
+        except Exception as e:
+            print(f"{Colors.RED}Request failed: {str(e)}{Colors.RESET}")
+            failures += 1
+        print(f"{Colors.CYAN}[{done}/{len(tasks)}] requests done{Colors.RESET}")
+    return failures
+
+
+def run(source_dir, target_dir, client, cache, chunk_tokens, request_tokens, batch_size, force=False):
+    """
+    Run the structuring stage over all converted documents.
+
+    Args:
+        source_dir (Path): process_pdf.py output root
+        target_dir (Path): llm_processed root
+        client (ChatClient): Endpoint client
+        cache (LLMCache): Result cache
+        chunk_tokens (int): Chunk token budget
+        request_tokens (int): Prompt token budget per request
+        batch_size (int): Maximum chunks per request
+        force (bool): Structure documents again even if unchanged (cached chunks are still reused)
+
+    Returns:
+        tuple: (documents written, documents skipped, documents incomplete)
+    """
+    documents = []
+    skipped = 0
+    for markdown_path, chapters_dir in find_documents(source_dir, target_dir):
+        if not force and is_up_to_date(markdown_path, chapters_dir, client.model, chunk_tokens):
+            skipped += 1
+            continue
+        with open(markdown_path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        chunks = chunk_document(text, chunk_tokens)
+        for chunk in chunks:
+            chunk["hash"] = input_hash(chunk["text"])
+        documents.append({
+            "name": markdown_path.relative_to(source_dir).as_posix(),
+            "markdown_path": markdown_path,
+            "chapters_dir": chapters_dir,
+            "sha256": file_sha256(markdown_path),
+            "chunks": chunks,
+        })
+
+    print(f"{Colors.CYAN}{len(documents)} documents to structure, {skipped} unchanged{Colors.RESET}")
+    if documents:
+        asyncio.run(process_corpus(client, documents, cache, chunk_tokens, request_tokens, batch_size))
+        print(f"{Colors.CYAN}Requests: {client.requests}, prompt tokens: {client.prompt_tokens}, "
+              f"completion tokens: {client.completion_tokens}, cached chunks: {cache.hits}{Colors.RESET}")
+
+    written = 0
+    incomplete = 0
+    for document in documents:
+        if write_outputs(document, client.model, chunk_tokens, cache):
+            written += 1
+            print(f"{Colors.GREEN}✓{Colors.RESET} {document['name']} ({len(document['chunks'])} chunks)")
+        else:
+            incomplete += 1
+            print(f"{Colors.YELLOW}Incomplete, will resume on the next run: {document['name']}{Colors.RESET}")
+    return written, skipped, incomplete
+
+
+def main():
+    """
+    Main function to run the LLM structuring stage.
+    """
+    parser = argparse.ArgumentParser(description="Structure converted Markdown with an OpenAI-compatible LLM")
+    parser.add_argument("--source", default=str(DEFAULT_SOURCE_DIR),
+                        help="process_pdf.py output directory (default: %(default)s)")
+    parser.add_argument("--target", default=str(DEFAULT_TARGET_DIR),
+                        help="Directory to write the results to (default: %(default)s)")
+    parser.add_argument("--base-url", default=os.environ.get("OPENAI_BASE_URL", DEFAULT_BASE_URL),
+                        help="OpenAI-compatible endpoint (default: $OPENAI_BASE_URL or %(default)s)")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Model name (default: %(default)s)")
+    parser.add_argument("--chunk-tokens", type=int, default=1500,
+                        help="Maximum tokens per chunk (default: %(default)s)")
+    parser.add_argument("--request-tokens", type=int, default=6000,
+                        help="Maximum prompt tokens per request (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="Maximum chunks per request (default: %(default)s)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Maximum requests in flight (default: %(default)s)")
+    parser.add_argument("--max-tokens", type=int, default=None,
+                        help="Completion token limit per request (default: 300 per chunk)")
+    parser.add_argument("--force", action="store_true",
+                        help="Rewrite the outputs of unchanged documents (cached chunks are reused)")
+    args = parser.parse_args()
+
+    client = ChatClient(args.base_url, args.model, os.environ.get("OPENAI_API_KEY"),
+                        args.concurrency, args.max_tokens)
+    cache = LLMCache()
+    try:
+        run(Path(args.source), Path(args.target), client, cache,
+            args.chunk_tokens, max(args.chunk_tokens, args.request_tokens), max(1, args.batch_size), args.force)
+        # Keep the cache within its size and age limits
+        cache.evict()
+    finally:
+        cache.close()
+
+    from search_index import update_index
+    update_index()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: markdown_stream.py
+
+Purpose:
+    This module writes the Markdown of a converted PDF page by page instead of
+    rendering the whole document into one string first. Marker's
+    text_from_rendered() path holds the full HTML, the full Markdown string and
+    the crops of every image at the same time; for very long papers that is
+    several copies of the document on top of the converted document itself.
+
+    Here the converter only builds the document. Pages are then rendered one
+    at a time, in order, carrying the section hierarchy from page to page as
+    Marker does. Each page's images are handed to the image sink and its
+    Markdown is appended to <name>.md.tmp, which is renamed to <name>.md once
+    the last page is written. An interrupted run therefore never leaves a
+    truncated Markdown file. Marker's document metadata (table of contents,
+    per-page block statistics) goes to a <name>_meta.json sidecar.
+
+    The Markdown is the same as Marker's whole-document output. Marker joins
+    a paragraph that continues on the next page (removing a hyphen that splits
+    a word), merges adjacent bold, italic and math runs, and collapses blank
+    lines over the whole text. A page is therefore only converted on its own
+    when the HTML before it ends with a closed block and the page starts with
+    one; otherwise it is held and converted together with the following page.
+    Marker also dedents the whole HTML, so text with line breaks (code,
+    tables from an LLM) is held until a line shows how much indentation the
+    document loses, which the first unindented line settles.
+    Blank lines are collapsed as the text is written, holding back only the
+    whitespace at its end.
+
+    This bounds the rendered output: the HTML, Markdown and image crops of a
+    page (or of a run of pages joined mid-paragraph) rather than those of the
+    whole document. The built document itself (page images, layout and text
+    blocks) still has to be held for the whole conversion, so peak memory is
+    still dominated by the document for most papers.
+
+Usage:
+    Used by process_pdf.py. Converters that do not expose Marker's
+    build_document() and Markdown renderer fall back to the whole-document path.
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - marker-pdf (only the converter passed in)
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import re
+import json
+from pathlib import Path
+
+# Blocks after which a page can be converted on its own. Lists are left out:
+# how a list ends depends on the block that follows it.
+SAFE_PAGE_END = re.compile(r'</(?:p|h[1-6]|table|blockquote|pre|div)>\Z')
+# Blocks a page can start with to be converted on its own
+SAFE_PAGE_START = re.compile(r'\A<(?:p|h[1-6]|table|blockquote|pre|div|ul|ol)[\s>]')
+
+# Marker dedents the whole HTML document: lines of only spaces and tabs are
+# emptied, and the indentation common to all lines is removed. The template
+# lines around the content are indented by at least this much.
+BLANK_LINE_RE = re.compile(r'^[ \t]+$', re.MULTILINE)
+INDENT_RE = re.compile(r'^([ \t]*)[^ \t\n]', re.MULTILINE)
+TEMPLATE_INDENT = " " * 12
+
+# Leading and trailing newlines of a converted run of HTML, as markdownify
+# splits them to collapse the blank lines between blocks
+NEWLINES_RE = re.compile(r'\A(\n*)((?:.*[^\n])?)(\n*)\Z', re.DOTALL)
+
+# <name>.md gets its metadata in <name>_meta.json, as Marker's own CLI does
+METADATA_SUFFIX = "_meta.json"
+
+
+def get_metadata_path(markdown_path):
+    """
+    Get the metadata sidecar of a Markdown file.
+
+    Args:
+        markdown_path (Path): Markdown file
+
+    Returns:
+        Path: <name>_meta.json next to it
+    """
+    markdown_path = Path(markdown_path)
+    return markdown_path.with_name(markdown_path.stem + METADATA_SUFFIX)
+
+
+def write_metadata(path, metadata):
+    """
+    Write document metadata as JSON, via a temp file and rename.
+
+    Args:
+        path (Path): Sidecar file
+        metadata (dict): Metadata; values JSON cannot encode are written as strings
+    """
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def cleanup_markdown(text):
+    """
+    Collapse runs of blank lines, as Marker does for a whole document.
+
+    Both substitutions only ever touch one run of whitespace, so applying them
+    to pieces of the text that end in a non-space character gives the same
+    result as applying them to the whole text.
+
+    Args:
+        text (str): Markdown
+
+    Returns:
+        str: Cleaned Markdown
+    """
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return re.sub(r'(\n\s){3,}', '\n\n', text)
+
+
+def supports_streaming(converter):
+    """
+    Check whether a converter can be rendered page by page.
+
+    Args:
+        converter: Marker converter
+
+    Returns:
+        bool: True if it builds documents separately and renders Markdown
+    """
+    renderer = getattr(converter, "renderer", None)
+    if renderer is None:
+        return False
+    if not callable(getattr(converter, "build_document", None)):
+        return False
+    if not callable(getattr(converter, "resolve_dependencies", None)):
+        return False
+    return all(hasattr(renderer, name) for name in ("extract_html", "md_cls", "generate_document_metadata"))
+
+
+class PageRenderer:
+    """
+    Renders a built Marker document to Markdown one page at a time.
+
+    Pages must be rendered in order. render_page() returns the Markdown that
+    is final after that page, which is empty while a page is held back to be
+    converted with the next one; flush() returns the rest after the last page.
+    Set html_hook to a function (page number, html) to see each page's HTML.
+    """
+
+    def __init__(self, converter, document):
+        """
+        Prepare a built document for rendering.
+
+        Args:
+            converter: Marker converter that built the document
+            document: Document returned by converter.build_document()
+        """
+        self.document = document
+        self.renderer = converter.resolve_dependencies(converter.renderer)
+        self.page_count = len(document.pages)
+        self.page_separator = None
+        if getattr(self.renderer, "paginate_output", False):
+            self.page_separator = self.renderer.page_separator
+        self.html_hook = None
+        self.next_page = 0
+        self.section_hierarchy = None
+        self.pending_html = ""
+        # Indentation removed from all lines; None until a line settles it
+        self.indent = None
+        # Marker strips the finished document instead; the writer does that
+        self.markdown = self.renderer.md_cls
+        self.markdown.options["strip_document"] = None
+
+    @property
+    def metadata(self):
+        """
+        dict: Marker's document metadata (table of contents, page statistics)
+        """
+        from marker.schema.document import DocumentOutput
+        # Only the document is used, so an empty output stands in for the
+        # page outputs that have already been dropped
+        return self.renderer.generate_document_metadata(self.document, DocumentOutput(children=[], html=""))
+
+    def render_page_html(self, page):
+        """
+        Render one page to HTML, as it appears inside the whole document.
+
+        Args:
+            page: Page of the document
+
+        Returns:
+            tuple: (html, images) where images maps image names to crops
+        """
+        from bs4 import BeautifulSoup
+        page_output = page.render(self.document, None, self.section_hierarchy, self.renderer.block_config)
+        self.section_hierarchy = page_output.section_hierarchy.copy()
+        content, images = self.renderer.extract_html(self.document, page_output, level=1)
+        if self.renderer.paginate_output:
+            content = f"<div class='page' data-page-id='{page_output.id.page_id}'>{content}</div>"
+        soup = self.renderer.insert_block_id(BeautifulSoup(content, "html.parser"), page_output.id)
+        return str(soup), images
+
+    @staticmethod
+    def get_indent(html):
+        """
+        Get the indentation Marker's dedent would remove from the lines of html.
+
+        Args:
+            html (str): Content HTML; text before its first newline shares a
+                line with the template and is left out
+
+        Returns:
+            str: Common indentation of the non-blank lines, at most the
+                template's own
+        """
+        if "\n" not in html:
+            return TEMPLATE_INDENT
+        lines = html[html.index("\n") + 1:]
+        return os.path.commonprefix(INDENT_RE.findall(lines) + [TEMPLATE_INDENT])
+
+    def is_indent_known(self, html):
+        """
+        Check whether the dedent Marker applies to html is already decided.
+
+        Lines of a run can only be converted once it is known how much
+        indentation the whole document loses, which is settled by the first
+        line that starts without any.
+
+        Args:
+            html (str): HTML held since the last conversion
+
+        Returns:
+            bool: True if html can be converted now
+        """
+        if self.indent == "" or "\n" not in html:
+            return True
+        if self.get_indent(html) == "":
+            self.indent = ""
+            return True
+        return False
+
+    def image_bboxes(self, index):
+        """
+        Get where the figures of a page are.
+
+        Args:
+            index (int): Page index within the document
+
+        Returns:
+            dict: Image name without extension to the block's bbox in points
+        """
+        page = self.document.pages[index]
+        return {block.id.to_path(): block.polygon.bbox
+                for block in page.contained_blocks(self.document, self.renderer.image_blocks)}
+
+    def convert(self, html, indent=""):
+        """
+        Convert a run of page HTML to Markdown.
+
+        Args:
+            html (str): HTML of one or more consecutive pages
+            indent (str): Indentation removed from every line, as by dedent
+
+        Returns:
+            str: Markdown, with its leading and trailing newlines kept
+        """
+        if not html:
+            return ""
+        html = BLANK_LINE_RE.sub("", html)
+        if indent:
+            html = html.replace("\n" + indent, "\n")
+        html = self.renderer.merge_consecutive_tags(html, "b")
+        html = self.renderer.merge_consecutive_tags(html, "i")
+        html = self.renderer.merge_consecutive_math(html)
+        return self.markdown.convert(html)
+
+    def render_page(self, index, markdown=True):
+        """
+        Render the next page.
+
+        Args:
+            index (int): Page index within the document; pages go in order
+            markdown (bool): Produce Markdown; False when only images are needed
+
+        Returns:
+            tuple: (markdown, images) where markdown is what can be written
+                after this page and images maps image names to crops
+        """
+        if index != self.next_page:
+            raise ValueError(f"Pages must be rendered in order: expected {self.next_page}, got {index}")
+        page = self.document.pages[index]
+        html, images = self.render_page_html(page)
+        self.next_page += 1
+        if self.html_hook is not None:
+            # Block IDs keep the page number of the PDF, also for page ranges
+            self.html_hook(page.page_id, html)
+
+        if not markdown:
+            return "", images
+        text = ""
+        if self.pending_html and html:
+            if (SAFE_PAGE_END.search(self.pending_html) and SAFE_PAGE_START.match(html)
+                    and self.is_indent_known(self.pending_html)):
+                text = self.convert(self.pending_html)
+                self.pending_html = ""
+        self.pending_html += html
+        return text, images
+
+    def flush(self):
+        """
+        Convert what is still held after the last page.
+
+        Returns:
+            str: Remaining Markdown
+        """
+        # Everything with lines is still held if the indentation is not settled
+        indent = self.indent
+        if indent is None:
+            indent = self.get_indent(self.pending_html)
+        markdown = self.convert(self.pending_html, indent)
+        self.pending_html = ""
+        return markdown
+
+    def __len__(self):
+        return self.page_count
+
+
+class MarkdownStreamWriter:
+    """
+    Appends Markdown to <name>.md.tmp and renames it to <name>.md on commit.
+
+    Used as a context manager, the file is committed when the block finishes
+    and the temp file is removed when it raises.
+    """
+
+    def __init__(self, markdown_path, page_separator=None):
+        """
+        Open the temp file.
+
+        Args:
+            markdown_path (Path): Final Markdown file
+            page_separator (str): Marker's page separator if pages are
+                paginated, so that the file is padded the way Marker pads it
+        """
+        self.markdown_path = Path(markdown_path)
+        self.tmp_path = self.markdown_path.with_name(self.markdown_path.name + ".tmp")
+        self.file = open(self.tmp_path, 'w', encoding='utf-8')
+        self.page_separator = page_separator
+        self.bytes = 0
+        # Trailing newlines of the last run, which may merge with the next one
+        self.trailing_newlines = ""
+        # Whitespace not yet followed by text, dropped if nothing follows
+        self.held = ""
+        self.started = False
+        self.tail = ""
+        if page_separator is not None:
+            self._write_text("\n\n")
+
+    def _write_text(self, text):
+        self.file.write(text)
+        self.bytes += len(text.encode('utf-8'))
+        self.tail = (self.tail + text)[-max(len(self.page_separator or ""), 1):]
+
+    def write(self, markdown):
+        """
+        Append the Markdown of a run of pages.
+
+        Args:
+            markdown (str): Markdown as returned by PageRenderer
+        """
+        if not markdown:
+            return
+        # Blank lines between two runs collapse as between two blocks of one run
+        leading, content, trailing = NEWLINES_RE.match(markdown).groups()
+        if self.trailing_newlines and leading:
+            leading = "\n" * min(2, max(len(self.trailing_newlines), len(leading)))
+        else:
+            leading = self.trailing_newlines + leading
+        self.trailing_newlines = trailing
+
+        text = self.held + leading + content
+        end = len(text.rstrip())
+        self.held = text[end:]
+        text = text[:end]
+        if not self.started:
+            text = text.lstrip()
+        if text:
+            self.started = True
+            self._write_text(cleanup_markdown(text))
+
+    def commit(self):
+        """
+        Close the temp file and move it into place.
+
+        Returns:
+            Path: The Markdown file
+        """
+        if not self.file.closed:
+            # Whitespace at the end of the document is dropped
+            if self.page_separator and self.tail.endswith(self.page_separator):
+                self._write_text("\n\n")
+            self.file.close()
+            os.replace(self.tmp_path, self.markdown_path)
+        return self.markdown_path
+
+    def abort(self):
+        """
+        Close and delete the temp file, leaving any previous Markdown untouched.
+        """
+        if not self.file.closed:
+            self.file.close()
+            try:
+                self.tmp_path.unlink()
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: page_router.py
+
+Purpose:
+    This module decides, page by page, whether a PDF page needs OCR. Pages of
+    born-digital PDFs with a clean text layer are routed to Marker's text-layer
+    path (OCR disabled), while scanned or garbled pages are routed to OCR. The
+    decision is based on the text-layer statistics and image coverage recorded
+    by pdf_prescan.py, so routing costs no extra pass over the PDF.
+
+    Every decision is appended to pdf/output/.pipeline/routing.jsonl together
+    with the reason, so routing can be audited across a whole corpus.
+
+Usage:
+    Used by process_pdf.py:
+    python scripts/process_pdf.py --route-ocr
+
+    To inspect the routing of one PDF without converting it:
+    python scripts/page_router.py path/to/paper.pdf
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - PyMuPDF (fitz), used through pdf_prescan.py
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import json
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+from pdf_prescan import get_profile
+
+ROUTE_TEXT = "text"
+ROUTE_OCR = "ocr"
+
+DEFAULT_LOG_PATH = Path(__file__).parent.parent / "pdf" / "output" / ".pipeline" / "routing.jsonl"
+
+# Heuristic thresholds
+MIN_TEXT_CHARS = 50          # fewer characters than this counts as "no text layer"
+SCANNED_IMAGE_COVERAGE = 0.5  # an image this large on a textless page means a scan
+MAX_BAD_CHAR_RATIO = 0.02    # replacement / private-use / control characters
+MIN_ALNUM_RATIO = 0.6        # letters and digits among non-space characters
+MAX_AVG_WORD_LENGTH = 25     # longer "words" mean spaces were lost in extraction
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def route_page(page):
+    """
+    Decide whether one page needs OCR.
+
+    Args:
+        page (dict): Page entry of a pre-scan profile
+
+    Returns:
+        tuple: (route, reason)
+    """
+    stats = page["text_stats"]
+    chars = stats["chars"]
+    coverage = page["image_coverage"]
+
+    if chars < MIN_TEXT_CHARS:
+        if coverage >= SCANNED_IMAGE_COVERAGE:
+            return ROUTE_OCR, f"no text layer, images cover {coverage:.0%} of the page"
+        if page["images"]:
+            return ROUTE_OCR, f"only {chars} characters next to {len(page['images'])} images"
+        return ROUTE_TEXT, f"near-empty page ({chars} characters, no images)"
+
+    bad_ratio = stats["bad_chars"] / chars
+    if bad_ratio > MAX_BAD_CHAR_RATIO:
+        return ROUTE_OCR, f"garbled text layer ({bad_ratio:.1%} unmappable characters)"
+    alnum_ratio = stats["alnum_chars"] / chars
+    if alnum_ratio < MIN_ALNUM_RATIO:
+        return ROUTE_OCR, f"garbled text layer (only {alnum_ratio:.0%} letters/digits)"
+    if stats["avg_word_length"] > MAX_AVG_WORD_LENGTH:
+        return ROUTE_OCR, f"text layer without word spacing (average word {stats['avg_word_length']} chars)"
+    return ROUTE_TEXT, f"clean text layer ({chars} characters)"
+
+
+def route_pdf(pdf_path, log_path=DEFAULT_LOG_PATH):
+    """
+    Route every page of a PDF and log the decisions.
+
+    Args:
+        pdf_path (Path): Path to the PDF file
+        log_path (Path): JSON-lines audit log, None to skip logging
+
+    Returns:
+        list: One route per page, in page order
+    """
+    profile = get_profile(pdf_path)
+    decisions = []
+    for page in profile["pages"]:
+        route, reason = route_page(page)
+        decisions.append({"page": page["number"], "route": route, "reason": reason})
+
+    ocr_pages = sum(1 for decision in decisions if decision["route"] == ROUTE_OCR)
+    print(f"{Colors.BLUE}Page routing:{Colors.RESET} {len(decisions) - ocr_pages} text-layer pages, {ocr_pages} OCR pages")
+
+    if log_path is not None:
+        Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({
+                "time": datetime.now().isoformat(timespec='seconds'),
+                "pdf": str(Path(pdf_path).resolve()),
+                "decisions": decisions,
+            }, ensure_ascii=False) + "\n")
+
+    return [decision["route"] for decision in decisions]
+
+
+def get_route_config(route):
+    """
+    Get the Marker config overrides for a route.
+
+    Args:
+        route (str): ROUTE_TEXT, ROUTE_OCR or None
+
+    Returns:
+        dict: Config entries to merge into the converter config
+    """
+    if route == ROUTE_TEXT:
+        # Trust the PDF text layer: skips text detection and recognition models
+        return {"disable_ocr": True}
+    if route == ROUTE_OCR:
+        return {"force_ocr": True}
+    return {}
+
+
+def main():
+    """
+    Main function to print the routing decisions for PDF files.
+    """
+    parser = argparse.ArgumentParser(description="Show per-page OCR routing for PDF files")
+    parser.add_argument("pdf", nargs="+", help="PDF files to inspect")
+    args = parser.parse_args()
+
+    for pdf in args.pdf:
+        print(f"{Colors.CYAN}{pdf}{Colors.RESET}")
+        profile = get_profile(pdf)
+        for page in profile["pages"]:
+            route, reason = route_page(page)
+            color = Colors.YELLOW if route == ROUTE_OCR else Colors.GREEN
+            print(f"  Page {page['number'] + 1}: {color}{route}{Colors.RESET} - {reason}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: pdf_prescan.py
+
+Purpose:
+    This module opens each PDF once with PyMuPDF and records a per-document
+    profile: page count, page sizes, text-layer presence and quality, image
+    coverage, per-page image xrefs with their dimensions, encoding and stream
+    size, and which pages hold vector figures (charts and diagrams drawn with
+    paths rather than embedded as images). The profile is cached on
+    disk, keyed by the file's size and mtime, so every later stage (skip checks,
+    image analysis, page routing, planning) reuses it instead of reopening and
+    reparsing the PDF.
+
+Usage:
+    Used by process_pdf.py and analyze_pdf_images.py.
+    Profiles are cached in pdf/output/.pipeline/prescan/
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - PyMuPDF (fitz)
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import json
+import socket
+import hashlib
+from pathlib import Path
+from collections import OrderedDict
+
+from pipeline_metrics import span
+
+# Bump when the profile layout changes so that old cache files are rebuilt
+PROFILE_VERSION = 3
+
+DEFAULT_CACHE_DIR = Path(__file__).parent.parent / "pdf" / "output" / ".pipeline" / "prescan"
+
+# Extension PyMuPDF's extract_image() would report for each stream filter
+FILTER_EXTENSIONS = {
+    "DCTDecode": "jpeg",
+    "JPXDecode": "jpx",
+    "JBIG2Decode": "jb2",
+    "CCITTFaxDecode": "tiff",
+}
+
+# A page holds a vector figure when at least this many drawing paths ...
+VECTOR_MIN_DRAWINGS = 5
+# ... cover at least this fraction of it (table rules and underlines have no area)
+VECTOR_MIN_COVERAGE = 0.05
+
+# In-process cache, so repeated lookups within one run skip even the JSON read.
+# Least recently used profiles are dropped, so the watch daemon does not grow forever
+_memory_cache = OrderedDict()
+# Profiles kept at once; a PDF is looked up several times in a row while it is planned and converted
+MAX_CACHED_PROFILES = 256
+
+
+def _xref_int(doc, xref, key):
+    kind, value = doc.xref_get_key(xref, key)
+    if kind == "int":
+        return int(value)
+    return 0
+
+
+def _describe_image(doc, image):
+    """
+    Describe one image xref from its dictionary, without decoding the stream.
+
+    Args:
+        doc (fitz.Document): Open document
+        image (tuple): Entry from page.get_images(full=True)
+
+    Returns:
+        dict: Image metadata
+    """
+    xref, smask, width, height, bpc, colorspace, _alt, name, stream_filter = image[:9]
+    # get_images() only lists Image XObjects; vector figures are found from the drawings
+    return {
+        "xref": xref,
+        "name": name,
+        "width": width,
+        "height": height,
+        "bpc": bpc,
+        "colorspace": colorspace,
+        "filter": stream_filter,
+        "ext": FILTER_EXTENSIONS.get(stream_filter, "png"),
+        "length": _xref_int(doc, xref, "Length"),
+        "smask": smask,
+        "type": "raster",
+    }
+
+
+def _text_stats(text):
+    """
+    Summarize a page's text layer for quality checks.
+
+    Args:
+        text (str): Text extracted from the page
+
+    Returns:
+        dict: Character, word and suspicious-character counts
+    """
+    chars = [c for c in text if not c.isspace()]
+    words = text.split()
+    bad_chars = sum(
+        1 for c in chars
+        if c == '\ufffd' or '\ue000' <= c <= '\uf8ff' or (ord(c) < 32)
+    )
+    return {
+        "chars": len(chars),
+        "alnum_chars": sum(1 for c in chars if c.isalnum()),
+        "bad_chars": bad_chars,
+        "words": len(words),
+        "avg_word_length": round(len(chars) / len(words), 2) if words else 0.0,
+    }
+
+
+def _image_coverage(page):
+    """
+    Estimate the fraction of the page area covered by raster images.
+
+    Args:
+        page (fitz.Page): Page to inspect
+
+    Returns:
+        float: Covered fraction between 0 and 1 (overlaps are not merged)
+    """
+    page_area = abs(page.rect)
+    if not page_area:
+        return 0.0
+    covered = 0.0
+    for info in page.get_image_info():
+        bbox = page.rect & info["bbox"]
+        if not bbox.is_empty:
+            covered += abs(bbox)
+    return round(min(1.0, covered / page_area), 3)
+
+
+def _drawing_coverage(page, drawings):
+    """
+    Estimate the fraction of the page area covered by drawing paths.
+
+    Args:
+        page (fitz.Page): Page to inspect
+        drawings (list): Paths from page.get_cdrawings()
+
+    Returns:
+        float: Covered fraction between 0 and 1 (overlaps are not merged)
+    """
+    import fitz
+
+    page_area = abs(page.rect)
+    if not page_area:
+        return 0.0
+    covered = 0.0
+    for drawing in drawings:
+        bbox = page.rect & fitz.Rect(drawing["rect"])
+        if not bbox.is_empty:
+            covered += abs(bbox)
+    return round(min(1.0, covered / page_area), 3)
+
+
+def scan_pdf(pdf_path):
+    """
+    Build the profile of a PDF in a single pass over its pages.
+
+    Args:
+        pdf_path (Path): Path to the PDF file
+
+    Returns:
+        dict: Document profile
+    """
+    import fitz
+
+    pdf_path = Path(pdf_path)
+    stat = pdf_path.stat()
+    doc = fitz.open(str(pdf_path))
+    try:
+        pages = []
+        seen_xrefs = set()
+        for page in doc:
+            images = [_describe_image(doc, image) for image in page.get_images(full=True)]
+            seen_xrefs.update(image["xref"] for image in images)
+            text = page.get_text("text")
+            # get_cdrawings() is the faster form of get_drawings(), without Python objects
+            drawings = page.get_cdrawings()
+            drawing_coverage = _drawing_coverage(page, drawings)
+            pages.append({
+                "number": page.number,
+                "width": round(page.rect.width, 2),
+                "height": round(page.rect.height, 2),
+                "text_chars": len(text.strip()),
+                "has_text": bool(text.strip()),
+                "text_stats": _text_stats(text),
+                "image_coverage": _image_coverage(page),
+                "images": images,
+                "form_xobjects": len(page.get_xobjects()),
+                "drawings": len(drawings),
+                "drawing_coverage": drawing_coverage,
+                "vector_figure": len(drawings) >= VECTOR_MIN_DRAWINGS and drawing_coverage >= VECTOR_MIN_COVERAGE,
+            })
+
+        return {
+            "version": PROFILE_VERSION,
+            "path": str(pdf_path.resolve()),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "page_count": len(pages),
+            "image_count": sum(len(page["images"]) for page in pages),
+            "unique_image_count": len(seen_xrefs),
+            "raster_image_count": sum(1 for page in pages for image in page["images"] if image["type"] == "raster"),
+            "vector_pages": sum(1 for page in pages if page["vector_figure"]),
+            "text_pages": sum(1 for page in pages if page["has_text"]),
+            "pages": pages,
+        }
+    finally:
+        doc.close()
+
+
+def _cache_path(pdf_path, cache_dir):
+    key = hashlib.sha1(str(Path(pdf_path).resolve()).encode('utf-8')).hexdigest()
+    return Path(cache_dir) / f"{key}.json"
+
+
+def _remember(cache_path, profile):
+    _memory_cache[cache_path] = profile
+    _memory_cache.move_to_end(cache_path)
+    while len(_memory_cache) > MAX_CACHED_PROFILES:
+        _memory_cache.popitem(last=False)
+
+
+def _is_fresh(profile, stat):
+    return (profile.get("version") == PROFILE_VERSION
+            and profile.get("size") == stat.st_size
+            and profile.get("mtime_ns") == stat.st_mtime_ns)
+
+
+def load_cached_profile(pdf_path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Get a cached profile without scanning the PDF.
+
+    Args:
+        pdf_path (Path): Path to the PDF file
+        cache_dir (Path): Directory holding cached profiles
+
+    Returns:
+        dict: Profile, or None if there is no up-to-date cached profile
+    """
+    stat = Path(pdf_path).stat()
+    cache_path = _cache_path(pdf_path, cache_dir)
+
+    profile = _memory_cache.get(cache_path)
+    if profile is not None and _is_fresh(profile, stat):
+        _memory_cache.move_to_end(cache_path)
+        return profile
+
+    if cache_path.exists():
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                profile = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if _is_fresh(profile, stat):
+            _remember(cache_path, profile)
+            return profile
+    return None
+
+
+def get_profile(pdf_path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Get the profile of a PDF, scanning it only if the cache is missing or stale.
+
+    Args:
+        pdf_path (Path): Path to the PDF file
+        cache_dir (Path): Directory holding cached profiles
+
+    Returns:
+        dict: Document profile
+    """
+    profile = load_cached_profile(pdf_path, cache_dir)
+    if profile is not None:
+        return profile
+
+    with span("prescan"):
+        profile = scan_pdf(pdf_path)
+    cache_path = _cache_path(pdf_path, cache_dir)
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(cache_path.name + f".{socket.gethostname()}.{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f)
+    os.replace(tmp_path, cache_path)
+    _remember(cache_path, profile)
+    return profile
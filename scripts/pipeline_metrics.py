@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: pipeline_metrics.py
+
+Purpose:
+    This module records structured metrics for the PDF pipeline, next to the
+    colored progress output. Stages (pre-scan, model load, conversion,
+    text_from_rendered, Markdown write, image save) are timed as spans, and
+    every converted document gets one JSON line with its spans, page and image
+    counts, input/output bytes and the process's peak RSS.
+
+    Records are appended to pdf/output/.pipeline/metrics.jsonl (one short
+    write per line, so worker processes can share the file) and aggregated
+    into a Prometheus text file, pdf/output/.pipeline/metrics.prom, which a
+    node_exporter textfile collector can scrape.
+
+Usage:
+    Used by process_pdf.py, pdf_prescan.py and watch_folder.py.
+
+    To list the slowest documents and stages of the recorded runs:
+    python scripts/pipeline_metrics.py summary --top 20
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - psutil (optional, peak memory on Windows)
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_METRICS_DIR = Path(__file__).parent.parent / "pdf" / "output" / ".pipeline"
+JSONL_NAME = "metrics.jsonl"
+PROM_NAME = "metrics.prom"
+
+# Shared by the parent and its (spawned) workers so records can be grouped per run
+RUN_ID_ENV = "PAPER2SKILL_RUN_ID"
+# Set to 0 to disable metrics output
+ENABLED_ENV = "PAPER2SKILL_METRICS"
+# Name of the node in a sharded run (see sharding.py); each node writes its own files
+NODE_ENV = "PAPER2SKILL_NODE"
+
+# Document currently being converted in this process, if any
+_current = None
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def is_enabled():
+    """
+    Check whether metrics should be recorded.
+
+    Returns:
+        bool: False if PAPER2SKILL_METRICS is set to 0
+    """
+    return os.environ.get(ENABLED_ENV, "1") != "0"
+
+
+def get_run_id():
+    """
+    Get the id of the current run, creating one for the top-level process.
+
+    Returns:
+        str: Run id shared with worker processes through the environment
+    """
+    run_id = os.environ.get(RUN_ID_ENV)
+    if not run_id:
+        run_id = datetime.now().strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        os.environ[RUN_ID_ENV] = run_id
+    return run_id
+
+
+def peak_rss_mb():
+    """
+    Get the peak resident memory of this process so far.
+
+    Returns:
+        float: Peak RSS in MB, or 0.0 if it cannot be measured
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+    except ImportError:
+        return 0.0
+
+
+def metrics_file_name(name):
+    """
+    Get the name of a metrics file of this node.
+
+    Args:
+        name (str): JSONL_NAME or PROM_NAME
+
+    Returns:
+        str: e.g. metrics.jsonl, or metrics.<node>.jsonl in a sharded run
+    """
+    node = os.environ.get(NODE_ENV)
+    if not node:
+        return name
+    stem, extension = name.rsplit(".", 1)
+    return f"{stem}.{node}.{extension}"
+
+
+def _append(record, metrics_dir=DEFAULT_METRICS_DIR):
+    if not is_enabled():
+        return
+    path = Path(metrics_dir) / metrics_file_name(JSONL_NAME)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+    # A single O_APPEND write keeps lines from concurrent workers intact
+    fd = os.open(str(path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def span(stage, **labels):
+    """
+    Time one pipeline stage.
+
+    Inside document(), the time is added to that document's record; otherwise
+    (e.g. model loading) a standalone span record is written.
+
+    Args:
+        stage (str): Stage name
+        **labels: Extra fields for standalone span records
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        if _current is not None:
+            spans = _current["spans"]
+            spans[stage] = round(spans.get(stage, 0.0) + elapsed, 4)
+        else:
+            _append({
+                "type": "span",
+                "run_id": get_run_id(),
+                "time": datetime.now().isoformat(timespec='seconds'),
+                "stage": stage,
+                "seconds": round(elapsed, 4),
+                "peak_rss_mb": round(peak_rss_mb(), 1),
+                **labels,
+            })
+
+
+def add(**counts):
+    """
+    Add counters (pages, images, markdown_bytes, ...) to the current document.
+
+    Args:
+        **counts: Counter name to amount
+    """
+    if _current is None:
+        return
+    for name, value in counts.items():
+        _current["counts"][name] = _current["counts"].get(name, 0) + value
+
+
+@contextmanager
+def document(pdf_path):
+    """
+    Record the metrics of one document conversion.
+
+    The caller sets record["ok"] to report success; the record is written as
+    one JSON line when the block exits.
+
+    Args:
+        pdf_path (Path): Path to the PDF file
+
+    Yields:
+        dict: The document record
+    """
+    global _current
+    previous = _current
+    record = {
+        "type": "document",
+        "run_id": get_run_id(),
+        "pid": os.getpid(),
+        "pdf": str(pdf_path),
+        "ok": False,
+        "spans": {},
+        "counts": {},
+    }
+    try:
+        record["counts"]["pdf_bytes"] = Path(pdf_path).stat().st_size
+    except OSError:
+        pass
+    _current = record
+    started = time.perf_counter()
+    try:
+        yield record
+    finally:
+        _current = previous
+        record["seconds"] = round(time.perf_counter() - started, 4)
+        record["peak_rss_mb"] = round(peak_rss_mb(), 1)
+        record["time"] = datetime.now().isoformat(timespec='seconds')
+        _append(record)
+
+
+def read_records(metrics_dir=DEFAULT_METRICS_DIR, run_id=None):
+    """
+    Read the recorded metrics, of every node.
+
+    Args:
+        metrics_dir (Path): Directory holding metrics.jsonl (and metrics.<node>.jsonl)
+        run_id (str): Only return records of this run
+
+    Returns:
+        list: Records in file order (unparseable lines are skipped)
+    """
+    records = []
+    for path in sorted(Path(metrics_dir).glob("metrics*.jsonl")):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if run_id is None or record.get("run_id") == run_id:
+                    records.append(record)
+    return records
+
+
+def aggregate(records):
+    """
+    Fold records into run totals.
+
+    Args:
+        records (list): Records from read_records()
+
+    Returns:
+        dict: Totals per stage and counter
+    """
+    totals = {"stage_seconds": {}, "stage_calls": {}, "documents": {"ok": 0, "failed": 0},
+              "counts": {}, "peak_rss_mb": 0.0}
+    for record in records:
+        if record.get("type") == "document":
+            spans = record.get("spans", {})
+            totals["documents"]["ok" if record.get("ok") else "failed"] += 1
+            for name, value in record.get("counts", {}).items():
+                totals["counts"][name] = totals["counts"].get(name, 0) + value
+        else:
+            spans = {record.get("stage", "unknown"): record.get("seconds", 0.0)}
+        for stage, seconds in spans.items():
+            totals["stage_seconds"][stage] = totals["stage_seconds"].get(stage, 0.0) + seconds
+            totals["stage_calls"][stage] = totals["stage_calls"].get(stage, 0) + 1
+        totals["peak_rss_mb"] = max(totals["peak_rss_mb"], record.get("peak_rss_mb", 0.0))
+    return totals
+
+
+def write_prometheus(run_id=None, metrics_dir=DEFAULT_METRICS_DIR):
+    """
+    Write the totals of a run as a Prometheus text file (temp file + rename).
+
+    Args:
+        run_id (str): Run to export (the current run if None)
+        metrics_dir (Path): Directory holding metrics.jsonl and metrics.prom
+
+    Returns:
+        Path: The written file, or None if metrics are disabled
+    """
+    if not is_enabled():
+        return None
+    run_id = run_id or get_run_id()
+    totals = aggregate(read_records(metrics_dir, run_id))
+    label = f'run_id="{run_id}"'
+
+    lines = [
+        "# HELP paper2skill_stage_seconds_total Time spent in each pipeline stage.",
+        "# TYPE paper2skill_stage_seconds_total counter",
+    ]
+    for stage, seconds in sorted(totals["stage_seconds"].items()):
+        lines.append(f'paper2skill_stage_seconds_total{{{label},stage="{stage}"}} {seconds:.4f}')
+    lines += [
+        "# HELP paper2skill_stage_calls_total Number of timed executions of each stage.",
+        "# TYPE paper2skill_stage_calls_total counter",
+    ]
+    for stage, calls in sorted(totals["stage_calls"].items()):
+        lines.append(f'paper2skill_stage_calls_total{{{label},stage="{stage}"}} {calls}')
+    lines += [
+        "# HELP paper2skill_documents_total Converted documents by outcome.",
+        "# TYPE paper2skill_documents_total counter",
+    ]
+    for status, count in sorted(totals["documents"].items()):
+        lines.append(f'paper2skill_documents_total{{{label},status="{status}"}} {count}')
+    for name, value in sorted(totals["counts"].items()):
+        metric = f"paper2skill_{name}_total"
+        lines += [f"# TYPE {metric} counter", f"{metric}{{{label}}} {value}"]
+    lines += [
+        "# HELP paper2skill_peak_rss_megabytes Highest peak RSS of any pipeline process.",
+        "# TYPE paper2skill_peak_rss_megabytes gauge",
+        f"paper2skill_peak_rss_megabytes{{{label}}} {totals['peak_rss_mb']}",
+        "# TYPE paper2skill_last_update_timestamp_seconds gauge",
+        f"paper2skill_last_update_timestamp_seconds{{{label}}} {time.time():.0f}",
+    ]
+
+    path = Path(metrics_dir) / metrics_file_name(PROM_NAME)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+def print_summary(records, top=10):
+    """
+    Print stage totals and the slowest documents.
+
+    Args:
+        records (list): Records from read_records()
+        top (int): Number of slow documents to list
+    """
+    totals = aggregate(records)
+    documents = [record for record in records if record.get("type") == "document"]
+    print(f"{Colors.CYAN}Documents:{Colors.RESET} {totals['documents']['ok']} ok, "
+          f"{totals['documents']['failed']} failed")
+    print(f"{Colors.CYAN}Pages:{Colors.RESET} {totals['counts'].get('pages', 0)}  "
+          f"{Colors.CYAN}Images:{Colors.RESET} {totals['counts'].get('images', 0)}  "
+          f"{Colors.CYAN}Peak RSS:{Colors.RESET} {totals['peak_rss_mb']} MB")
+
+    print(f"\n{Colors.CYAN}Stages:{Colors.RESET}")
+    for stage, seconds in sorted(totals["stage_seconds"].items(), key=lambda item: -item[1]):
+        calls = totals["stage_calls"][stage]
+        print(f"  {stage:<20} {seconds:10.2f}s  {calls:6d} calls  {seconds / calls:8.3f}s avg")
+
+    print(f"\n{Colors.CYAN}Slowest documents:{Colors.RESET}")
+    for record in sorted(documents, key=lambda r: -r.get("seconds", 0.0))[:top]:
+        pages = record.get("counts", {}).get("pages", 0)
+        per_page = f"{record['seconds'] / pages:.2f}s/page" if pages else "-"
+        slowest = max(record.get("spans", {}).items(), key=lambda item: item[1], default=("-", 0.0))
+        status = Colors.GREEN + "ok" if record.get("ok") else Colors.RED + "failed"
+        print(f"  {record.get('seconds', 0.0):8.2f}s  {per_page:>12}  {status}{Colors.RESET}  "
+              f"{record['pdf']}  (slowest stage: {slowest[0]} {slowest[1]:.2f}s)")
+
+
+def main():
+    """
+    Main function to summarize recorded metrics.
+    """
+    parser = argparse.ArgumentParser(description="Summarize PDF pipeline metrics")
+    parser.add_argument("command", choices=["summary", "prometheus"],
+                        help="summary: print stage totals and slow documents; "
+                             "prometheus: rewrite metrics.prom for a run")
+    parser.add_argument("--run", default=None, help="Only use records of this run id (default: all runs "
+                                                    "for summary, the latest run for prometheus)")
+    parser.add_argument("--top", type=int, default=10, help="Slow documents to list (default: %(default)s)")
+    parser.add_argument("--dir", default=str(DEFAULT_METRICS_DIR), help="Metrics directory (default: %(default)s)")
+    args = parser.parse_args()
+
+    records = read_records(args.dir, args.run)
+    if args.command == "summary":
+        print_summary(records, args.top)
+    else:
+        run_id = args.run or (records[-1]["run_id"] if records else None)
+        if run_id is None:
+            print(f"{Colors.YELLOW}No metrics recorded in {args.dir}{Colors.RESET}")
+            return
+        print(f"{Colors.GREEN}Wrote{Colors.RESET} {write_prometheus(run_id, args.dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,9 +9,14 @@ Purpose:
     from PDF documents, handling special characters in filenames automatically.
 
 Usage:
-    python scripts/process_pdf.py
+    python scripts/process_pdf.py [convert] [options]   Convert new and changed PDFs
+    python scripts/process_pdf.py scan [--json PATH]    Plan what convert would do, with a time estimate
+    python scripts/process_pdf.py status                Show how far the corpus is converted
+    python scripts/process_pdf.py analyze [--inventory OUTPUT]   Analyze the images in all PDFs
 
     The script automatically detects the input and output directories based on its relative position.
+    Marker, Surya and torch are only imported once a conversion actually runs,
+    so scan, status and runs with nothing to convert start in well under a second.
 
 Virtual Environment:
     This script should be run within the project's virtual environment.
@@ -41,8 +46,12 @@ License:
 
 import os
 import re
+import sys
+import json
+import shutil
 import argparse
 from pathlib import Path
+from collections import OrderedDict
 
 # Terminal color codes
 class Colors:
@@ -58,9 +67,6 @@ class Colors:
         """Colorize text for terminal output"""
         return f"{color}{text}{Colors.RESET}"
 
-# Set model directory environment variables BEFORE importing Marker/Surya
-# This ensures the variables are set before Surya's settings are initialized
-
 def get_project_root():
     """
     Get the project root directory based on the script's location.
@@ -72,36 +78,73 @@ def get_project_root():
     project_root = script_dir.parent
     return project_root
 
-# Calculate project root and model directory early
 project_root = get_project_root()
 model_dir = project_root / "models"
 
-# Create model directory if it doesn't exist
-print(f"Creating model directory: {model_dir}")
-try:
-    model_dir.mkdir(parents=True, exist_ok=True)
-    print(f"Model directory created successfully: {model_dir}")
-except Exception as e:
-    print(f"Error creating model directory: {str(e)}")
-
-# Set environment variables for model directory
-print(f"Setting model directory environment variables to: {model_dir}")
-os.environ["MODEL_CACHE_DIR"] = str(model_dir)
-os.environ["MARKER_MODEL_DIR"] = str(model_dir)
-print(f"MODEL_CACHE_DIR: {os.environ.get('MODEL_CACHE_DIR', 'NOT SET')}")
-print(f"MARKER_MODEL_DIR: {os.environ.get('MARKER_MODEL_DIR', 'NOT SET')}")
-
-# Now import Marker modules
-from marker.converters.pdf import PdfConverter
-from marker.models import create_model_dict
-from marker.output import text_from_rendered
-
-# Import Surya settings to verify the actual model directory
-try:
-    from surya.settings import settings
-    print(f"\nSurya settings model cache dir: {settings.MODEL_CACHE_DIR}")
-except Exception as e:
-    print(f"Error importing Surya settings: {str(e)}")
+# Only light modules are imported here. Marker, Surya and torch take seconds to
+# import, so they are imported on first use (see prepare_model_dir()), and
+# commands such as scan and status never load them.
+from pdf_prescan import get_profile
+from page_router import route_pdf, get_route_config
+from image_sink import save_images, open_sink, submit_images, print_sink_summary
+import table_extract
+from table_extract import TableCollector, get_tables_dir
+from markdown_stream import PageRenderer, MarkdownStreamWriter, supports_streaming, get_metadata_path, write_metadata
+import pipeline_metrics
+import autotune
+import image_store
+from search_index import update_index
+from chunked_convert import (
+    plan_page_ranges, get_chunk_root, get_chunk_dir, prepare_chunk_root,
+    is_chunk_done, write_chunk, stitch_chunks,
+)
+from conversion_manifest import ConversionManifest, STATUS_DONE, STATUS_MOVED, STATUS_CHANGED
+from job_queue import JobQueue, RunLock, DEFAULT_MAX_ATTEMPTS, STATE_FAILED, print_status
+from sharding import (
+    DEFAULT_LEASE_TTL, NODES_DIR, LeaseManager, LeaseLost, PeerManifests, check_lease, default_node_name,
+    get_lease_path, get_node_dir, in_shard, list_nodes, parse_shard, merge_node_state, print_node_status,
+)
+
+# Converter settings that affect the output; changing them invalidates the manifest
+MANIFEST_CONFIG = {
+    "output_format": "markdown",
+    "image_extraction_mode": "highres",
+}
+
+
+def prepare_model_dir():
+    """
+    Create the model directory and point Marker and Surya at it.
+    
+    Must run before Marker or Surya is first imported, because Surya reads
+    the environment variables when its settings are initialized.
+    
+    Returns:
+        Path: Model directory
+    """
+    if os.environ.get("MARKER_MODEL_DIR") != str(model_dir):
+        try:
+            model_dir.mkdir(parents=True, exist_ok=True)
+        except Exception as e:
+            print(f"Error creating model directory: {str(e)}")
+        os.environ["MODEL_CACHE_DIR"] = str(model_dir)
+        os.environ["MARKER_MODEL_DIR"] = str(model_dir)
+    return model_dir
+
+
+def text_from_rendered(rendered):
+    """
+    Marker's text_from_rendered(), imported on first use.
+    
+    Args:
+        rendered: Output of a PdfConverter call
+        
+    Returns:
+        tuple: (text, extension, images)
+    """
+    prepare_model_dir()
+    from marker.output import text_from_rendered as marker_text_from_rendered
+    return marker_text_from_rendered(rendered)
 
 
 def sanitize_filename(filename):
@@ -122,7 +165,10 @@ def sanitize_filename(filename):
 
 def count_pdf_images(pdf_path):
     """
-    Count the actual number of images in a PDF file using PyMuPDF.
+    Count the actual number of images in a PDF file.
+    
+    Uses the cached pre-scan profile, so the PDF is only opened with PyMuPDF
+    the first time it is seen (or after it changes).
     
     Args:
         pdf_path (Path): Path to the PDF file
@@ -131,20 +177,284 @@ def count_pdf_images(pdf_path):
         int: Number of images found in the PDF
     """
     try:
-        import fitz
-        doc = fitz.open(str(pdf_path))
-        total_images = 0
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            images = page.get_images(full=True)
-            total_images += len(images)
-        doc.close()
-        return total_images
+        return get_profile(pdf_path)["image_count"]
     except Exception as e:
         print(f"Error counting PDF images: {str(e)}")
         return 0
 
-def process_pdf_file(pdf_path, output_dir, model_dir):
+# Long-lived model registry.
+# Loading the Surya/Marker weights is the most expensive part of a run, so the
+# artifact dict is created once per process and converters are cached by config.
+_model_dict = None
+_converter_cache = OrderedDict()
+# Converters kept at once; configs only change with the autotuned batch sizes
+MAX_CACHED_CONVERTERS = 2
+
+
+def get_model_dict():
+    """
+    Get the shared Marker artifact dict, loading the models on first use.
+    
+    Returns:
+        dict: Marker artifact dict shared by every converter in this process
+    """
+    global _model_dict
+    if _model_dict is None:
+        print(f"{Colors.YELLOW}Loading Marker models...{Colors.RESET}")
+        prepare_model_dir()
+        with pipeline_metrics.span("model_load"):
+            from marker.models import create_model_dict
+            _model_dict = create_model_dict()
+        print(f"{Colors.GREEN}Marker models loaded.{Colors.RESET}")
+    return _model_dict
+
+
+def release_models():
+    """
+    Drop the shared models and cached converters from this process.
+    
+    Used by the parent of a worker pool, which only needs the models to be
+    downloaded, not kept in memory next to the workers' own copies.
+    """
+    global _model_dict
+    import gc
+    _model_dict = None
+    _converter_cache.clear()
+    gc.collect()
+
+
+def get_converter(config, cache=True):
+    """
+    Get a PdfConverter for the given config, reusing the loaded models.
+    
+    Converters are cached by their config so that repeated calls with the same
+    settings return the same instance. Only the MAX_CACHED_CONVERTERS most
+    recently used are kept.
+    
+    Args:
+        config (dict): Marker converter config
+        cache (bool): Keep the converter for later calls with the same config
+        
+    Returns:
+        PdfConverter: Converter sharing the process-wide artifact dict
+    """
+    key = json.dumps(config, sort_keys=True)
+    converter = _converter_cache.get(key)
+    if converter is not None:
+        _converter_cache.move_to_end(key)
+        return converter
+    prepare_model_dir()
+    from marker.converters.pdf import PdfConverter
+    converter = PdfConverter(artifact_dict=get_model_dict(), config=dict(config))
+    if cache:
+        _converter_cache[key] = converter
+        while len(_converter_cache) > MAX_CACHED_CONVERTERS:
+            _converter_cache.popitem(last=False)
+    return converter
+
+
+def get_cores_limit(cores_limit=None):
+    """
+    Get the number of CPU cores Marker may use.
+    
+    Args:
+        cores_limit (int): Explicit limit (e.g. set by the scheduler), or None
+        
+    Returns:
+        int: Cores limit, half of the cores unless set explicitly
+    """
+    import multiprocessing
+    if cores_limit is None:
+        cores_limit = max(1, multiprocessing.cpu_count() // 2)
+    return cores_limit
+
+
+def get_converter_config(cores_limit, extract_images=True, pdf_path=None):
+    """
+    Build the Marker converter config used for every conversion.
+    
+    Batch sizes come from the autotuner (available memory, page size and any
+    memory-pressure backoff) unless autotuning is disabled.
+    
+    Args:
+        cores_limit (int): CPU cores Marker may use
+        extract_images (bool): Whether Marker should extract images
+        pdf_path (Path): PDF to size the batches for (letter-sized pages if None)
+        
+    Returns:
+        dict: Marker converter config
+    """
+    config = {
+        "max_workers": cores_limit,
+        "batch_size": min(4, cores_limit),
+        "extract_images": extract_images,
+        "image_extraction_mode": "highres"
+    }
+    if autotune.is_enabled():
+        page_area = autotune.LETTER_PAGE_AREA
+        if pdf_path is not None:
+            pages = get_profile(pdf_path)["pages"]
+            page_area = max((page["width"] * page["height"] for page in pages), default=page_area)
+        config.update(autotune.get_tuner().batch_sizes(cores_limit, page_area))
+    return config
+
+
+# Retries of a conversion that ran out of memory, each with halved batches
+MAX_MEMORY_RETRIES = 2
+
+
+def run_converter(config, pdf_path, cache=True, stream=False):
+    """
+    Run a conversion, backing off on memory pressure instead of failing.
+    
+    Args:
+        config (dict): Marker converter config
+        pdf_path (Path): Path to the PDF file
+        cache (bool): Keep the converter for later calls with the same config
+        stream (bool): Only build the document, to be rendered page by page
+        
+    Returns:
+        The rendered document, or a PageRenderer if stream is set and the
+        converter supports it
+    """
+    for attempt in range(MAX_MEMORY_RETRIES + 1):
+        converter = get_converter(config, cache)
+        try:
+            if stream and supports_streaming(converter):
+                rendered = PageRenderer(converter, converter.build_document(str(pdf_path)))
+            else:
+                rendered = converter(str(pdf_path))
+        except Exception as e:
+            if not autotune.is_enabled() or not autotune.is_memory_error(e) or attempt == MAX_MEMORY_RETRIES:
+                raise
+            # Free what the failed attempt held before retrying with smaller batches
+            del converter
+            _converter_cache.clear()
+            import gc
+            gc.collect()
+            autotune.get_tuner().record_memory_pressure()
+            config = autotune.halve_batches(config)
+        else:
+            if autotune.is_enabled():
+                autotune.get_tuner().record_success()
+            return rendered
+
+
+def convert_pdf_chunk(pdf_path, chunk_dir, start, end, route=None, cores_limit=None):
+    """
+    Convert one page range of a PDF and checkpoint it.
+    
+    Args:
+        pdf_path (Path): Path to the PDF file
+        chunk_dir (Path): Checkpoint directory for this chunk
+        start (int): First page (0-based)
+        end (int): Page after the last one
+        route (str): OCR route of the pages (see page_router.py), or None
+        cores_limit (int): CPU cores Marker may use (half of the cores if None)
+        
+    Returns:
+        bool: True if the chunk was converted (or already checkpointed)
+    """
+    if is_chunk_done(chunk_dir):
+        print(f"{Colors.GREEN}Pages {start + 1}-{end} already converted. Skipping.{Colors.RESET}")
+        return True
+    
+    try:
+        config = get_converter_config(get_cores_limit(cores_limit), pdf_path=pdf_path)
+        config["page_range"] = list(range(start, end))
+        config.update(get_route_config(route))
+        
+        route_label = f" ({route} route)" if route else ""
+        print(f"{Colors.YELLOW}Converting pages {start + 1}-{end} of {pdf_path}{route_label}...{Colors.RESET}")
+        labels = {"pdf": str(pdf_path), "pages": f"{start}-{end - 1}"}
+        with pipeline_metrics.span("conversion", **labels):
+            # Page-range converters are one-off, so don't keep them in the cache
+            rendered = run_converter(config, pdf_path, cache=False)
+        with pipeline_metrics.span("text_from_rendered", **labels):
+            markdown_text, _, images = text_from_rendered(rendered)
+        metadata = getattr(rendered, "metadata", None)
+        del rendered
+        with pipeline_metrics.span("chunk_write", **labels):
+            write_chunk(chunk_dir, markdown_text, images,
+                        lambda chunk_images, images_dir: save_images(chunk_images, images_dir, pdf_path),
+                        metadata)
+        return True
+    except Exception as e:
+        print(f"{Colors.RED}Error converting pages {start + 1}-{end} of {pdf_path}: {str(e)}{Colors.RESET}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def plan_pdf_chunks(pdf_path, output_dir, chunk_pages, route_ocr=False):
+    """
+    Plan the page-range chunks of a PDF.
+    
+    A PDF is chunked when it is longer than chunk_pages, or when OCR routing
+    sends some of its pages to OCR and others to the text-layer path.
+    
+    Args:
+        pdf_path (Path): Path to the PDF file
+        output_dir (Path): Directory to save output files
+        chunk_pages (int): Pages per chunk, 0 to disable size-based chunking
+        route_ocr (bool): Route pages between OCR and the text-layer path
+        
+    Returns:
+        tuple: (chunk_root, ranges) of (start, end, route) tuples. chunk_root is
+            None when the PDF is converted in one go; ranges then holds at most
+            the single range covering the whole document.
+    """
+    if not chunk_pages and not route_ocr:
+        return None, []
+    page_count = get_profile(pdf_path)["page_count"]
+    routes = route_pdf(pdf_path) if route_ocr else None
+    ranges = plan_page_ranges(page_count, chunk_pages, routes)
+    if len(ranges) <= 1:
+        return None, ranges
+    chunk_root = get_chunk_root(output_dir, sanitize_filename(pdf_path.stem))
+    prepare_chunk_root(chunk_root, pdf_path, ranges)
+    return chunk_root, ranges
+
+
+def finish_chunked_pdf(pdf_path, output_dir, chunk_root, ranges, lease=None):
+    """
+    Stitch the checkpointed chunks of a PDF into its final outputs.
+    
+    Args:
+        pdf_path (Path): Path to the PDF file
+        output_dir (Path): Directory to save output files
+        chunk_root (Path): Document checkpoint directory
+        ranges (list): (start, end, route) tuples in page order
+        lease (tuple): Lease claim of the PDF (see sharding.py); nothing is
+            written if another node took it over
+        
+    Returns:
+        bool: True if the outputs were written
+    """
+    sanitized_filename = sanitize_filename(pdf_path.stem)
+    markdown_path = output_dir / f"{sanitized_filename}.md"
+    images_dir = output_dir / f"{sanitized_filename}_images"
+    try:
+        check_lease(lease)
+    except LeaseLost as e:
+        print(f"{Colors.YELLOW}Discarding the chunks of {pdf_path}: {str(e)}{Colors.RESET}")
+        return False
+    if table_extract.is_enabled():
+        # Chunks keep no page HTML, so only PyMuPDF's tables are available here
+        write_document_tables(TableCollector(pdf_path, get_tables_dir(output_dir, sanitized_filename)))
+    try:
+        with pipeline_metrics.span("markdown_write"):
+            moved = stitch_chunks(chunk_root, ranges, markdown_path, images_dir, get_metadata_path(markdown_path))
+        pipeline_metrics.add(images=moved, markdown_bytes=markdown_path.stat().st_size)
+        print(f"{Colors.GREEN}Saved Markdown:{Colors.RESET} {markdown_path} ({len(ranges)} chunks, {moved} images)")
+        return True
+    except Exception as e:
+        print(f"{Colors.RED}Error stitching {pdf_path}: {str(e)}{Colors.RESET}")
+        return False
+
+
+def process_pdf_file(pdf_path, output_dir, model_dir, cores_limit=None, force=False, chunk_pages=0, route_ocr=False,
+                     lease=None):
     """
     Process a single PDF file using Marker's default parameters.
     Only processes parts that haven't been completed yet.
@@ -153,6 +463,32 @@ def process_pdf_file(pdf_path, output_dir, model_dir):
         pdf_path (Path): Path to the PDF file
         output_dir (Path): Directory to save output files
         model_dir (Path): Directory to store model files
+        cores_limit (int): CPU cores Marker may use (half of the cores if None)
+        force (bool): Reconvert and overwrite existing outputs, e.g. because
+            the source PDF changed since they were produced
+        chunk_pages (int): Convert PDFs longer than this many pages in
+            checkpointed page-range chunks, 0 to disable
+        route_ocr (bool): Only OCR pages without a usable text layer
+        lease (tuple): Lease claim of the PDF in a leased run (see
+            sharding.py); the Markdown is not committed if another node
+            took the lease over
+        
+    Returns:
+        bool: True if the PDF was processed or skipped, False on error
+    """
+    with pipeline_metrics.document(pdf_path) as record:
+        record["ok"] = _convert_pdf_file(pdf_path, output_dir, model_dir, cores_limit, force, chunk_pages, route_ocr,
+                                         lease)
+        try:
+            pipeline_metrics.add(pages=get_profile(pdf_path)["page_count"])
+        except Exception:
+            pass
+    return record["ok"]
+
+
+def _convert_pdf_file(pdf_path, output_dir, model_dir, cores_limit, force, chunk_pages, route_ocr, lease):
+    """
+    Body of process_pdf_file(), run inside its metrics record.
     """
     import multiprocessing
     
@@ -164,10 +500,11 @@ def process_pdf_file(pdf_path, output_dir, model_dir):
     sanitized_filename = sanitize_filename(pdf_filename)
     markdown_path = output_dir / f"{sanitized_filename}.md"
     images_dir = output_dir / f"{sanitized_filename}_images"
+    tables_dir = get_tables_dir(output_dir, sanitized_filename)
     
-    # Calculate CPU cores limit (half of max cores)
+    # Calculate CPU cores limit (half of max cores unless set by the scheduler)
     max_cores = multiprocessing.cpu_count()
-    cores_limit = max(1, max_cores // 2)
+    cores_limit = get_cores_limit(cores_limit)
     print(f"{Colors.BLUE}System CPU cores:{Colors.RESET} {max_cores}")
     print(f"{Colors.BLUE}Using CPU cores limit:{Colors.RESET} {cores_limit}")
     
@@ -176,17 +513,26 @@ def process_pdf_file(pdf_path, output_dir, model_dir):
         output_dir.mkdir(parents=True, exist_ok=True)
         model_dir.mkdir(parents=True, exist_ok=True)
         
-        # Count actual images in PDF
-        expected_images = count_pdf_images(pdf_path)
-        print(f"{Colors.BLUE}Expected images in PDF:{Colors.RESET} {expected_images}")
+        if force:
+            # Outputs are stale or partial; start from scratch
+            print(f"{Colors.YELLOW}Discarding previous outputs, reconverting {pdf_path}{Colors.RESET}")
+            if images_dir.exists():
+                shutil.rmtree(images_dir)
+            if tables_dir.exists():
+                shutil.rmtree(tables_dir)
+            expected_images = 0
+        else:
+            # Count actual images in PDF
+            expected_images = count_pdf_images(pdf_path)
+            print(f"{Colors.BLUE}Expected images in PDF:{Colors.RESET} {expected_images}")
         
         # Check if we need to process the PDF
-        need_full_processing = not markdown_path.exists()
+        need_full_processing = force or not markdown_path.exists()
         
         # Check if images are valid
         has_valid_images = False
         valid_image_count = 0
-        if images_dir.exists():
+        if images_dir.exists() and not force:
             for img_file in images_dir.iterdir():
                 if img_file.is_file() and img_file.stat().st_size > 0:
                     valid_image_count += 1
@@ -198,92 +544,459 @@ def process_pdf_file(pdf_path, output_dir, model_dir):
         if not need_full_processing and not need_image_extraction:
             print(f"{Colors.GREEN}All processing for {pdf_path} is complete. Skipping.{Colors.RESET}")
             print(f"{Colors.BLUE}Found {valid_image_count} valid images (expected {expected_images}){Colors.RESET}")
-            return
+            return True
         elif not need_full_processing and need_image_extraction:
             print(f"{Colors.YELLOW}Need to extract images for {pdf_path}{Colors.RESET}")
             print(f"{Colors.BLUE}Found {valid_image_count} valid images, but expected {expected_images}{Colors.RESET}")
         
-        # Initialize Marker converter with CPU limit and image extraction settings
-        converter = PdfConverter(
-            artifact_dict=create_model_dict(),
-            config={
-                "max_workers": cores_limit,
-                "batch_size": min(4, cores_limit),
-                "extract_images": need_image_extraction,
-                "image_extraction_mode": "highres"
-            }
-        )
+        # Large or mixed-route documents are converted in checkpointed page-range chunks
+        route = None
+        if need_full_processing:
+            chunk_root, ranges = plan_pdf_chunks(pdf_path, output_dir, chunk_pages, route_ocr)
+            if chunk_root is not None:
+                print(f"{Colors.BLUE}Converting in {len(ranges)} page-range chunks{Colors.RESET}")
+                for start, end, chunk_route in ranges:
+                    chunk_dir = get_chunk_dir(chunk_root, start, end)
+                    if not convert_pdf_chunk(pdf_path, chunk_dir, start, end, chunk_route, cores_limit):
+                        return False
+                return finish_chunked_pdf(pdf_path, output_dir, chunk_root, ranges, lease)
+            if ranges:
+                route = ranges[0][2]
+        
+        # Get Marker converter with CPU limit and image extraction settings
+        config = get_converter_config(cores_limit, need_image_extraction, pdf_path)
+        config.update(get_route_config(route))
         
         # Convert PDF file
         print(f"{Colors.YELLOW}Converting PDF file...{Colors.RESET}")
-        rendered = converter(str(pdf_path))
+        with pipeline_metrics.span("conversion"):
+            rendered = run_converter(config, pdf_path, stream=True)
+        
+        # Structured table outputs go with a new Markdown, not with a repair of missing images
+        tables = None
+        if need_full_processing and table_extract.is_enabled():
+            tables = TableCollector(pdf_path, tables_dir)
+        
+        if isinstance(rendered, PageRenderer):
+            if tables is not None:
+                rendered.html_hook = tables.add_page_html
+            return write_streamed_outputs(rendered, pdf_path, markdown_path, images_dir,
+                                          need_full_processing, need_image_extraction, tables, lease)
         
         # Extract text and images
         print(f"{Colors.YELLOW}Extracting text and images...{Colors.RESET}")
-        markdown_text, metadata, images = text_from_rendered(rendered)
+        with pipeline_metrics.span("text_from_rendered"):
+            markdown_text, _, images = text_from_rendered(rendered)
+        metadata = getattr(rendered, "metadata", None)
+        # Only the images dict is needed from here on; let the rest be freed
+        del rendered
         
-        # Save Markdown file if it doesn't exist
-        if not markdown_path.exists():
-            with open(markdown_path, 'w', encoding='utf-8') as f:
-                f.write(markdown_text)
-            print(f"{Colors.GREEN}Saved Markdown:{Colors.RESET} {markdown_path}")
-        else:
-            print(f"{Colors.BLUE}Markdown file already exists:{Colors.RESET} {markdown_path}")
-        
-        # Save images if needed
+        # Save images if needed (before the Markdown, so that an existing
+        # Markdown file always means the conversion got to the end)
         if need_image_extraction and images:
-            import io
-            from PIL import Image
-            
-            images_dir.mkdir(exist_ok=True)
-            
-            saved_count = 0
-            print(f"{Colors.BLUE}Found {len(images)} images to save...{Colors.RESET}")
-            
-            for img_name, img_data in images.items():
-                img_path = images_dir / img_name
-                try:
-                    # Check if img_data is already bytes
-                    if isinstance(img_data, bytes):
-                        with open(img_path, 'wb') as f:
-                            f.write(img_data)
-                        saved_count += 1
-                    # Check if img_data is a PIL Image object
-                    elif isinstance(img_data, Image.Image):
-                        # Convert Image object to bytes
-                        img_buffer = io.BytesIO()
-                        # Convert to RGB if needed
-                        if img_data.mode != 'RGB':
-                            img_data = img_data.convert('RGB')
-                        img_data.save(img_buffer, format='JPEG')
-                        img_bytes = img_buffer.getvalue()
-                        with open(img_path, 'wb') as f:
-                            f.write(img_bytes)
-                        saved_count += 1
-                    # Check if img_data is a base64 string
-                    elif isinstance(img_data, str) and img_data.startswith('data:image/'):
-                        # Extract base64 data
-                        import base64
-                        header, base64_data = img_data.split(',', 1)
-                        img_bytes = base64.b64decode(base64_data)
-                        with open(img_path, 'wb') as f:
-                            f.write(img_bytes)
-                        saved_count += 1
-                    else:
-                        print(f"{Colors.YELLOW}Unknown image data type for {img_name}: {type(img_data)}{Colors.RESET}")
-                except Exception as e:
-                    print(f"{Colors.RED}Error saving image {img_name}: {str(e)}{Colors.RESET}")
-            
-            print(f"{Colors.GREEN}Saved {saved_count}/{len(images)} images to:{Colors.RESET} {images_dir}")
+            image_count = len(images)
+            print(f"{Colors.BLUE}Found {image_count} images to save...{Colors.RESET}")
+            with pipeline_metrics.span("image_save"):
+                saved_count = save_images(images, images_dir, pdf_path)
+            pipeline_metrics.add(images=saved_count,
+                                 image_bytes=sum(path.stat().st_size for path in images_dir.iterdir()))
+            print(f"{Colors.GREEN}Saved {saved_count}/{image_count} images to:{Colors.RESET} {images_dir}")
         elif not need_image_extraction:
             print(f"{Colors.BLUE}Images already extracted. Skipping image processing.{Colors.RESET}")
         elif not images:
             print(f"{Colors.BLUE}No images found in PDF.{Colors.RESET}")
         
+        # Save Markdown file if it doesn't exist (or is outdated), via a temp
+        # file so an interrupted write never leaves a truncated Markdown
+        if need_full_processing:
+            check_lease(lease)
+            if tables is not None:
+                write_document_tables(tables)
+            tmp_path = markdown_path.with_name(markdown_path.name + ".tmp")
+            with pipeline_metrics.span("markdown_write"):
+                if metadata is not None:
+                    write_metadata(get_metadata_path(markdown_path), metadata)
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(markdown_text)
+                os.replace(tmp_path, markdown_path)
+            pipeline_metrics.add(markdown_bytes=markdown_path.stat().st_size)
+            print(f"{Colors.GREEN}Saved Markdown:{Colors.RESET} {markdown_path}")
+        else:
+            print(f"{Colors.BLUE}Markdown file already exists:{Colors.RESET} {markdown_path}")
+        
+        return True
+        
+    except LeaseLost as e:
+        print(f"{Colors.YELLOW}Discarding the conversion of {pdf_path}: {str(e)}{Colors.RESET}")
+        return False
     except Exception as e:
         print(f"{Colors.RED}Error processing {pdf_path}: {str(e)}{Colors.RESET}")
         import traceback
         traceback.print_exc()
+        return False
+
+
+def write_document_tables(tables):
+    """
+    Write the table side outputs of a document.
+    
+    Tables are an extra; failing to extract them does not fail the conversion.
+    
+    Args:
+        tables (TableCollector): Tables collected during the conversion
+        
+    Returns:
+        int: Number of tables written
+    """
+    try:
+        with pipeline_metrics.span("table_extract"):
+            count = tables.write()
+    except Exception as e:
+        print(f"{Colors.YELLOW}Could not extract tables of {tables.pdf_path}: {str(e)}{Colors.RESET}")
+        return 0
+    pipeline_metrics.add(tables=count)
+    if count:
+        print(f"{Colors.GREEN}Saved {count} tables to:{Colors.RESET} {tables.tables_dir}")
+    return count
+
+
+def write_streamed_outputs(pages, pdf_path, markdown_path, images_dir, write_markdown, extract_images, tables=None,
+                           lease=None):
+    """
+    Write the outputs of a conversion page by page.
+    
+    The images of each page are queued to the image sink and its Markdown is
+    appended to a temp file as soon as it is final, so pages are rendered one
+    at a time and a page is only held while a paragraph runs on. Images and
+    the metadata sidecar are written before the Markdown is moved into place,
+    so an existing Markdown file still means the conversion got to the end.
+    
+    Args:
+        pages (PageRenderer): Built document to render
+        pdf_path (Path): Path to the PDF file
+        markdown_path (Path): Markdown file to write
+        images_dir (Path): Directory for the images
+        write_markdown (bool): Write the Markdown (False when only images are missing)
+        extract_images (bool): Save the images of each page
+        tables (TableCollector): Collects Marker's tables as pages are rendered,
+            written with the other outputs; None to skip tables
+        lease (tuple): Lease claim of the PDF; the Markdown is discarded
+            (LeaseLost) if another node took it over
+        
+    Returns:
+        bool: True once the outputs are written
+    """
+    print(f"{Colors.YELLOW}Writing {len(pages)} pages...{Colors.RESET}")
+    writer = MarkdownStreamWriter(markdown_path, pages.page_separator) if write_markdown else None
+    sink = None
+    try:
+        for index in range(len(pages)):
+            with pipeline_metrics.span("text_from_rendered"):
+                markdown, images = pages.render_page(index, markdown=writer is not None)
+            if extract_images and images:
+                with pipeline_metrics.span("image_save"):
+                    if sink is None:
+                        sink = open_sink(images_dir, pdf_path)
+                    submit_images(sink, images, pages.image_bboxes(index))
+            if writer is not None:
+                with pipeline_metrics.span("markdown_write"):
+                    writer.write(markdown)
+        if writer is not None:
+            with pipeline_metrics.span("text_from_rendered"):
+                markdown = pages.flush()
+            with pipeline_metrics.span("markdown_write"):
+                writer.write(markdown)
+            check_lease(lease)
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        if sink is not None:
+            with pipeline_metrics.span("image_save"):
+                sink.close()
+    
+    if sink is not None:
+        print_sink_summary(sink)
+        pipeline_metrics.add(images=sink.saved,
+                             image_bytes=sum(path.stat().st_size for path in images_dir.iterdir()))
+        print(f"{Colors.GREEN}Saved {sink.saved} images to:{Colors.RESET} {images_dir}")
+    elif not extract_images:
+        print(f"{Colors.BLUE}Images already extracted. Skipping image processing.{Colors.RESET}")
+    else:
+        print(f"{Colors.BLUE}No images found in PDF.{Colors.RESET}")
+    
+    if tables is not None:
+        write_document_tables(tables)
+    
+    if writer is not None:
+        with pipeline_metrics.span("markdown_write"):
+            write_metadata(get_metadata_path(markdown_path), pages.metadata)
+            writer.commit()
+        pipeline_metrics.add(markdown_bytes=markdown_path.stat().st_size)
+        print(f"{Colors.GREEN}Saved Markdown:{Colors.RESET} {markdown_path} ({len(pages)} pages)")
+    else:
+        print(f"{Colors.BLUE}Markdown file already exists:{Colors.RESET} {markdown_path}")
+    
+    return True
+
+
+def is_legacy_output_complete(pdf_output_dir, sanitized_name):
+    """
+    Check outputs written before the conversion manifest existed.
+    
+    Args:
+        pdf_output_dir (Path): Per-PDF output directory
+        sanitized_name (str): Sanitized stem of the output files
+        
+    Returns:
+        bool: True if the Markdown exists and the images directory has at least
+            one non-empty file
+    """
+    if not (pdf_output_dir / f"{sanitized_name}.md").exists():
+        return False
+    images_dir = pdf_output_dir / f"{sanitized_name}_images"
+    if not images_dir.exists():
+        return False
+    return any(img_file.is_file() and img_file.stat().st_size > 0 for img_file in images_dir.iterdir())
+
+
+# plan_pdf_job() outcomes
+PLAN_SKIP = "skip"
+PLAN_BLOCKED = "blocked"
+PLAN_CONVERT = "convert"
+PLAN_BUSY = "busy"
+
+# classify_pdf_job() states
+JOB_DONE = "done"
+JOB_MOVED = "moved"
+JOB_LEGACY = "legacy"
+JOB_CHANGED = "changed"
+JOB_INTERRUPTED = "interrupted"
+JOB_IMAGES = "images"
+JOB_NEW = "new"
+
+# States whose outputs are complete
+SKIP_STATES = (JOB_DONE, JOB_MOVED, JOB_LEGACY)
+
+
+def classify_pdf_job(pdf_path, relative_path, output_dir, manifest, job_queue=None):
+    """
+    Work out what converting one input PDF would involve, without changing anything.
+    
+    Args:
+        pdf_path (Path): Path to the PDF file
+        relative_path (str): Directory of the PDF relative to the input directory
+        output_dir (Path): Root output directory
+        manifest (ConversionManifest): Record of finished conversions
+        job_queue (JobQueue): Durable queue of conversion jobs (None if there is none yet)
+        
+    Returns:
+        tuple: (state, job, source_key). state is one of the JOB_* states;
+            job is (manifest_key, pdf_path, pdf_output_dir, sanitized_name,
+            sha256); source_key is the original of a moved PDF.
+    """
+    sanitized_name = sanitize_filename(pdf_path.stem)
+    # Create subdirectory for this PDF file
+    pdf_output_dir = Path(output_dir) / relative_path / sanitized_name
+    manifest_key = (Path(relative_path) / pdf_path.name).as_posix()
+    
+    # Check if this PDF has already been processed
+    status, sha256, source_key = manifest.lookup(manifest_key, pdf_path, pdf_output_dir)
+    job = (manifest_key, pdf_path, pdf_output_dir, sanitized_name, sha256)
+    
+    if status == STATUS_DONE:
+        return JOB_DONE, job, None
+    elif status == STATUS_MOVED:
+        return JOB_MOVED, job, source_key
+    elif status == STATUS_CHANGED:
+        return JOB_CHANGED, job, None
+    elif job_queue is not None and job_queue.is_unfinished(manifest_key):
+        # Outputs of an unfinished job may be partial; never trust them
+        return JOB_INTERRUPTED, job, None
+    elif is_legacy_output_complete(pdf_output_dir, sanitized_name):
+        # Converted by a run that predates the manifest
+        return JOB_LEGACY, job, None
+    elif (pdf_output_dir / f"{sanitized_name}.md").exists():
+        return JOB_IMAGES, job, None
+    return JOB_NEW, job, None
+
+
+def is_blocked(job_queue, manifest_key):
+    """
+    Check whether a job has used up its attempts.
+    
+    Args:
+        job_queue (JobQueue): Durable queue of conversion jobs
+        manifest_key (str): Job key
+        
+    Returns:
+        bool: True if the job failed job_queue.max_attempts times
+    """
+    row = job_queue.get(manifest_key)
+    return row is not None and row["state"] == STATE_FAILED and row["attempts"] >= job_queue.max_attempts
+
+
+def plan_pdf_job(pdf_path, relative_path, output_dir, manifest, job_queue, claim=None):
+    """
+    Decide whether one input PDF needs converting.
+    
+    Unchanged PDFs are skipped, moved ones reuse their old outputs, and PDFs
+    that need converting are added to the job queue.
+    
+    Args:
+        pdf_path (Path): Path to the PDF file
+        relative_path (str): Directory of the PDF relative to the input directory
+        output_dir (Path): Root output directory
+        manifest (ConversionManifest): Record of finished conversions
+        job_queue (JobQueue): Durable queue of conversion jobs
+        claim (callable): Optional function (job) -> None to go ahead, or
+            (PLAN_SKIP or PLAN_BUSY, message); used to coordinate nodes
+        
+    Returns:
+        tuple: (action, job, force). action is PLAN_SKIP, PLAN_BLOCKED (failed
+            too often), PLAN_BUSY (claimed by another node) or PLAN_CONVERT;
+            job is (manifest_key, pdf_path, pdf_output_dir, sanitized_name,
+            sha256); force means existing outputs must be discarded.
+    """
+    file = pdf_path.name
+    state, job, source_key = classify_pdf_job(pdf_path, relative_path, output_dir, manifest, job_queue)
+    manifest_key, _, pdf_output_dir, sanitized_name, sha256 = job
+    force = state in (JOB_CHANGED, JOB_INTERRUPTED)
+    
+    if state == JOB_DONE:
+        job_queue.mark_done(manifest_key)
+        print(f"  {Colors.GREEN}✓{Colors.RESET} {file} - already processed")
+        return PLAN_SKIP, job, False
+    elif state == JOB_MOVED:
+        manifest.adopt_moved(manifest_key, source_key, pdf_path, pdf_output_dir, sanitized_name)
+        manifest.save()
+        job_queue.mark_done(manifest_key)
+        print(f"  {Colors.GREEN}✓{Colors.RESET} {file} - same content as {source_key}, outputs reused")
+        return PLAN_SKIP, job, False
+    elif state == JOB_LEGACY:
+        manifest.record(manifest_key, pdf_path, pdf_output_dir, sanitized_name, sha256=sha256)
+        manifest.save()
+        print(f"  {Colors.GREEN}✓{Colors.RESET} {file} - already processed")
+        return PLAN_SKIP, job, False
+    
+    if claim is not None:
+        claimed = claim(job)
+        if claimed is not None:
+            action, message = claimed
+            color = Colors.GREEN if action == PLAN_SKIP else Colors.BLUE
+            print(f"  {color}{'✓' if action == PLAN_SKIP else '·'}{Colors.RESET} {file} - {message}")
+            return action, job, False
+    
+    if state == JOB_CHANGED:
+        print(f"  {Colors.YELLOW}→{Colors.RESET} {file} - changed since last conversion, reprocessing")
+    elif state == JOB_INTERRUPTED:
+        print(f"  {Colors.YELLOW}→{Colors.RESET} {file} - unfinished in a previous run, reprocessing")
+    elif state == JOB_IMAGES:
+        print(f"  {Colors.YELLOW}→{Colors.RESET} {file} - extracting images")
+    else:
+        print(f"  {Colors.YELLOW}→{Colors.RESET} {file} - processing")
+    
+    if not job_queue.enqueue(manifest_key, pdf_path, pdf_output_dir):
+        print(f"    {Colors.RED}Skipped:{Colors.RESET} failed {job_queue.max_attempts} times "
+              f"(see 'python scripts/job_queue.py status')")
+        return PLAN_BLOCKED, job, force
+    
+    # Count actual images in PDF before processing
+    expected_images = count_pdf_images(pdf_path)
+    print(f"    {Colors.BLUE}Images detected:{Colors.RESET} {expected_images}")
+    return PLAN_CONVERT, job, force
+
+
+def make_lease_claim(leases, peers, manifest, job_queue):
+    """
+    Build the claim function of plan_pdf_job() for a leased run.
+    
+    Args:
+        leases (LeaseManager): Leases of this node
+        peers (PeerManifests): Manifests of the other nodes
+        manifest (ConversionManifest): Manifest of this node
+        job_queue (JobQueue): Job queue of this node
+        
+    Returns:
+        callable: Function (job) -> None if this node may convert the PDF,
+            otherwise (PLAN_BUSY or PLAN_SKIP, message)
+    """
+    def claim(job):
+        manifest_key, pdf_path, pdf_output_dir = job[0], job[1], job[2]
+        lease_path = get_lease_path(pdf_output_dir)
+        if not leases.acquire(lease_path):
+            return PLAN_BUSY, f"being converted by {leases.owner(lease_path) or 'another node'}"
+        # A peer may have finished it after this run started
+        entry = peers.find_done(manifest_key, pdf_path, pdf_output_dir)
+        if entry is not None:
+            manifest.merge({manifest_key: entry})
+            manifest.save()
+            job_queue.mark_done(manifest_key)
+            leases.release(lease_path)
+            return PLAN_SKIP, "converted by another node"
+        return None
+    return claim
+
+
+def is_lease_lost(leases, job, job_queue):
+    """
+    Check, before recording a PDF as done, whether its lease was lost.
+    
+    A PDF whose lease another node took over is being converted there; this
+    node's work on it is discarded and its job put back in the queue.
+    
+    Args:
+        leases (LeaseManager): Leases of this node, or None if not leased
+        job (tuple): Job returned by plan_pdf_job()
+        job_queue (JobQueue): Job queue of this node
+        
+    Returns:
+        bool: True if the lease was lost
+    """
+    if leases is None or leases.is_held(get_lease_path(job[2])):
+        return False
+    print(f"{Colors.YELLOW}Discarding {job[1]}: another node took over its lease{Colors.RESET}")
+    job_queue.requeue(job[0], "lease lost to another node")
+    return True
+
+
+def run_pdf_job(job, force, model_dir, manifest, job_queue, worker_address=None, chunk_pages=0, route_ocr=False,
+                leases=None):
+    """
+    Convert one planned PDF in this process, or on a warm worker, and record the outcome.
+    
+    Args:
+        job (tuple): Job returned by plan_pdf_job()
+        force (bool): Discard existing outputs first
+        model_dir (Path): Directory containing model files
+        manifest (ConversionManifest): Record of finished conversions
+        job_queue (JobQueue): Durable queue of conversion jobs
+        worker_address (tuple): Optional (host, port) of a running warm worker
+        chunk_pages (int): Convert longer PDFs in chunks of this many pages
+        route_ocr (bool): Only OCR pages without a usable text layer
+        leases (LeaseManager): Leases of this node in a leased run
+        
+    Returns:
+        bool: True if the conversion succeeded
+    """
+    manifest_key, pdf_path, pdf_output_dir = job[0], job[1], job[2]
+    lease = leases.claim(get_lease_path(pdf_output_dir)) if leases is not None else None
+    job_queue.start(manifest_key)
+    if worker_address is not None:
+        from warm_worker import submit_pdf
+        ok = submit_pdf(worker_address, pdf_path, pdf_output_dir, model_dir,
+                        force=force, chunk_pages=chunk_pages, route_ocr=route_ocr, lease=lease)
+    else:
+        ok = process_pdf_file(pdf_path, pdf_output_dir, model_dir,
+                              force=force, chunk_pages=chunk_pages, route_ocr=route_ocr, lease=lease)
+    if is_lease_lost(leases, job, job_queue):
+        return False
+    if ok:
+        manifest.record(*job)
+        manifest.save()
+    job_queue.finish(manifest_key, ok)
+    return ok
 
 
 def check_model_availability():
@@ -294,21 +1007,18 @@ def check_model_availability():
     print("\nChecking model availability...")
     
     try:
-        # Import here to avoid circular imports
-        from marker.models import create_model_dict
-        from marker.converters.pdf import PdfConverter
+        # The environment must point at the model directory before Surya's settings load
+        prepare_model_dir()
         from surya.settings import settings
         
         # Print actual model directory being used
         print(f"Actual model directory being used by Surya: {settings.MODEL_CACHE_DIR}")
         print(f"Model directory exists: {os.path.exists(settings.MODEL_CACHE_DIR)}")
         
-        # Create a minimal converter to trigger model download
-        # This will check and download models if they don't exist
-        converter = PdfConverter(
-            artifact_dict=create_model_dict(),
-            config={"max_workers": 1, "batch_size": 1}
-        )
+        # Load the shared models to trigger model download
+        # This will check and download models if they don't exist, and the
+        # loaded models are kept in the registry for every later conversion
+        get_model_dict()
         print("Models are available and ready!")
         return True
     except Exception as e:
@@ -317,46 +1027,21 @@ def check_model_availability():
         traceback.print_exc()
         return False
 
-def process_all_pdfs():
+def scan_input_structure(input_dir):
     """
-    Process all PDF files in the input directory structure.
-    Only processes files that haven't been fully processed yet.
-    """
-    # Get project root directory
-    project_root = get_project_root()
-    print(f"Project root: {project_root}")
-    
-    # Define input, output, and model directories
-    pdf_dir = project_root / "pdf"
-    input_dir = pdf_dir / "input"
-    output_dir = pdf_dir / "output"
-    model_dir = project_root / "models"
-    
-    print(f"Input directory: {input_dir}")
-    print(f"Output directory: {output_dir}")
-    print(f"Model directory: {model_dir}")
-    print(f"Model directory exists: {model_dir.exists()}")
-    
-    # Create output directory if it doesn't exist
-    output_dir.mkdir(parents=True, exist_ok=True)
-    print(f"Output directory created successfully: {output_dir}")
-    
-    # Model directory is already created at script startup
-    
-    # First check if models are available
-    if not check_model_availability():
-        print("\nModel check failed. Please check your internet connection and try again.")
-        return
-    
-    # Collect input structure information
-    print(f"\n{Colors.CYAN}Input Structure Analysis:{Colors.RESET}")
-    print("-" * 50)
+    Collect the PDFs of every subdirectory of the input directory.
     
+    Args:
+        input_dir (Path): Input directory
+        
+    Returns:
+        tuple: (total_dirs, total_pdfs, dir_pdf_map) where dir_pdf_map maps
+            each relative directory to its PDF file names
+    """
     total_dirs = 0
     total_pdfs = 0
     dir_pdf_map = {}
     
-    # First pass: collect directory and PDF information
     for root, dirs, files in os.walk(input_dir):
         # Calculate relative path from input directory
         relative_path = os.path.relpath(root, input_dir)
@@ -369,8 +1054,20 @@ def process_all_pdfs():
         pdf_files = [file for file in files if file.lower().endswith('.pdf')]
         total_pdfs += len(pdf_files)
         dir_pdf_map[relative_path] = pdf_files
+    return total_dirs, total_pdfs, dir_pdf_map
+
+
+def print_input_structure(total_dirs, total_pdfs, dir_pdf_map):
+    """
+    Print the input structure collected by scan_input_structure().
     
-    # Print input structure summary
+    Args:
+        total_dirs (int): Number of subdirectories
+        total_pdfs (int): Number of PDFs
+        dir_pdf_map (dict): Relative directory to PDF file names
+    """
+    print(f"\n{Colors.CYAN}Input Structure Analysis:{Colors.RESET}")
+    print("-" * 50)
     print(f"{Colors.BLUE}Total directories:{Colors.RESET} {total_dirs}")
     print(f"{Colors.BLUE}Total PDF files:{Colors.RESET} {total_pdfs}")
     
@@ -381,6 +1078,142 @@ def process_all_pdfs():
             if pdf_files:
                 for pdf_file in pdf_files:
                     print(f"    - {pdf_file}")
+
+
+def open_pipeline_state(output_dir, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Open the manifest and, if it exists, the job queue without writing anything.
+    
+    The job queue is opened read-only, so status reports and dry runs never
+    change a database another process (or node) is using.
+    
+    The manifests of the nodes of a sharded run are merged in (in memory only).
+    
+    Args:
+        output_dir (Path): Root output directory
+        max_attempts (int): Attempts per PDF before it counts as failed
+        
+    Returns:
+        tuple: (manifest, job_queue); job_queue is None before the first conversion run
+    """
+    pipeline_dir = Path(output_dir) / ".pipeline"
+    manifest = ConversionManifest(pipeline_dir / "manifest.json", MANIFEST_CONFIG)
+    for node in list_nodes(pipeline_dir):
+        node_manifest = get_node_dir(pipeline_dir, node) / "manifest.json"
+        manifest.merge(ConversionManifest(node_manifest, MANIFEST_CONFIG, output_root=output_dir).entries)
+    job_queue = None
+    if (pipeline_dir / "jobs.sqlite").exists():
+        job_queue = JobQueue(pipeline_dir / "jobs.sqlite", max_attempts, read_only=True)
+    return manifest, job_queue
+
+
+def print_pipeline_status(input_dir, output_dir):
+    """
+    Print how far the corpus has been converted.
+    
+    Only stat() calls are made: a PDF counts as converted when the manifest
+    has an entry for it with the same size and modification time.
+    
+    Args:
+        input_dir (Path): Input directory
+        output_dir (Path): Root output directory
+    """
+    _, total_pdfs, dir_pdf_map = scan_input_structure(input_dir)
+    manifest, job_queue = open_pipeline_state(output_dir)
+    converted = 0
+    for relative_path, pdf_files in dir_pdf_map.items():
+        for file in pdf_files:
+            entry = manifest.entries.get((Path(relative_path) / file).as_posix())
+            if entry is None:
+                continue
+            stat = (Path(input_dir) / relative_path / file).stat()
+            if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+                converted += 1
+    
+    print(f"{Colors.CYAN}Conversion status:{Colors.RESET} {input_dir}")
+    print("-" * 50)
+    print(f"{Colors.BLUE}Input PDFs:{Colors.RESET} {total_pdfs}")
+    print(f"{Colors.GREEN}Converted:{Colors.RESET} {converted}")
+    print(f"{Colors.YELLOW}Not converted or changed:{Colors.RESET} {total_pdfs - converted}")
+    print()
+    summaries = merge_node_state(output_dir, MANIFEST_CONFIG, write=False)
+    if summaries:
+        print_node_status(summaries)
+        print()
+    if job_queue is None:
+        if not summaries:
+            print(f"{Colors.BLUE}Job queue:{Colors.RESET} no conversion run yet")
+        return
+    try:
+        print_status(job_queue)
+    finally:
+        job_queue.close()
+
+
+def process_all_pdfs(worker_address=None, workers=1, threads_per_worker=None, max_worker_memory=0, chunk_pages=0,
+                     route_ocr=False, resume=False, max_attempts=DEFAULT_MAX_ATTEMPTS, shard=None, lease=False,
+                     node=None, lease_ttl=DEFAULT_LEASE_TTL):
+    """
+    Process all PDF files in the input directory structure.
+    Only processes files that haven't been fully processed yet.
+    
+    Args:
+        worker_address (tuple): Optional (host, port) of a running warm worker.
+            When given, conversions are sent to the worker, which already has
+            the models loaded, instead of loading them in this process.
+        workers (int): Number of worker processes; 1 converts in this process,
+            None derives the count from the CPU cores
+        threads_per_worker (int): Compute threads per worker process
+        max_worker_memory (float): Per-worker RSS ceiling in MB, 0 to disable
+        chunk_pages (int): Convert PDFs longer than this many pages in
+            checkpointed page-range chunks (spread across the workers when
+            running in parallel), 0 to disable
+        route_ocr (bool): Only OCR pages without a usable text layer; clean
+            pages go through Marker's text-layer path
+        resume (bool): Only run the jobs left unfinished in the job queue
+        max_attempts (int): Attempts per PDF before it is skipped as failed
+        shard (tuple): Only convert the PDFs of shard (i, N) (see sharding.py)
+        lease (bool): Claim every PDF with a lease file before converting it,
+            so several nodes can share the input tree
+        node (str): Name of this node in a sharded or leased run
+        lease_ttl (float): Seconds until the lease of a stopped node expires
+    """
+    parallel = worker_address is None and workers != 1
+    # Sharded and leased runs keep their state per node (see sharding.py)
+    node_mode = shard is not None or lease
+    # Workers inherit the run id through the environment
+    run_id = pipeline_metrics.get_run_id()
+    # Get project root directory
+    project_root = get_project_root()
+    print(f"Project root: {project_root}")
+    
+    # Define input, output, and model directories
+    pdf_dir = project_root / "pdf"
+    input_dir = pdf_dir / "input"
+    output_dir = pdf_dir / "output"
+    model_dir = project_root / "models"
+    
+    print(f"Input directory: {input_dir}")
+    print(f"Output directory: {output_dir}")
+    print(f"Model directory: {model_dir}")
+    print(f"Model directory exists: {model_dir.exists()}")
+    print(f"Metrics run id: {run_id}")
+    
+    # Create output directory if it doesn't exist
+    output_dir.mkdir(parents=True, exist_ok=True)
+    print(f"Output directory created successfully: {output_dir}")
+    
+    # Models are only loaded once there is something to convert (see below)
+    if worker_address is not None:
+        from warm_worker import is_worker_alive
+        if not is_worker_alive(worker_address):
+            print(f"\n{Colors.RED}No warm worker running at {worker_address[0]}:{worker_address[1]}{Colors.RESET}")
+            return
+        print(f"Using warm worker at {worker_address[0]}:{worker_address[1]}")
+    
+    # Collect input structure information
+    total_dirs, total_pdfs, dir_pdf_map = scan_input_structure(input_dir)
+    print_input_structure(total_dirs, total_pdfs, dir_pdf_map)
     
     # Second pass: process files
     print(f"\n{Colors.CYAN}Starting PDF Processing...{Colors.RESET}")
@@ -388,6 +1221,44 @@ def process_all_pdfs():
     
     processed_count = 0
     skipped_count = 0
+    busy_count = 0
+    shard_pdfs = 0
+    sequential_jobs = []
+    parallel_jobs = []
+    parallel_meta = {}
+    chunked_docs = []
+    state_dir = output_dir / ".pipeline"
+    leases = None
+    claim = None
+    if node_mode:
+        node = node or default_node_name(shard)
+        state_dir = get_node_dir(state_dir, node)
+        shard_label = f"shard {shard[0]}/{shard[1]}" if shard is not None else "all PDFs"
+        print(f"{Colors.BLUE}Node:{Colors.RESET} {node} ({shard_label}{', leased' if lease else ''}), state in {state_dir}")
+    # One run per state directory: a second one (e.g. the watch daemon) would take over its jobs
+    run_lock = RunLock(state_dir)
+    if not run_lock.acquire():
+        print(f"{Colors.RED}Another run is using {state_dir} ({run_lock.holder()}); "
+              f"wait for it to finish or stop it first{Colors.RESET}")
+        return
+    manifest = ConversionManifest(state_dir / "manifest.json", MANIFEST_CONFIG, output_root=output_dir)
+    job_queue = JobQueue(state_dir / "jobs.sqlite", max_attempts)
+    if node_mode:
+        # Start from what the other nodes converted, e.g. before the shards changed
+        peers = PeerManifests(output_dir / ".pipeline", node, MANIFEST_CONFIG)
+        for peer in peers.manifests():
+            manifest.merge({key: entry for key, entry in peer.entries.items() if in_shard(key, shard)})
+    if lease:
+        leases = LeaseManager(node, lease_ttl)
+        claim = make_lease_claim(leases, peers, manifest, job_queue)
+    
+    # Jobs still marked running were interrupted by a crash or restart
+    recovered = job_queue.recover()
+    if recovered:
+        print(f"{Colors.YELLOW}Requeued {len(recovered)} jobs interrupted in a previous run{Colors.RESET}")
+    resume_keys = job_queue.unfinished_keys() if resume else None
+    if resume:
+        print(f"{Colors.BLUE}Resuming {len(resume_keys)} unfinished jobs{Colors.RESET}")
     
     for root, dirs, files in os.walk(input_dir):
         # Calculate relative path from input directory
@@ -410,45 +1281,147 @@ def process_all_pdfs():
         for file in files:
             if file.lower().endswith('.pdf'):
                 pdf_path = Path(root) / file
-                # Create subdirectory for this PDF file
-                pdf_output_dir = current_output_dir / sanitize_filename(Path(file).stem)
+                manifest_key = (Path(relative_path) / file).as_posix()
+                if not in_shard(manifest_key, shard):
+                    continue
+                shard_pdfs += 1
+                if resume and manifest_key not in resume_keys:
+                    continue
                 
-                # Check if this PDF has already been processed
-                md_file = pdf_output_dir / f"{sanitize_filename(Path(file).stem)}.md"
-                images_dir = pdf_output_dir / f"{sanitize_filename(Path(file).stem)}_images"
+                action, job, force = plan_pdf_job(pdf_path, relative_path, output_dir, manifest, job_queue,
+                                                  claim=claim)
+                if action == PLAN_SKIP:
+                    dir_skipped += 1
+                    skipped_count += 1
+                    continue
+                elif action == PLAN_BUSY:
+                    busy_count += 1
+                    continue
+                elif action == PLAN_BLOCKED:
+                    if leases is not None:
+                        leases.release(get_lease_path(job[2]))
+                    continue
                 
-                # Check if processing is complete
-                if md_file.exists():
-                    # Check if images directory exists and has valid files
-                    has_valid_images = False
-                    valid_image_count = 0
-                    if images_dir.exists():
-                        for img_file in images_dir.iterdir():
-                            if img_file.is_file() and img_file.stat().st_size > 0:
-                                valid_image_count += 1
-                        has_valid_images = valid_image_count > 0
-                    
-                    if has_valid_images:
-                        print(f"  {Colors.GREEN}✓{Colors.RESET} {file} - already processed (images: {valid_image_count})")
-                        dir_skipped += 1
-                        skipped_count += 1
-                        continue
+                # Process the PDF file
+                if parallel:
+                    _, pdf_path, pdf_output_dir, sanitized_name, _ = job
+                    job_queue.start(manifest_key)
+                    chunk_root, ranges = None, []
+                    if force or not (pdf_output_dir / f"{sanitized_name}.md").exists():
+                        chunk_root, ranges = plan_pdf_chunks(pdf_path, pdf_output_dir, chunk_pages, route_ocr)
+                    if chunk_root is not None:
+                        # Spread the chunks of a large PDF across the workers
+                        if force and (pdf_output_dir / f"{sanitized_name}_images").exists():
+                            shutil.rmtree(pdf_output_dir / f"{sanitized_name}_images")
+                        indexes = []
+                        for start, end, route in ranges:
+                            indexes.append(len(parallel_jobs))
+                            parallel_jobs.append(("chunk", {
+                                "pdf_path": pdf_path,
+                                "chunk_dir": get_chunk_dir(chunk_root, start, end),
+                                "start": start,
+                                "end": end,
+                                "route": route,
+                            }))
+                        chunked_docs.append((job, indexes, chunk_root, ranges))
                     else:
-                        print(f"  {Colors.YELLOW}→{Colors.RESET} {file} - extracting images")
+                        parallel_meta[len(parallel_jobs)] = job
+                        parallel_jobs.append(("pdf", {
+                            "pdf_path": pdf_path,
+                            "output_dir": pdf_output_dir,
+                            "model_dir": model_dir,
+                            "force": force,
+                            "route_ocr": route_ocr,
+                            "lease": leases.claim(get_lease_path(pdf_output_dir)) if leases is not None else None,
+                        }))
                 else:
-                    print(f"  {Colors.YELLOW}→{Colors.RESET} {file} - processing")
-                
-                # Count actual images in PDF before processing
-                expected_images = count_pdf_images(pdf_path)
-                print(f"    {Colors.BLUE}Images detected:{Colors.RESET} {expected_images}")
-                
-                # Process the PDF file
-                process_pdf_file(pdf_path, pdf_output_dir, model_dir)
+                    sequential_jobs.append((job, force))
                 dir_processed += 1
                 processed_count += 1
         
         if dir_processed > 0 or dir_skipped > 0:
-            print(f"  {Colors.BLUE}Summary:{Colors.RESET} {dir_processed} newly processed, {dir_skipped} already completed")
+            print(f"  {Colors.BLUE}Summary:{Colors.RESET} {dir_processed} to process, {dir_skipped} already completed")
+    
+    planned = [job for job, _ in sequential_jobs] + list(parallel_meta.values()) + [doc[0] for doc in chunked_docs]
+    if planned:
+        from run_planner import print_run_estimate
+        print()
+        print_run_estimate([job[1] for job in planned], workers if parallel else 1, threads_per_worker,
+                           metrics_dir=output_dir / ".pipeline")
+    
+    # Load (or download) the models only now: a run with nothing to convert never imports Marker
+    if (sequential_jobs or parallel_jobs) and worker_address is None:
+        if not check_model_availability():
+            print("\nModel check failed. Please check your internet connection and try again.")
+            job_queue.close()
+            run_lock.release()
+            if leases is not None:
+                leases.close()
+            return
+        if parallel:
+            # Workers load their own models; the parent only needed the download
+            release_models()
+    
+    for job, force in sequential_jobs:
+        run_pdf_job(job, force, model_dir, manifest, job_queue,
+                    worker_address=worker_address, chunk_pages=chunk_pages, route_ocr=route_ocr, leases=leases)
+        if leases is not None:
+            # Released only after the manifest is saved, so other nodes see the PDF as done
+            leases.release(get_lease_path(job[2]))
+    
+    # Convert the collected documents across the worker pool
+    if parallel_jobs:
+        from batch_scheduler import BatchScheduler
+        scheduler = BatchScheduler(workers, threads_per_worker, max_worker_memory)
+        results = scheduler.run(parallel_jobs)
+        for index, ok in sorted(results.items()):
+            if index in parallel_meta:
+                if is_lease_lost(leases, parallel_meta[index], job_queue):
+                    continue
+                if ok:
+                    manifest.record(*parallel_meta[index])
+                job_queue.finish(parallel_meta[index][0], ok)
+            if not ok:
+                print(f"{Colors.RED}Failed:{Colors.RESET} {parallel_jobs[index][1]['pdf_path']}")
+        manifest.save()
+        
+        # Stitch chunked documents whose chunks all finished
+        for job, indexes, chunk_root, ranges in chunked_docs:
+            pdf_path, pdf_output_dir = job[1], job[2]
+            if is_lease_lost(leases, job, job_queue):
+                continue
+            ok = all(results.get(index) for index in indexes)
+            if ok:
+                lease = leases.claim(get_lease_path(pdf_output_dir)) if leases is not None else None
+                ok = finish_chunked_pdf(pdf_path, pdf_output_dir, chunk_root, ranges, lease)
+            if is_lease_lost(leases, job, job_queue):
+                continue
+            if ok:
+                manifest.record(*job)
+                manifest.save()
+            job_queue.finish(job[0], ok, None if ok else "one or more page-range chunks failed")
+    
+    if leases is not None:
+        leases.close()
+    
+    # Forget PDFs that were deleted (moved ones were matched by hash above)
+    manifest.forget_missing(input_dir)
+    manifest.save()
+    job_queue.forget_missing(input_dir)
+    job_queue.close()
+    run_lock.release()
+    
+    metrics_path = pipeline_metrics.write_prometheus(metrics_dir=output_dir / ".pipeline")
+    if metrics_path is not None:
+        jsonl_name = pipeline_metrics.metrics_file_name(pipeline_metrics.JSONL_NAME)
+        print(f"{Colors.BLUE}Metrics:{Colors.RESET} {output_dir / '.pipeline' / jsonl_name}, {metrics_path}")
+    
+    # Make the new Markdown searchable (only changed files are re-read). In a
+    # sharded run the shared index is updated once, by the merge step.
+    if node_mode:
+        print(f"{Colors.BLUE}Run 'python scripts/process_pdf.py merge' once all nodes are done{Colors.RESET}")
+    else:
+        update_index()
     
     # Final summary
     print(f"\n{Colors.CYAN}Processing Summary:{Colors.RESET}")
@@ -458,16 +1431,167 @@ def process_all_pdfs():
     print(f"{Colors.GREEN}Successfully processed:{Colors.RESET} {processed_count + skipped_count}")
     print(f"{Colors.GREEN}Newly processed:{Colors.RESET} {processed_count}")
     print(f"{Colors.YELLOW}Already completed (skipped):{Colors.RESET} {skipped_count}")
+    if busy_count:
+        print(f"{Colors.BLUE}Claimed by other nodes:{Colors.RESET} {busy_count}")
+    if shard is not None:
+        # Rates below refer to this node's shard
+        print(f"{Colors.BLUE}PDF files in shard {shard[0]}/{shard[1]}:{Colors.RESET} {shard_pdfs}")
+        total_pdfs = shard_pdfs
     if total_pdfs > 0:
         success_rate = (processed_count + skipped_count) / total_pdfs * 100
         print(f"{Colors.BLUE}Processing rate:{Colors.RESET} {(processed_count + skipped_count)}/{total_pdfs} ({success_rate:.1f}%)")
     print(f"\n{Colors.GREEN}Processing completed!{Colors.RESET}")
 
 
-if __name__ == "__main__":
+# Subcommands; without one, the arguments are those of convert
+COMMANDS = ("scan", "convert", "status", "merge", "analyze")
+
+
+def main(argv=None):
+    """
+    Main function: parse the subcommand and run it.
+    
+    Args:
+        argv (list): Command-line arguments (sys.argv[1:] if None)
+    """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ("-h", "--help")):
+        # Keep 'python scripts/process_pdf.py --workers 4' working
+        argv = ["convert"] + argv
+    
     parser = argparse.ArgumentParser(description="Process PDF files using Marker")
-    args = parser.parse_args()
+    subparsers = parser.add_subparsers(dest="command", metavar="{scan,convert,status,merge,analyze}")
+    scan = subparsers.add_parser("scan", help="Plan what convert would do and estimate its cost, "
+                                               "without loading any models (see run_planner.py)")
+    scan.add_argument("--json", metavar="PATH", help="Also write the plan as JSON ('-' for stdout only)")
+    scan.add_argument("--summary", action="store_true", help="Only print the totals, not every PDF")
+    scan.add_argument("--workers", type=int, default=1,
+                      help="Planned worker processes (default: 1, 0 = derive from CPU cores)")
+    scan.add_argument("--threads-per-worker", type=int, default=None, help="Planned threads per worker")
+    scan.add_argument("--chunk-pages", type=int, default=0, metavar="N", help="Planned --chunk-pages")
+    scan.add_argument("--route-ocr", action="store_true", help="Planned --route-ocr")
+    scan.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS, metavar="N",
+                      help="Attempts before a PDF counts as failed (default: %(default)s)")
+    scan.add_argument("--shard", metavar="i/N", help="Only plan the PDFs of shard i of N")
+    convert = subparsers.add_parser("convert", help="Convert the PDFs that are new or changed (default)")
+    convert.add_argument("--worker", metavar="HOST:PORT",
+                         help="Send conversions to a running warm worker (see warm_worker.py)")
+    convert.add_argument("--workers", type=int, default=1,
+                         help="Number of worker processes converting PDFs in parallel "
+                              "(default: 1, 0 = derive from CPU cores)")
+    convert.add_argument("--threads-per-worker", type=int, default=None,
+                         help="Compute threads per worker process (default: cores / workers)")
+    convert.add_argument("--max-worker-memory", type=float, default=0, metavar="MB",
+                         help="Restart a worker once its memory use passes this many MB (default: off)")
+    convert.add_argument("--chunk-pages", type=int, default=0, metavar="N",
+                         help="Convert PDFs longer than N pages in checkpointed N-page chunks; heading depth "
+                              "can differ from a single-shot conversion (default: off)")
+    convert.add_argument("--route-ocr", action="store_true",
+                         help="Only OCR scanned or garbled pages; use the PDF text layer for clean pages")
+    convert.add_argument("--no-autotune", action="store_true",
+                         help="Use the fixed batch sizes instead of sizing them from the available memory")
+    convert.add_argument("--no-image-store", action="store_true",
+                         help="Write a full copy of every image instead of hardlinking shared images "
+                              "from the content-addressed store")
+    convert.add_argument("--tables", action="store_true",
+                         help="Also write every table as CSV (and Parquet with pyarrow) under <name>_tables/")
+    convert.add_argument("--resume", action="store_true",
+                         help="Only run the jobs left unfinished by previous runs (see job_queue.py)")
+    convert.add_argument("--max-attempts", type=int, default=DEFAULT_MAX_ATTEMPTS, metavar="N",
+                         help="Skip PDFs that failed N times until retried with job_queue.py retry "
+                              "(default: %(default)s)")
+    convert.add_argument("--shard", metavar="i/N",
+                         help="Only convert the PDFs of shard i of N, chosen by a hash of their path "
+                              "(for several nodes sharing pdf/input, see sharding.py)")
+    convert.add_argument("--lease", action="store_true",
+                         help="Claim each PDF with a lease file in the output tree before converting it, "
+                              "so any number of nodes can share the work")
+    convert.add_argument("--node", help="Name of this node in a sharded or leased run "
+                                        "(default: host name and shard)")
+    convert.add_argument("--lease-ttl", type=float, default=DEFAULT_LEASE_TTL, metavar="SECONDS",
+                         help="Seconds until the leases of a stopped node expire (default: %(default)s)")
+    subparsers.add_parser("status", help="Show how far the corpus has been converted")
+    subparsers.add_parser("merge", help="Combine the state of the nodes of a sharded run and update the search index")
+    analyze = subparsers.add_parser("analyze", help="Analyze the images in all PDFs (see analyze_pdf_images.py)")
+    analyze.add_argument("--inventory", metavar="OUTPUT",
+                         help="Write a tabular inventory (.csv, .sqlite/.db or .parquet) of all images")
+    analyze.add_argument("--workers", type=int, default=None,
+                         help="Worker processes for --inventory (default: CPU count)")
+    args = parser.parse_args(argv)
+    
+    input_dir = project_root / "pdf" / "input"
+    output_dir = project_root / "pdf" / "output"
+    shard = None
+    if getattr(args, "shard", None):
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(str(e))
+    
+    if args.command == "scan":
+        from run_planner import build_plan, print_plan, write_plan
+        plan = build_plan(input_dir, output_dir, args.workers or None, args.threads_per_worker,
+                          args.chunk_pages, args.route_ocr, args.max_attempts, shard)
+        if args.json != "-":
+            print_plan(plan, verbose=not args.summary)
+        if args.json:
+            write_plan(plan, args.json)
+        return
+    if args.command == "status":
+        print_pipeline_status(input_dir, output_dir)
+        return
+    if args.command == "merge":
+        summaries = merge_node_state(output_dir, MANIFEST_CONFIG)
+        if not summaries:
+            print(f"{Colors.YELLOW}No node state in {output_dir / '.pipeline' / NODES_DIR}{Colors.RESET}")
+            return
+        print_node_status(summaries)
+        print(f"{Colors.GREEN}Merged manifest:{Colors.RESET} {output_dir / '.pipeline' / 'manifest.json'}")
+        update_index()
+        return
+    if args.command == "analyze":
+        from analyze_pdf_images import run_analysis
+        run_analysis(input_dir, args.inventory, args.workers)
+        return
+    
+    if args.chunk_pages or args.route_ocr:
+        print(f"{Colors.YELLOW}Note: chunks are converted separately, so heading levels are inferred per chunk "
+              f"and can differ from a single-shot conversion.{Colors.RESET}")
+    if args.no_autotune:
+        # Through the environment, so that worker processes see it too
+        os.environ[autotune.ENABLED_ENV] = "0"
+    if args.no_image_store:
+        os.environ[image_store.ENABLED_ENV] = "0"
+    if args.tables:
+        os.environ[table_extract.ENABLED_ENV] = "1"
+    node = None
+    if shard is not None or args.lease:
+        node = args.node or default_node_name(shard)
+        # Worker processes write their metrics to this node's own files
+        os.environ[pipeline_metrics.NODE_ENV] = node
+    
+    worker_address = None
+    if args.worker:
+        from warm_worker import parse_address
+        worker_address = parse_address(args.worker)
     
     print("Starting PDF processing...")
-    process_all_pdfs()
+    process_all_pdfs(
+        worker_address=worker_address,
+        workers=args.workers or None,
+        threads_per_worker=args.threads_per_worker,
+        max_worker_memory=args.max_worker_memory,
+        chunk_pages=args.chunk_pages,
+        route_ocr=args.route_ocr,
+        resume=args.resume,
+        max_attempts=args.max_attempts,
+        shard=shard,
+        lease=args.lease,
+        node=node,
+        lease_ttl=args.lease_ttl,
+    )
     print("\nPDF processing completed!")
+
+
+if __name__ == "__main__":
+    main()
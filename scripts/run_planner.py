@@ -0,0 +1,451 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: run_planner.py
+
+Purpose:
+    This module builds the work plan of a conversion run without loading any
+    models or changing any state, so a large run can be sized (and split
+    across machines) before it starts.
+
+    - Every input PDF is classified like a real run would (new, changed,
+      moved, interrupted, missing images, already done, failed too often),
+      using the manifest, the job queue and the cached pre-scan profiles.
+    - Page, OCR-page and image totals come from the pre-scan profiles; with
+      --chunk-pages or --route-ocr, pages already checkpointed by an
+      interrupted chunked conversion are subtracted.
+    - Time and memory estimates are calibrated from the document records of
+      previous runs (pdf/output/.pipeline/metrics.jsonl): median seconds per
+      page, median model load time and the 90th percentile of the peak RSS.
+      Without previous runs, conservative defaults are used and the plan says
+      so.
+    - The plan can be written as JSON, with a per-PDF time estimate that can
+      be used to balance shards.
+
+Usage:
+    Used by process_pdf.py:
+    python scripts/process_pdf.py scan --workers 4
+    python scripts/process_pdf.py scan --json pdf/output/.pipeline/plan.json
+    python scripts/process_pdf.py scan --json -      (JSON to stdout)
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - PyMuPDF (fitz), for PDFs without a cached pre-scan profile
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import sys
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pipeline_metrics
+from pdf_prescan import get_profile
+from page_router import route_page, ROUTE_OCR
+from chunked_convert import plan_page_ranges, get_chunk_root, get_chunk_dir, is_chunk_done, STATE_FILE
+from job_queue import DEFAULT_MAX_ATTEMPTS
+from sharding import in_shard
+
+PLAN_VERSION = 1
+
+# Used until previous runs have recorded metrics (Marker on CPU)
+DEFAULT_SECONDS_PER_PAGE = 3.0
+DEFAULT_MODEL_LOAD_SECONDS = 30.0
+# Most recent document records used for the calibration
+MAX_SAMPLES = 500
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    return values[middle] if len(values) % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def format_duration(seconds):
+    """
+    Format a duration for the terminal.
+
+    Args:
+        seconds (float): Duration in seconds
+
+    Returns:
+        str: e.g. "2h 05m", "12m 30s" or "45s"
+    """
+    seconds = int(round(seconds))
+    if seconds >= 3600:
+        return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m {seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def calibrate_estimates(metrics_dir=pipeline_metrics.DEFAULT_METRICS_DIR):
+    """
+    Derive per-page time, model load time and worker memory from previous runs.
+
+    Args:
+        metrics_dir (Path): Directory holding metrics.jsonl
+
+    Returns:
+        dict: seconds_per_page, model_load_seconds, peak_rss_mb (per
+            worker), samples (documents used) and calibrated (False when
+            the defaults were used)
+    """
+    records = pipeline_metrics.read_records(metrics_dir)
+    documents = [record for record in records
+                 if record.get("type") == "document" and record.get("ok")
+                 and record.get("counts", {}).get("pages")][-MAX_SAMPLES:]
+    model_loads = [record["seconds"] for record in records
+                   if record.get("type") == "span" and record.get("stage") == "model_load"]
+    # A worker's first document also pays for loading the models
+    model_loads += [record["spans"]["model_load"] for record in documents if "model_load" in record.get("spans", {})]
+
+    estimates = {
+        "seconds_per_page": DEFAULT_SECONDS_PER_PAGE,
+        "model_load_seconds": _median(model_loads[-MAX_SAMPLES:]) if model_loads else DEFAULT_MODEL_LOAD_SECONDS,
+        "peak_rss_mb": None,
+        "samples": len(documents),
+        "calibrated": bool(documents),
+    }
+    if documents:
+        estimates["seconds_per_page"] = _median(
+            [max(0.0, record["seconds"] - record.get("spans", {}).get("model_load", 0.0)) / record["counts"]["pages"]
+             for record in documents])
+        rss = [record["peak_rss_mb"] for record in documents if record.get("peak_rss_mb")]
+        if rss:
+            estimates["peak_rss_mb"] = _percentile(rss, 0.9)
+    if estimates["peak_rss_mb"] is None:
+        # Models plus a few pages in flight (see autotune.py)
+        import autotune
+        state = autotune.get_tuner().state
+        estimates["peak_rss_mb"] = state["model_mb"] + 4 * state["page_mb"]
+    return estimates
+
+
+def estimate_run(job_seconds, workers, estimates):
+    """
+    Estimate the wall time of a run.
+
+    Jobs are spread over the workers largest first, each worker loading the
+    models once.
+
+    Args:
+        job_seconds (list): Estimated conversion seconds of each job
+        workers (int): Worker processes
+        estimates (dict): Result of calibrate_estimates()
+
+    Returns:
+        dict: cpu_seconds (sum over jobs), wall_seconds and memory_mb (all workers)
+    """
+    workers = max(1, min(workers, len(job_seconds) or 1))
+    loads = [0.0] * workers
+    for seconds in sorted(job_seconds, reverse=True):
+        loads[loads.index(min(loads))] += seconds
+    model_load = estimates["model_load_seconds"] if job_seconds else 0.0
+    return {
+        "cpu_seconds": round(sum(job_seconds), 1),
+        "wall_seconds": round(max(loads) + model_load, 1),
+        "memory_mb": round(workers * estimates["peak_rss_mb"], 1) if job_seconds else 0.0,
+    }
+
+
+def _checkpointed_pages(pdf_path, chunk_root, ranges):
+    """
+    Count the pages already converted by an interrupted chunked conversion.
+    """
+    state_path = Path(chunk_root) / STATE_FILE
+    if not state_path.exists():
+        return 0
+    stat = Path(pdf_path).stat()
+    expected = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "ranges": [list(r) for r in ranges]}
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            if json.load(f) != expected:
+                return 0
+    except (OSError, ValueError):
+        return 0
+    return sum(end - start for start, end, _ in ranges if is_chunk_done(get_chunk_dir(chunk_root, start, end)))
+
+
+def plan_document(pdf_path, relative_path, output_dir, manifest, job_queue, estimates, chunk_pages=0, route_ocr=False):
+    """
+    Plan one input PDF.
+
+    Args:
+        pdf_path (Path): Path to the PDF file
+        relative_path (str): Directory of the PDF relative to the input directory
+        output_dir (Path): Root output directory
+        manifest (ConversionManifest): Record of finished conversions
+        job_queue (JobQueue): Durable queue of conversion jobs, or None
+        estimates (dict): Result of calibrate_estimates()
+        chunk_pages (int): Chunk size of the planned run, 0 for none
+        route_ocr (bool): Whether the planned run routes pages to OCR
+
+    Returns:
+        dict: Job entry of the plan
+    """
+    import process_pdf
+
+    state, job, source_key = process_pdf.classify_pdf_job(pdf_path, relative_path, output_dir, manifest, job_queue)
+    manifest_key, _, pdf_output_dir, sanitized_name, _ = job
+    if state in process_pdf.SKIP_STATES:
+        action = process_pdf.PLAN_SKIP
+    elif job_queue is not None and process_pdf.is_blocked(job_queue, manifest_key):
+        action = process_pdf.PLAN_BLOCKED
+    else:
+        action = process_pdf.PLAN_CONVERT
+
+    entry = {
+        "key": manifest_key,
+        "pdf": str(pdf_path),
+        "output_dir": str(pdf_output_dir),
+        "state": state,
+        "action": action,
+        "bytes": Path(pdf_path).stat().st_size,
+    }
+    if source_key is not None:
+        entry["source"] = source_key
+    if action != process_pdf.PLAN_CONVERT:
+        return entry
+
+    profile = get_profile(pdf_path)
+    routes = [route_page(page)[0] for page in profile["pages"]]
+    entry.update({
+        "pages": profile["page_count"],
+        "ocr_pages": sum(1 for route in routes if route == ROUTE_OCR),
+        "images": profile["image_count"],
+        "chunks": 1,
+        "done_pages": 0,
+    })
+    if chunk_pages or route_ocr:
+        ranges = plan_page_ranges(profile["page_count"], chunk_pages, routes if route_ocr else None)
+        entry["chunks"] = max(1, len(ranges))
+        if len(ranges) > 1 and state != process_pdf.JOB_NEW:
+            entry["done_pages"] = _checkpointed_pages(pdf_path, get_chunk_root(pdf_output_dir, sanitized_name), ranges)
+    remaining = entry["pages"] - entry["done_pages"]
+    entry["estimated_seconds"] = round(remaining * estimates["seconds_per_page"], 1)
+    return entry
+
+
+def build_plan(input_dir, output_dir, workers=1, threads_per_worker=None, chunk_pages=0, route_ocr=False,
+               max_attempts=DEFAULT_MAX_ATTEMPTS, shard=None):
+    """
+    Build the full work plan of a conversion run.
+
+    Nothing is written except pre-scan profiles of PDFs not scanned before.
+
+    Args:
+        input_dir (Path): Input directory
+        output_dir (Path): Root output directory
+        workers (int): Planned worker processes, None to derive them like convert does
+        threads_per_worker (int): Planned threads per worker
+        chunk_pages (int): Planned --chunk-pages
+        route_ocr (bool): Planned --route-ocr
+        max_attempts (int): Attempts per PDF before it is skipped as failed
+        shard (tuple): Only plan the PDFs of shard (i, N) (see sharding.py)
+
+    Returns:
+        dict: Plan with settings, totals, estimate and one entry per PDF
+    """
+    import process_pdf
+
+    output_dir = Path(output_dir)
+    if workers != 1:
+        from batch_scheduler import plan_workers
+        workers, threads_per_worker = plan_workers(workers, threads_per_worker)
+    estimates = calibrate_estimates(output_dir / ".pipeline")
+    manifest, job_queue = process_pdf.open_pipeline_state(output_dir, max_attempts)
+    _, _, dir_pdf_map = process_pdf.scan_input_structure(input_dir)
+
+    jobs = []
+    try:
+        for relative_path, pdf_files in sorted(dir_pdf_map.items()):
+            for file in sorted(pdf_files):
+                if not in_shard((Path(relative_path) / file).as_posix(), shard):
+                    continue
+                pdf_path = Path(input_dir) / relative_path / file
+                jobs.append(plan_document(pdf_path, relative_path, output_dir, manifest, job_queue, estimates,
+                                          chunk_pages, route_ocr))
+    finally:
+        if job_queue is not None:
+            job_queue.close()
+
+    convert = [job for job in jobs if job["action"] == process_pdf.PLAN_CONVERT]
+    by_state = {}
+    for job in jobs:
+        by_state[job["state"]] = by_state.get(job["state"], 0) + 1
+    totals = {
+        "pdfs": len(jobs),
+        "convert": len(convert),
+        "skip": sum(1 for job in jobs if job["action"] == process_pdf.PLAN_SKIP),
+        "blocked": sum(1 for job in jobs if job["action"] == process_pdf.PLAN_BLOCKED),
+        "by_state": by_state,
+        "partial": sum(1 for job in convert if job["state"] in (process_pdf.JOB_INTERRUPTED, process_pdf.JOB_IMAGES)
+                       or job["done_pages"]),
+        "pages": sum(job["pages"] for job in convert),
+        "remaining_pages": sum(job["pages"] - job["done_pages"] for job in convert),
+        "ocr_pages": sum(job["ocr_pages"] for job in convert),
+        "images": sum(job["images"] for job in convert),
+        "bytes": sum(job["bytes"] for job in convert),
+    }
+    # Parallel runs spread the chunks of a chunked PDF across the workers
+    pieces = []
+    for job in convert:
+        count = job["chunks"] if workers != 1 else 1
+        pieces += [job["estimated_seconds"] / count] * count
+    estimate = dict(estimates)
+    estimate.update(estimate_run(pieces, workers, estimates))
+    return {
+        "version": PLAN_VERSION,
+        "created": datetime.now().isoformat(timespec='seconds'),
+        "input_dir": str(Path(input_dir).resolve()),
+        "output_dir": str(output_dir.resolve()),
+        "settings": {
+            "workers": workers,
+            "threads_per_worker": threads_per_worker,
+            "chunk_pages": chunk_pages,
+            "route_ocr": route_ocr,
+            "max_attempts": max_attempts,
+            "shard": list(shard) if shard else None,
+        },
+        "totals": totals,
+        "estimate": estimate,
+        "jobs": jobs,
+    }
+
+
+# Labels of the classify_pdf_job() states in the printed plan
+STATE_LABELS = {
+    "done": (Colors.GREEN, "already processed"),
+    "moved": (Colors.GREEN, "same content as a converted PDF, outputs reused"),
+    "legacy": (Colors.GREEN, "already processed (before the manifest)"),
+    "changed": (Colors.YELLOW, "changed since last conversion"),
+    "interrupted": (Colors.YELLOW, "unfinished in a previous run"),
+    "images": (Colors.YELLOW, "Markdown present, images missing"),
+    "new": (Colors.YELLOW, "new"),
+}
+
+
+def print_plan(plan, verbose=True):
+    """
+    Print a plan built by build_plan().
+
+    Args:
+        plan (dict): Plan to print
+        verbose (bool): List every PDF, not only the totals
+    """
+    totals, estimate = plan["totals"], plan["estimate"]
+    if verbose:
+        print(f"{Colors.CYAN}Planned Work:{Colors.RESET}")
+        print("-" * 50)
+        current_dir = None
+        for job in plan["jobs"]:
+            relative_dir, file = os.path.split(job["key"])
+            if relative_dir != current_dir:
+                current_dir = relative_dir
+                print(f"\n{Colors.BLUE}Directory:{Colors.RESET} {relative_dir}")
+            color, label = STATE_LABELS[job["state"]]
+            if job["action"] == "skip":
+                print(f"  {color}✓{Colors.RESET} {file} - {label}")
+            elif job["action"] == "blocked":
+                print(f"  {Colors.RED}✗{Colors.RESET} {file} - {label}, failed "
+                      f"{plan['settings']['max_attempts']} times, skipped")
+            else:
+                done = f", {job['done_pages']} already checkpointed" if job["done_pages"] else ""
+                print(f"  {color}→{Colors.RESET} {file} - {label}: {job['pages']} pages{done}, "
+                      f"{job['images']} images, ~{format_duration(job['estimated_seconds'])}")
+        print()
+
+    print(f"{Colors.CYAN}Plan Summary:{Colors.RESET}")
+    print("-" * 50)
+    print(f"{Colors.BLUE}Input PDFs:{Colors.RESET} {totals['pdfs']}")
+    print(f"{Colors.GREEN}Up to date (skipped):{Colors.RESET} {totals['skip']}")
+    print(f"{Colors.YELLOW}To convert:{Colors.RESET} {totals['convert']} "
+          f"({totals['partial']} with partial outputs)")
+    if totals["blocked"]:
+        print(f"{Colors.RED}Failed too often (skipped):{Colors.RESET} {totals['blocked']}")
+    print(f"{Colors.BLUE}Pages:{Colors.RESET} {totals['remaining_pages']} to convert "
+          f"({totals['ocr_pages']} need OCR), {totals['images']} images, {totals['bytes'] / (1024 * 1024):.1f} MB of PDF")
+    source = (f"calibrated from {estimate['samples']} documents" if estimate["calibrated"]
+              else "defaults, no previous runs recorded")
+    print(f"{Colors.BLUE}Estimate ({source}):{Colors.RESET} {estimate['seconds_per_page']:.2f}s/page, "
+          f"{format_duration(estimate['wall_seconds'])} with {plan['settings']['workers']} worker(s) "
+          f"({format_duration(estimate['cpu_seconds'])} of conversion), "
+          f"~{estimate['memory_mb'] / 1024:.1f} GB of memory")
+
+
+def write_plan(plan, path):
+    """
+    Write a plan as JSON.
+
+    Args:
+        plan (dict): Plan built by build_plan()
+        path (str): Output file, "-" for stdout
+    """
+    if path == "-":
+        json.dump(plan, sys.stdout, indent=2, ensure_ascii=False)
+        sys.stdout.write("\n")
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def print_run_estimate(pdf_paths, workers=1, threads_per_worker=None,
+                       metrics_dir=pipeline_metrics.DEFAULT_METRICS_DIR):
+    """
+    Print the estimated cost of converting the planned PDFs (used by convert).
+
+    Args:
+        pdf_paths (list): PDFs about to be converted
+        workers (int): Worker processes, None to derive them like convert does
+        threads_per_worker (int): Threads per worker
+        metrics_dir (Path): Directory holding metrics.jsonl
+    """
+    if workers != 1:
+        from batch_scheduler import plan_workers
+        workers, _ = plan_workers(workers, threads_per_worker)
+    estimates = calibrate_estimates(metrics_dir)
+    pages = [get_profile(pdf_path)["page_count"] for pdf_path in pdf_paths]
+    estimate = estimate_run([count * estimates["seconds_per_page"] for count in pages], workers, estimates)
+    source = f"from {estimates['samples']} previous documents" if estimates["calibrated"] else "uncalibrated"
+    print(f"{Colors.BLUE}Estimated:{Colors.RESET} {len(pdf_paths)} PDFs, {sum(pages)} pages, "
+          f"~{format_duration(estimate['wall_seconds'])} with {workers} worker(s), "
+          f"~{estimate['memory_mb'] / 1024:.1f} GB ({source})")
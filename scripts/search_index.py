@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: search_index.py
+
+Purpose:
+    This module keeps a local full-text index (SQLite FTS5) of the Markdown
+    outputs, so finding the papers that mention a method or topic is a single
+    ranked query instead of a grep over thousands of files. It covers:
+    - pdf/output: converted documents
+    - llm_processed: processed documents, chapter files and structured results
+    - paper_skills: skill documents in by_topic / by_method / by_journal
+
+    Every file gets metadata taken from its path and content (publisher,
+    journal, paper, chapter, skill facet and category, title, section
+    headings, figure count). The index is updated incrementally: only files
+    whose size, mtime and hash changed are re-read, and deleted files are
+    dropped. process_pdf.py, chapter_splitter.py and llm_process.py update it
+    at the end of their runs.
+
+Usage:
+    python scripts/search_index.py update
+    python scripts/search_index.py search "hierarchical cross-entropy"
+    python scripts/search_index.py search "single cell" --kind chapter --journal Nature_Computational_Science
+    python scripts/search_index.py stats
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+ (sqlite3 with FTS5, included in the official builds)
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_DB_PATH = PROJECT_ROOT / "pdf" / "output" / ".pipeline" / "search.sqlite"
+
+# Indexed trees, by corpus name
+DEFAULT_ROOTS = {
+    "pdf_output": PROJECT_ROOT / "pdf" / "output",
+    "llm_processed": PROJECT_ROOT / "llm_processed",
+    "paper_skills": PROJECT_ROOT / "paper_skills",
+}
+
+# Column weights for ranking: title, headings, body
+RANK_WEIGHTS = (5.0, 2.0, 1.0)
+
+HEADING_PATTERN = re.compile(r"^#{1,6}\s+(.*?)\s*#*\s*$", re.MULTILINE)
+IMAGE_PATTERN = re.compile(r"!\[[^\]]*\]\(")
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def describe_path(corpus, relative):
+    """
+    Derive document metadata from the location of a Markdown file.
+
+    Args:
+        corpus (str): Corpus name (a key of DEFAULT_ROOTS)
+        relative (Path): Path relative to the corpus root
+
+    Returns:
+        dict: kind, publisher, journal, paper, chapter, facet and category
+    """
+    parts = relative.parts
+    info = {"kind": "document", "publisher": None, "journal": None, "paper": None,
+            "chapter": None, "facet": None, "category": None}
+    if corpus == "paper_skills":
+        info["kind"] = "skill"
+        info["facet"] = parts[0] if len(parts) > 1 else None
+        info["category"] = "/".join(parts[1:-1]) or None
+        info["paper"] = relative.stem
+        return info
+
+    directories = list(parts[:-1])
+    if directories and directories[-1] == "chapters":
+        info["kind"] = "chapter"
+        info["chapter"] = relative.stem
+        directories.pop()
+    elif relative.stem.endswith("_structured"):
+        info["kind"] = "structured"
+    # <publisher>/<journal>/<paper>/<file>, with fewer levels for shallow trees
+    if directories:
+        info["paper"] = directories[-1]
+    if len(directories) >= 2:
+        info["publisher"] = directories[0]
+    if len(directories) >= 3:
+        info["journal"] = directories[-2]
+    return info
+
+
+# Shown when a --raw query is not a valid FTS5 expression
+RAW_QUERY_USAGE = (
+    "FTS5 query syntax: terms are combined with AND; also OR, NOT, NEAR(a b, 10), "
+    "\"exact phrase\", prefix*, and column:term for title, headings or body. "
+    "Quotes and parentheses must be balanced; quote terms containing punctuation."
+)
+
+
+def _fts_query(text):
+    # Quote every term so user input never breaks the FTS5 syntax
+    terms = re.findall(r"\w[\w'-]*", text, re.UNICODE)
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+class SearchIndex:
+    """
+    SQLite FTS5 index of the Markdown outputs with per-document metadata.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH):
+        """
+        Open (or create) the index database.
+
+        Args:
+            db_path (Path): Location of the SQLite file
+        """
+        self.path = Path(db_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS documents (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    corpus TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    publisher TEXT,
+                    journal TEXT,
+                    paper TEXT,
+                    chapter TEXT,
+                    facet TEXT,
+                    category TEXT,
+                    title TEXT,
+                    sections TEXT,
+                    figures INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    indexed_at REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS documents_journal ON documents (journal)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS documents_paper ON documents (paper)")
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts
+                USING fts5(title, headings, body, tokenize = 'porter unicode61')
+            """)
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.conn.close()
+
+    def _index_file(self, corpus, root, path, stat, row):
+        with open(path, 'rb') as f:
+            data = f.read()
+        sha256 = hashlib.sha256(data).hexdigest()
+        if row is not None and row["sha256"] == sha256:
+            # Touched but unchanged: only remember the new mtime
+            self.conn.execute("UPDATE documents SET size = ?, mtime_ns = ? WHERE id = ?",
+                              (stat.st_size, stat.st_mtime_ns, row["id"]))
+            return False
+
+        text = data.decode('utf-8', errors='replace')
+        relative = path.relative_to(root)
+        info = describe_path(corpus, relative)
+        headings = HEADING_PATTERN.findall(text)
+        title = next((match.group(1) for match in re.finditer(r"^#\s+(.*?)\s*$", text, re.MULTILINE)),
+                     info["paper"] or relative.stem)
+        values = (path.as_posix(), corpus, info["kind"], info["publisher"], info["journal"], info["paper"],
+                  info["chapter"], info["facet"], info["category"], title, json.dumps(headings, ensure_ascii=False),
+                  len(IMAGE_PATTERN.findall(text)), stat.st_size, stat.st_mtime_ns, sha256, time.time())
+        if row is None:
+            cursor = self.conn.execute(
+                "INSERT INTO documents (path, corpus, kind, publisher, journal, paper, chapter, facet, category, "
+                "title, sections, figures, size, mtime_ns, sha256, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+            doc_id = cursor.lastrowid
+        else:
+            doc_id = row["id"]
+            self.conn.execute(
+                "UPDATE documents SET path = ?, corpus = ?, kind = ?, publisher = ?, journal = ?, paper = ?, "
+                "chapter = ?, facet = ?, category = ?, title = ?, sections = ?, figures = ?, size = ?, "
+                "mtime_ns = ?, sha256 = ?, indexed_at = ? WHERE id = ?", values + (doc_id,))
+            self.conn.execute("DELETE FROM documents_fts WHERE rowid = ?", (doc_id,))
+        self.conn.execute("INSERT INTO documents_fts (rowid, title, headings, body) VALUES (?, ?, ?, ?)",
+                          (doc_id, title, "\n".join(headings), text))
+        return True
+
+    def update(self, roots=None):
+        """
+        Bring the index up to date with the Markdown files on disk.
+
+        Args:
+            roots (dict): Corpus name to root directory (DEFAULT_ROOTS if None)
+
+        Returns:
+            dict: Numbers of files added or changed, unchanged and removed
+        """
+        roots = roots or DEFAULT_ROOTS
+        known = {row["path"]: row for row in self.conn.execute(
+            "SELECT id, path, size, mtime_ns, sha256 FROM documents")}
+        seen = set()
+        changed = 0
+        unchanged = 0
+        with self.conn:
+            for corpus, root in roots.items():
+                root = Path(root)
+                if not root.exists():
+                    continue
+                for directory, dirs, files in os.walk(root):
+                    # Skip pipeline state, the image store and temp directories
+                    dirs[:] = sorted(d for d in dirs if not d.startswith(".") and not d.endswith(".tmp"))
+                    for name in sorted(files):
+                        if not name.lower().endswith(".md"):
+                            continue
+                        if corpus == "paper_skills" and name == "index.md":
+                            # Generated category pages (skill_index.py) only repeat the documents
+                            continue
+                        path = Path(directory) / name
+                        key = path.as_posix()
+                        seen.add(key)
+                        stat = path.stat()
+                        row = known.get(key)
+                        if row is not None and row["size"] == stat.st_size and row["mtime_ns"] == stat.st_mtime_ns:
+                            unchanged += 1
+                        elif self._index_file(corpus, root, path, stat, row):
+                            changed += 1
+                        else:
+                            unchanged += 1
+
+            removed = [row["id"] for key, row in known.items() if key not in seen]
+            self.conn.executemany("DELETE FROM documents WHERE id = ?", [(doc_id,) for doc_id in removed])
+            self.conn.executemany("DELETE FROM documents_fts WHERE rowid = ?", [(doc_id,) for doc_id in removed])
+        return {"changed": changed, "unchanged": unchanged, "removed": len(removed)}
+
+    def search(self, query, limit=20, kind=None, journal=None, publisher=None, raw=False):
+        """
+        Run a ranked full-text query.
+
+        Args:
+            query (str): Search terms (all must match), or an FTS5 expression if raw
+            limit (int): Maximum results
+            kind (str): Only documents of this kind (document, chapter, structured, skill)
+            journal (str): Only documents of this journal directory
+            publisher (str): Only documents of this publisher directory
+            raw (bool): Pass the query to FTS5 unchanged (AND/OR/NEAR, prefix*)
+
+        Returns:
+            list: sqlite3.Row results with metadata, snippet and score (best
+                first), or None if a raw query is not valid FTS5 (the error and
+                the query syntax are printed)
+        """
+        match = query if raw else _fts_query(query)
+        if not match:
+            return []
+        sql = (
+            "SELECT documents.*, snippet(documents_fts, 2, '[', ']', '…', 16) AS snippet, "
+            f"bm25(documents_fts, {', '.join(str(weight) for weight in RANK_WEIGHTS)}) AS score "
+            "FROM documents_fts JOIN documents ON documents.id = documents_fts.rowid "
+            "WHERE documents_fts MATCH ?"
+        )
+        params = [match]
+        for column, value in (("kind", kind), ("journal", journal), ("publisher", publisher)):
+            if value:
+                sql += f" AND documents.{column} = ?"
+                params.append(value)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(limit)
+        if not raw:
+            return self.conn.execute(sql, params).fetchall()
+        try:
+            return self.conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"{Colors.RED}Invalid search query {query!r}: {str(e)}{Colors.RESET}")
+            print(RAW_QUERY_USAGE)
+            return None
+
+    def stats(self):
+        """
+        Count the indexed documents per corpus and kind.
+
+        Returns:
+            list: sqlite3.Row objects with corpus, kind, documents and bytes
+        """
+        return self.conn.execute(
+            "SELECT corpus, kind, COUNT(*) AS documents, SUM(size) AS bytes "
+            "FROM documents GROUP BY corpus, kind ORDER BY corpus, kind"
+        ).fetchall()
+
+
+def update_index(db_path=DEFAULT_DB_PATH, roots=None):
+    """
+    Update the search index at the end of a pipeline step.
+
+    Failures are reported but never fail the calling step.
+
+    Args:
+        db_path (Path): Location of the index
+        roots (dict): Corpus name to root directory (DEFAULT_ROOTS if None)
+
+    Returns:
+        dict: Update counts, or None if the update failed
+    """
+    try:
+        index = SearchIndex(db_path)
+        try:
+            counts = index.update(roots)
+        finally:
+            index.close()
+    except Exception as e:
+        print(f"{Colors.YELLOW}Search index not updated: {str(e)}{Colors.RESET}")
+        return None
+    if counts["changed"] or counts["removed"]:
+        print(f"{Colors.BLUE}Search index:{Colors.RESET} {counts['changed']} updated, "
+              f"{counts['removed']} removed, {counts['unchanged']} unchanged")
+    return counts
+
+
+def print_results(rows, elapsed):
+    """
+    Print ranked search results with their snippets.
+
+    Args:
+        rows (list): Results of SearchIndex.search()
+        elapsed (float): Query time in seconds
+    """
+    print(f"{Colors.CYAN}{len(rows)} results in {elapsed * 1000:.1f} ms{Colors.RESET}")
+    for number, row in enumerate(rows, start=1):
+        location = " / ".join(value for value in (row["publisher"], row["journal"], row["paper"]) if value)
+        detail = row["chapter"] or row["category"] or row["kind"]
+        print(f"{Colors.GREEN}{number}. {row['title']}{Colors.RESET} ({detail}, {row['figures']} figures)")
+        if location:
+            print(f"   {Colors.BLUE}{location}{Colors.RESET}")
+        print(f"   {os.path.relpath(row['path'], PROJECT_ROOT)}")
+        print(f"   {' '.join(row['snippet'].split())}")
+
+
+def main():
+    """
+    Main function to update and query the search index.
+    """
+    parser = argparse.ArgumentParser(description="Full-text search over the Markdown outputs")
+    parser.add_argument("command", choices=["update", "search", "stats"],
+                        help="update: index new and changed files; search: ranked query; stats: index contents")
+    parser.add_argument("query", nargs="?", help="Search terms (for search)")
+    parser.add_argument("--db", default=str(DEFAULT_DB_PATH), help="Index database (default: %(default)s)")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum results (default: %(default)s)")
+    parser.add_argument("--kind", choices=["document", "chapter", "structured", "skill"],
+                        help="Only results of this kind")
+    parser.add_argument("--journal", help="Only results of this journal directory")
+    parser.add_argument("--publisher", help="Only results of this publisher directory")
+    parser.add_argument("--raw", action="store_true",
+                        help="Use the query as an FTS5 expression (AND, OR, NEAR, prefix*)")
+    parser.add_argument("--no-update", action="store_true", help="Search without updating the index first")
+    args = parser.parse_args()
+
+    if args.command == "search" and not args.query:
+        parser.error("search needs a query")
+
+    index = SearchIndex(args.db)
+    try:
+        if args.command == "update" or (args.command == "search" and not args.no_update):
+            counts = index.update()
+            if args.command == "update":
+                print(f"{Colors.GREEN}Index updated:{Colors.RESET} {counts['changed']} updated, "
+                      f"{counts['removed']} removed, {counts['unchanged']} unchanged")
+        if args.command == "search":
+            start = time.perf_counter()
+            rows = index.search(args.query, args.limit, args.kind, args.journal, args.publisher, args.raw)
+            if rows is None:
+                parser.exit(2)
+            print_results(rows, time.perf_counter() - start)
+        elif args.command == "stats":
+            print(f"{Colors.CYAN}Search index:{Colors.RESET} {index.path}")
+            for row in index.stats():
+                print(f"{Colors.BLUE}{row['corpus']} / {row['kind']}:{Colors.RESET} {row['documents']} files, "
+                      f"{(row['bytes'] or 0) / (1024 * 1024):.1f} MB")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
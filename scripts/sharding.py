@@ -0,0 +1,637 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: sharding.py
+
+Purpose:
+    This module lets several nodes that share pdf/input and pdf/output over a
+    network filesystem convert one corpus together, without converting any
+    PDF twice or racing on an output directory.
+
+    - Static sharding: --shard i/N gives each PDF to exactly one of N nodes,
+      by a hash of its path relative to pdf/input, so every node can decide
+      on its own which PDFs are its share.
+    - Leases: --lease makes a node claim a PDF before converting it, with a
+      lease file next to the PDF's output directory, created atomically
+      (O_CREAT | O_EXCL) and renewed by a heartbeat thread. Leases of a
+      node that died expire and are taken over. Renewal, takeover and
+      release compare the lease's token and rewrite it under a short-lived
+      lock file (also O_EXCL), so a node can never renew a lease another
+      node has taken over. A node that lost a lease discards that PDF's
+      work instead of committing its Markdown or recording it as done.
+      Leases also guard static shards against two nodes started with the
+      same shard.
+    - Per-node state: every node keeps its own manifest and job queue in
+      pdf/output/.pipeline/nodes/<node>/, so no state file is written by two
+      nodes. A node starts from its peers' manifests, so PDFs converted by
+      another node (e.g. after changing N) are not converted again.
+    - Merge: `process_pdf.py merge` combines the per-node manifests into
+      pdf/output/.pipeline/manifest.json, prints the status of every node
+      and updates the search index.
+
+Usage:
+    Used by process_pdf.py:
+    python scripts/process_pdf.py convert --shard 1/3 --lease     (on node 1)
+    python scripts/process_pdf.py convert --shard 2/3 --lease     (on node 2)
+    python scripts/process_pdf.py convert --lease                 (work-stealing, any number of nodes)
+    python scripts/process_pdf.py merge
+
+    Several local processes with --node NAME behave like separate nodes.
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import socket
+import hashlib
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+# Node name inherited by worker processes (see pipeline_metrics.py)
+NODE_ENV = "PAPER2SKILL_NODE"
+NODES_DIR = "nodes"
+LEASE_SUFFIX = ".lease"
+DEFAULT_LEASE_TTL = 600
+LOCK_SUFFIX = ".lock"
+# Seconds after which the lock of a lease is considered left by a dead process
+LOCK_TIMEOUT = 30
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+class LeaseLost(Exception):
+    """
+    Raised when a PDF's lease was taken over by another node mid-conversion.
+    """
+
+
+def parse_shard(text):
+    """
+    Parse a --shard argument.
+
+    Args:
+        text (str): "i/N" with 1 <= i <= N
+
+    Returns:
+        tuple: (i, N)
+
+    Raises:
+        ValueError: If the argument is malformed
+    """
+    match = re.fullmatch(r"\s*(\d+)\s*/\s*(\d+)\s*", text or "")
+    if not match:
+        raise ValueError(f"Expected --shard i/N, got {text!r}")
+    index, count = int(match.group(1)), int(match.group(2))
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard index must be between 1 and {count}, got {index}")
+    return index, count
+
+
+def shard_of(key, count):
+    """
+    Get the shard of a PDF.
+
+    Args:
+        key (str): PDF path relative to the input directory (manifest key)
+        count (int): Number of shards
+
+    Returns:
+        int: Shard index, 1 to count
+    """
+    digest = hashlib.sha1(key.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def in_shard(key, shard):
+    """
+    Check whether a PDF belongs to a shard.
+
+    Args:
+        key (str): PDF path relative to the input directory
+        shard (tuple): (i, N), or None for all PDFs
+
+    Returns:
+        bool: True if the PDF is part of the shard
+    """
+    return shard is None or shard_of(key, shard[1]) == shard[0]
+
+
+def default_node_name(shard=None):
+    """
+    Name this node: the host name, plus the shard if there is one.
+
+    Args:
+        shard (tuple): (i, N), or None
+
+    Returns:
+        str: Node name safe for file names
+    """
+    name = socket.gethostname().split(".")[0] or "node"
+    if shard is not None:
+        name += f"-{shard[0]}of{shard[1]}"
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+
+
+def get_node_dir(pipeline_dir, node):
+    """
+    Get the state directory of one node.
+
+    Args:
+        pipeline_dir (Path): pdf/output/.pipeline
+        node (str): Node name
+
+    Returns:
+        Path: Directory holding the node's manifest.json and jobs.sqlite
+    """
+    return Path(pipeline_dir) / NODES_DIR / node
+
+
+def list_nodes(pipeline_dir):
+    """
+    List the nodes that have written state.
+
+    Args:
+        pipeline_dir (Path): pdf/output/.pipeline
+
+    Returns:
+        list: Node names, sorted
+    """
+    nodes_dir = Path(pipeline_dir) / NODES_DIR
+    if not nodes_dir.exists():
+        return []
+    return sorted(path.name for path in nodes_dir.iterdir() if path.is_dir())
+
+
+def get_lease_path(pdf_output_dir):
+    """
+    Get the lease file of a PDF (next to its output directory).
+
+    Args:
+        pdf_output_dir (Path): Per-PDF output directory
+
+    Returns:
+        Path: Lease file
+    """
+    pdf_output_dir = Path(pdf_output_dir)
+    return pdf_output_dir.parent / f".{pdf_output_dir.name}{LEASE_SUFFIX}"
+
+
+def _read_lease(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _is_live(path, ttl):
+    """
+    Check whether a lease file is held (unexpired, or still being written).
+    """
+    current = _read_lease(path)
+    if current is not None:
+        return current.get("expires", 0) > time.time()
+    # Unreadable: a lease just created and not written yet, unless it is old
+    try:
+        return time.time() - Path(path).stat().st_mtime < ttl
+    except OSError:
+        return False
+
+
+def _break_stale_lock(lock_path):
+    # Renamed first, so that of two nodes breaking the lock only one removes it
+    stale = lock_path.with_name(f"{lock_path.name}.{os.getpid()}.{uuid.uuid4().hex}.stale")
+    try:
+        os.rename(lock_path, stale)
+    except FileNotFoundError:
+        return
+    try:
+        if time.time() - stale.stat().st_mtime <= LOCK_TIMEOUT:
+            # A fresh lock replaced the stale one in the meantime: put it back
+            os.link(stale, lock_path)
+    except OSError:
+        pass
+    os.remove(stale)
+
+
+@contextmanager
+def _lease_lock(path):
+    """
+    Hold the lock of a lease file while reading and rewriting it.
+
+    Args:
+        path (Path): Lease file
+
+    Raises:
+        TimeoutError: If the lock stays held by a live process
+    """
+    lock_path = path.with_name(path.name + LOCK_SUFFIX)
+    deadline = time.time() + 2 * LOCK_TIMEOUT
+    while True:
+        try:
+            os.close(os.open(str(lock_path), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+            break
+        except FileExistsError:
+            try:
+                age = time.time() - lock_path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+            if age > LOCK_TIMEOUT:
+                _break_stale_lock(lock_path)
+            elif time.time() > deadline:
+                raise TimeoutError(f"Lease lock {lock_path} is held")
+            else:
+                time.sleep(0.01)
+    try:
+        yield
+    finally:
+        try:
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+
+
+def holds_lease(lease):
+    """
+    Check a lease claim, e.g. in a worker process converting the leased PDF.
+
+    Args:
+        lease (tuple): (lease file, token) from LeaseManager.claim()
+
+    Returns:
+        bool: True unless another node took the lease over
+    """
+    path, token = lease
+    current = _read_lease(path)
+    return current is not None and current.get("token") == token
+
+
+def check_lease(lease):
+    """
+    Make sure a lease is still held before committing the work it guards.
+
+    Args:
+        lease (tuple): (lease file, token) from LeaseManager.claim(), or None
+            when the PDF is not leased
+
+    Raises:
+        LeaseLost: If another node took the lease over
+    """
+    if lease is not None and not holds_lease(lease):
+        current = _read_lease(lease[0])
+        raise LeaseLost(f"Lease {lease[0]} was taken over by {current.get('node') if current else 'nobody'}")
+
+
+class LeaseManager:
+    """
+    Exclusive, expiring claims on PDFs, shared through the output tree.
+
+    A lease is a small JSON file (node, pid, token, expiry). A heartbeat
+    thread renews every held lease at a third of its lifetime, so a lease
+    only expires when its node stops. Leases found taken over by another
+    node are remembered in lost.
+    """
+
+    def __init__(self, node, ttl=DEFAULT_LEASE_TTL):
+        """
+        Initialize the manager and start the heartbeat.
+
+        Args:
+            node (str): Name of this node
+            ttl (float): Seconds a lease stays valid without renewal
+        """
+        self.node = node
+        self.ttl = ttl
+        self.held = {}
+        self.lost = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._heartbeat, name="lease-heartbeat", daemon=True)
+        self._thread.start()
+
+    def _content(self, token):
+        return {
+            "node": self.node,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "token": token,
+            "expires": time.time() + self.ttl,
+        }
+
+    def _write(self, path, content):
+        # Written beside the lease and renamed over it, so readers never see a partial file
+        tmp_path = path.with_name(f"{path.name}.{self.node}.{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(content, f)
+        os.replace(tmp_path, path)
+
+    def acquire(self, path):
+        """
+        Try to claim a lease.
+
+        Args:
+            path (Path): Lease file (see get_lease_path())
+
+        Returns:
+            bool: True if this node now holds the lease
+        """
+        path = Path(path)
+        if path in self.held:
+            return True
+        token = uuid.uuid4().hex
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            fd = os.open(str(path), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            with _lease_lock(path):
+                if _is_live(path, self.ttl):
+                    return False
+                # Expired lease of a stopped node: take it over
+                self._write(path, self._content(token))
+        else:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._content(token), f)
+        with self._lock:
+            self.held[path] = token
+            self.lost.discard(path)
+        return True
+
+    def claim(self, path):
+        """
+        Get the claim of a held lease, for the process doing the conversion.
+
+        Args:
+            path (Path): Lease file
+
+        Returns:
+            tuple: (lease file, token) for check_lease(), or None if not held
+        """
+        path = Path(path)
+        with self._lock:
+            token = self.held.get(path)
+        return None if token is None else (str(path), token)
+
+    def owner(self, path):
+        """
+        Get the node holding a lease.
+
+        Args:
+            path (Path): Lease file
+
+        Returns:
+            str: Node name, or None if the lease is free or expired
+        """
+        current = _read_lease(path)
+        if current is None or current.get("expires", 0) <= time.time():
+            return None
+        return current.get("node")
+
+    def renew(self, path):
+        """
+        Extend a held lease.
+
+        The token is compared and the lease rewritten under the lease's lock,
+        so a lease another node took over is never overwritten.
+
+        Args:
+            path (Path): Lease file
+
+        Returns:
+            bool: False if the lease was lost to another node
+        """
+        path = Path(path)
+        with self._lock:
+            token = self.held.get(path)
+        if token is None:
+            return False
+        with _lease_lock(path):
+            current = _read_lease(path)
+            if current is not None and current.get("token") == token:
+                self._write(path, self._content(token))
+                return True
+        with self._lock:
+            self.held.pop(path, None)
+            self.lost.add(path)
+        print(f"{Colors.RED}Lost lease {path} to {current.get('node') if current else 'nobody'}{Colors.RESET}")
+        return False
+
+    def is_held(self, path):
+        """
+        Check that a lease is still held, renewing it, before committing its work.
+
+        Args:
+            path (Path): Lease file
+
+        Returns:
+            bool: False if the lease was lost (the work must be discarded)
+        """
+        path = Path(path)
+        if path in self.lost:
+            return False
+        try:
+            return self.renew(path)
+        except OSError as e:
+            print(f"{Colors.YELLOW}Could not renew lease {path}: {str(e)}{Colors.RESET}")
+            return holds_lease((path, self.held.get(path)))
+
+    def release(self, path):
+        """
+        Give up a lease.
+
+        Args:
+            path (Path): Lease file
+        """
+        path = Path(path)
+        with self._lock:
+            token = self.held.pop(path, None)
+        if token is None:
+            return
+        with _lease_lock(path):
+            current = _read_lease(path)
+            if current is not None and current.get("token") == token:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.ttl / 3):
+            with self._lock:
+                paths = list(self.held)
+            for path in paths:
+                try:
+                    self.renew(path)
+                except OSError as e:
+                    print(f"{Colors.YELLOW}Could not renew lease {path}: {str(e)}{Colors.RESET}")
+
+    def close(self):
+        """
+        Stop the heartbeat and release every held lease.
+        """
+        self._stop.set()
+        self._thread.join()
+        for path in list(self.held):
+            try:
+                self.release(path)
+            except OSError as e:
+                print(f"{Colors.YELLOW}Could not release lease {path}: {str(e)}{Colors.RESET}")
+
+
+class PeerManifests:
+    """
+    Read-only view of the manifests of the other nodes.
+
+    Manifest files are re-read when they change, so PDFs finished by a peer
+    during this run are seen too.
+    """
+
+    def __init__(self, pipeline_dir, node, config):
+        """
+        Initialize the view.
+
+        Args:
+            pipeline_dir (Path): pdf/output/.pipeline
+            node (str): Name of this node (excluded)
+            config (dict): Converter settings that affect the output
+        """
+        self.pipeline_dir = Path(pipeline_dir)
+        self.node = node
+        self.config = config
+        self._manifests = {}
+
+    def manifests(self):
+        """
+        Load the current peer manifests.
+
+        Returns:
+            list: ConversionManifest objects, one per peer node (plus the
+                merged manifest, if any)
+        """
+        from conversion_manifest import ConversionManifest
+
+        paths = [get_node_dir(self.pipeline_dir, peer) / "manifest.json"
+                 for peer in list_nodes(self.pipeline_dir) if peer != self.node]
+        paths.append(self.pipeline_dir / "manifest.json")
+        manifests = []
+        for path in paths:
+            try:
+                mtime = path.stat().st_mtime_ns
+            except OSError:
+                continue
+            cached = self._manifests.get(path)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, ConversionManifest(path, self.config, output_root=self.pipeline_dir.parent))
+                self._manifests[path] = cached
+            manifests.append(cached[1])
+        return manifests
+
+    def find_done(self, key, pdf_path, output_dir):
+        """
+        Find a peer's record of an up-to-date conversion of a PDF.
+
+        Args:
+            key (str): PDF path relative to the input directory
+            pdf_path (Path): Path to the PDF file
+            output_dir (Path): Per-PDF output directory
+
+        Returns:
+            dict: The peer's manifest entry, or None
+        """
+        from conversion_manifest import STATUS_DONE
+
+        for manifest in self.manifests():
+            # Only entries for this very key: a lookup without one would hash the PDF
+            if key in manifest.entries and manifest.lookup(key, pdf_path, output_dir)[0] == STATUS_DONE:
+                return manifest.entries[key]
+        return None
+
+
+def merge_node_state(output_dir, config, write=True):
+    """
+    Combine the per-node manifests and summarize every node.
+
+    For PDFs recorded by several nodes, the most recent conversion wins.
+
+    Args:
+        output_dir (Path): Root output directory
+        config (dict): Converter settings that affect the output
+        write (bool): Write the merged manifest to .pipeline/manifest.json
+
+    Returns:
+        dict: Node name to its summary (converted PDFs and job counts)
+    """
+    from conversion_manifest import ConversionManifest
+    from job_queue import JobQueue
+
+    pipeline_dir = Path(output_dir) / ".pipeline"
+    merged = ConversionManifest(pipeline_dir / "manifest.json", config)
+    summaries = {}
+    for node in list_nodes(pipeline_dir):
+        node_dir = get_node_dir(pipeline_dir, node)
+        manifest = ConversionManifest(node_dir / "manifest.json", config, output_root=output_dir)
+        merged.merge(manifest.entries)
+        counts = {}
+        if (node_dir / "jobs.sqlite").exists():
+            # Peers' databases are only read: no DDL, no journal mode change
+            job_queue = JobQueue(node_dir / "jobs.sqlite", read_only=True)
+            try:
+                counts = job_queue.counts()
+            finally:
+                job_queue.close()
+        summaries[node] = {"converted": len(manifest.entries), "jobs": counts}
+    if write and summaries:
+        merged.save()
+    return summaries
+
+
+def print_node_status(summaries):
+    """
+    Print the per-node summaries of merge_node_state().
+
+    Args:
+        summaries (dict): Node name to summary
+    """
+    from job_queue import STATE_DONE, STATE_QUEUED, STATE_RUNNING, STATE_FAILED
+
+    print(f"{Colors.CYAN}Nodes:{Colors.RESET} {len(summaries)}")
+    print("-" * 50)
+    for node, summary in summaries.items():
+        jobs = summary["jobs"]
+        print(f"  {Colors.BLUE}{node}{Colors.RESET}: {summary['converted']} converted, "
+              f"{Colors.GREEN}{jobs.get(STATE_DONE, 0)} done{Colors.RESET}, "
+              f"{jobs.get(STATE_QUEUED, 0)} queued, "
+              f"{Colors.YELLOW}{jobs.get(STATE_RUNNING, 0)} running{Colors.RESET}, "
+              f"{Colors.RED}{jobs.get(STATE_FAILED, 0)} failed{Colors.RESET}")
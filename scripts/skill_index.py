@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: skill_index.py
+
+Purpose:
+    This script maintains the hierarchical index pages of paper_skills: an
+    index.md in by_topic, by_method, by_journal and every category directory
+    below them, listing the skill documents of the category (title and summary)
+    and its subcategories with their document counts. One article may appear
+    in several categories.
+
+    The builder tracks which skill documents feed which index pages, so a run
+    only rewrites the pages affected by what changed:
+    - a new or deleted skill document: its category page and the pages of all
+      parent categories (their counts change)
+    - a changed title or summary: its category page only
+    - any other edit: no page at all
+
+    Skill documents are only re-read when their size or mtime changed, and a
+    page is only written when its content differs, so updating a large library
+    costs O(changes) rather than O(corpus).
+
+Usage:
+    python scripts/skill_index.py
+    python scripts/skill_index.py --force
+
+    The dependency state is stored in pdf/output/.pipeline/skill_index.json
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import re
+import json
+import hashlib
+import argparse
+from pathlib import PurePosixPath, Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_SKILLS_DIR = PROJECT_ROOT / "paper_skills"
+DEFAULT_STATE_PATH = PROJECT_ROOT / "pdf" / "output" / ".pipeline" / "skill_index.json"
+
+# Bump when the page layout changes so that every page is rewritten
+INDEX_VERSION = 1
+
+FACETS = ("by_topic", "by_method", "by_journal")
+INDEX_NAME = "index.md"
+
+# Characters of the first paragraph shown as a document's summary
+SUMMARY_LENGTH = 200
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def display_name(name):
+    """
+    Turn a directory name into a page title, e.g. machine_learning -> Machine Learning.
+
+    Args:
+        name (str): Directory name
+
+    Returns:
+        str: Title
+    """
+    return " ".join(word[:1].upper() + word[1:] for word in re.split(r"[_\-\s]+", name) if word)
+
+
+def describe_skill(text, fallback_title):
+    """
+    Get the title and summary of a skill document.
+
+    Args:
+        text (str): Document content
+        fallback_title (str): Title to use without a level-1 heading
+
+    Returns:
+        dict: title and summary
+    """
+    title = None
+    summary = ""
+    in_code = False
+    for block in re.split(r"\n\s*\n", text):
+        block = block.strip()
+        if block.startswith("```"):
+            in_code = not in_code if block.count("```") % 2 else in_code
+            continue
+        if in_code or not block:
+            continue
+        if title is None and block.startswith("# "):
+            title = block.splitlines()[0][2:].strip()
+            continue
+        if block.startswith(("#", "|", ">", "-", "*", "!", "<")):
+            continue
+        summary = " ".join(block.split())
+        break
+    if len(summary) > SUMMARY_LENGTH:
+        summary = summary[:SUMMARY_LENGTH].rsplit(" ", 1)[0] + "…"
+    return {"title": title or display_name(fallback_title), "summary": summary}
+
+
+def page_of(doc_path):
+    """
+    Get the index page a skill document is listed on.
+
+    Args:
+        doc_path (str): Document path relative to paper_skills (POSIX)
+
+    Returns:
+        str: Index page path relative to paper_skills
+    """
+    return str(PurePosixPath(doc_path).parent / INDEX_NAME)
+
+
+def ancestor_pages(doc_path):
+    """
+    Get the index pages of every category above a document's own.
+
+    Args:
+        doc_path (str): Document path relative to paper_skills (POSIX)
+
+    Returns:
+        list: Index page paths, from the parent category up to the facet root
+    """
+    directory = PurePosixPath(doc_path).parent
+    pages = []
+    while len(directory.parts) > 1:
+        directory = directory.parent
+        pages.append(str(directory / INDEX_NAME))
+    return pages
+
+
+class SkillIndexBuilder:
+    """
+    Dependency-tracked builder of the paper_skills index pages.
+
+    The state file remembers, per skill document, the fingerprint (size,
+    mtime, hash) and the entry shown on its index page, plus the hash of every
+    page written.
+    """
+
+    def __init__(self, skills_dir=DEFAULT_SKILLS_DIR, state_path=DEFAULT_STATE_PATH):
+        """
+        Initialize the builder.
+
+        Args:
+            skills_dir (Path): paper_skills directory
+            state_path (Path): Dependency state file
+        """
+        self.skills_dir = Path(skills_dir)
+        self.state_path = Path(state_path)
+        self.state = self._load()
+
+    def _load(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get("version") == INDEX_VERSION:
+                return state
+        except (OSError, ValueError):
+            pass
+        return {"version": INDEX_VERSION, "documents": {}, "pages": {}}
+
+    def save(self):
+        """
+        Persist the dependency state (temp file + rename).
+        """
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_name(self.state_path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def scan(self):
+        """
+        Find the skill documents on disk.
+
+        Returns:
+            dict: Document path relative to paper_skills -> os.stat_result
+        """
+        found = {}
+        for facet in FACETS:
+            facet_dir = self.skills_dir / facet
+            if not facet_dir.exists():
+                continue
+            for directory, dirs, files in os.walk(facet_dir):
+                dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+                for name in files:
+                    if name.lower().endswith(".md") and name != INDEX_NAME:
+                        path = Path(directory) / name
+                        found[path.relative_to(self.skills_dir).as_posix()] = path.stat()
+        return found
+
+    def find_dirty_pages(self, force=False):
+        """
+        Update the document state and work out which pages must be rebuilt.
+
+        Args:
+            force (bool): Treat every page as dirty
+
+        Returns:
+            tuple: (set of dirty page paths, dict of counts added/changed/removed/unchanged)
+        """
+        documents = self.state["documents"]
+        found = self.scan()
+        dirty = set()
+        counts = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+
+        for doc_path in sorted(set(documents) - set(found)):
+            # Removed: its page loses an entry, every ancestor a count
+            del documents[doc_path]
+            dirty.add(page_of(doc_path))
+            dirty.update(ancestor_pages(doc_path))
+            counts["removed"] += 1
+
+        for doc_path, stat in sorted(found.items()):
+            record = documents.get(doc_path)
+            if record is not None and record["size"] == stat.st_size and record["mtime_ns"] == stat.st_mtime_ns:
+                counts["unchanged"] += 1
+                continue
+            with open(self.skills_dir / doc_path, 'rb') as f:
+                data = f.read()
+            sha256 = hashlib.sha256(data).hexdigest()
+            if record is not None and record["sha256"] == sha256:
+                record.update({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns})
+                counts["unchanged"] += 1
+                continue
+            entry = describe_skill(data.decode('utf-8', errors='replace'), PurePosixPath(doc_path).stem)
+            if record is None:
+                dirty.add(page_of(doc_path))
+                dirty.update(ancestor_pages(doc_path))
+                counts["added"] += 1
+            else:
+                if entry != record["entry"]:
+                    dirty.add(page_of(doc_path))
+                counts["changed"] += 1
+            documents[doc_path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                   "sha256": sha256, "entry": entry}
+
+        if force:
+            dirty.update(self.all_pages())
+        # Pages deleted or edited by hand are rebuilt as well
+        for page in self.all_pages():
+            if page not in dirty and not self._page_is_current(page):
+                dirty.add(page)
+        return dirty, counts
+
+    def _page_is_current(self, page):
+        expected = self.state["pages"].get(page)
+        path = self.skills_dir / page
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        return (expected is not None and expected["size"] == stat.st_size
+                and expected["mtime_ns"] == stat.st_mtime_ns)
+
+    def all_pages(self):
+        """
+        List every index page the current documents need.
+
+        Returns:
+            set: Page paths relative to paper_skills (facet roots always included)
+        """
+        pages = {f"{facet}/{INDEX_NAME}" for facet in FACETS if (self.skills_dir / facet).exists()}
+        for doc_path in self.state["documents"]:
+            pages.add(page_of(doc_path))
+            pages.update(ancestor_pages(doc_path))
+        return pages
+
+    def render_page(self, page, tree):
+        """
+        Render one index page from the recorded entries.
+
+        Args:
+            page (str): Page path relative to paper_skills
+            tree (dict): Directory -> {"docs": [doc paths], "children": set, "total": int}
+
+        Returns:
+            str: Markdown content
+        """
+        directory = str(PurePosixPath(page).parent)
+        node = tree.get(directory, {"docs": [], "children": set(), "total": 0})
+        lines = [f"# {display_name(PurePosixPath(directory).name)}", ""]
+        parent = PurePosixPath(directory).parent
+        if len(PurePosixPath(directory).parts) > 1:
+            lines.extend([f"[↑ {display_name(parent.name)}](../{INDEX_NAME})", ""])
+        lines.extend([f"{node['total']} skill documents in this category.", ""])
+
+        if node["children"]:
+            lines.extend(["## Subcategories", ""])
+            for child in sorted(node["children"]):
+                name = PurePosixPath(child).name
+                lines.append(f"- [{display_name(name)}]({name}/{INDEX_NAME}) ({tree[child]['total']})")
+            lines.append("")
+
+        if node["docs"]:
+            lines.extend(["## Skill documents", ""])
+            documents = self.state["documents"]
+            for doc_path in sorted(node["docs"], key=lambda path: documents[path]["entry"]["title"].lower()):
+                entry = documents[doc_path]["entry"]
+                line = f"- [{entry['title']}]({PurePosixPath(doc_path).name})"
+                if entry["summary"]:
+                    line += f": {entry['summary']}"
+                lines.append(line)
+            lines.append("")
+        return "\n".join(lines)
+
+    def build_tree(self):
+        """
+        Group the recorded documents by category directory.
+
+        Returns:
+            dict: Directory -> {"docs": [doc paths], "children": set, "total": int}
+        """
+        tree = {}
+        for doc_path in self.state["documents"]:
+            directory = PurePosixPath(doc_path).parent
+            tree.setdefault(str(directory), {"docs": [], "children": set(), "total": 0})["docs"].append(doc_path)
+            while True:
+                tree.setdefault(str(directory), {"docs": [], "children": set(), "total": 0})["total"] += 1
+                if len(directory.parts) <= 1:
+                    break
+                tree.setdefault(str(directory.parent), {"docs": [], "children": set(), "total": 0})[
+                    "children"].add(str(directory))
+                directory = directory.parent
+        return tree
+
+    def update(self, force=False):
+        """
+        Rewrite the index pages affected by changes since the last run.
+
+        Args:
+            force (bool): Rewrite every page
+
+        Returns:
+            dict: Document counts plus pages written and removed
+        """
+        dirty, counts = self.find_dirty_pages(force)
+        needed = self.all_pages()
+        tree = self.build_tree()
+        written = 0
+        removed = 0
+        for page in sorted(dirty):
+            path = self.skills_dir / page
+            if page not in needed:
+                # Category without documents left
+                if path.exists():
+                    path.unlink()
+                    removed += 1
+                self.state["pages"].pop(page, None)
+                continue
+            content = self.render_page(page, tree)
+            sha256 = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            recorded = self.state["pages"].get(page)
+            if recorded is None or recorded["sha256"] != sha256 or not self._page_is_current(page):
+                path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = path.with_name(path.name + ".tmp")
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+                written += 1
+            stat = path.stat()
+            self.state["pages"][page] = {"sha256": sha256, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        self.save()
+        return {**counts, "pages_written": written, "pages_removed": removed}
+
+
+def main():
+    """
+    Main function to update the paper_skills index pages.
+    """
+    parser = argparse.ArgumentParser(description="Incrementally rebuild the paper_skills index pages")
+    parser.add_argument("--skills", default=str(DEFAULT_SKILLS_DIR),
+                        help="paper_skills directory (default: %(default)s)")
+    parser.add_argument("--state", default=str(DEFAULT_STATE_PATH),
+                        help="Dependency state file (default: %(default)s)")
+    parser.add_argument("--force", action="store_true", help="Rewrite every index page")
+    args = parser.parse_args()
+
+    result = SkillIndexBuilder(Path(args.skills), Path(args.state)).update(args.force)
+    print(f"{Colors.CYAN}Skill documents:{Colors.RESET} {result['added']} added, {result['changed']} changed, "
+          f"{result['removed']} removed, {result['unchanged']} unchanged")
+    print(f"{Colors.GREEN}Index pages:{Colors.RESET} {result['pages_written']} written, "
+          f"{result['pages_removed']} removed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,711 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: table_extract.py
+
+Purpose:
+    This module writes the tables of each converted PDF as structured side
+    outputs, so that numbers in tables can be queried without parsing them
+    back out of the Markdown.
+
+    - On born-digital pages (the text-layer route of page_router.py) tables are
+      taken straight from the PDF with PyMuPDF's table finder.
+    - On scanned pages, and on born-digital pages where PyMuPDF finds nothing
+      (e.g. tables drawn with horizontal rules only), the tables Marker
+      rendered for that page are used instead.
+    - Each table is written to <name>_tables/table_<n>.csv, and to
+      table_<n>.parquet when pyarrow is installed. Column types (int, float,
+      string) are inferred from the cells; numeric cells are written without
+      thousands separators or typographic minus signs.
+    - <name>_tables/index.json lists every table with its page, source, shape
+      and column names and types.
+
+Usage:
+    python scripts/process_pdf.py convert --tables
+    python scripts/table_extract.py extract paper.pdf [--output DIR]
+    python scripts/table_extract.py list
+    python scripts/table_extract.py query --column "accuracy|acc" --min 0.9
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - PyMuPDF (fitz)
+    - pyarrow (optional, Parquet output)
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import re
+import csv
+import json
+import shutil
+import argparse
+from pathlib import Path
+from html.parser import HTMLParser
+
+from pdf_prescan import get_profile
+from page_router import route_page, ROUTE_TEXT
+
+# Set to 1 by `process_pdf.py convert --tables`; inherited by worker processes
+ENABLED_ENV = "PAPER2SKILL_TABLES"
+
+DEFAULT_OUTPUT_DIR = Path(__file__).parent.parent / "pdf" / "output"
+
+TABLES_SUFFIX = "_tables"
+INDEX_FILE = "index.json"
+
+SOURCE_PYMUPDF = "pymupdf"
+SOURCE_MARKER = "marker"
+
+TYPE_INT = "int"
+TYPE_FLOAT = "float"
+TYPE_STRING = "string"
+
+# Smaller grids (below a header plus one row, or one column) are layout artifacts
+MIN_DATA_ROWS = 1
+MIN_COLUMNS = 2
+
+# Cells that mean "no value"
+NULL_CELLS = {"", "-", "–", "—", "n/a", "na", "n.a.", "nan", "none"}
+
+NUMBER_PATTERN = re.compile(r"^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$")
+THOUSANDS_PATTERN = re.compile(r"^[+-]?\d{1,3}(,\d{3})+(\.\d*)?$")
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        return f"{color}{text}{Colors.RESET}"
+
+
+def is_enabled():
+    """
+    Check whether conversions write table side outputs.
+
+    Returns:
+        bool: True if PAPER2SKILL_TABLES is set to 1
+    """
+    return os.environ.get(ENABLED_ENV, "0") == "1"
+
+
+def get_tables_dir(output_dir, sanitized_name):
+    """
+    Get the table directory of a converted PDF.
+
+    Args:
+        output_dir (Path): Per-PDF output directory
+        sanitized_name (str): Sanitized stem of the output files
+
+    Returns:
+        Path: <output dir>/<name>_tables
+    """
+    return Path(output_dir) / f"{sanitized_name}{TABLES_SUFFIX}"
+
+
+class HtmlTableParser(HTMLParser):
+    """
+    Collects the cell text of every <table> in an HTML fragment.
+
+    Cells spanning several columns are repeated in each of them; cells spanning
+    several rows are repeated in the rows below. Nested tables are flattened
+    into the cell that contains them. Leading rows made only of <th> cells are
+    counted as header rows.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tables = []
+        self._depth = 0
+        self._rows = None
+        self._row = None
+        self._cell = None
+        self._span = (1, 1)
+        self._pending = {}
+        self._header_rows = 0
+        self._row_is_header = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            self._depth += 1
+            if self._depth == 1:
+                self._rows = []
+                self._pending = {}
+                self._header_rows = 0
+        elif self._depth != 1:
+            return
+        elif tag == "tr":
+            self._row = []
+            self._row_is_header = True
+        elif tag in ("td", "th") and self._row is not None:
+            if tag == "td":
+                self._row_is_header = False
+            attrs = dict(attrs)
+            self._cell = []
+            self._span = (_int_attr(attrs, "colspan"), _int_attr(attrs, "rowspan"))
+        elif tag == "br" and self._cell is not None:
+            self._cell.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag == "table":
+            if self._depth == 1 and self._rows is not None:
+                self.tables.append((self._rows, self._header_rows))
+                self._rows = None
+            self._depth = max(0, self._depth - 1)
+        elif self._depth != 1:
+            return
+        elif tag in ("td", "th") and self._cell is not None:
+            self._add_cell(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == "tr" and self._row is not None:
+            self._fill_pending()
+            if self._row_is_header and len(self._rows) == self._header_rows and self._row:
+                self._header_rows += 1
+            self._rows.append(self._row)
+            self._row = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def _fill_pending(self):
+        # Cells of earlier rows that span down into the current position
+        while len(self._row) in self._pending:
+            text, remaining = self._pending.pop(len(self._row))
+            self._row.append(text)
+            if remaining > 1:
+                self._pending[len(self._row) - 1] = (text, remaining - 1)
+
+    def _add_cell(self, text):
+        self._fill_pending()
+        colspan, rowspan = self._span
+        for _ in range(colspan):
+            if rowspan > 1:
+                self._pending[len(self._row)] = (text, rowspan - 1)
+            self._row.append(text)
+
+
+def _int_attr(attrs, name):
+    try:
+        return max(1, int(attrs.get(name) or 1))
+    except ValueError:
+        return 1
+
+
+def parse_html_tables(html):
+    """
+    Extract the tables of an HTML fragment as rows of cell text.
+
+    Args:
+        html (str): HTML, e.g. one page rendered by Marker
+
+    Returns:
+        list: (rows, header_rows) per top-level table, rows being lists of str
+    """
+    parser = HtmlTableParser()
+    parser.feed(html)
+    parser.close()
+    return parser.tables
+
+
+def normalize_rows(rows):
+    """
+    Clean cell text and pad rows to the same width.
+
+    Args:
+        rows (list): Rows of cells (str or None)
+
+    Returns:
+        list: Rows of str, all of the table's width, without empty rows
+    """
+    cleaned = [[" ".join(str(cell).split()) if cell is not None else "" for cell in row] for row in rows]
+    cleaned = [row for row in cleaned if any(row)]
+    width = max((len(row) for row in cleaned), default=0)
+    return [row + [""] * (width - len(row)) for row in cleaned]
+
+
+def column_names(header, width):
+    """
+    Turn header cells into unique, non-empty column names.
+
+    Args:
+        header (list): Header cells, possibly empty or repeated
+        width (int): Number of columns
+
+    Returns:
+        list: Column names
+    """
+    names = []
+    seen = {}
+    for index in range(width):
+        name = " ".join(str(header[index]).split()) if index < len(header) and header[index] else ""
+        name = name or f"column_{index + 1}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}_{seen[name]}"
+        else:
+            seen[name] = 1
+        names.append(name)
+    return names
+
+
+def parse_number(text):
+    """
+    Parse a numeric cell.
+
+    Thousands separators, typographic minus signs and a trailing percent sign
+    are accepted; the percent sign is dropped, not divided out.
+
+    Args:
+        text (str): Cell text
+
+    Returns:
+        int, float or None: The value, or None if the cell is not a number
+    """
+    text = text.strip().replace("\u2212", "-").replace("\u2009", "").replace("\u00a0", "")
+    if text.endswith("%"):
+        text = text[:-1].rstrip()
+    if THOUSANDS_PATTERN.match(text):
+        text = text.replace(",", "")
+    if not NUMBER_PATTERN.match(text):
+        return None
+    if re.fullmatch(r"[+-]?\d+", text):
+        return int(text)
+    return float(text)
+
+
+def is_null(text):
+    """
+    Check whether a cell means "no value".
+
+    Args:
+        text (str): Cell text
+
+    Returns:
+        bool: True for empty cells and dashes, n/a and the like
+    """
+    return text.strip().lower() in NULL_CELLS
+
+
+def infer_column_types(rows, width):
+    """
+    Infer the type of each column from its cells.
+
+    A column is numeric when every non-null cell parses as a number, and an
+    int column when all of them are integers.
+
+    Args:
+        rows (list): Data rows of str
+        width (int): Number of columns
+
+    Returns:
+        list: TYPE_INT, TYPE_FLOAT or TYPE_STRING per column
+    """
+    types = []
+    for index in range(width):
+        kind = None
+        for row in rows:
+            if is_null(row[index]):
+                continue
+            value = parse_number(row[index])
+            if value is None:
+                kind = TYPE_STRING
+                break
+            if isinstance(value, float):
+                kind = TYPE_FLOAT
+            elif kind is None:
+                kind = TYPE_INT
+        types.append(kind or TYPE_STRING)
+    return types
+
+
+def typed_value(text, kind):
+    """
+    Convert one cell to its column type.
+
+    Args:
+        text (str): Cell text
+        kind (str): Column type
+
+    Returns:
+        The value (None for nulls in numeric columns)
+    """
+    if kind == TYPE_STRING:
+        return text
+    if is_null(text):
+        return None
+    value = parse_number(text)
+    return float(value) if kind == TYPE_FLOAT else value
+
+
+def merge_header_rows(rows):
+    """
+    Combine stacked header rows into one header.
+
+    Cells repeated by a column span appear once per column name, e.g. a
+    "Accuracy" cell spanning "Top-1" and "Top-5" gives "Accuracy Top-1" and
+    "Accuracy Top-5".
+
+    Args:
+        rows (list): Header rows of str, all of the same width
+
+    Returns:
+        list: One header cell per column
+    """
+    header = []
+    for cells in zip(*rows):
+        parts = []
+        for cell in cells:
+            if cell and cell not in parts:
+                parts.append(cell)
+        header.append(" ".join(parts))
+    return header
+
+
+def make_table(page, source, rows, header=None, bbox=None, header_rows=1):
+    """
+    Build a table record from raw rows.
+
+    Args:
+        page (int): 0-based page number
+        source (str): SOURCE_PYMUPDF or SOURCE_MARKER
+        rows (list): Rows of cells, starting with header_rows header rows
+            unless header is given
+        header (list): Header cells that are not part of rows
+        bbox (list): Table rectangle on the page, if known
+        header_rows (int): Number of leading header rows when header is None
+
+    Returns:
+        dict: Table record, or None if the grid is too small to be a table
+    """
+    rows = normalize_rows(rows)
+    if header is None and rows:
+        header_rows = max(1, header_rows)
+        header, rows = merge_header_rows(rows[:header_rows]), rows[header_rows:]
+    width = max([len(header or [])] + [len(row) for row in rows])
+    if len(rows) < MIN_DATA_ROWS or width < MIN_COLUMNS:
+        return None
+    rows = [row + [""] * (width - len(row)) for row in rows]
+    types = infer_column_types(rows, width)
+    return {
+        "page": page,
+        "source": source,
+        "bbox": [round(value, 1) for value in bbox] if bbox else None,
+        "columns": [{"name": name, "type": kind} for name, kind in zip(column_names(header or [], width), types)],
+        "rows": [[typed_value(text, kind) for text, kind in zip(row, types)] for row in rows],
+    }
+
+
+def find_pdf_tables(pdf_path, pages):
+    """
+    Find tables on born-digital pages with PyMuPDF's table finder.
+
+    Args:
+        pdf_path (Path): Path to the PDF file
+        pages (list): 0-based page numbers to search
+
+    Returns:
+        dict: Page number to list of table records
+    """
+    import fitz
+
+    found = {}
+    doc = fitz.open(str(pdf_path))
+    try:
+        for number in pages:
+            tables = []
+            for table in doc[number].find_tables().tables:
+                rows = table.extract()
+                header = table.header.names if table.header is not None else None
+                if header is not None and not table.header.external:
+                    # The header is the first extracted row
+                    rows = rows[1:]
+                record = make_table(number, SOURCE_PYMUPDF, rows, header, list(table.bbox))
+                if record is not None:
+                    tables.append(record)
+            if tables:
+                found[number] = tables
+    finally:
+        doc.close()
+    return found
+
+
+def _parquet_module():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def write_table_files(table, tables_dir, stem, pyarrow=None):
+    """
+    Write one table as CSV, and as Parquet if pyarrow is available.
+
+    Args:
+        table (dict): Table record
+        tables_dir (Path): Directory to write to
+        stem (str): File name without extension
+        pyarrow: The pyarrow module, or None to skip Parquet
+
+    Returns:
+        dict: File names written, by format
+    """
+    names = [column["name"] for column in table["columns"]]
+    files = {"csv": f"{stem}.csv"}
+    with open(Path(tables_dir) / files["csv"], 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+        for row in table["rows"]:
+            writer.writerow(["" if value is None else value for value in row])
+
+    if pyarrow is not None:
+        arrow_types = {TYPE_INT: pyarrow.int64(), TYPE_FLOAT: pyarrow.float64(), TYPE_STRING: pyarrow.string()}
+        arrays = [
+            pyarrow.array([row[index] for row in table["rows"]], type=arrow_types[column["type"]])
+            for index, column in enumerate(table["columns"])
+        ]
+        files["parquet"] = f"{stem}.parquet"
+        pyarrow.parquet.write_table(pyarrow.Table.from_arrays(arrays, names=names),
+                                    str(Path(tables_dir) / files["parquet"]))
+    return files
+
+
+def write_tables(tables, tables_dir, pdf_name):
+    """
+    Replace a document's table directory with the given tables.
+
+    Files are written to a temp directory that is swapped in at the end, so
+    the index never lists tables from two different runs.
+
+    Args:
+        tables (list): Table records in page order
+        tables_dir (Path): <name>_tables directory
+        pdf_name (str): File name of the source PDF, for the index
+
+    Returns:
+        int: Number of tables written
+    """
+    tables_dir = Path(tables_dir)
+    if tables_dir.exists():
+        shutil.rmtree(tables_dir)
+    if not tables:
+        return 0
+
+    tmp_dir = tables_dir.with_name(tables_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    tmp_dir.mkdir(parents=True)
+    pyarrow = _parquet_module()
+
+    entries = []
+    for number, table in enumerate(tables, start=1):
+        files = write_table_files(table, tmp_dir, f"table_{number:03d}", pyarrow)
+        entries.append({
+            "table": number,
+            "page": table["page"],
+            "source": table["source"],
+            "bbox": table["bbox"],
+            "rows": len(table["rows"]),
+            "columns": table["columns"],
+            "files": files,
+        })
+    with open(tmp_dir / INDEX_FILE, 'w', encoding='utf-8') as f:
+        json.dump({"pdf": pdf_name, "tables": entries}, f, ensure_ascii=False, indent=2)
+
+    os.replace(tmp_dir, tables_dir)
+    return len(entries)
+
+
+class TableCollector:
+    """
+    Gathers the tables of one document during a conversion.
+
+    Marker's tables are collected page by page as pages are rendered (only
+    their cells are kept, not the page HTML); write() adds PyMuPDF's tables
+    for born-digital pages and writes the side outputs.
+    """
+
+    def __init__(self, pdf_path, tables_dir):
+        """
+        Initialize the collector.
+
+        Args:
+            pdf_path (Path): Path to the PDF file
+            tables_dir (Path): <name>_tables directory to write
+        """
+        self.pdf_path = Path(pdf_path)
+        self.tables_dir = Path(tables_dir)
+        self.marker_tables = {}
+
+    def add_page_html(self, page, html):
+        """
+        Keep the tables of one page rendered by Marker.
+
+        Args:
+            page (int): 0-based page number
+            html (str): Rendered HTML of the page
+        """
+        for rows, header_rows in parse_html_tables(html):
+            record = make_table(page, SOURCE_MARKER, rows, header_rows=header_rows)
+            if record is not None:
+                self.marker_tables.setdefault(page, []).append(record)
+
+    def write(self):
+        """
+        Write the tables of the document.
+
+        PyMuPDF's tables are used for born-digital pages where it finds any,
+        Marker's tables for every other page.
+
+        Returns:
+            int: Number of tables written
+        """
+        profile = get_profile(self.pdf_path)
+        born_digital = [page["number"] for page in profile["pages"] if route_page(page)[0] == ROUTE_TEXT]
+        pdf_tables = find_pdf_tables(self.pdf_path, born_digital)
+
+        tables = []
+        for number in range(profile["page_count"]):
+            tables.extend(pdf_tables.get(number) or self.marker_tables.get(number, []))
+        return write_tables(tables, self.tables_dir, self.pdf_path.name)
+
+
+def iter_table_indexes(output_dir):
+    """
+    Find the table indexes of all converted documents.
+
+    Args:
+        output_dir (Path): Root output directory
+
+    Yields:
+        tuple: (tables_dir, index dict)
+    """
+    for index_path in sorted(Path(output_dir).rglob(f"*{TABLES_SUFFIX}/{INDEX_FILE}")):
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                yield index_path.parent, json.load(f)
+        except (OSError, ValueError):
+            continue
+
+
+def list_tables(output_dir):
+    """
+    Print every extracted table of the corpus.
+
+    Args:
+        output_dir (Path): Root output directory
+    """
+    total = 0
+    for tables_dir, index in iter_table_indexes(output_dir):
+        print(f"{Colors.CYAN}{tables_dir.relative_to(output_dir)}{Colors.RESET} ({index['pdf']})")
+        for entry in index["tables"]:
+            columns = ", ".join(f"{column['name']}:{column['type']}" for column in entry["columns"])
+            print(f"  {Colors.BLUE}{entry['files']['csv']}{Colors.RESET} page {entry['page'] + 1}, "
+                  f"{entry['rows']} rows, {entry['source']} [{columns}]")
+            total += 1
+    print(f"{Colors.GREEN}Tables:{Colors.RESET} {total}")
+
+
+def query_tables(output_dir, column_pattern, minimum=None, maximum=None, limit=50):
+    """
+    Find numeric cells of matching columns across the corpus.
+
+    Only the index is read to pick columns; CSV files are opened only for
+    tables that have a matching numeric column.
+
+    Args:
+        output_dir (Path): Root output directory
+        column_pattern (str): Regular expression matched against column names (case-insensitive)
+        minimum (float): Smallest value to report, None for no bound
+        maximum (float): Largest value to report, None for no bound
+        limit (int): Maximum number of hits to print
+
+    Returns:
+        list: (csv path, row number, column name, value) tuples
+    """
+    pattern = re.compile(column_pattern, re.IGNORECASE)
+    hits = []
+    for tables_dir, index in iter_table_indexes(output_dir):
+        for entry in index["tables"]:
+            wanted = [column["name"] for column in entry["columns"]
+                      if column["type"] != TYPE_STRING and pattern.search(column["name"])]
+            if not wanted:
+                continue
+            csv_path = tables_dir / entry["files"]["csv"]
+            with open(csv_path, 'r', encoding='utf-8', newline='') as f:
+                for row_number, row in enumerate(csv.DictReader(f), start=1):
+                    for name in wanted:
+                        if not row.get(name):
+                            continue
+                        value = float(row[name])
+                        if (minimum is None or value >= minimum) and (maximum is None or value <= maximum):
+                            hits.append((csv_path, row_number, name, value))
+
+    for csv_path, row_number, name, value in hits[:limit]:
+        print(f"{Colors.BLUE}{csv_path.relative_to(output_dir)}{Colors.RESET} row {row_number}: {name} = {value:g}")
+    if len(hits) > limit:
+        print(f"{Colors.YELLOW}... {len(hits) - limit} more{Colors.RESET}")
+    print(f"{Colors.GREEN}Matches:{Colors.RESET} {len(hits)}")
+    return hits
+
+
+def main():
+    """
+    Main function to extract, list or query tables.
+    """
+    parser = argparse.ArgumentParser(description="Extract tables from PDFs as CSV/Parquet and query them")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    extract = subparsers.add_parser("extract", help="Extract the tables of PDFs with PyMuPDF (no Marker needed)")
+    extract.add_argument("pdfs", nargs="+", help="PDF files")
+    extract.add_argument("--output", help="Directory for <name>_tables (default: next to each PDF)")
+
+    listing = subparsers.add_parser("list", help="List the extracted tables of the corpus")
+    listing.add_argument("--output-dir", default=str(DEFAULT_OUTPUT_DIR), help="Output root (default: %(default)s)")
+
+    query = subparsers.add_parser("query", help="Find numeric values in matching columns")
+    query.add_argument("--column", required=True, help="Regular expression for column names")
+    query.add_argument("--min", type=float, help="Smallest value")
+    query.add_argument("--max", type=float, help="Largest value")
+    query.add_argument("--limit", type=int, default=50, help="Maximum hits to print (default: %(default)s)")
+    query.add_argument("--output-dir", default=str(DEFAULT_OUTPUT_DIR), help="Output root (default: %(default)s)")
+
+    args = parser.parse_args()
+
+    if args.command == "extract":
+        for pdf in args.pdfs:
+            pdf_path = Path(pdf)
+            output_dir = Path(args.output) if args.output else pdf_path.parent
+            output_dir.mkdir(parents=True, exist_ok=True)
+            tables_dir = get_tables_dir(output_dir, pdf_path.stem)
+            count = TableCollector(pdf_path, tables_dir).write()
+            print(f"{Colors.GREEN}{pdf_path.name}:{Colors.RESET} {count} tables -> {tables_dir}")
+    elif args.command == "list":
+        list_tables(Path(args.output_dir))
+    else:
+        query_tables(Path(args.output_dir), args.column, args.min, args.max, args.limit)
+
+
+if __name__ == "__main__":
+    main()
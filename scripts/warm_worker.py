@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: warm_worker.py
+
+Purpose:
+    This script runs a persistent "warm" conversion worker that loads the Marker
+    models once and keeps them in memory. Repeated invocations of process_pdf.py
+    can hand their PDFs to the running worker instead of reloading the weights.
+
+Usage:
+    python scripts/warm_worker.py serve [--host 127.0.0.1] [--port 6010]
+    python scripts/warm_worker.py ping
+    python scripts/warm_worker.py shutdown
+
+    While the worker is running, use it from the batch converter with:
+    python scripts/process_pdf.py --worker 127.0.0.1:6010
+
+    Connections are authenticated with a shared key. Unless
+    PAPER2SKILL_WORKER_AUTHKEY is set, the worker generates a random key into
+    pdf/output/.pipeline/worker.key (readable by the owner only), which local
+    clients read. The worker only listens on a non-loopback address when
+    PAPER2SKILL_WORKER_AUTHKEY is set, so that remote clients share a key
+    chosen on purpose. Requests and replies are JSON, never pickles, so even
+    an authenticated client can only ask for conversions.
+
+    Options process_pdf.py hands to its workers through the environment
+    (--tables, --no-image-store, --no-autotune, metrics run and node) are
+    sent with every conversion request and applied for that PDF only.
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - marker-pdf (worker side only)
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import json
+import secrets
+import argparse
+import ipaddress
+from pathlib import Path
+from contextlib import contextmanager
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import autotune
+import image_store
+import table_extract
+import pipeline_metrics
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 6010
+
+AUTHKEY_ENV = "PAPER2SKILL_WORKER_AUTHKEY"
+DEFAULT_KEY_PATH = Path(__file__).parent.parent / "pdf" / "output" / ".pipeline" / "worker.key"
+
+# Largest request or reply accepted, in bytes
+MAX_MESSAGE_BYTES = 1024 * 1024
+
+# Pipeline options passed to conversions through the environment
+FORWARDED_ENV = (
+    autotune.ENABLED_ENV,
+    image_store.ENABLED_ENV,
+    table_extract.ENABLED_ENV,
+    pipeline_metrics.ENABLED_ENV,
+    pipeline_metrics.RUN_ID_ENV,
+    pipeline_metrics.NODE_ENV,
+)
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def get_authkey(create=False, key_path=DEFAULT_KEY_PATH):
+    """
+    Get the shared secret used to authenticate worker connections.
+
+    Args:
+        create (bool): Generate the key file if it does not exist (worker side)
+        key_path (Path): Key file used when PAPER2SKILL_WORKER_AUTHKEY is not set
+
+    Returns:
+        bytes: Authentication key, or None if there is none yet
+    """
+    key = os.environ.get(AUTHKEY_ENV)
+    if key:
+        return key.encode("utf-8")
+
+    key_path = Path(key_path)
+    if key_path.exists():
+        return key_path.read_bytes().strip() or None
+    if not create:
+        return None
+
+    key_path.parent.mkdir(parents=True, exist_ok=True)
+    key = secrets.token_hex(32).encode("ascii")
+    # Created with owner-only permissions, and never over an existing key
+    fd = os.open(str(key_path), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+    return key
+
+
+def is_loopback(host):
+    """
+    Check whether a listen address only accepts local connections.
+
+    Args:
+        host (str): Host name or IP address
+
+    Returns:
+        bool: True for 127.0.0.0/8, ::1 and localhost
+    """
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def send_message(conn, message):
+    """
+    Send one JSON message over a connection.
+
+    Args:
+        conn (Connection): Open connection
+        message (dict): JSON-serializable payload
+    """
+    conn.send_bytes(json.dumps(message).encode("utf-8"))
+
+
+def recv_message(conn):
+    """
+    Receive one JSON message from a connection.
+
+    Args:
+        conn (Connection): Open connection
+
+    Returns:
+        dict: Decoded payload
+
+    Raises:
+        ValueError: If the message is not a JSON object
+    """
+    message = json.loads(conn.recv_bytes(MAX_MESSAGE_BYTES).decode("utf-8"))
+    if not isinstance(message, dict):
+        raise ValueError("Expected a JSON object")
+    return message
+
+
+def get_forwarded_env():
+    """
+    Get the pipeline options of this process to send with a conversion.
+
+    Returns:
+        dict: Values of the FORWARDED_ENV variables that are set
+    """
+    return {name: os.environ[name] for name in FORWARDED_ENV if name in os.environ}
+
+
+@contextmanager
+def job_environment(env):
+    """
+    Apply a request's pipeline options for one conversion.
+
+    Variables the request does not set are unset for the job, so options of
+    one client never leak into the next request.
+
+    Args:
+        env (dict): FORWARDED_ENV values sent by the client
+
+    Raises:
+        ValueError: If env holds anything but FORWARDED_ENV strings
+    """
+    if not isinstance(env, dict) or any(name not in FORWARDED_ENV or not isinstance(value, str)
+                                        for name, value in env.items()):
+        raise ValueError("Invalid job environment")
+    saved = {name: os.environ.get(name) for name in FORWARDED_ENV}
+    try:
+        for name in FORWARDED_ENV:
+            if name in env:
+                os.environ[name] = env[name]
+            else:
+                os.environ.pop(name, None)
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def parse_address(address):
+    """
+    Parse a "host:port" string into a connection address.
+
+    Args:
+        address (str): Address such as "127.0.0.1:6010" or just "6010"
+
+    Returns:
+        tuple: (host, port)
+    """
+    if ":" in address:
+        host, port = address.rsplit(":", 1)
+    else:
+        host, port = DEFAULT_HOST, address
+    return host or DEFAULT_HOST, int(port)
+
+
+def send_request(address, request):
+    """
+    Send a single request to a running warm worker and wait for the reply.
+
+    Args:
+        address (tuple): (host, port) of the worker
+        request (dict): Request payload with a "cmd" key
+
+    Returns:
+        dict: Worker response
+
+    Raises:
+        OSError: If no worker key is available or the connection fails
+        AuthenticationError: If the worker uses a different key
+    """
+    authkey = get_authkey()
+    if authkey is None:
+        raise OSError(f"No worker key: set {AUTHKEY_ENV} or start the worker on this machine first")
+    with Client(address, authkey=authkey) as conn:
+        send_message(conn, request)
+        return recv_message(conn)
+
+
+def is_worker_alive(address):
+    """
+    Check whether a warm worker is listening at the given address.
+
+    Args:
+        address (tuple): (host, port) of the worker
+
+    Returns:
+        bool: True if the worker answered a ping
+    """
+    try:
+        return send_request(address, {"cmd": "ping"}).get("ok", False)
+    except (OSError, EOFError, ValueError, AuthenticationError):
+        return False
+
+
+def submit_pdf(address, pdf_path, output_dir, model_dir, force=False, chunk_pages=0, route_ocr=False, lease=None):
+    """
+    Ask a warm worker to convert one PDF.
+
+    Args:
+        address (tuple): (host, port) of the worker
+        pdf_path (Path): Path to the PDF file
+        output_dir (Path): Directory to save output files
+        model_dir (Path): Directory to store model files
+        force (bool): Reconvert and overwrite existing outputs
+        chunk_pages (int): Convert longer PDFs in chunks of this many pages
+        route_ocr (bool): Only OCR pages without a usable text layer
+        lease (tuple): Lease claim of the PDF in a leased run, checked by the
+            worker before it commits the Markdown
+
+    Returns:
+        bool: True if the worker processed or skipped the PDF successfully
+    """
+    try:
+        response = send_request(address, {
+            "cmd": "convert",
+            "pdf_path": str(Path(pdf_path).resolve()),
+            "output_dir": str(Path(output_dir).resolve()),
+            "model_dir": str(Path(model_dir).resolve()),
+            "force": force,
+            "chunk_pages": chunk_pages,
+            "route_ocr": route_ocr,
+            "lease": list(lease) if lease is not None else None,
+            "env": get_forwarded_env(),
+        })
+    except (OSError, EOFError, ValueError, AuthenticationError) as e:
+        print(f"{Colors.RED}Lost connection to worker for {pdf_path}: {str(e)}{Colors.RESET}")
+        return False
+    if not response.get("ok", False):
+        print(f"{Colors.RED}Worker error for {pdf_path}: {response.get('error', 'unknown error')}{Colors.RESET}")
+    return response.get("ok", False)
+
+
+def serve(address):
+    """
+    Load the models once and serve conversion requests until shut down.
+
+    Requests are handled one at a time so that the worker never holds more
+    than one document's worth of intermediate state.
+
+    Args:
+        address (tuple): (host, port) to listen on
+    """
+    if not is_loopback(address[0]) and not os.environ.get(AUTHKEY_ENV):
+        print(f"{Colors.RED}Refusing to listen on {address[0]} without {AUTHKEY_ENV}. "
+              f"Set a shared key to accept connections from other machines.{Colors.RESET}")
+        return
+    authkey = get_authkey(create=True)
+
+    # Import here so that clients never pay the Marker import cost
+    import process_pdf
+
+    if not process_pdf.check_model_availability():
+        print(f"{Colors.RED}Model check failed. Worker not started.{Colors.RESET}")
+        return
+
+    print(f"{Colors.CYAN}Warm worker listening on {address[0]}:{address[1]}{Colors.RESET}")
+    served = 0
+    with Listener(address, authkey=authkey) as listener:
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception as e:
+                print(f"{Colors.RED}Rejected connection: {str(e)}{Colors.RESET}")
+                continue
+
+            with conn:
+                try:
+                    request = recv_message(conn)
+                except (EOFError, OSError, ValueError) as e:
+                    print(f"{Colors.RED}Invalid request: {str(e)}{Colors.RESET}")
+                    continue
+
+                cmd = request.get("cmd")
+                if cmd == "ping":
+                    send_message(conn, {"ok": True, "served": served})
+                elif cmd == "shutdown":
+                    send_message(conn, {"ok": True, "served": served})
+                    print(f"{Colors.YELLOW}Shutdown requested. Served {served} PDFs.{Colors.RESET}")
+                    return
+                elif cmd == "convert":
+                    try:
+                        with job_environment(request.get("env", {})):
+                            ok = process_pdf.process_pdf_file(
+                                Path(request["pdf_path"]),
+                                Path(request["output_dir"]),
+                                Path(request["model_dir"]),
+                                force=request.get("force", False),
+                                chunk_pages=request.get("chunk_pages", 0),
+                                route_ocr=request.get("route_ocr", False),
+                                lease=tuple(request["lease"]) if request.get("lease") else None,
+                            )
+                        served += 1
+                        send_message(conn, {"ok": ok})
+                    except Exception as e:
+                        send_message(conn, {"ok": False, "error": str(e)})
+                else:
+                    send_message(conn, {"ok": False, "error": f"Unknown command: {cmd}"})
+
+
+def main():
+    """
+    Main function to run or control the warm worker.
+    """
+    parser = argparse.ArgumentParser(description="Persistent Marker conversion worker")
+    parser.add_argument("command", choices=["serve", "ping", "shutdown"], help="Worker action")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Address to listen on / connect to")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on / connect to")
+    args = parser.parse_args()
+
+    address = (args.host, args.port)
+    if args.command == "serve":
+        serve(address)
+        return
+
+    try:
+        response = send_request(address, {"cmd": args.command})
+        state = "is up" if args.command == "ping" else "is shutting down"
+        print(f"{Colors.GREEN}Worker at {args.host}:{args.port} {state} (served {response.get('served', 0)} PDFs){Colors.RESET}")
+    except AuthenticationError:
+        print(f"{Colors.RED}Worker at {args.host}:{args.port} rejected the key{Colors.RESET}")
+    except (OSError, EOFError, ValueError) as e:
+        print(f"{Colors.RED}No worker running at {args.host}:{args.port}: {str(e)}{Colors.RESET}")
+
+
+if __name__ == "__main__":
+    main()
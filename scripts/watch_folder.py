@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script Name: watch_folder.py
+
+Purpose:
+    This script runs the PDF pipeline as a long-running daemon. The Marker
+    models are loaded once (or a warm worker is used), and pdf/input is watched
+    for new or changed PDFs instead of being rescanned on a timer. Each file is
+    only converted once it has stopped changing for a debounce period, so PDFs
+    that are still being copied are never picked up half-written.
+
+    File events come from watchdog (inotify / FSEvents / ReadDirectoryChangesW)
+    when it is installed, otherwise the input tree is polled with stat() calls.
+    Every converted file goes through the same manifest and job queue as
+    process_pdf.py, so unchanged files are never converted twice. Once every
+    file that settled together has been handled, the search index
+    (search_index.py) is updated, so new Markdown becomes searchable without
+    a separate run. The daemon holds the lock on pdf/output/.pipeline for as
+    long as it runs, so it does not start while process_pdf.py convert is
+    running on the same output tree (and vice versa).
+
+    Queue depth and latency statistics (time from a file settling to its
+    conversion finishing) are printed and written to
+    pdf/output/.pipeline/watch_stats.json after every job; per-stage metrics
+    are exported to pdf/output/.pipeline/metrics.prom (see pipeline_metrics.py).
+
+Usage:
+    python scripts/watch_folder.py
+    python scripts/watch_folder.py --debounce 10 --poll-interval 5
+    python scripts/watch_folder.py --worker 127.0.0.1:6010
+
+Virtual Environment:
+    This script should be run within the project's virtual environment.
+
+    Virtual environment location: ./venv
+
+    To activate the virtual environment (Windows):
+    venv\\Scripts\\activate
+
+Dependencies:
+    - Python 3.10.11+
+    - marker-pdf (through process_pdf.py)
+    - watchdog (optional, event-driven watching instead of polling)
+
+Author:
+    MiouCat Workshop
+    Date: 2026-02-14
+
+License:
+    MIT License
+"""
+
+import os
+import json
+import time
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_DEBOUNCE = 5.0
+DEFAULT_POLL_INTERVAL = 10.0
+# Seconds between rewrites of the Prometheus metrics file
+METRICS_EXPORT_INTERVAL = 60.0
+
+# Terminal color codes
+class Colors:
+    GREEN = '\033[92m'
+    YELLOW = '\033[93m'
+    RED = '\033[91m'
+    BLUE = '\033[94m'
+    CYAN = '\033[96m'
+    RESET = '\033[0m'
+
+    @staticmethod
+    def colorize(text, color):
+        """Colorize text for terminal output"""
+        return f"{color}{text}{Colors.RESET}"
+
+
+def _stat_key(path):
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class PendingFiles:
+    """
+    Debounce buffer of PDFs that changed recently.
+
+    A file becomes ready once its size and mtime have not changed for the
+    debounce period. Safe to use from the watchdog observer thread.
+    """
+
+    def __init__(self, debounce):
+        """
+        Initialize the buffer.
+
+        Args:
+            debounce (float): Seconds a file must stay unchanged
+        """
+        self.debounce = debounce
+        self.lock = threading.Lock()
+        self.files = {}
+
+    def touch(self, path):
+        """
+        Note that a file was created or modified.
+
+        Args:
+            path (Path): Changed PDF
+        """
+        with self.lock:
+            self.files[Path(path)] = (time.monotonic(), _stat_key(Path(path)))
+
+    def pop_ready(self):
+        """
+        Take the files that have settled.
+
+        Returns:
+            list: (path, settled_at) tuples, settled_at on the time.monotonic() clock
+        """
+        now = time.monotonic()
+        ready = []
+        with self.lock:
+            for path, (changed_at, stat_key) in list(self.files.items()):
+                if now - changed_at < self.debounce:
+                    continue
+                current = _stat_key(path)
+                if current is None:
+                    # Deleted or moved away before it settled
+                    del self.files[path]
+                elif current != stat_key:
+                    # Still being written without events (e.g. network shares)
+                    self.files[path] = (now, current)
+                else:
+                    del self.files[path]
+                    ready.append((path, now))
+        return ready
+
+    def __len__(self):
+        with self.lock:
+            return len(self.files)
+
+
+class WatchStats:
+    """
+    Queue depth and latency counters of the daemon.
+    """
+
+    def __init__(self, stats_path):
+        """
+        Initialize the counters.
+
+        Args:
+            stats_path (Path): JSON file the statistics are written to
+        """
+        self.path = Path(stats_path)
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.converted = 0
+        self.failed = 0
+        self.skipped = 0
+        self.latencies = []
+        self.conversion_times = []
+
+    def record(self, outcome, latency=0.0, conversion_time=0.0):
+        """
+        Record the outcome of one file.
+
+        Args:
+            outcome (str): "converted", "failed" or "skipped"
+            latency (float): Seconds from the file settling to the job finishing
+            conversion_time (float): Seconds spent converting
+        """
+        if outcome == "skipped":
+            self.skipped += 1
+            return
+        if outcome == "converted":
+            self.converted += 1
+        else:
+            self.failed += 1
+        self.latencies.append(latency)
+        self.conversion_times.append(conversion_time)
+        # Keep memory bounded on long-running daemons
+        del self.latencies[:-1000]
+        del self.conversion_times[:-1000]
+
+    def snapshot(self, debouncing, ready):
+        """
+        Build the statistics document.
+
+        Args:
+            debouncing (int): Files waiting for the debounce period
+            ready (int): Settled files waiting to be converted
+
+        Returns:
+            dict: Statistics
+        """
+        return {
+            "started_at": self.started_at,
+            "updated_at": datetime.now().isoformat(timespec='seconds'),
+            "queue_depth": {"debouncing": debouncing, "ready": ready},
+            "converted": self.converted,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "latency_seconds": {
+                "last": round(self.latencies[-1], 2) if self.latencies else 0.0,
+                "p50": round(_percentile(self.latencies, 0.5), 2),
+                "p95": round(_percentile(self.latencies, 0.95), 2),
+            },
+            "conversion_seconds": {
+                "p50": round(_percentile(self.conversion_times, 0.5), 2),
+                "p95": round(_percentile(self.conversion_times, 0.95), 2),
+            },
+        }
+
+    def write(self, debouncing, ready):
+        """
+        Write the statistics atomically and print a one-line summary.
+
+        Args:
+            debouncing (int): Files waiting for the debounce period
+            ready (int): Settled files waiting to be converted
+        """
+        data = self.snapshot(debouncing, ready)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self.path)
+        print(f"{Colors.BLUE}Queue:{Colors.RESET} {debouncing} settling, {ready} ready | "
+              f"{Colors.BLUE}Done:{Colors.RESET} {self.converted} converted, {self.failed} failed | "
+              f"{Colors.BLUE}Latency p50/p95:{Colors.RESET} "
+              f"{data['latency_seconds']['p50']}s/{data['latency_seconds']['p95']}s")
+
+
+def scan_input(input_dir):
+    """
+    List the PDFs that process_pdf.py would convert (those inside subdirectories).
+
+    Args:
+        input_dir (Path): Root of the input tree
+
+    Returns:
+        dict: Path to (size, mtime_ns)
+    """
+    snapshot = {}
+    for root, dirs, files in os.walk(input_dir):
+        if os.path.relpath(root, input_dir) == '.':
+            continue
+        for file in files:
+            if file.lower().endswith('.pdf'):
+                path = Path(root) / file
+                stat_key = _stat_key(path)
+                if stat_key is not None:
+                    snapshot[path] = stat_key
+    return snapshot
+
+
+def start_observer(input_dir, pending):
+    """
+    Watch the input tree with watchdog, if it is installed.
+
+    Args:
+        input_dir (Path): Root of the input tree
+        pending (PendingFiles): Buffer that receives changed PDFs
+
+    Returns:
+        Observer: Running observer, or None to fall back to polling
+    """
+    try:
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+    except ImportError:
+        return None
+
+    class Handler(FileSystemEventHandler):
+        def _note(self, path):
+            path = Path(path)
+            if path.suffix.lower() == '.pdf' and path.parent != input_dir:
+                pending.touch(path)
+
+        def on_created(self, event):
+            if not event.is_directory:
+                self._note(event.src_path)
+
+        def on_modified(self, event):
+            if not event.is_directory:
+                self._note(event.src_path)
+
+        def on_moved(self, event):
+            if not event.is_directory:
+                self._note(event.dest_path)
+
+    observer = Observer()
+    observer.schedule(Handler(), str(input_dir), recursive=True)
+    observer.start()
+    return observer
+
+
+def watch(input_dir, output_dir, model_dir, debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL,
+          worker_address=None, chunk_pages=0, route_ocr=False, max_attempts=None, use_watchdog=True):
+    """
+    Watch the input tree and convert new or changed PDFs until interrupted.
+
+    Args:
+        input_dir (Path): Root of the input tree
+        output_dir (Path): Root output directory
+        model_dir (Path): Directory containing model files
+        debounce (float): Seconds a file must stay unchanged before converting
+        poll_interval (float): Seconds between scans when polling (and between
+            safety rescans when watchdog is used)
+        worker_address (tuple): Optional (host, port) of a running warm worker
+        chunk_pages (int): Convert longer PDFs in chunks of this many pages
+        route_ocr (bool): Only OCR pages without a usable text layer
+        max_attempts (int): Attempts per PDF before it is skipped as failed
+        use_watchdog (bool): Use file system events when watchdog is available
+    """
+    import process_pdf
+    import pipeline_metrics
+    from job_queue import JobQueue, RunLock, DEFAULT_MAX_ATTEMPTS
+    from conversion_manifest import ConversionManifest
+    from search_index import update_index
+
+    input_dir = Path(input_dir).resolve()
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    # The queue and manifest are shared with process_pdf.py convert, which must not run meanwhile
+    run_lock = RunLock(output_dir / ".pipeline")
+    if not run_lock.acquire():
+        print(f"{Colors.RED}Another run is using {output_dir / '.pipeline'} ({run_lock.holder()}); "
+              f"not starting the watcher.{Colors.RESET}")
+        return
+
+    if worker_address is not None:
+        from warm_worker import is_worker_alive
+        if not is_worker_alive(worker_address):
+            print(f"{Colors.RED}No warm worker running at {worker_address[0]}:{worker_address[1]}{Colors.RESET}")
+            run_lock.release()
+            return
+    elif not process_pdf.check_model_availability():
+        print(f"{Colors.RED}Model check failed; not starting the watcher.{Colors.RESET}")
+        run_lock.release()
+        return
+
+    manifest = ConversionManifest(output_dir / ".pipeline" / "manifest.json", process_pdf.MANIFEST_CONFIG)
+    job_queue = JobQueue(output_dir / ".pipeline" / "jobs.sqlite", max_attempts or DEFAULT_MAX_ATTEMPTS)
+    recovered = job_queue.recover()
+    if recovered:
+        print(f"{Colors.YELLOW}Requeued {len(recovered)} jobs interrupted in a previous run{Colors.RESET}")
+    stats = WatchStats(output_dir / ".pipeline" / "watch_stats.json")
+    pipeline_metrics.get_run_id()
+    next_metrics_export = 0.0
+
+    pending = PendingFiles(debounce)
+    observer = start_observer(input_dir, pending) if use_watchdog else None
+    mode = "file system events" if observer is not None else f"polling every {poll_interval:g}s"
+    print(f"{Colors.CYAN}Watching {input_dir} ({mode}, {debounce:g}s debounce). Press Ctrl+C to stop.{Colors.RESET}")
+
+    # Files added while the daemon was down are picked up by the first scan;
+    # unchanged ones are skipped by the manifest with a single stat() call
+    snapshot = {}
+    next_scan = 0.0
+    ready = []
+    # Files handled since the search index was last updated
+    unindexed = 0
+    try:
+        while True:
+            now = time.monotonic()
+            if now >= next_scan:
+                # With watchdog this is only a safety net for missed events
+                current = scan_input(input_dir)
+                for path, stat_key in current.items():
+                    if snapshot.get(path) != stat_key:
+                        pending.touch(path)
+                snapshot = current
+                next_scan = now + (poll_interval if observer is None else max(poll_interval, 60.0))
+
+            ready.extend(pending.pop_ready())
+            if not ready:
+                time.sleep(min(1.0, debounce))
+                continue
+
+            pdf_path, settled_at = ready.pop(0)
+            if not pdf_path.exists():
+                continue
+            relative_path = os.path.relpath(pdf_path.parent, input_dir)
+            action, job, force = process_pdf.plan_pdf_job(pdf_path, relative_path, output_dir, manifest, job_queue)
+            if action == process_pdf.PLAN_CONVERT:
+                started = time.monotonic()
+                ok = process_pdf.run_pdf_job(job, force, model_dir, manifest, job_queue,
+                                             worker_address=worker_address, chunk_pages=chunk_pages,
+                                             route_ocr=route_ocr)
+                finished = time.monotonic()
+                stats.record("converted" if ok else "failed", finished - settled_at, finished - started)
+            else:
+                stats.record("skipped")
+            stats.write(len(pending), len(ready))
+            # Skipped files may be moved PDFs whose outputs were just reused
+            unindexed += 1
+            if not ready:
+                update_index()
+                unindexed = 0
+            # Re-aggregating the metrics log is linear in its size, so throttle it
+            if time.monotonic() >= next_metrics_export:
+                pipeline_metrics.write_prometheus(metrics_dir=output_dir / ".pipeline")
+                next_metrics_export = time.monotonic() + METRICS_EXPORT_INTERVAL
+    except KeyboardInterrupt:
+        print(f"\n{Colors.YELLOW}Stopping watcher...{Colors.RESET}")
+    finally:
+        if observer is not None:
+            observer.stop()
+            observer.join()
+        job_queue.close()
+        if unindexed:
+            update_index()
+        run_lock.release()
+
+
+def main():
+    """
+    Main function to run the watch-folder daemon.
+    """
+    parser = argparse.ArgumentParser(description="Watch pdf/input and convert new or changed PDFs")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE, metavar="SECONDS",
+                        help="Seconds a PDF must stay unchanged before it is converted (default: %(default)s)")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, metavar="SECONDS",
+                        help="Seconds between scans when polling (default: %(default)s)")
+    parser.add_argument("--poll", action="store_true",
+                        help="Poll the input tree even if watchdog is installed")
+    parser.add_argument("--worker", metavar="HOST:PORT",
+                        help="Send conversions to a running warm worker (see warm_worker.py)")
+    parser.add_argument("--chunk-pages", type=int, default=0, metavar="N",
+                        help="Convert PDFs longer than N pages in checkpointed N-page chunks (default: off)")
+    parser.add_argument("--route-ocr", action="store_true",
+                        help="Only OCR scanned or garbled pages; use the PDF text layer for clean pages")
+    parser.add_argument("--max-attempts", type=int, default=None, metavar="N",
+                        help="Skip PDFs that failed N times (default: 3)")
+    args = parser.parse_args()
+
+    project_root = Path(__file__).resolve().parent.parent
+    worker_address = None
+    if args.worker:
+        from warm_worker import parse_address
+        worker_address = parse_address(args.worker)
+
+    watch(
+        project_root / "pdf" / "input",
+        project_root / "pdf" / "output",
+        project_root / "models",
+        debounce=args.debounce,
+        poll_interval=args.poll_interval,
+        worker_address=worker_address,
+        chunk_pages=args.chunk_pages,
+        route_ocr=args.route_ocr,
+        max_attempts=args.max_attempts,
+        use_watchdog=not args.poll,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for job_queue.py.
+
+A process dying in the middle of a job is simulated by marking the job
+running under another pid and opening the queue again, as a restarted run
+would. Two runs sharing a state directory are simulated by taking its run
+lock twice.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from job_queue import JobQueue, RunLock, STATE_DONE, STATE_FAILED, STATE_QUEUED
+
+KEY = "journal/paper.pdf"
+# No process has this pid: jobs marked with it belong to a run that died
+DEAD_PID = 2 ** 22 + 1
+
+
+class JobQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp.name) / "jobs.sqlite"
+        self.queue = self.open_queue()
+
+    def tearDown(self):
+        self.queue.close()
+        self.tmp.cleanup()
+
+    def open_queue(self, max_attempts=3):
+        return JobQueue(self.db_path, max_attempts)
+
+    def crash(self):
+        # The run converting the job dies; a new run opens the queue
+        self.queue.conn.execute("UPDATE jobs SET pid = ? WHERE key = ?", (DEAD_PID, KEY))
+        self.queue.conn.commit()
+        self.queue.close()
+        self.queue = self.open_queue()
+
+    def test_crashing_jobs_stop_at_the_attempt_limit(self):
+        outcomes = []
+        for _ in range(6):
+            allowed = self.queue.enqueue(KEY, "paper.pdf", "out/paper")
+            outcomes.append(allowed)
+            if not allowed:
+                break
+            self.queue.start(KEY)
+            self.crash()
+            self.queue.recover()
+        self.assertEqual(outcomes, [True, True, True, False])
+        row = self.queue.get(KEY)
+        self.assertEqual((row["state"], row["attempts"]), (STATE_FAILED, 3))
+        self.assertEqual(row["last_error"], "interrupted (process died)")
+
+    def test_interrupted_jobs_are_requeued(self):
+        self.queue.enqueue(KEY, "paper.pdf", "out/paper")
+        self.queue.start(KEY)
+        self.crash()
+        self.assertEqual(self.queue.recover(), [KEY])
+        row = self.queue.get(KEY)
+        self.assertEqual((row["state"], row["attempts"]), (STATE_QUEUED, 1))
+        self.assertEqual(self.queue.unfinished_keys(), {KEY})
+
+    def test_own_running_jobs_are_not_recovered(self):
+        self.queue.enqueue(KEY, "paper.pdf", "out/paper")
+        self.queue.start(KEY)
+        self.assertEqual(self.queue.recover(), [])
+
+    def test_failures_are_retried_until_the_limit(self):
+        for attempt in range(3):
+            self.assertTrue(self.queue.enqueue(KEY, "paper.pdf", "out/paper"))
+            self.queue.start(KEY)
+            self.queue.finish(KEY, False, f"error {attempt}")
+        self.assertFalse(self.queue.enqueue(KEY, "paper.pdf", "out/paper"))
+        self.assertEqual(self.queue.get(KEY)["last_error"], "error 2")
+        self.assertEqual(self.queue.retry_failed(), 1)
+        self.assertTrue(self.queue.enqueue(KEY, "paper.pdf", "out/paper"))
+
+    def test_finished_jobs_start_over_when_converted_again(self):
+        self.queue.enqueue(KEY, "paper.pdf", "out/paper")
+        self.queue.start(KEY)
+        self.queue.finish(KEY, True)
+        self.assertEqual(self.queue.get(KEY)["state"], STATE_DONE)
+        self.assertEqual(self.queue.unfinished_keys(), set())
+        self.assertTrue(self.queue.enqueue(KEY, "paper.pdf", "out/paper"))
+        self.assertEqual(self.queue.get(KEY)["attempts"], 0)
+
+    def test_requeue_does_not_count_the_attempt(self):
+        self.queue.enqueue(KEY, "paper.pdf", "out/paper")
+        self.queue.start(KEY)
+        self.queue.requeue(KEY, "lease lost to another node")
+        row = self.queue.get(KEY)
+        self.assertEqual((row["state"], row["attempts"]), (STATE_QUEUED, 0))
+
+
+class RunLockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.state_dir = Path(self.tmp.name) / ".pipeline"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_second_run_is_refused_until_the_first_ends(self):
+        first = RunLock(self.state_dir)
+        self.assertTrue(first.acquire())
+        second = RunLock(self.state_dir)
+        self.assertFalse(second.acquire())
+        self.assertIn(f"pid {os.getpid()}", second.holder())
+        first.release()
+        self.assertTrue(second.acquire())
+        second.release()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for llm_process.py.
+
+llm_process.run() is pointed at a stand-in OpenAI-compatible endpoint served
+from a local thread. The endpoint structures every chunk it receives, records
+how many chunks each request held, and gives an unusable answer for batches
+holding a chunk marked as hard to answer, so the tests can check batching
+across documents, reuse of cached chunks and halving of failed batches.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+
+import re
+import sys
+import json
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import llm_process
+from llm_cache import LLMCache
+
+# Only answered when sent on its own
+HARD_MARK = "HARD"
+# Never answered
+BROKEN_MARK = "BROKEN"
+
+CHUNK_PATTERN = re.compile(r"^=== Chunk (\d+) ===\n(.*?)(?=\n\n=== Chunk \d+ ===\n|\Z)", re.M | re.S)
+SECTION_BODY = "The method is evaluated on three datasets and compared with earlier work in detail."
+# Room for one section but not two, so that each section becomes its own chunk
+CHUNK_TOKENS = llm_process.count_tokens(f"## Heading\n\n{SECTION_BODY}\n\n") * 3 // 2
+
+
+class ChatHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in chat completions endpoint.
+    """
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = payload["messages"][-1]["content"]
+        chunks = [text for _number, text in CHUNK_PATTERN.findall(prompt)]
+        self.server.batches.append([text.splitlines()[0] for text in chunks])
+        if any(BROKEN_MARK in text for text in chunks) or (len(chunks) > 1 and any(HARD_MARK in text for text in chunks)):
+            content = "Sorry, these excerpts are too long to structure at once."
+        else:
+            content = json.dumps([{
+                "chunk": number,
+                "summary": text.splitlines()[0],
+                "concepts": ["datasets"],
+                "methods": [],
+                "findings": [],
+            } for number, text in enumerate(chunks, start=1)])
+        body = json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4},
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class LLMProcessTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.source_dir = self.root / "output"
+        self.target_dir = self.root / "llm_processed"
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ChatHandler)
+        self.server.batches = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.cache = LLMCache(self.root / "llm_cache.sqlite")
+
+    def tearDown(self):
+        self.cache.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def add_document(self, relative, headings):
+        path = self.source_dir / relative / f"{Path(relative).name}.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("\n\n".join(f"## {heading}\n\n{SECTION_BODY}" for heading in headings), encoding='utf-8')
+
+    def run_stage(self, batch_size=4, force=False):
+        self.server.batches = []
+        client = llm_process.ChatClient(f"http://127.0.0.1:{self.server.server_address[1]}/v1", "stand-in",
+                                        concurrency=2, timeout=30)
+        result = llm_process.run(self.source_dir, self.target_dir, client, self.cache,
+                                 CHUNK_TOKENS, 10000, batch_size, force)
+        return result, client
+
+    def structured(self, relative):
+        name = Path(relative).name
+        with open(self.target_dir / relative / f"{name}_structured.json", 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def sent_headings(self):
+        return sorted(heading for batch in self.server.batches for heading in batch)
+
+    def test_chunks_of_several_documents_share_requests(self):
+        self.add_document("a/paper1", ["A1", "A2", "A3"])
+        self.add_document("a/paper2", ["B1", "B2", "B3"])
+        self.add_document("b/paper3", ["C1", "C2", "C3"])
+        (written, skipped, incomplete), client = self.run_stage(batch_size=4)
+        self.assertEqual((written, skipped, incomplete), (3, 0, 0))
+        self.assertEqual(sorted(len(batch) for batch in self.server.batches), [1, 4, 4])
+        self.assertEqual(client.requests, 3)
+        self.assertTrue(any(len({heading[3] for heading in batch}) > 1 for batch in self.server.batches))
+        output = self.structured("a/paper2")
+        self.assertEqual([chunk["summary"] for chunk in output["chunks"]], ["## B1", "## B2", "## B3"])
+        self.assertEqual([chunk["section"] for chunk in output["chunks"]], ["B1", "B2", "B3"])
+
+    def test_cached_chunks_are_not_sent_again(self):
+        self.add_document("a/paper1", ["A1", "A2"])
+        self.run_stage()
+        self.assertEqual(self.sent_headings(), ["## A1", "## A2"])
+
+        # Unchanged documents are skipped; a new one only sends its unseen chunks
+        self.add_document("a/paper2", ["A2", "B1"])
+        (written, skipped, incomplete), client = self.run_stage()
+        self.assertEqual((written, skipped, incomplete), (1, 1, 0))
+        self.assertEqual(self.sent_headings(), ["## B1"])
+        self.assertEqual(client.requests, 1)
+
+        # Forced runs rewrite every output from the cache alone
+        (written, skipped, incomplete), client = self.run_stage(force=True)
+        self.assertEqual((written, skipped, incomplete), (2, 0, 0))
+        self.assertEqual(self.server.batches, [])
+        self.assertEqual([chunk["summary"] for chunk in self.structured("a/paper2")["chunks"]], ["## A2", "## B1"])
+
+    def test_chunks_shared_by_documents_are_sent_once(self):
+        self.add_document("a/paper1", ["Shared", "A1"])
+        self.add_document("a/paper2", ["Shared", "B1"])
+        (written, _skipped, _incomplete), _client = self.run_stage()
+        self.assertEqual(written, 2)
+        self.assertEqual(self.sent_headings(), ["## A1", "## B1", "## Shared"])
+
+    def test_unusable_answers_halve_the_batch(self):
+        self.add_document("a/paper1", ["A1", f"A2 {HARD_MARK}", "A3", "A4"])
+        (written, skipped, incomplete), client = self.run_stage(batch_size=4)
+        self.assertEqual((written, skipped, incomplete), (1, 0, 0))
+        # 4 chunks fail, then 2 + 2, of which the half with the hard chunk is split into 1 + 1
+        self.assertEqual(sorted(len(batch) for batch in self.server.batches), [1, 1, 2, 2, 4])
+        self.assertEqual(client.requests, 5)
+        self.assertEqual(len(self.structured("a/paper1")["chunks"]), 4)
+
+    def test_unanswerable_chunks_leave_the_document_for_the_next_run(self):
+        self.add_document("a/paper1", ["A1", f"A2 {BROKEN_MARK}"])
+        self.add_document("a/paper2", ["B1", "B2"])
+        (written, skipped, incomplete), _client = self.run_stage(batch_size=4)
+        self.assertEqual((written, skipped, incomplete), (1, 0, 1))
+        self.assertFalse((self.target_dir / "a" / "paper1" / "paper1_structured.json").exists())
+
+        # The next run only sends the chunk that is still missing
+        (written, skipped, incomplete), _client = self.run_stage(batch_size=4)
+        self.assertEqual((written, skipped, incomplete), (0, 1, 1))
+        self.assertEqual(self.sent_headings(), [f"## A2 {BROKEN_MARK}"])
+
+
+if __name__ == "__main__":
+    unittest.main()
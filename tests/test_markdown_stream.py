@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for markdown_stream.py.
+
+The page-by-page Markdown is compared with Marker's own MarkdownRenderer on
+generated documents whose pages end mid-paragraph, in hyphenated words, in
+bold runs, lists and indented code. These tests are skipped when marker-pdf
+is not installed.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+
+import sys
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import markdown_stream
+
+try:
+    from marker.renderers.markdown import MarkdownRenderer
+    from marker.schema.document import Document
+    from marker.schema.groups.page import PageGroup
+    from marker.schema.blocks import Text, SectionHeader
+    from marker.schema.polygon import PolygonBox
+    HAS_MARKER = True
+except ImportError:
+    HAS_MARKER = False
+
+# HTML of the blocks pages are made of; Marker uses a block's html as is
+BLOCKS = [
+    "<p block-type='Text'>A plain paragraph.</p>",
+    "<p block-type='Text' class='has-continuation'>a word split across pages experi-</p>",
+    "<p block-type='Text' class='has-continuation'>a sentence that runs on to the</p>",
+    "<p block-type='Text'>ment ends here.</p>",
+    "<p block-type='Text'>next page.</p>",
+    "<b>bold at the end</b>",
+    "<b>bold at the start</b> of a line",
+    "<i>italic</i>",
+    "<math>x-</math>",
+    "<math>y</math>",
+    "loose inline text",
+    "\n\n",
+    "  ",
+    "",
+    "<ul><li>item one</li><li>item two</li></ul>",
+    "<ol><li>first</li></ol>",
+    "<table><tr><th>head</th></tr><tr><td>cell</td></tr></table>",
+    "<blockquote><p>quoted</p></blockquote>",
+    "<pre>code\n  block</pre>",
+    "<pre>    indented\n    code</pre>",
+    "<pre>\ttabbed\n  \n\tmore</pre>",
+    "<p>line\n   \n  wrapped</p>",
+    "\n   ",
+]
+
+
+class Converter:
+    """
+    Stand-in for a Marker converter around an existing renderer.
+    """
+
+    def __init__(self, renderer):
+        self.renderer = renderer
+
+    def resolve_dependencies(self, renderer):
+        return renderer
+
+
+class MarkdownStreamWriterTest(unittest.TestCase):
+
+    def write(self, runs, page_separator=None):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "paper.md"
+            with markdown_stream.MarkdownStreamWriter(path, page_separator) as writer:
+                for run in runs:
+                    writer.write(run)
+            return path.read_text(encoding="utf-8")
+
+    def test_blank_lines_between_runs_collapse(self):
+        self.assertEqual(self.write(["\n\nfirst\n\n\n", "\n\nsecond\n"]), "first\n\nsecond")
+
+    def test_whitespace_at_the_ends_is_dropped(self):
+        self.assertEqual(self.write(["  \n", "text", " \n\n", ""]), "text")
+
+    def test_failed_write_keeps_previous_markdown(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "paper.md"
+            path.write_text("old", encoding="utf-8")
+            with self.assertRaises(RuntimeError):
+                with markdown_stream.MarkdownStreamWriter(path) as writer:
+                    writer.write("new")
+                    raise RuntimeError("conversion failed")
+            self.assertEqual(path.read_text(encoding="utf-8"), "old")
+            self.assertFalse(writer.tmp_path.exists())
+
+
+@unittest.skipUnless(HAS_MARKER, "marker-pdf is not installed")
+class PageRendererTest(unittest.TestCase):
+
+    def build_document(self, pages):
+        box = PolygonBox.from_bbox([0, 0, 100, 100])
+        page_groups = []
+        for page_id, blocks in enumerate(pages):
+            page = PageGroup(polygon=box, page_id=page_id)
+            page.children = []
+            page.structure = []
+            for html in blocks:
+                if isinstance(html, int):
+                    block = SectionHeader(polygon=box, page_id=page_id, heading_level=html,
+                                          html=f"<h{html}>Heading {html}</h{html}>")
+                else:
+                    block = Text(polygon=box, page_id=page_id, html=html)
+                page.add_full_block(block)
+                page.structure.append(block.id)
+            page_groups.append(page)
+        return Document(filepath="paper.pdf", pages=page_groups)
+
+    def stream(self, document, paginate):
+        pages = markdown_stream.PageRenderer(Converter(MarkdownRenderer({"paginate_output": paginate})), document)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "paper.md"
+            with markdown_stream.MarkdownStreamWriter(path, pages.page_separator) as writer:
+                for index in range(len(pages)):
+                    markdown, _ = pages.render_page(index)
+                    writer.write(markdown)
+                writer.write(pages.flush())
+            return path.read_text(encoding="utf-8"), pages.metadata
+
+    def assert_same_as_marker(self, pages, paginate=False):
+        document = self.build_document(pages)
+        expected = MarkdownRenderer({"paginate_output": paginate})(document)
+        markdown, metadata = self.stream(document, paginate)
+        self.assertEqual(markdown, expected.markdown)
+        self.assertEqual(metadata, expected.metadata)
+
+    def test_hyphenated_word_across_pages(self):
+        self.assert_same_as_marker([[BLOCKS[0], BLOCKS[1]], [BLOCKS[3], BLOCKS[0]]])
+
+    def test_bold_run_across_pages(self):
+        self.assert_same_as_marker([[BLOCKS[5]], [BLOCKS[6]]])
+
+    def test_headings_carry_over_pages(self):
+        self.assert_same_as_marker([[2, BLOCKS[0]], [3, BLOCKS[2]], [BLOCKS[4], 2]], paginate=True)
+
+    def test_closed_blocks_are_written_page_by_page(self):
+        document = self.build_document([[BLOCKS[0]], [BLOCKS[0]], [BLOCKS[0]]])
+        pages = markdown_stream.PageRenderer(Converter(MarkdownRenderer()), document)
+        written = [pages.render_page(index)[0] for index in range(len(pages))]
+        self.assertEqual(written[0], "")
+        self.assertTrue(written[1] and written[2])
+
+    def test_out_of_order_pages_are_refused(self):
+        document = self.build_document([[BLOCKS[0]], [BLOCKS[0]]])
+        pages = markdown_stream.PageRenderer(Converter(MarkdownRenderer()), document)
+        with self.assertRaises(ValueError):
+            pages.render_page(1)
+
+    def test_random_documents(self):
+        rng = random.Random(2026)
+        for _ in range(200):
+            pages = []
+            for _ in range(rng.randint(1, 6)):
+                pages.append([rng.choice(BLOCKS + [1, 2, 3]) for _ in range(rng.randint(0, 5))])
+            with self.subTest(pages=pages):
+                self.assert_same_as_marker(pages, paginate=rng.random() < 0.3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tests for sharded and leased runs of process_pdf.py (sharding.py).
+
+Several node processes run process_all_pdfs() on the same temporary corpus at
+the same time, with --shard and/or --lease. Marker is replaced by a stand-in
+conversion that logs which node converted which PDF, so these tests need no
+models. Every PDF must be converted exactly once, and the merged manifest
+must cover the whole corpus.
+
+Usage:
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import time
+import tempfile
+import unittest
+import multiprocessing
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import process_pdf
+from sharding import check_lease, merge_node_state, list_nodes
+
+DIRECTORIES = ["alpha", "beta", "gamma"]
+PDFS_PER_DIRECTORY = 6
+
+
+def run_node(root, log_path, node, shard=None, lease=False):
+    """
+    Run one node of a sharded or leased run over the corpus under root.
+
+    Args:
+        root (str): Stand-in project root holding pdf/input and pdf/output
+        log_path (str): File each conversion is appended to as "<node> <key>"
+        node (str): Node name
+        shard (tuple): Shard (i, N) of the node, or None
+        lease (bool): Claim PDFs with lease files
+    """
+    import run_planner
+
+    # Metrics, profiles and the search index must not touch the real outputs
+    os.environ["PAPER2SKILL_METRICS"] = "0"
+    process_pdf.get_project_root = lambda: Path(root)
+    process_pdf.get_profile = lambda pdf_path: {"page_count": 1, "image_count": 0}
+    process_pdf.check_model_availability = lambda: True
+    run_planner.print_run_estimate = lambda *args, **kwargs: None
+    input_dir = Path(root) / "pdf" / "input"
+
+    def convert(pdf_path, output_dir, model_dir, cores_limit, force, chunk_pages, route_ocr, lease):
+        # Long enough for the other nodes to be planning at the same time
+        time.sleep(0.05)
+        check_lease(lease)
+        key = Path(pdf_path).relative_to(input_dir).as_posix()
+        with open(log_path, 'a', encoding='utf-8') as f:
+            f.write(f"{node} {key}\n")
+        Path(output_dir).mkdir(parents=True, exist_ok=True)
+        (Path(output_dir) / f"{process_pdf.sanitize_filename(Path(pdf_path).stem)}.md").write_text(
+            f"# {key}\n", encoding='utf-8')
+        return True
+
+    process_pdf._convert_pdf_file = convert
+    process_pdf.process_all_pdfs(workers=1, shard=shard, lease=lease, node=node)
+
+
+class ShardedRunTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.log_path = self.root / "conversions.log"
+        self.keys = []
+        for directory in DIRECTORIES:
+            (self.root / "pdf" / "input" / directory).mkdir(parents=True)
+            for number in range(PDFS_PER_DIRECTORY):
+                path = self.root / "pdf" / "input" / directory / f"paper{number}.pdf"
+                # Distinct contents, so that no PDF looks like a moved copy of another
+                path.write_bytes(f"%PDF-1.4\n% {directory} {number}\n".encode())
+                self.keys.append(f"{directory}/paper{number}.pdf")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_nodes(self, nodes):
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=run_node, args=(str(self.root), str(self.log_path)) + node)
+                     for node in nodes]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(120)
+            self.assertEqual(process.exitcode, 0)
+
+    def conversions(self):
+        if not self.log_path.exists():
+            return []
+        lines = self.log_path.read_text(encoding='utf-8').splitlines()
+        return [line.split(" ", 1) for line in lines]
+
+    def assert_converted_once(self):
+        counts = Counter(key for _, key in self.conversions())
+        self.assertEqual(sorted(counts), sorted(self.keys))
+        self.assertEqual({key: count for key, count in counts.items() if count > 1}, {})
+
+    def assert_merged(self, nodes):
+        output_dir = self.root / "pdf" / "output"
+        self.assertEqual(sorted(list_nodes(output_dir / ".pipeline")), sorted(nodes))
+        summaries = merge_node_state(output_dir, process_pdf.MANIFEST_CONFIG)
+        self.assertEqual(sum(summary["converted"] for summary in summaries.values()), len(self.keys))
+        merged = process_pdf.ConversionManifest(output_dir / ".pipeline" / "manifest.json", process_pdf.MANIFEST_CONFIG)
+        self.assertEqual(sorted(merged.entries), sorted(self.keys))
+        for key in self.keys:
+            stem = Path(key).stem
+            self.assertTrue((output_dir / Path(key).parent / stem / f"{stem}.md").exists(), key)
+
+    def test_shards_split_the_corpus(self):
+        self.run_nodes([("node-a", (1, 2)), ("node-b", (2, 2))])
+        self.assert_converted_once()
+        by_node = {}
+        for node, key in self.conversions():
+            by_node.setdefault(node, set()).add(key)
+        self.assertFalse(by_node.get("node-a", set()) & by_node.get("node-b", set()))
+        self.assert_merged(["node-a", "node-b"])
+
+    def test_leased_nodes_share_the_corpus(self):
+        self.run_nodes([("node-a", None, True), ("node-b", None, True), ("node-c", None, True)])
+        self.assert_converted_once()
+        self.assert_merged(["node-a", "node-b", "node-c"])
+        lease_files = list((self.root / "pdf" / "output").rglob("*.lease"))
+        self.assertEqual(lease_files, [])
+
+    def test_leased_shards_and_rerun(self):
+        nodes = [("node-a", (1, 2), True), ("node-b", (1, 2), True), ("node-c", (2, 2), True)]
+        self.run_nodes(nodes)
+        self.assert_converted_once()
+        self.assert_merged(["node-a", "node-b", "node-c"])
+        # A node joining later finds everything converted by its peers
+        self.run_nodes([("node-d", None, True)])
+        self.assertNotIn("node-d", [node for node, _ in self.conversions()])
+        self.assert_converted_once()
+
+
+if __name__ == "__main__":
+    unittest.main()